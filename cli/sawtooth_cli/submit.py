@@ -13,20 +13,47 @@
 # limitations under the License.
 # ------------------------------------------------------------------------------
 
+from collections import deque
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import logging
 import time
 from sys import maxsize
 
+from sawtooth_sdk.client.batch_file import read_batches
+
 from sawtooth_cli.exceptions import CliException
 from sawtooth_cli.rest_client import RestClient
 import sawtooth_cli.protobuf.batch_pb2 as batch_pb2
 
 LOGGER = logging.getLogger(__file__)
 
+# The most batch ids whose status is asked for in one request
+_STATUS_REQUEST_SIZE = 500
+
+
+def _read_batches(fd):
+    """Reads the batches of a batch file one at a time, so that files of
+    any size can be submitted without reading them into memory.
 
-def _split_batch_list(args, batch_list):
+    Args:
+        fd (file): The batch file, opened in binary mode
+
+    Yields:
+        Batch: the next batch in the file
+    """
+    try:
+        for serialized_batch in read_batches(fd):
+            batch = batch_pb2.Batch()
+            batch.ParseFromString(serialized_batch)
+            yield batch
+    except ValueError as e:
+        raise CliException(e)
+
+
+def _split_batch_list(args, batches):
     new_list = []
-    for batch in batch_list.batches:
+    for batch in batches:
         new_list.append(batch)
         if len(new_list) == args.batch_size_limit:
             yield batch_pb2.BatchList(batches=new_list)
@@ -35,49 +62,181 @@ def _split_batch_list(args, batch_list):
         yield batch_pb2.BatchList(batches=new_list)
 
 
+def _percentiles(latencies, percents=(50, 95, 99)):
+    """Returns the nearest-rank percentiles of a list of latencies.
+    """
+    ordered = sorted(latencies)
+    return [
+        ordered[min(len(ordered) - 1, len(ordered) * percent // 100)]
+        for percent in percents
+    ]
+
+
+def _print_latencies(name, latencies):
+    if latencies:
+        print('{} latency (sec): p50: {:.4f}  p95: {:.4f}  p99: {:.4f}'
+              .format(name, *_percentiles(latencies)))
+
+
+class _BatchSubmitter(object):
+    """Submits lists of batches, spread round-robin over one or more
+    validators, keeping up to a window of submissions in flight to each.
+    """
+
+    def __init__(self, urls, window):
+        self._targets = [(RestClient(url), deque()) for url in urls]
+        self._window = window
+        self._next_target = 0
+        self._executor = ThreadPoolExecutor(window * len(urls))
+        self.latencies = []
+
+    @staticmethod
+    def _send(rest_client, batch_list):
+        start = time.time()
+        rest_client.send_batches(batch_list)
+        return time.time() - start
+
+    def submit(self, batch_list):
+        """Sends a list of batches to the next validator.
+
+        Returns:
+            RestClient: the client of the validator the batches were sent to
+        """
+        rest_client, in_flight = self._targets[self._next_target]
+        self._next_target = (self._next_target + 1) % len(self._targets)
+
+        # Wait for the oldest submission to this validator once its window
+        # is full
+        while len(in_flight) >= self._window or \
+                (in_flight and in_flight[0].done()):
+            self.latencies.append(in_flight.popleft().result())
+
+        in_flight.append(
+            self._executor.submit(self._send, rest_client, batch_list))
+        return rest_client
+
+    def finish(self):
+        try:
+            for _, in_flight in self._targets:
+                while in_flight:
+                    self.latencies.append(in_flight.popleft().result())
+        finally:
+            self._executor.shutdown(wait=False)
+
+
+class _CommitTracker(object):
+    """Records the time from the submission of each batch until it is seen
+    to be committed, asking for the statuses of many batches at once.  The
+    status of each batch is asked of the validator it was submitted to, as
+    the others may not have seen it yet.
+    """
+
+    def __init__(self):
+        self._pending = OrderedDict()
+        self._last_check = 0
+        self.statuses = {}
+        self.latencies = []
+
+    @property
+    def pending_count(self):
+        return len(self._pending)
+
+    @property
+    def pending_ids(self):
+        return list(self._pending)
+
+    def add(self, rest_client, batch_ids):
+        now = time.time()
+        for batch_id in batch_ids:
+            self._pending[batch_id] = (now, rest_client)
+
+    def check(self, interval=0.2):
+        """Asks for the statuses of the batches submitted longest ago, if
+        they haven't been asked for in the last interval seconds.  Batches
+        that are not yet committed are asked for again after the others.
+        """
+        if not self._pending or time.time() - self._last_check < interval:
+            return
+
+        batch_ids = []
+        ids_by_client = OrderedDict()
+        for batch_id, (_, rest_client) in self._pending.items():
+            batch_ids.append(batch_id)
+            ids_by_client.setdefault(rest_client, []).append(batch_id)
+            if len(batch_ids) == _STATUS_REQUEST_SIZE:
+                break
+
+        for rest_client, client_batch_ids in ids_by_client.items():
+            self.statuses.update(rest_client.get_statuses(client_batch_ids))
+        self._last_check = time.time()
+
+        for batch_id in batch_ids:
+            if self.statuses.get(batch_id) == 'COMMITTED':
+                submitted, _ = self._pending.pop(batch_id)
+                self.latencies.append(self._last_check - submitted)
+            else:
+                self._pending.move_to_end(batch_id)
+
+
 def do_submit(args):
+    urls = [url.strip() for url in args.url.split(',') if url.strip()]
+    if not urls:
+        raise CliException('At least one validator URL is required')
+
+    if args.window < 1:
+        raise CliException('The submission window must be at least 1')
 
     try:
-        with open(args.filename, mode='rb') as fd:
-            batches = batch_pb2.BatchList()
-            batches.ParseFromString(fd.read())
+        fd = open(args.filename, mode='rb')
     except IOError as e:
         raise CliException(e)
 
-    rest_client = RestClient(args.url)
+    submitter = _BatchSubmitter(urls, args.window)
+    tracker = None
+    if args.wait and args.wait > 0:
+        tracker = _CommitTracker()
 
+    batch_count = 0
     start = time.time()
 
-    for batch_list in _split_batch_list(args, batches):
-        rest_client.send_batches(batch_list)
+    with fd:
+        try:
+            for batch_list in _split_batch_list(args, _read_batches(fd)):
+                rest_client = submitter.submit(batch_list)
+                if tracker is not None:
+                    tracker.add(
+                        rest_client,
+                        (b.header_signature for b in batch_list.batches))
+                    tracker.check()
+                batch_count += len(batch_list.batches)
+        finally:
+            submitter.finish()
 
     stop = time.time()
 
     print('batches: {},  batch/sec: {}'.format(
-        str(len(batches.batches)),
-        len(batches.batches) / (stop - start)))
-
-    if args.wait and args.wait > 0:
-        batch_ids = [b.header_signature for b in batches.batches]
-        wait_time = 0
-        start_time = time.time()
-
-        while wait_time < args.wait:
-            statuses = rest_client.get_statuses(
-                batch_ids,
-                args.wait - int(wait_time))
-            wait_time = time.time() - start_time
-
-            if all(s == 'COMMITTED' for s in statuses.values()):
-                print('All batches committed in {:.6} sec'.format(wait_time))
-                return
+        str(batch_count),
+        batch_count / (stop - start)))
+    _print_latencies('submit', submitter.latencies)
 
+    if tracker is not None:
+        while tracker.pending_count > 0 and time.time() - stop < args.wait:
+            tracker.check()
             # Wait a moment so as not to hammer the Rest Api
             time.sleep(0.2)
 
+        wait_time = time.time() - stop
+        if tracker.pending_count == 0:
+            print('All batches committed in {:.6} sec'.format(wait_time))
+            print('committed batch/sec: {}'.format(
+                batch_count / (time.time() - start)))
+            _print_latencies('commit', tracker.latencies)
+            return
+
         print('Wait timed out! Some batches have not yet been committed...')
-        for batch_id, status in statuses.items():
-            print('{:128.128}  {:8.8}'.format(batch_id, status))
+        for batch_id in tracker.pending_ids:
+            print('{:128.128}  {:8.8}'.format(
+                batch_id, tracker.statuses.get(batch_id, 'UNKNOWN')))
         exit(1)
 
 
@@ -102,7 +261,8 @@ def add_submit_parser(subparsers, parent_parser):
     parser.add_argument(
         '-U', '--url',
         type=str,
-        help='connection URL for validator',
+        help='connection URL for validator, or comma separated URLs to '
+        'spread the batches over several validators',
         default='http://localhost:8080')
 
     parser.add_argument(
@@ -111,3 +271,10 @@ def add_submit_parser(subparsers, parent_parser):
         help='batches are split for processing if they exceed this size',
         default=100
     )
+
+    parser.add_argument(
+        '--window',
+        type=int,
+        help='the number of submissions in flight to each validator',
+        default=4
+    )
@@ -76,6 +76,7 @@ setup(name='sawtooth-cli',
           'colorlog',
           'protobuf',
           'sawtooth-manage',
+          'sawtooth-sdk',
           'sawtooth-signing',
           'toml',
           'PyYAML',
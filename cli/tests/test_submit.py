@@ -0,0 +1,129 @@
+# Copyright 2017 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+
+import argparse
+import io
+import os
+import tempfile
+import shutil
+import threading
+import unittest
+from unittest import mock
+
+from sawtooth_cli.exceptions import CliException
+from sawtooth_cli.protobuf.batch_pb2 import Batch
+from sawtooth_cli.protobuf.batch_pb2 import BatchList
+
+from sawtooth_cli import submit
+
+
+class MockRestClient(object):
+    """Records the batches sent to a URL, and the most submissions that were
+    in flight to it at once.
+    """
+
+    clients = {}
+    lock = threading.Lock()
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.batch_ids = []
+        self.in_flight = 0
+        self.most_in_flight = 0
+        self.status_ids = []
+        MockRestClient.clients[base_url] = self
+
+    def send_batches(self, batch_list):
+        with MockRestClient.lock:
+            self.in_flight += 1
+            self.most_in_flight = max(self.most_in_flight, self.in_flight)
+        threading.Event().wait(0.01)
+        with MockRestClient.lock:
+            self.in_flight -= 1
+            self.batch_ids.extend(
+                batch.header_signature for batch in batch_list.batches)
+
+    def get_statuses(self, batch_ids, wait=None):
+        self.status_ids.extend(batch_ids)
+        return {batch_id: 'COMMITTED' for batch_id in batch_ids}
+
+
+class TestSubmit(unittest.TestCase):
+    def setUp(self):
+        self._temp_dir = tempfile.mkdtemp()
+        self._filename = os.path.join(self._temp_dir, 'batches')
+
+        self._parser = argparse.ArgumentParser()
+        subparsers = self._parser.add_subparsers(title='subcommands',
+                                                 dest='command')
+        submit.add_submit_parser(
+            subparsers, argparse.ArgumentParser(add_help=False))
+
+        MockRestClient.clients = {}
+
+    def tearDown(self):
+        shutil.rmtree(self._temp_dir)
+
+    def _batch_list(self, start, count):
+        return BatchList(batches=[
+            Batch(header_signature='batch-{}'.format(i), header=b'x' * i)
+            for i in range(start, start + count)])
+
+    def test_read_batches(self):
+        """Test that the batches of a file of several BatchLists are read one
+        at a time, and that a truncated file is reported.
+        """
+        data = \
+            self._batch_list(0, 3).SerializeToString() + \
+            self._batch_list(3, 200).SerializeToString()
+
+        batch_ids = [
+            b.header_signature for b in submit._read_batches(io.BytesIO(data))
+        ]
+        self.assertEqual(['batch-{}'.format(i) for i in range(203)],
+                         batch_ids)
+
+        with self.assertRaises(CliException):
+            list(submit._read_batches(io.BytesIO(data[:-5])))
+
+    def test_submit_window(self):
+        """Test that the batches are spread over the validators, with no more
+        than the window of submissions in flight to each, and that their
+        commits are waited for by asking each validator for the statuses of
+        the batches sent to it.
+        """
+        with open(self._filename, 'wb') as fd:
+            fd.write(self._batch_list(0, 95).SerializeToString())
+
+        args = self._parser.parse_args([
+            'submit', '-f', self._filename, '--batch-size-limit', '5',
+            '--window', '2', '--wait', '10',
+            '--url', 'http://validator-0:8080,http://validator-1:8080'])
+
+        with mock.patch.object(submit, 'RestClient', MockRestClient), \
+                mock.patch('builtins.print'):
+            submit.do_submit(args)
+
+        clients = MockRestClient.clients
+        self.assertEqual(
+            ['http://validator-0:8080', 'http://validator-1:8080'],
+            sorted(clients))
+        self.assertEqual(
+            [50, 45],
+            [len(clients[url].batch_ids) for url in sorted(clients)])
+        for client in clients.values():
+            self.assertLessEqual(client.most_in_flight, 2)
+            self.assertEqual(sorted(client.batch_ids),
+                             sorted(client.status_ids))
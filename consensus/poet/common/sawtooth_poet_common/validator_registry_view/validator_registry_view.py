@@ -12,7 +12,9 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 # ------------------------------------------------------------------------------
+from collections import OrderedDict
 import hashlib
+import threading
 
 from sawtooth_poet_common.protobuf.validator_registry_pb2 import ValidatorInfo
 
@@ -27,8 +29,19 @@ class ValidatorRegistryView(object):
     The ValidatorRegistryView provides access to the validator registry's
     information about validators stored within a particular state view. This
     access is read-only.
+
+    Reading all of the validators decodes every record in the registry, so
+    the result is kept in a snapshot shared by all views.  A snapshot is
+    keyed by the hash of the registry's merkle node, so views of any state
+    root in which the registry is unchanged share it, and it is only rebuilt
+    when the registry actually changes.
     """
 
+    MAXIMUM_SNAPSHOTS = 64
+
+    _snapshots = OrderedDict()
+    _lock = threading.Lock()
+
     def __init__(self, state_view):
         """
         Constructs a view, on top of the given read-only state view.
@@ -38,21 +51,30 @@ class ValidatorRegistryView(object):
                 current snapshot of chain state.
         """
         self._state_view = state_view
+        self._snapshot = None
 
     def get_validators(self):
         """Gets a dict of validator infos for all validators known to the
         registry. The dict is a mapping of validator id to ValidatorInfo.
 
+        The `ValidatorInfo` objects are shared with other views of the same
+        registry, so must not be changed.
+
         Returns:
             dict:(str, `ValidatorInfo`): A dict of validator id to
                 `ValidatorInfo` objects.
         """
-        validator_map_addr = ValidatorRegistryView._to_address('validator_map')
-        leaves = self._state_view.leaves(_NAMESPACE)
-        infos = [ValidatorRegistryView._parse_validator_info(state_data)
-                 for address, state_data in leaves.items()
-                 if address != validator_map_addr]
-        return {info.id: info for info in infos}
+        return dict(self._get_snapshot())
+
+    def get_validator_count(self):
+        """Gets the number of validators known to the registry, without
+        decoding their records if the registry is unchanged since they were
+        last counted.
+
+        Returns:
+            int: The number of validators
+        """
+        return len(self._get_snapshot())
 
     def has_validator_info(self, validator_id):
         """Checks to see if it has the validator info for a given validator ID.
@@ -83,11 +105,55 @@ class ValidatorRegistryView(object):
         Raises:
             KeyError: If no validator info exists for the given ID.
         """
+        if self._snapshot is not None:
+            validator_info = self._snapshot.get(validator_id)
+            if validator_info is None:
+                raise KeyError(validator_id)
+            return ValidatorRegistryView._copy_validator_info(validator_info)
+
         state_data = self._state_view.get(
             ValidatorRegistryView._to_address(validator_id))
 
         return ValidatorRegistryView._parse_validator_info(state_data)
 
+    def _get_snapshot(self):
+        """Returns the dict of validator id to ValidatorInfo for the registry
+        in this view's state, from the shared snapshots if possible.  The
+        ValidatorInfo objects are shared, so must not be changed.
+        """
+        if self._snapshot is not None:
+            return self._snapshot
+
+        try:
+            registry_hash = self._state_view.get_node_hash(_NAMESPACE)
+        except KeyError:
+            # There is nothing in the registry
+            self._snapshot = {}
+            return self._snapshot
+
+        with ValidatorRegistryView._lock:
+            snapshot = ValidatorRegistryView._snapshots.get(registry_hash)
+            if snapshot is not None:
+                ValidatorRegistryView._snapshots.move_to_end(registry_hash)
+                self._snapshot = snapshot
+                return snapshot
+
+        validator_map_addr = ValidatorRegistryView._to_address('validator_map')
+        leaves = self._state_view.leaves(_NAMESPACE)
+        infos = [ValidatorRegistryView._parse_validator_info(state_data)
+                 for address, state_data in leaves.items()
+                 if address != validator_map_addr]
+        snapshot = {info.id: info for info in infos}
+
+        with ValidatorRegistryView._lock:
+            ValidatorRegistryView._snapshots[registry_hash] = snapshot
+            while len(ValidatorRegistryView._snapshots) > \
+                    ValidatorRegistryView.MAXIMUM_SNAPSHOTS:
+                ValidatorRegistryView._snapshots.popitem(last=False)
+
+        self._snapshot = snapshot
+        return snapshot
+
     @staticmethod
     def _to_address(addressable_key):
         return _NAMESPACE + hashlib.sha256(
@@ -99,3 +165,10 @@ class ValidatorRegistryView(object):
         validator_info.ParseFromString(state_data)
 
         return validator_info
+
+    @staticmethod
+    def _copy_validator_info(validator_info):
+        copy = ValidatorInfo()
+        copy.CopyFrom(validator_info)
+
+        return copy
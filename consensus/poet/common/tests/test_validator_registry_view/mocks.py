@@ -13,6 +13,8 @@
 # limitations under the License.
 # ------------------------------------------------------------------------------
 
+import hashlib
+
 
 class MockStateView(object):
     """Simulates a StateView by wrapping a dictionary of address/bytes pairs.
@@ -25,6 +27,7 @@ class MockStateView(object):
             state_dict (dict): Dict of address/byte pairs
         """
         self._state = state_dict
+        self.leaves_calls = 0
 
     def get(self, address):
         """See sawtooth_validator.state.state_view.StateView.get"""
@@ -36,6 +39,17 @@ class MockStateView(object):
 
     def leaves(self, prefix):
         """See sawtooth_validator.state.state_view.StateView.leaves"""
+        self.leaves_calls += 1
         return {address: data
                 for address, data in self._state.items()
                 if address.startswith(prefix)}
+
+    def get_node_hash(self, address):
+        """See sawtooth_validator.state.state_view.StateView.get_node_hash"""
+        entries = sorted(
+            (key, data) for key, data in self._state.items()
+            if key.startswith(address))
+        if not entries:
+            raise KeyError(address)
+
+        return hashlib.sha512(repr(entries).encode()).hexdigest()[:64]
@@ -23,7 +23,22 @@ from test_validator_registry_view.mocks import MockStateView
 from test_validator_registry_view.utils import to_address
 
 
+def _validator_info(validator_id, name):
+    return ValidatorInfo(
+        registered='sure',
+        name=name,
+        id=validator_id,
+        signup_info=SignUpInfo(poet_public_key='my_pubkey',
+                               proof_data='beleive me',
+                               anti_sybil_id='no sybil'),
+        transaction_id="signature"
+    ).SerializeToString()
+
+
 class TestValidatorRegistryView(unittest.TestCase):
+    def setUp(self):
+        # pylint: disable=protected-access
+        ValidatorRegistryView._snapshots.clear()
 
     def test_get_validator_info(self):
         """Given a state view that contains a state entry for a given validator
@@ -125,3 +140,51 @@ class TestValidatorRegistryView(unittest.TestCase):
         self.assertEqual(2, len(infos))
         self.assertEqual('my_validator', infos['my_id'].name)
         self.assertEqual('your_validator', infos['another_id'].name)
+
+    def test_registry_snapshots(self):
+        """Given state views of several state roots, verify that the
+        validators are only read from state again when the registry changes,
+        and that the validator count and validator infos read from a
+        snapshot match the registry.
+        """
+        registry = {
+            to_address('validator_map'): b'this should be ignored',
+            to_address('my_id'): _validator_info('my_id', 'my_validator')
+        }
+        other_state = {'000000' + '0' * 64: b'other'}
+
+        first_view = MockStateView(dict(registry, **other_state))
+        self.assertEqual(
+            1, ValidatorRegistryView(first_view).get_validator_count())
+        self.assertEqual(1, first_view.leaves_calls)
+
+        # A state root where only state outside the registry has changed
+        # shares the snapshot
+        second_view = MockStateView(dict(registry))
+        validator_registry_view = ValidatorRegistryView(second_view)
+        self.assertEqual(1, validator_registry_view.get_validator_count())
+        self.assertEqual(
+            'my_validator',
+            validator_registry_view.get_validator_info('my_id').name)
+        with self.assertRaises(KeyError):
+            validator_registry_view.get_validator_info('another_id')
+        self.assertEqual(0, second_view.leaves_calls)
+
+        # Validator info from a snapshot can be changed by the caller
+        # without changing the snapshot
+        validator_registry_view.get_validator_info('my_id').name = 'changed'
+        self.assertEqual(
+            'my_validator',
+            ValidatorRegistryView(second_view).get_validators()['my_id'].name)
+
+        # A state root where the registry has changed is read again
+        registry[to_address('another_id')] = \
+            _validator_info('another_id', 'your_validator')
+        third_view = MockStateView(dict(registry))
+        self.assertEqual(
+            2, ValidatorRegistryView(third_view).get_validator_count())
+        self.assertEqual(1, third_view.leaves_calls)
+
+        # An empty registry has no validators
+        self.assertEqual(
+            0, ValidatorRegistryView(MockStateView({})).get_validator_count())
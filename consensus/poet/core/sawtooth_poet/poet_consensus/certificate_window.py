@@ -0,0 +1,177 @@
+# Copyright 2017 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+
+from collections import OrderedDict
+import logging
+import threading
+
+from sawtooth_validator.journal.block_wrapper import NULL_BLOCK_IDENTIFIER
+
+LOGGER = logging.getLogger(__name__)
+
+
+class CertificateWindow(tuple):
+    """An immutable window of the wait certificates for a run of consecutive
+    blocks, ordered oldest to newest.  Values derived from the window, such
+    as the population estimate, are computed once and kept with it.
+    """
+
+    def __new__(cls, certificates=()):
+        window = super().__new__(cls, certificates)
+        window._derived = {}
+        return window
+
+    def extend(self, certificates, maximum_number):
+        """Creates the window for the blocks following the ones in this
+        window.
+
+        Args:
+            certificates (list): The wait certificates for the following
+                blocks, ordered oldest to newest
+            maximum_number (int): The maximum number of certificates in the
+                new window, the oldest certificates are dropped to fit
+
+        Returns:
+            CertificateWindow: The new window
+        """
+        combined = tuple(self) + tuple(certificates)
+        start = max(len(combined) - maximum_number, 0)
+        return CertificateWindow(combined[start:])
+
+    def get_derived(self, key, compute):
+        """Returns a value derived from the certificates in the window,
+        computing it only the first time it is asked for.
+
+        Args:
+            key (hashable): Identifies the value, including any settings
+                that it depends on
+            compute (function): Computes the value from the window
+        """
+        try:
+            return self._derived[key]
+        except KeyError:
+            value = compute()
+            self._derived[key] = value
+            return value
+
+
+class CertificateWindowCache(object):
+    """Caches, by block ID, the deserialized wait certificate of each block
+    and the window of wait certificates ending with it.  As blocks are
+    nearly always verified, published on, or compared soon after their
+    predecessors, the window for a block is usually derived from its
+    predecessor's window, deserializing only the block's own certificate.
+    Because block IDs identify block contents, all of the consensus objects
+    share a single cache.
+    """
+
+    _lock = threading.Lock()
+    _windows = OrderedDict()
+    _certificates = OrderedDict()
+
+    maximum_windows = 1000
+    maximum_certificates = 10000
+
+    @classmethod
+    def get_window(cls,
+                   block_id,
+                   block_cache,
+                   deserialize_certificate,
+                   maximum_number):
+        """Returns the window of up to maximum_number wait certificates for
+        the block with block_id and the blocks preceding it.  The window ends
+        early at the genesis block or at a block without a wait certificate.
+
+        Args:
+            block_id (str): The ID of the newest block in the window
+            block_cache (BlockCache): The cache of blocks that are
+                predecessors to the block
+            deserialize_certificate (function): Returns the WaitCertificate
+                for a block, or None if it doesn't have one
+            maximum_number (int): The maximum number of certificates in the
+                window
+
+        Returns:
+            CertificateWindow: The window of wait certificates
+        """
+        with cls._lock:
+            window = cls._windows.get((block_id, maximum_number))
+            if window is not None:
+                cls._windows.move_to_end((block_id, maximum_number))
+                return window
+
+            # Walk back until a block whose window is known, collecting the
+            # certificates of the blocks in between
+            certificates = []
+            base = CertificateWindow()
+            current_id = block_id
+            complete = True
+
+            try:
+                while len(certificates) < maximum_number and \
+                        current_id != NULL_BLOCK_IDENTIFIER:
+                    known = cls._windows.get((current_id, maximum_number))
+                    if known is not None:
+                        base = known
+                        break
+
+                    certificate, previous_block_id = \
+                        cls._get_certificate(
+                            current_id, block_cache, deserialize_certificate)
+                    if certificate is None:
+                        break
+
+                    certificates.append(certificate)
+                    current_id = previous_block_id
+            except KeyError as ke:
+                LOGGER.error('Error getting block: %s', ke)
+                complete = False
+
+            certificates.reverse()
+            window = base.extend(certificates, maximum_number)
+
+            # A window cut short by a missing block is not kept, so it can
+            # be completed once the block arrives
+            if complete:
+                cls._windows[(block_id, maximum_number)] = window
+                while len(cls._windows) > cls.maximum_windows:
+                    cls._windows.popitem(last=False)
+
+            return window
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._windows.clear()
+            cls._certificates.clear()
+
+    @classmethod
+    def _get_certificate(cls, block_id, block_cache, deserialize_certificate):
+        try:
+            entry = cls._certificates[block_id]
+            cls._certificates.move_to_end(block_id)
+            return entry
+        except KeyError:
+            pass
+
+        block = block_cache[block_id]
+        entry = \
+            (deserialize_certificate(block), block.header.previous_block_id)
+
+        cls._certificates[block_id] = entry
+        while len(cls._certificates) > cls.maximum_certificates:
+            cls._certificates.popitem(last=False)
+
+        return entry
@@ -63,6 +63,12 @@ class ConsensusState(object):
         self.total_block_claim_count = 0
         self._validators = {}
 
+        # The block whose stored consensus state this one was created from,
+        # and the validators whose state has been set since, so that the
+        # consensus state store can record only what changed
+        self._base_block_id = None
+        self._changed_validator_ids = set()
+
     @staticmethod
     def _check_validator_state(validator_state):
         if not isinstance(validator_state.commit_block_number, int) \
@@ -144,6 +150,59 @@ class ConsensusState(object):
 
         self._check_validator_state(validator_state)
         self._validators[validator_id] = validator_state
+        self._changed_validator_ids.add(validator_id)
+
+    @property
+    def base_block_id(self):
+        """The ID of the block whose stored consensus state this consensus
+        state was created from, or was last stored as, if any.
+        """
+        return self._base_block_id
+
+    def get_changed_validator_states(self):
+        """Returns the validator states that have been set since the
+        consensus state was created from, or last stored as, the consensus
+        state for base_block_id.
+
+        Returns:
+            dict: validator ID to ValidatorState
+        """
+        return \
+            {validator_id: self._validators[validator_id]
+             for validator_id in self._changed_validator_ids}
+
+    def mark_stored(self, block_id):
+        """Records that the consensus state is now the one stored for a
+        block, so that later changes are relative to it.
+
+        Args:
+            block_id (str): The ID of the block the consensus state is stored
+                for
+
+        Returns:
+            None
+        """
+        self._base_block_id = block_id
+        self._changed_validator_ids = set()
+
+    def copy(self):
+        """Returns a copy of the consensus state which can be changed
+        without affecting this one.
+
+        Returns:
+            ConsensusState: The copy
+        """
+        consensus_state = ConsensusState()
+        consensus_state.expected_block_claim_count = \
+            self.expected_block_claim_count
+        consensus_state.total_block_claim_count = self.total_block_claim_count
+        # Validator states are immutable named tuples, so they can be shared
+        consensus_state._validators = dict(self._validators)
+        consensus_state._base_block_id = self._base_block_id
+        consensus_state._changed_validator_ids = \
+            set(self._changed_validator_ids)
+
+        return consensus_state
 
     def serialize_to_bytes(self):
         """Serialized the consensus state object to a byte string suitable
@@ -154,7 +213,12 @@ class ConsensusState(object):
         """
         # For serialization, the easiest thing to do is to convert ourself to
         # a dictionary and convert to CBOR.
-        return cbor.dumps(self.__dict__)
+        return \
+            cbor.dumps({
+                'expected_block_claim_count': self.expected_block_claim_count,
+                'total_block_claim_count': self.total_block_claim_count,
+                '_validators': self._validators
+            })
 
     def parse_from_bytes(self, buffer):
         """Returns a consensus state object re-created from the serialized
@@ -219,6 +283,9 @@ class ConsensusState(object):
                 self._check_validator_state(validator_state)
                 self._validators[str(key)] = validator_state
 
+            self._base_block_id = None
+            self._changed_validator_ids = set()
+
         except (LookupError, ValueError, KeyError, TypeError) as error:
             raise \
                 ValueError(
@@ -13,6 +13,7 @@
 # limitations under the License.
 # ------------------------------------------------------------------------------
 
+from collections import OrderedDict
 import threading
 import logging
 import os
@@ -20,7 +21,10 @@ import os
 # pylint: disable=no-name-in-module
 from collections.abc import MutableMapping
 
+import cbor
+
 from sawtooth_poet.poet_consensus.consensus_state import ConsensusState
+from sawtooth_poet.poet_consensus.consensus_state import ValidatorState
 
 from sawtooth_validator.database.lmdb_nolock_database \
     import LMDBNoLockDatabase
@@ -34,9 +38,22 @@ class ConsensusStateStore(MutableMapping):
     the consensus objects, all ConsensusStateStore objects actually reference
     a single underlying database.  Provides a dict-like interface to the
     consensus state, mapping block IDs to their corresponding consensus state.
+
+    To keep the size of the store from growing with the number of validators
+    times the number of blocks, a consensus state is stored as a delta, i.e.,
+    the validator states that changed, from the stored consensus state it was
+    created from.  Every CHECKPOINT_INTERVAL blocks, or when there is nothing
+    for it to be a delta from, a complete checkpoint is stored instead, so
+    that materializing a consensus state never reads more than
+    CHECKPOINT_INTERVAL records.  Recently materialized consensus states,
+    which are nearly always those around the chain head, are kept in memory.
     """
 
+    CHECKPOINT_INTERVAL = 100
+    MAXIMUM_CACHED_STATES = 128
+
     _store_dbs = {}
+    _caches = {}
     _lock = threading.Lock()
 
     def __init__(self, data_dir, validator_id):
@@ -66,6 +83,14 @@ class ConsensusStateStore(MutableMapping):
                 self._store_db = LMDBNoLockDatabase(db_file_name, 'c')
                 ConsensusStateStore._store_dbs[validator_id] = self._store_db
 
+            # The materialized consensus states, along with the number of
+            # deltas since the last checkpoint, are shared with any other
+            # stores for the validator, as is the database
+            self._cache = \
+                ConsensusStateStore._caches.setdefault(
+                    validator_id,
+                    OrderedDict())
+
     def __setitem__(self, block_id, consensus_state):
         """Adds/updates an item in the consensus state store
 
@@ -77,7 +102,30 @@ class ConsensusStateStore(MutableMapping):
         Returns:
             None
         """
-        self._store_db[block_id] = consensus_state.serialize_to_bytes()
+        with ConsensusStateStore._lock:
+            base = self._cache.get(consensus_state.base_block_id)
+            if base is not None \
+                    and base[1] + 1 < ConsensusStateStore.CHECKPOINT_INTERVAL:
+                depth = base[1] + 1
+                self._store_db[block_id] = \
+                    cbor.dumps({
+                        'base_block_id': consensus_state.base_block_id,
+                        'depth': depth,
+                        'expected_block_claim_count':
+                            consensus_state.expected_block_claim_count,
+                        'total_block_claim_count':
+                            consensus_state.total_block_claim_count,
+                        'validators':
+                            consensus_state.get_changed_validator_states()
+                    })
+            else:
+                depth = 0
+                self._store_db[block_id] = \
+                    consensus_state.serialize_to_bytes()
+
+            consensus_state.mark_stored(block_id)
+            self._cache_consensus_state(
+                block_id, consensus_state.copy(), depth)
 
     def __getitem__(self, block_id):
         """Return the consensus state corresponding to the block ID
@@ -92,24 +140,23 @@ class ConsensusStateStore(MutableMapping):
         Raises:
             KeyError if the block ID is not in the store
         """
-        serialized_consensus_state = self._store_db[block_id]
-        if serialized_consensus_state is None:
-            raise KeyError('Block ID {} not found'.format(block_id))
+        with ConsensusStateStore._lock:
+            try:
+                consensus_state, _ = \
+                    self._materialize_consensus_state(block_id)
+            except ValueError as error:
+                raise \
+                    KeyError(
+                        'Cannot return block with ID {}: {}'.format(
+                            block_id,
+                            error))
 
-        try:
-            consensus_state = ConsensusState()
-            consensus_state.parse_from_bytes(
-                buffer=serialized_consensus_state)
-            return consensus_state
-        except ValueError as error:
-            raise \
-                KeyError(
-                    'Cannot return block with ID {}: {}'.format(
-                        block_id,
-                        error))
+            return consensus_state.copy()
 
     def __delitem__(self, block_id):
-        del self._store_db[block_id]
+        with ConsensusStateStore._lock:
+            self._cache.pop(block_id, None)
+            del self._store_db[block_id]
 
     def __contains__(self, block_id):
         return block_id in self._store_db
@@ -124,18 +171,13 @@ class ConsensusStateStore(MutableMapping):
     def __str__(self):
         out = []
         for block_id in self._store_db.keys():
-            try:
-                serialized_consensus_state = self._store_db[block_id]
-                consensus_state = ConsensusState()
-                consensus_state.parse_from_bytes(
-                    buffer=serialized_consensus_state)
+            consensus_state = self.get(block_id)
+            if consensus_state is not None:
                 out.append(
                     '{}...{}: {{{}}}'.format(
                         block_id[:8],
                         block_id[-8:],
                         consensus_state))
-            except ValueError:
-                pass
 
         return ', '.join(out)
 
@@ -158,3 +200,73 @@ class ConsensusStateStore(MutableMapping):
             pass
 
         return default
+
+    def _materialize_consensus_state(self, block_id):
+        """Returns the consensus state for the block, and the number of
+        deltas since its checkpoint, building it from the nearest cached or
+        checkpointed consensus state and the deltas since.  Must be called
+        with the lock held.
+        """
+        deltas = []
+        current_id = block_id
+        while True:
+            cached = self._cache.get(current_id)
+            if cached is not None:
+                self._cache.move_to_end(current_id)
+                consensus_state, depth = cached
+                consensus_state = consensus_state.copy()
+                break
+
+            serialized_consensus_state = self._store_db[current_id]
+            if serialized_consensus_state is None:
+                raise KeyError('Block ID {} not found'.format(current_id))
+
+            try:
+                record = cbor.loads(serialized_consensus_state)
+            except (LookupError, ValueError, TypeError) as error:
+                raise ValueError('Error parsing record: {}'.format(error))
+
+            if isinstance(record, dict) and 'base_block_id' in record:
+                deltas.append((current_id, record))
+                current_id = record['base_block_id']
+                continue
+
+            consensus_state = ConsensusState()
+            consensus_state.parse_from_bytes(
+                buffer=serialized_consensus_state)
+            consensus_state.mark_stored(current_id)
+            depth = 0
+            self._cache_consensus_state(
+                current_id, consensus_state.copy(), depth)
+            break
+
+        for delta_block_id, delta in reversed(deltas):
+            self._apply_delta(consensus_state, delta)
+            consensus_state.mark_stored(delta_block_id)
+            depth += 1
+
+        if deltas:
+            self._cache_consensus_state(
+                block_id, consensus_state.copy(), depth)
+
+        return consensus_state, depth
+
+    @staticmethod
+    def _apply_delta(consensus_state, delta):
+        try:
+            consensus_state.expected_block_claim_count = \
+                float(delta['expected_block_claim_count'])
+            consensus_state.total_block_claim_count = \
+                int(delta['total_block_claim_count'])
+            for validator_id, value in delta['validators'].items():
+                consensus_state.set_validator_state(
+                    validator_id=str(validator_id),
+                    validator_state=ValidatorState._make(value))
+        except (LookupError, ValueError, TypeError, AttributeError) as error:
+            raise ValueError('Error parsing delta: {}'.format(error))
+
+    def _cache_consensus_state(self, block_id, consensus_state, depth):
+        self._cache[block_id] = (consensus_state, depth)
+        self._cache.move_to_end(block_id)
+        while len(self._cache) > ConsensusStateStore.MAXIMUM_CACHED_STATES:
+            self._cache.popitem(last=False)
@@ -218,6 +218,10 @@ class PoetBlockPublisher(BlockPublisherInterface):
             Boolean: True if the candidate block should be built. False if
             no candidate should be built.
         """
+        # The publisher is kept between blocks, so forget the wait timer for
+        # the previous candidate block
+        self._wait_timer = None
+
         # Using the current chain head, we need to create a state view so we
         # can create a PoET enclave.
         state_view = \
@@ -360,7 +364,7 @@ class PoetBlockPublisher(BlockPublisherInterface):
         # the number of validators, at this point no validators would be
         # able to claim a block.
         number_of_validators = \
-            len(validator_registry_view.get_validators())
+            validator_registry_view.get_validator_count()
         block_claim_delay = \
             min(
                 poet_config_view.block_claim_delay,
@@ -397,7 +401,7 @@ class PoetBlockPublisher(BlockPublisherInterface):
             WaitTimer.create_wait_timer(
                 poet_enclave_module=poet_enclave_module,
                 validator_address=block_header.signer_pubkey,
-                certificates=list(certificates))
+                certificates=certificates)
 
         LOGGER.debug('Created wait timer: %s', self._wait_timer)
 
@@ -172,17 +172,18 @@ class PoetBlockVerifier(BlockVerifierInterface):
                     block_cache=self._block_cache)
 
             poet_config_view = PoetConfigView(state_view=state_view)
+            key_block_claim_limit = poet_config_view.key_block_claim_limit
 
             if validator_state.poet_public_key == poet_public_key and \
                     validator_state.key_block_claim_count >= \
-                    poet_config_view.key_block_claim_limit:
+                    key_block_claim_limit:
                 raise \
                     ValueError(
                         'Validator {} has already reached claim block limit '
                         'for current PoET key pair: {} >= {}'.format(
                             validator_info.name,
                             validator_state.key_block_claim_count,
-                            poet_config_view.key_block_claim_limit))
+                            key_block_claim_limit))
 
             # While having a block claim delay is nice, it turns out that in
             # practice the claim delay should not be more than one less than
@@ -199,7 +200,7 @@ class PoetBlockVerifier(BlockVerifierInterface):
             # the number of validators, at this point no validators would be
             # able to claim a block.
             number_of_validators = \
-                len(validator_registry_view.get_validators())
+                validator_registry_view.get_validator_count()
             block_claim_delay = \
                 min(
                     poet_config_view.block_claim_delay,
@@ -22,6 +22,8 @@ from sawtooth_validator.journal.block_wrapper import NULL_BLOCK_IDENTIFIER
 from sawtooth_poet_common.validator_registry_view.validator_registry_view \
     import ValidatorRegistryView
 
+from sawtooth_poet.poet_consensus.certificate_window \
+    import CertificateWindowCache
 from sawtooth_poet.poet_consensus.wait_certificate import WaitCertificate
 from sawtooth_poet.poet_consensus.consensus_state import ConsensusState
 from sawtooth_poet.poet_consensus.consensus_state import ValidatorState
@@ -107,39 +109,21 @@ def build_certificate_list(block_header,
         maximum_number (int): The maximum number of certificates to return
 
     Returns:
-        A list of wait certificates
+        A CertificateWindow, an immutable list of wait certificates ordered
+            oldest to newest
     """
-
-    # Create a list of certificates starting with the immediate predecessor
-    # to the block represented by block_header.  We will use a deque because
-    # we are walking the blocks in reverse order.
-    certificates = collections.deque()
-    block_id = block_header.previous_block_id
-
-    try:
-        while not block_id_is_genesis(block_id) and \
-                len(certificates) < maximum_number:
-            # Grab the block from the block store, use the consensus
-            # property to reconstitute the wait certificate, and add
-            # the wait certificate to the list.  If we get to a block
-            # that does not have a wait certificate, we stop.
-            block = block_cache[block_id]
-            wait_certificate = \
+    # The window is usually derived from the window of the previous block,
+    # which has already been verified or published on, so only the newest
+    # certificate needs to be deserialized.
+    return \
+        CertificateWindowCache.get_window(
+            block_id=block_header.previous_block_id,
+            block_cache=block_cache,
+            deserialize_certificate=lambda block:
                 deserialize_wait_certificate(
                     block=block,
-                    poet_enclave_module=poet_enclave_module)
-
-            if wait_certificate is None:
-                break
-
-            certificates.appendleft(wait_certificate)
-
-            # Move to the previous block
-            block_id = block.header.previous_block_id
-    except KeyError as ke:
-        LOGGER.error('Error getting block: %s', ke)
-
-    return list(certificates)
+                    poet_enclave_module=poet_enclave_module),
+            maximum_number=maximum_number)
 
 
 def get_current_validator_state(validator_info,
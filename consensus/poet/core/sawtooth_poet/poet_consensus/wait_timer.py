@@ -17,6 +17,8 @@ import logging
 
 from sawtooth_validator.journal.block_wrapper import NULL_BLOCK_IDENTIFIER
 
+from sawtooth_poet.poet_consensus.certificate_window import CertificateWindow
+
 LOGGER = logging.getLogger(__name__)
 
 
@@ -69,10 +71,10 @@ class WaitTimer(object):
         http://en.wikipedia.org/wiki/Exponential_distribution
 
         Args:
-            certificates (list): Previously committed certificates,
+            certificates (list or tuple): Previously committed certificates,
                 ordered newest to oldest
         """
-        assert isinstance(certificates, list)
+        assert isinstance(certificates, (list, tuple))
         assert len(certificates) >= cls.certificate_sample_length
 
         sum_means = 0
@@ -144,10 +146,27 @@ class WaitTimer(object):
         else:
             local_mean = \
                 cls.target_wait_time * \
-                cls._compute_population_estimate(certificates)
+                cls._get_population_estimate(certificates)
 
         return local_mean
 
+    @classmethod
+    def _get_population_estimate(cls, certificates):
+        """Returns the population estimate for the certificates.  For a
+        CertificateWindow, the estimate is computed once and kept with the
+        window, for as long as the settings it depends on are unchanged.
+        """
+        if not isinstance(certificates, CertificateWindow):
+            return cls._compute_population_estimate(certificates)
+
+        return \
+            certificates.get_derived(
+                key=('population_estimate',
+                     cls.certificate_sample_length,
+                     cls.minimum_wait_time),
+                compute=lambda:
+                    cls._compute_population_estimate(certificates))
+
     @property
     def population_estimate(self):
         return self.local_mean / WaitTimer.target_wait_time
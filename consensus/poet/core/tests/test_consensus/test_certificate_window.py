@@ -0,0 +1,174 @@
+# Copyright 2017 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+
+from importlib import reload
+import unittest
+
+from sawtooth_validator.journal.block_wrapper import NULL_BLOCK_IDENTIFIER
+
+from sawtooth_poet.poet_consensus.certificate_window \
+    import CertificateWindow
+from sawtooth_poet.poet_consensus.certificate_window \
+    import CertificateWindowCache
+import sawtooth_poet.poet_consensus.wait_timer as wait_timer
+
+from test_consensus.utils import AttrDict
+
+
+class TestCertificateWindowCache(unittest.TestCase):
+    def setUp(self):
+        CertificateWindowCache.clear()
+        self.block_cache = {}
+        self.deserialized = []
+
+    def tearDown(self):
+        CertificateWindowCache.clear()
+
+    def _add_chain(self, count, previous_block_id=NULL_BLOCK_IDENTIFIER,
+                   prefix='B'):
+        """Adds a chain of count blocks to the block cache, each with a
+        certificate, and returns the block IDs, oldest first.
+        """
+        block_ids = []
+        for i in range(count):
+            block_id = '{}{}'.format(prefix, i)
+            self.block_cache[block_id] = \
+                AttrDict(
+                    block_id=block_id,
+                    header=AttrDict(previous_block_id=previous_block_id))
+            block_ids.append(block_id)
+            previous_block_id = block_id
+        return block_ids
+
+    def _deserialize(self, block):
+        self.deserialized.append(block.block_id)
+        if block.block_id.startswith('X'):
+            return None
+        return \
+            AttrDict(
+                identifier=block.block_id,
+                duration=2.0 + len(self.block_cache) % 7,
+                local_mean=20.0)
+
+    def _get_window(self, block_id, maximum_number=5):
+        return \
+            CertificateWindowCache.get_window(
+                block_id=block_id,
+                block_cache=self.block_cache,
+                deserialize_certificate=self._deserialize,
+                maximum_number=maximum_number)
+
+    def _identifiers(self, window):
+        return [certificate.identifier for certificate in window]
+
+    def test_window_from_genesis(self):
+        """Verify that the window for a block in a chain shorter than the
+        maximum holds every certificate, oldest first, and that the window
+        for the genesis block is empty.
+        """
+        block_ids = self._add_chain(3)
+
+        window = self._get_window(block_ids[-1])
+        self.assertIsInstance(window, CertificateWindow)
+        self.assertEqual(block_ids, self._identifiers(window))
+
+        self.assertEqual(0, len(self._get_window(NULL_BLOCK_IDENTIFIER)))
+
+    def test_consecutive_windows(self):
+        """Verify that the windows for consecutive blocks are each derived
+        from the previous block's window, deserializing each certificate
+        only once, and hold the most recent certificates.
+        """
+        block_ids = self._add_chain(20)
+
+        for index, block_id in enumerate(block_ids):
+            window = self._get_window(block_id)
+            self.assertEqual(
+                block_ids[max(index - 4, 0):index + 1],
+                self._identifiers(window))
+
+        self.assertEqual(block_ids, self.deserialized)
+
+        # Asking again is answered from the cache
+        self.assertIs(window, self._get_window(block_ids[-1]))
+        self.assertEqual(20, len(self.deserialized))
+
+    def test_cold_window(self):
+        """Verify that the window for a block whose predecessors' windows
+        are unknown only deserializes the certificates it needs, and that a
+        fork reuses them.
+        """
+        block_ids = self._add_chain(20)
+        window = self._get_window(block_ids[-1])
+        self.assertEqual(block_ids[-5:], self._identifiers(window))
+        self.assertEqual(5, len(self.deserialized))
+
+        fork_ids = self._add_chain(1, block_ids[-2], prefix='F')
+        fork_window = self._get_window(fork_ids[0])
+        self.assertEqual(
+            block_ids[-5:-1] + fork_ids, self._identifiers(fork_window))
+        self.assertEqual(6, len(self.deserialized))
+
+    def test_window_ends_at_block_without_certificate(self):
+        """Verify that a window stops at a block without a certificate.
+        """
+        block_ids = self._add_chain(2)
+        other_ids = self._add_chain(1, block_ids[-1], prefix='X')
+        block_ids = self._add_chain(2, other_ids[0], prefix='C')
+
+        self.assertEqual(block_ids, self._identifiers(
+            self._get_window(block_ids[-1])))
+        self.assertEqual(0, len(self._get_window(other_ids[0])))
+
+    def test_window_with_missing_block(self):
+        """Verify that a window cut short by a missing block is not cached,
+        and is completed once the block is available.
+        """
+        block_ids = self._add_chain(4)
+        missing = self.block_cache.pop(block_ids[1])
+
+        self.assertEqual(
+            block_ids[2:], self._identifiers(self._get_window(block_ids[-1])))
+
+        self.block_cache[block_ids[1]] = missing
+        self.assertEqual(
+            block_ids, self._identifiers(self._get_window(block_ids[-1])))
+
+    def test_population_estimate_kept_with_window(self):
+        """Verify that the local mean computed from a window matches the one
+        computed from the same certificates in a list, and that the
+        population estimate is computed once per window.
+        """
+        reload(wait_timer)
+        wait_timer.WaitTimer.certificate_sample_length = 5
+        wait_timer.WaitTimer.fixed_duration_blocks = 5
+
+        try:
+            block_ids = self._add_chain(10)
+            window = self._get_window(block_ids[-1])
+
+            self.assertEqual(
+                wait_timer.WaitTimer.compute_local_mean(list(window)),
+                wait_timer.WaitTimer.compute_local_mean(window))
+            self.assertEqual(1, len(window._derived))
+
+            # A change to the settings computes a new estimate
+            wait_timer.WaitTimer.minimum_wait_time = 0.5
+            self.assertEqual(
+                wait_timer.WaitTimer.compute_local_mean(list(window)),
+                wait_timer.WaitTimer.compute_local_mean(window))
+            self.assertEqual(2, len(window._derived))
+        finally:
+            reload(wait_timer)
@@ -150,3 +150,87 @@ class TestConsensusStateStore(unittest.TestCase):
 
         with self.assertRaises(KeyError):
             _ = store['key']
+
+    @mock.patch('sawtooth_poet.poet_consensus.consensus_state_store.'
+                'LMDBNoLockDatabase')
+    def test_consensus_store_deltas(self, mock_lmdb):
+        """Verify that consensus state built upon a stored consensus state
+        is stored as just the validator states that changed, with a complete
+        checkpoint every CHECKPOINT_INTERVAL blocks, and that each consensus
+        state is materialized correctly from the database alone.
+        """
+        my_dict = {}
+        mock_lmdb.return_value = my_dict
+
+        store = \
+            consensus_state_store.ConsensusStateStore(
+                data_dir=tempfile.gettempdir(),
+                validator_id='0123456789abcdef')
+        store_class = consensus_state_store.ConsensusStateStore
+        store_class.CHECKPOINT_INTERVAL = 10
+
+        validator_ids = ['validator {}'.format(i) for i in range(50)]
+        state = consensus_state.ConsensusState()
+        for validator_id in validator_ids:
+            state.set_validator_state(
+                validator_id=validator_id,
+                validator_state=consensus_state.ValidatorState(
+                    commit_block_number=0,
+                    key_block_claim_count=0,
+                    poet_public_key='key',
+                    total_block_claim_count=0))
+
+        # Claim blocks round robin, building each consensus state on the
+        # previous block's as the PoET consensus objects do
+        block_ids = ['block {}'.format(i) for i in range(25)]
+        for block_number, block_id in enumerate(block_ids):
+            if block_number > 0:
+                state = store[block_ids[block_number - 1]]
+            validator_id = validator_ids[block_number % len(validator_ids)]
+            state.set_validator_state(
+                validator_id=validator_id,
+                validator_state=consensus_state.ValidatorState(
+                    commit_block_number=0,
+                    key_block_claim_count=1,
+                    poet_public_key='key',
+                    total_block_claim_count=1))
+            state.total_block_claim_count = block_number + 1
+            store[block_id] = state
+
+        # Only every tenth block is a complete checkpoint
+        full_size = len(my_dict[block_ids[0]])
+        for block_number, block_id in enumerate(block_ids):
+            if block_number % 10 == 0:
+                self.assertEqual(len(my_dict[block_id]), full_size)
+            else:
+                self.assertLess(len(my_dict[block_id]), full_size / 5)
+
+        # Forget the materialized consensus state, as on a restart, and
+        # verify that it is rebuilt from the database
+        store_class._caches.clear()
+        store = \
+            consensus_state_store.ConsensusStateStore(
+                data_dir=tempfile.gettempdir(),
+                validator_id='0123456789abcdef')
+
+        for block_number in [24, 13, 0, 9]:
+            retrieved_state = store[block_ids[block_number]]
+            self.assertEqual(
+                retrieved_state.total_block_claim_count, block_number + 1)
+            for index, validator_id in enumerate(validator_ids):
+                validator_state = \
+                    retrieved_state.get_validator_state(
+                        validator_id=validator_id)
+                self.assertEqual(
+                    validator_state.total_block_claim_count,
+                    1 if index <= block_number else 0)
+
+        # Changing retrieved consensus state does not change the store
+        retrieved_state.total_block_claim_count = 1000
+        self.assertEqual(store[block_ids[9]].total_block_claim_count, 10)
+
+        # A consensus state whose base has been removed can't be rebuilt
+        store_class._caches.clear()
+        del store[block_ids[20]]
+        self.assertIsNone(store.get(block_ids[21]))
+        self.assertIsNotNone(store.get(block_ids[19]))
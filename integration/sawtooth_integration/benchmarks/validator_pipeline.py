@@ -0,0 +1,543 @@
+# Copyright 2017 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+
+"""Measures the throughput of the validator pipeline by replaying a batch
+file, such as one made by `intkey create_batch`, through a validator that
+runs in this process, with an intkey transaction processor in a child
+process.  The validator uses dev_mode consensus and ipc endpoints, so no
+network is needed.  The transaction processor runs apart because the SDK
+and the validator define the same protobuf messages, which cannot be loaded
+into one process.
+
+The time from the submission of each batch until the block holding it is
+written to the block store is recorded, along with the time spent in each
+stage of the pipeline:
+
+    signature_verification: verifying the signatures of a submitted batch
+        list, including the wait for the process pool
+    completer: adding the batches of a batch list to the completer
+    scheduling: adding batches to a scheduler, taking the next transaction
+        from it, and finalizing it
+    execution: from sending a transaction to the transaction processor until
+        its result is handled
+    squash: merging the state changes of a transaction into a state root
+    block_store_commit: writing a new chain head to the block store
+
+Blocks are executed both when they are built and when they are validated,
+so the scheduling, execution and squash stages include both.  The results
+are written as JSON, so that they can be compared between commits.
+"""
+
+import argparse
+from contextlib import contextmanager
+import functools
+import json
+import logging
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+import zmq
+
+from sawtooth_sdk.client.batch_file import read_batches
+import sawtooth_signing as signing
+
+from sawtooth_validator.execution.context_manager import ContextManager
+from sawtooth_validator.execution.executor import TransactionExecutorThread
+from sawtooth_validator.execution.scheduler_serial import SerialScheduler
+from sawtooth_validator.gossip.signature_verifier import \
+    BatchListSignatureVerifier
+from sawtooth_validator.journal.block_store import BlockStore
+from sawtooth_validator.journal.completer import \
+    CompleterBatchListBroadcastHandler
+from sawtooth_validator.networking import dispatch
+from sawtooth_validator.protobuf import batch_pb2
+from sawtooth_validator.protobuf.client_pb2 import ClientBatchSubmitResponse
+from sawtooth_validator.protobuf.genesis_pb2 import GenesisData
+from sawtooth_validator.protobuf.validator_pb2 import Message
+from sawtooth_validator.server.core import Validator
+from sawtooth_validator.server.log import init_console_logging
+
+
+LOGGER = logging.getLogger(__name__)
+
+STAGES = [
+    'signature_verification',
+    'completer',
+    'scheduling',
+    'execution',
+    'squash',
+    'block_store_commit',
+]
+
+
+def _summarize(durations):
+    """Returns the count, total, mean, nearest-rank percentiles and maximum
+    of a list of durations, in seconds.
+    """
+    if not durations:
+        return {'count': 0}
+
+    ordered = sorted(durations)
+    summary = {
+        'count': len(ordered),
+        'total': sum(ordered),
+        'mean': sum(ordered) / len(ordered),
+        'max': ordered[-1],
+    }
+    for percent in (50, 95, 99):
+        summary['p{}'.format(percent)] = \
+            ordered[min(len(ordered) - 1, len(ordered) * percent // 100)]
+    return summary
+
+
+class StageTimer(object):
+    """Collects the durations of the calls into each stage of the
+    pipeline, from any thread.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._durations = {stage: [] for stage in STAGES}
+
+    def record(self, stage, duration):
+        with self._lock:
+            self._durations[stage].append(duration)
+
+    def timed(self, stage, func):
+        """Returns a function that calls func and records how long it took.
+        """
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.time()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.record(stage, time.time() - start)
+        return wrapper
+
+    def get_results(self):
+        with self._lock:
+            return {
+                stage: _summarize(durations)
+                for stage, durations in self._durations.items()
+            }
+
+
+class _CommitTracker(object):
+    """Records when each submitted batch was written to the block store,
+    as part of a new chain head.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._submitted = {}
+        self._committed = {}
+        self._transaction_counts = {}
+        self.chain_started = threading.Event()
+
+    def on_submitted(self, batches, submitted_at):
+        with self._condition:
+            for batch in batches:
+                self._submitted[batch.header_signature] = submitted_at
+                self._transaction_counts[batch.header_signature] = \
+                    len(batch.transactions)
+
+    def on_chain_updated(self, new_chain):
+        committed_at = time.time()
+        with self._condition:
+            for blkw in new_chain:
+                for batch in blkw.batches:
+                    batch_id = batch.header_signature
+                    if batch_id in self._submitted and \
+                            batch_id not in self._committed:
+                        self._committed[batch_id] = committed_at
+            self._condition.notify_all()
+        self.chain_started.set()
+
+    def wait(self, timeout):
+        """Waits for all of the submitted batches to be committed, and
+        returns whether they were.
+        """
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: len(self._committed) == len(self._submitted),
+                timeout)
+
+    def get_results(self):
+        with self._condition:
+            if not self._committed:
+                return {'batches': 0, 'transactions': 0}
+
+            start = min(self._submitted.values())
+            seconds = max(self._committed.values()) - start
+            transactions = sum(
+                self._transaction_counts[batch_id]
+                for batch_id in self._committed)
+            return {
+                'batches': len(self._committed),
+                'transactions': transactions,
+                'seconds': seconds,
+                'batches_per_second': len(self._committed) / seconds,
+                'transactions_per_second': transactions / seconds,
+                'latency': _summarize([
+                    committed_at - self._submitted[batch_id]
+                    for batch_id, committed_at in self._committed.items()
+                ]),
+            }
+
+
+@contextmanager
+def instrument(timer, tracker):
+    """Times the stages of the pipeline, and the commits of batches, while
+    the context is open.  The validator must be created within the context,
+    as it takes the squash handler when it is created.
+    """
+    patches = []
+
+    def patch(owner, name, replacement):
+        patches.append((owner, name, getattr(owner, name)))
+        setattr(owner, name, replacement)
+
+    handler_stages = {
+        BatchListSignatureVerifier: 'signature_verification',
+        CompleterBatchListBroadcastHandler: 'completer',
+    }
+    execute = dispatch._HandlerManager.execute
+
+    def timed_execute(manager, connection_id, message):
+        # Time the handler from its submission to the executor, so that the
+        # wait for a process in the process pool is included
+        start = time.time()
+        future = execute(manager, connection_id, message)
+        stage = handler_stages.get(type(manager._handler))
+        if stage is not None:
+            future.add_done_callback(
+                lambda _: timer.record(stage, time.time() - start))
+        return future
+
+    patch(dispatch._HandlerManager, 'execute', timed_execute)
+
+    for name in ('add_batch', 'finalize'):
+        patch(SerialScheduler, name,
+              timer.timed('scheduling', getattr(SerialScheduler, name)))
+
+    next_transaction = SerialScheduler.next_transaction
+
+    def timed_next_transaction(scheduler):
+        # The executor asks for the next transaction until one is ready, so
+        # only the calls that return one are counted
+        start = time.time()
+        txn_info = next_transaction(scheduler)
+        if txn_info is not None:
+            timer.record('scheduling', time.time() - start)
+        return txn_info
+
+    patch(SerialScheduler, 'next_transaction', timed_next_transaction)
+
+    sent = {}
+    send_and_process_result = \
+        TransactionExecutorThread._send_and_process_result
+    future_done_callback = TransactionExecutorThread._future_done_callback
+
+    def timed_send_and_process_result(executor_thread, content,
+                                      connection_id):
+        sent[content] = time.time()
+        send_and_process_result(executor_thread, content, connection_id)
+
+    def timed_future_done_callback(executor_thread, request, result):
+        sent_at = sent.pop(request, None)
+        if sent_at is not None:
+            timer.record('execution', time.time() - sent_at)
+        future_done_callback(executor_thread, request, result)
+
+    patch(TransactionExecutorThread, '_send_and_process_result',
+          timed_send_and_process_result)
+    patch(TransactionExecutorThread, '_future_done_callback',
+          timed_future_done_callback)
+
+    get_squash_handler = ContextManager.get_squash_handler
+
+    def timed_get_squash_handler(context_manager):
+        return timer.timed('squash', get_squash_handler(context_manager))
+
+    patch(ContextManager, 'get_squash_handler', timed_get_squash_handler)
+
+    update_chain = BlockStore.update_chain
+
+    def timed_update_chain(block_store, new_chain, old_chain=None):
+        start = time.time()
+        update_chain(block_store, new_chain, old_chain)
+        timer.record('block_store_commit', time.time() - start)
+        tracker.on_chain_updated(new_chain)
+
+    patch(BlockStore, 'update_chain', timed_update_chain)
+
+    try:
+        yield
+    finally:
+        for owner, name, original in reversed(patches):
+            setattr(owner, name, original)
+
+
+def _split_batch_list(serialized_batches, batch_size_limit):
+    new_list = []
+    for serialized_batch in serialized_batches:
+        batch = batch_pb2.Batch()
+        batch.ParseFromString(serialized_batch)
+        new_list.append(batch)
+        if len(new_list) == batch_size_limit:
+            yield batch_pb2.BatchList(batches=new_list)
+            new_list = []
+    if new_list:
+        yield batch_pb2.BatchList(batches=new_list)
+
+
+def _replay(url, filename, batch_size_limit, window, timeout, tracker):
+    """Submits the batches of a batch file to the validator, with up to a
+    window of submissions in flight, and returns the submission results.
+    The batch file is read as the batches are sent, so that files of any
+    size can be replayed without holding them in memory.
+    """
+    fd = open(filename, 'rb')
+    context = zmq.Context()
+    socket = context.socket(zmq.DEALER)
+    socket.setsockopt(zmq.RCVTIMEO, timeout * 1000)
+    socket.connect(url)
+
+    in_flight = {}
+    latencies = []
+    batch_count = 0
+
+    def complete():
+        message = Message()
+        message.ParseFromString(socket.recv())
+        latencies.append(time.time() - in_flight.pop(message.correlation_id))
+
+        response = ClientBatchSubmitResponse()
+        response.ParseFromString(message.content)
+        if response.status != ClientBatchSubmitResponse.OK:
+            LOGGER.warning(
+                'Batch submission failed: %s',
+                ClientBatchSubmitResponse.Status.Name(response.status))
+
+    start = time.time()
+    try:
+        for batch_list in _split_batch_list(read_batches(fd),
+                                            batch_size_limit):
+            while len(in_flight) >= window:
+                complete()
+
+            correlation_id = uuid.uuid4().hex
+            in_flight[correlation_id] = time.time()
+            tracker.on_submitted(batch_list.batches,
+                                 in_flight[correlation_id])
+            socket.send(Message(
+                correlation_id=correlation_id,
+                message_type=Message.CLIENT_BATCH_SUBMIT_REQUEST,
+                content=batch_list.SerializeToString()).SerializeToString())
+            batch_count += len(batch_list.batches)
+
+        while in_flight:
+            complete()
+    except zmq.Again:
+        LOGGER.warning('Timed out waiting for a batch submission response')
+    finally:
+        socket.close(linger=0)
+        context.term()
+        fd.close()
+
+    seconds = time.time() - start
+    return {
+        'batches': batch_count,
+        'seconds': seconds,
+        'batches_per_second': batch_count / seconds,
+        'latency': _summarize(latencies),
+    }
+
+
+def _start_transaction_processor(url, data_dir):
+    """Starts an intkey transaction processor in a child process, logging
+    under data_dir.
+    """
+    env = dict(os.environ)
+    env['SAWTOOTH_HOME'] = data_dir
+    env['PYTHONPATH'] = os.pathsep.join(sys.path)
+    os.makedirs(os.path.join(data_dir, 'logs'), exist_ok=True)
+
+    return subprocess.Popen(
+        [sys.executable, '-c',
+         'from sawtooth_intkey.processor.main import main; main()', url],
+        env=env)
+
+
+def run_benchmark(filename, data_dir, batch_size_limit=100, window=4,
+                  timeout=300):
+    """Replays a batch file through a validator started in this process,
+    which keeps its databases in data_dir, and returns the results.
+
+    This must be called from the main thread, as the validator handles
+    SIGTERM, which is how it is stopped once the batches are committed.
+    """
+    component_endpoint = 'ipc://{}'.format(
+        os.path.join(data_dir, 'component'))
+    network_endpoint = 'ipc://{}'.format(os.path.join(data_dir, 'network'))
+
+    # An empty genesis batch file has the validator create a genesis block,
+    # and so use the default consensus, dev_mode
+    with open(os.path.join(data_dir, 'genesis.batch'), 'wb') as fd:
+        fd.write(GenesisData().SerializeToString())
+
+    timer = StageTimer()
+    tracker = _CommitTracker()
+    results = {
+        'batch_file': filename,
+        'batch_size_limit': batch_size_limit,
+        'window': window,
+    }
+
+    def drive():
+        try:
+            if not tracker.chain_started.wait(timeout):
+                LOGGER.error('The genesis block was not created')
+                return
+
+            results['submit'] = _replay(
+                component_endpoint, filename, batch_size_limit, window,
+                timeout, tracker)
+            if not tracker.wait(timeout):
+                LOGGER.warning(
+                    'Timed out waiting for the batches to be committed')
+
+            results['commit'] = tracker.get_results()
+            results['stages'] = timer.get_results()
+        finally:
+            os.kill(os.getpid(), signal.SIGTERM)
+
+    with instrument(timer, tracker):
+        validator = Validator(network_endpoint,
+                              component_endpoint,
+                              network_endpoint,
+                              'static',
+                              [],
+                              [],
+                              data_dir,
+                              signing.generate_privkey())
+
+        processor = _start_transaction_processor(
+            component_endpoint, data_dir)
+        driver = threading.Thread(target=drive)
+        driver.start()
+        try:
+            validator.start()
+        finally:
+            driver.join()
+            processor.terminate()
+            processor.wait()
+            validator.stop()
+
+    return results
+
+
+def parse_args(args):
+    parser = argparse.ArgumentParser(
+        description='Replays a batch file through a validator and an intkey '
+        'transaction processor in this process, and reports the commit '
+        'throughput and latency, and the time spent in each stage of the '
+        'validator pipeline.')
+
+    parser.add_argument(
+        '-f', '--filename',
+        type=str,
+        help='location of the batch file to replay',
+        default='batches.intkey')
+
+    parser.add_argument(
+        '-o', '--output',
+        type=str,
+        help='file to write the JSON results to, instead of standard output')
+
+    parser.add_argument(
+        '--data-dir',
+        type=str,
+        help='empty directory for the validator databases; a temporary '
+        'directory is used by default')
+
+    parser.add_argument(
+        '--batch-size-limit',
+        type=int,
+        help='batches are split for submission if they exceed this size',
+        default=100)
+
+    parser.add_argument(
+        '--window',
+        type=int,
+        help='the number of submissions in flight at once',
+        default=4)
+
+    parser.add_argument(
+        '--timeout',
+        type=int,
+        help='how many seconds to wait for the batches to commit',
+        default=300)
+
+    parser.add_argument(
+        '-v', '--verbose',
+        action='count',
+        default=0,
+        help='enable more verbose output')
+
+    return parser.parse_args(args)
+
+
+def main(args=sys.argv[1:]):
+    opts = parse_args(args)
+    init_console_logging(verbose_level=opts.verbose)
+
+    if not os.path.isfile(opts.filename):
+        LOGGER.error('Batch file does not exist: %s', opts.filename)
+        sys.exit(1)
+
+    data_dir = opts.data_dir
+    if data_dir is None:
+        data_dir = tempfile.mkdtemp()
+
+    try:
+        results = run_benchmark(
+            os.path.abspath(opts.filename),
+            data_dir,
+            batch_size_limit=opts.batch_size_limit,
+            window=opts.window,
+            timeout=opts.timeout)
+    finally:
+        if opts.data_dir is None:
+            shutil.rmtree(data_dir)
+
+    output = json.dumps(results, indent=2, sort_keys=True)
+    if opts.output is None:
+        print(output)
+    else:
+        with open(opts.output, 'w') as fd:
+            fd.write(output + '\n')
+
+    if 'commit' not in results or \
+            results['commit']['batches'] < results['submit']['batches']:
+        sys.exit(1)
@@ -0,0 +1,157 @@
+# Copyright 2017 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+
+import asyncio
+import logging
+import uuid
+
+import zmq
+import zmq.asyncio
+from zmq.utils.monitor import parse_monitor_message
+
+from sawtooth_sdk.protobuf.validator_pb2 import Message
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+class DisconnectError(Exception):
+    """Raised when the connection to the validator is lost while a request
+    is waiting for its response.
+    """
+    pass
+
+
+class Connection(object):
+    """A connection to a validator, driven by the event loop it is opened on.
+
+    Requests are sent without blocking, and each waits on an asyncio future
+    which is resolved when the response with its correlation id arrives. No
+    thread is held per outstanding request, so the number of concurrent
+    requests is bounded only by memory.
+
+    Args:
+        url (str): The zmq url of the validator's client endpoint
+        loop (asyncio.AbstractEventLoop, optional): The loop to run on,
+            defaults to the current event loop
+    """
+    def __init__(self, url, loop=None):
+        self._url = url
+        self._loop = loop or asyncio.get_event_loop()
+        self._context = None
+        self._socket = None
+        self._monitor = None
+        self._futures = {}
+        self._tasks = []
+
+    @property
+    def url(self):
+        return self._url
+
+    def open(self):
+        """Connects to the validator, and starts receiving responses and
+        watching for disconnects on the event loop.
+        """
+        self._context = zmq.asyncio.Context()
+        self._socket = self._context.socket(zmq.DEALER)
+        self._socket.identity = uuid.uuid4().hex[:16].encode()
+        self._monitor = self._socket.get_monitor_socket(
+            zmq.EVENT_DISCONNECTED)
+        self._socket.connect(self._url)
+
+        self._tasks = [
+            asyncio.ensure_future(self._receive_messages(), loop=self._loop),
+            asyncio.ensure_future(
+                self._monitor_disconnects(), loop=self._loop)]
+
+    def close(self):
+        """Stops receiving, fails any outstanding requests, and closes the
+        socket.
+        """
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        self._fail_outstanding()
+
+        if self._socket is not None:
+            self._socket.disable_monitor()
+            self._monitor.close(linger=0)
+            self._socket.close(linger=0)
+            self._monitor = None
+            self._socket = None
+        if self._context is not None:
+            self._context.term()
+            self._context = None
+
+    async def send(self, message_type, content, timeout=None):
+        """Sends a message to the validator and waits for its response.
+
+        Args:
+            message_type (int): The Message.MessageType of the request
+            content (bytes): The serialized request
+            timeout (float, optional): Seconds to wait for the response
+
+        Returns:
+            Message: The response from the validator
+
+        Raises:
+            asyncio.TimeoutError: No response arrived before the timeout
+            DisconnectError: The connection was lost before a response arrived
+        """
+        if self._socket is None:
+            raise DisconnectError()
+
+        correlation_id = uuid.uuid4().hex
+        message = Message(
+            message_type=message_type,
+            correlation_id=correlation_id,
+            content=content)
+
+        future = self._loop.create_future()
+        self._futures[correlation_id] = future
+        try:
+            await self._socket.send_multipart([message.SerializeToString()])
+            return await asyncio.wait_for(future, timeout, loop=self._loop)
+        finally:
+            self._futures.pop(correlation_id, None)
+
+    async def _receive_messages(self):
+        while True:
+            message = Message()
+            message.ParseFromString(await self._socket.recv())
+
+            future = self._futures.pop(message.correlation_id, None)
+            if future is None:
+                LOGGER.debug(
+                    'Ignoring unsolicited message of type %s from validator',
+                    message.message_type)
+            elif not future.done():
+                future.set_result(message)
+
+    async def _monitor_disconnects(self):
+        while True:
+            event = parse_monitor_message(
+                await self._monitor.recv_multipart())
+            if event['event'] == zmq.EVENT_DISCONNECTED:
+                # The socket reconnects on its own, but any responses still
+                # owed from before the disconnect are lost
+                LOGGER.debug('Disconnected from validator at %s', self._url)
+                self._fail_outstanding()
+
+    def _fail_outstanding(self):
+        futures, self._futures = self._futures, {}
+        for future in futures.values():
+            if not future.done():
+                future.set_exception(DisconnectError())
@@ -0,0 +1,133 @@
+# Copyright 2017 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+
+from collections import OrderedDict
+import hashlib
+
+from aiohttp import web
+
+
+DEFAULT_CACHE_SIZE = 64 * 1024 * 1024
+
+CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+class _CachedResponse(object):
+    def __init__(self, body, content_type, etag):
+        self.body = body
+        self.content_type = content_type
+        self.etag = etag
+
+
+class ResponseCache(object):
+    """A least recently used cache of successful responses to queries whose
+    results never change, such as resources fetched by id, or queries pinned
+    to a particular head block.
+
+    Responses are sent with a strong ETag derived from their body, and with
+    a Cache-Control header marking them immutable. As the same URL may be
+    answered in more than one format, they vary on the Accept header. A
+    request whose If-None-Match header matches the ETag is answered with a
+    304.
+
+    Args:
+        max_size (int, optional): The most bytes of response bodies to keep
+    """
+    def __init__(self, max_size=DEFAULT_CACHE_SIZE):
+        self._max_size = max_size
+        self._size = 0
+        self._responses = OrderedDict()
+
+        self._hits = 0
+        self._misses = 0
+        self._not_modified = 0
+
+    async def respond(self, key, request, handle):
+        """Answers a request from the cache, or by awaiting handle and caching
+        its response if successful.
+
+        Args:
+            key (hashable): Identifies the response, must include anything in
+                the request that changes the response body
+            request (aiohttp.web.Request): The request being answered
+            handle (function): Returns an awaitable of the response, if it
+                isn't cached
+        """
+        cached = self._responses.get(key)
+        if cached is not None:
+            self._responses.move_to_end(key)
+            self._hits += 1
+        else:
+            self._misses += 1
+            response = await handle()
+            if response.status != 200 or response.body is None:
+                return response
+
+            body = bytes(response.body)
+            cached = _CachedResponse(
+                body=body,
+                content_type=response.content_type,
+                etag='"{}"'.format(hashlib.sha256(body).hexdigest()[:40]))
+            self._put(key, cached)
+
+        headers = {
+            'ETag': cached.etag,
+            'Cache-Control': CACHE_CONTROL,
+            'Vary': 'Accept'}
+        if self._matches(request, cached.etag):
+            self._not_modified += 1
+            return web.Response(status=304, headers=headers)
+
+        return web.Response(
+            body=cached.body,
+            content_type=cached.content_type,
+            headers=headers)
+
+    def get_stats(self):
+        """Returns the cache's hit and miss counts, its hit rate, and its
+        size in entries and bytes.
+        """
+        requests = self._hits + self._misses
+        return {
+            'hits': self._hits,
+            'misses': self._misses,
+            'not_modified': self._not_modified,
+            'hit_rate': self._hits / requests if requests else 0.0,
+            'entries': len(self._responses),
+            'size': self._size,
+            'max_size': self._max_size}
+
+    def _put(self, key, cached):
+        if len(cached.body) > self._max_size:
+            return
+
+        previous = self._responses.pop(key, None)
+        if previous is not None:
+            self._size -= len(previous.body)
+
+        self._size += len(cached.body)
+        self._responses[key] = cached
+        while self._size > self._max_size:
+            _, evicted = self._responses.popitem(last=False)
+            self._size -= len(evicted.body)
+
+    @staticmethod
+    def _matches(request, etag):
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match is None:
+            return False
+
+        candidates = [c.strip() for c in if_none_match.split(',')]
+        return '*' in candidates or etag in candidates
@@ -17,6 +17,7 @@ import asyncio
 import argparse
 import sys
 from aiohttp import web
+from sawtooth_rest_api.messaging import Connection
 from sawtooth_rest_api.route_handlers import RouteHandler
 
 
@@ -58,8 +59,11 @@ def start_rest_api(host, port, stream_url, timeout):
     loop = asyncio.get_event_loop()
     app = web.Application(loop=loop, middlewares=[logging_middleware])
 
+    connection = Connection(stream_url, loop=loop)
+    connection.open()
+
     # Add routes to the web app
-    handler = RouteHandler(loop, stream_url, timeout)
+    handler = RouteHandler(loop, connection, timeout)
 
     app.router.add_post('/batches', handler.submit_batches)
     app.router.add_get('/batch_status', handler.list_statuses)
@@ -79,8 +83,13 @@ def start_rest_api(host, port, stream_url, timeout):
         '/transactions/{transaction_id}',
         handler.fetch_transaction)
 
+    app.router.add_get('/status/cache', handler.cache_stats)
+
     # Start app
-    web.run_app(app, host=host, port=port)
+    try:
+        web.run_app(app, host=host, port=port)
+    finally:
+        connection.close()
 
 
 def main():
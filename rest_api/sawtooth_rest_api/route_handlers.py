@@ -13,9 +13,10 @@
 # limitations under the License.
 # ------------------------------------------------------------------------------
 
+import asyncio
 import json
 import base64
-from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
 from aiohttp import web
 
 # pylint: disable=no-name-in-module,import-error
@@ -24,13 +25,13 @@ from google.protobuf.json_format import MessageToDict
 from google.protobuf.message import DecodeError
 from google.protobuf.message import Message as BaseMessage
 
-from sawtooth_sdk.client.exceptions import ValidatorConnectionError
-from sawtooth_sdk.client.future import FutureTimeoutError
-from sawtooth_sdk.client.stream import Stream
 from sawtooth_sdk.protobuf.validator_pb2 import Message
 
 import sawtooth_rest_api.exceptions as errors
 import sawtooth_rest_api.error_handlers as error_handlers
+from sawtooth_rest_api.messaging import DisconnectError
+from sawtooth_rest_api.response_cache import DEFAULT_CACHE_SIZE
+from sawtooth_rest_api.response_cache import ResponseCache
 from sawtooth_rest_api.protobuf import client_pb2
 from sawtooth_rest_api.protobuf.block_pb2 import BlockHeader
 from sawtooth_rest_api.protobuf.batch_pb2 import BatchList
@@ -40,6 +41,29 @@ from sawtooth_rest_api.protobuf.transaction_pb2 import TransactionHeader
 
 DEFAULT_TIMEOUT = 300
 
+# Validator responses at least this many bytes are converted and encoded in
+# the loop's executor, so a large page doesn't stall other requests
+LARGE_RESPONSE_SIZE = 64 * 1024
+
+
+def _cache_immutable(pinned_by_head=False):
+    """Decorates a RouteHandler endpoint whose successful responses never
+    change, so they are cached and sent with an ETag. If pinned_by_head,
+    this is only true of queries which specify a head block.
+    """
+    def decorator(handler):
+        @wraps(handler)
+        async def cached_handler(self, request):
+            if pinned_by_head and 'head' not in request.url.query:
+                return await handler(self, request)
+
+            key = (request.scheme, request.host, request.path_qs,
+                   self._accepts_protobuf(request))
+            return await self._response_cache.respond(
+                key, request, lambda: handler(self, request))
+        return cached_handler
+    return decorator
+
 
 class RouteHandler(object):
     """Contains a number of aiohttp handlers for endpoints in the Rest Api.
@@ -47,21 +71,33 @@ class RouteHandler(object):
     Each handler takes an aiohttp Request object, and uses the data in
     that request to send Protobuf message to a validator. The Protobuf response
     is then parsed, and finally an aiohttp Response object is sent back
-    to the client with JSON formatted data and metadata.
+    to the client with JSON formatted data and metadata. The JSON is compact,
+    unless the `pretty` query parameter is set. Clients that accept
+    `application/octet-stream` are sent the validator's Protobuf response for
+    block, batch, and transaction endpoints as is, instead of JSON.
+
+    Responses to queries for resources by id, or pinned to a head block,
+    never change. They are kept in an LRU cache, and sent with a strong ETag
+    and an immutable Cache-Control header.
 
     If something goes wrong, an aiohttp HTTP exception is raised or returned
     instead.
 
     Args:
-        stream_url (str): The TCP url to communitcate with the validator
+        loop (asyncio.AbstractEventLoop): The event loop the Api runs on
+        connection (messaging.Connection): The open connection to the
+            validator, which sends requests without blocking the loop
         timeout (int, optional): The time in seconds before the Api should
             cancel a request and report that the validator is unavailable.
+        cache_size (int, optional): The most bytes of immutable responses
+            to cache.
     """
-    def __init__(self, loop, stream_url, timeout=DEFAULT_TIMEOUT):
-        loop.set_default_executor(ThreadPoolExecutor())
+    def __init__(self, loop, connection, timeout=DEFAULT_TIMEOUT,
+                 cache_size=DEFAULT_CACHE_SIZE):
         self._loop = loop
-        self._stream = Stream(stream_url)
+        self._connection = connection
         self._timeout = timeout
+        self._response_cache = ResponseCache(cache_size)
 
     async def submit_batches(self, request):
         """Accepts a binary encoded BatchList and submits it to the validator.
@@ -122,7 +158,8 @@ class RouteHandler(object):
             data = None
             link = link.replace('batch_status', 'batches')
 
-        return self._wrap_response(
+        return await self._wrap_response(
+            request,
             data=data,
             metadata={'link': link},
             status=status)
@@ -178,10 +215,12 @@ class RouteHandler(object):
         else:
             metadata = None
 
-        return self._wrap_response(
+        return await self._wrap_response(
+            request,
             data=response.get('batch_statuses'),
             metadata=metadata)
 
+    @_cache_immutable(pinned_by_head=True)
     async def list_state(self, request):
         """Fetches list of data leaves, optionally filtered by address prefix.
 
@@ -207,12 +246,14 @@ class RouteHandler(object):
             client_pb2.ClientStateListResponse,
             validator_query)
 
-        return self._wrap_paginated_response(
+        return await self._wrap_paginated_response(
             request=request,
             response=response,
             controls=paging_controls,
-            data=response.get('leaves', []))
+            data=response.get('leaves', []),
+            by_cursor=True)
 
+    @_cache_immutable(pinned_by_head=True)
     async def fetch_state(self, request):
         """Fetches data from a specific address in the validator's state tree.
 
@@ -239,10 +280,12 @@ class RouteHandler(object):
             client_pb2.ClientStateGetRequest(head_id=head, address=address),
             error_traps)
 
-        return self._wrap_response(
+        return await self._wrap_response(
+            request,
             data=response['value'],
             metadata=self._get_metadata(request, response))
 
+    @_cache_immutable(pinned_by_head=True)
     async def list_blocks(self, request):
         """Fetches list of blocks from validator, optionally filtered by id.
 
@@ -263,17 +306,26 @@ class RouteHandler(object):
             block_ids=self._get_filter_ids(request),
             paging=self._make_paging_message(paging_controls))
 
-        response = await self._query_validator(
+        response, content = await self._query_resources(
             Message.CLIENT_BLOCK_LIST_REQUEST,
             client_pb2.ClientBlockListResponse,
             validator_query)
 
-        return self._wrap_paginated_response(
+        if self._accepts_protobuf(request):
+            return self._wrap_protobuf(content)
+
+        data = await self._run_sized(
+            len(content), self._expand_list, self._expand_block,
+            response.blocks)
+
+        return await self._wrap_paginated_response(
             request=request,
-            response=response,
+            response=self._get_list_fields(response),
             controls=paging_controls,
-            data=[self._expand_block(b) for b in response['blocks']])
+            data=data,
+            size=len(content))
 
+    @_cache_immutable()
     async def fetch_block(self, request):
         """Fetches a specific block from the validator, specified by id.
         Request:
@@ -288,16 +340,23 @@ class RouteHandler(object):
 
         block_id = request.match_info.get('block_id', '')
 
-        response = await self._query_validator(
+        response, content = await self._query_resources(
             Message.CLIENT_BLOCK_GET_REQUEST,
             client_pb2.ClientBlockGetResponse,
             client_pb2.ClientBlockGetRequest(block_id=block_id),
             error_traps)
 
-        return self._wrap_response(
-            data=self._expand_block(response['block']),
-            metadata=self._get_metadata(request, response))
+        if self._accepts_protobuf(request):
+            return self._wrap_protobuf(content)
 
+        return await self._wrap_response(
+            request,
+            data=await self._run_sized(
+                len(content), self._expand_block, response.block),
+            metadata=self._get_metadata(request, {}),
+            size=len(content))
+
+    @_cache_immutable(pinned_by_head=True)
     async def list_batches(self, request):
         """Fetches list of batches from validator, optionally filtered by id.
 
@@ -318,17 +377,26 @@ class RouteHandler(object):
             batch_ids=self._get_filter_ids(request),
             paging=self._make_paging_message(paging_controls))
 
-        response = await self._query_validator(
+        response, content = await self._query_resources(
             Message.CLIENT_BATCH_LIST_REQUEST,
             client_pb2.ClientBatchListResponse,
             validator_query)
 
-        return self._wrap_paginated_response(
+        if self._accepts_protobuf(request):
+            return self._wrap_protobuf(content)
+
+        data = await self._run_sized(
+            len(content), self._expand_list, self._expand_batch,
+            response.batches)
+
+        return await self._wrap_paginated_response(
             request=request,
-            response=response,
+            response=self._get_list_fields(response),
             controls=paging_controls,
-            data=[self._expand_batch(b) for b in response['batches']])
+            data=data,
+            size=len(content))
 
+    @_cache_immutable()
     async def fetch_batch(self, request):
         """Fetches a specific batch from the validator, specified by id.
 
@@ -344,16 +412,23 @@ class RouteHandler(object):
 
         batch_id = request.match_info.get('batch_id', '')
 
-        response = await self._query_validator(
+        response, content = await self._query_resources(
             Message.CLIENT_BATCH_GET_REQUEST,
             client_pb2.ClientBatchGetResponse,
             client_pb2.ClientBatchGetRequest(batch_id=batch_id),
             error_traps)
 
-        return self._wrap_response(
-            data=self._expand_batch(response['batch']),
-            metadata=self._get_metadata(request, response))
+        if self._accepts_protobuf(request):
+            return self._wrap_protobuf(content)
 
+        return await self._wrap_response(
+            request,
+            data=await self._run_sized(
+                len(content), self._expand_batch, response.batch),
+            metadata=self._get_metadata(request, {}),
+            size=len(content))
+
+    @_cache_immutable(pinned_by_head=True)
     async def list_transactions(self, request):
         """Fetches list of txns from validator, optionally filtered by id.
 
@@ -374,19 +449,26 @@ class RouteHandler(object):
             transaction_ids=self._get_filter_ids(request),
             paging=self._make_paging_message(paging_controls))
 
-        response = await self._query_validator(
+        response, content = await self._query_resources(
             Message.CLIENT_TRANSACTION_LIST_REQUEST,
             client_pb2.ClientTransactionListResponse,
             validator_query)
 
-        data = [self._expand_transaction(t) for t in response['transactions']]
+        if self._accepts_protobuf(request):
+            return self._wrap_protobuf(content)
 
-        return self._wrap_paginated_response(
+        data = await self._run_sized(
+            len(content), self._expand_list, self._expand_transaction,
+            response.transactions)
+
+        return await self._wrap_paginated_response(
             request=request,
-            response=response,
+            response=self._get_list_fields(response),
             controls=paging_controls,
-            data=data)
+            data=data,
+            size=len(content))
 
+    @_cache_immutable()
     async def fetch_transaction(self, request):
         """Fetches a specific transaction from the validator, specified by id.
 
@@ -402,15 +484,34 @@ class RouteHandler(object):
 
         txn_id = request.match_info.get('transaction_id', '')
 
-        response = await self._query_validator(
+        response, content = await self._query_resources(
             Message.CLIENT_TRANSACTION_GET_REQUEST,
             client_pb2.ClientTransactionGetResponse,
             client_pb2.ClientTransactionGetRequest(transaction_id=txn_id),
             error_traps)
 
-        return self._wrap_response(
-            data=self._expand_transaction(response['transaction']),
-            metadata=self._get_metadata(request, response))
+        if self._accepts_protobuf(request):
+            return self._wrap_protobuf(content)
+
+        return await self._wrap_response(
+            request,
+            data=await self._run_sized(
+                len(content), self._expand_transaction, response.transaction),
+            metadata=self._get_metadata(request, {}),
+            size=len(content))
+
+    async def cache_stats(self, request):
+        """Reports how well the cache of immutable responses is working.
+
+        Response:
+            data: A JSON object with the number of cache hits and misses, the
+                hit rate, the number of 304 responses, and the cache's size
+            link: The link to this exact query
+        """
+        return await self._wrap_response(
+            request,
+            data=self._response_cache.get_stats(),
+            metadata={'link': self._build_url(request)})
 
     async def _query_validator(self, request_type, response_proto,
                                content, traps=None):
@@ -419,6 +520,15 @@ class RouteHandler(object):
         response = await self._try_validator_request(request_type, content)
         return self._try_response_parse(response_proto, response, traps)
 
+    async def _query_resources(self, request_type, response_proto,
+                               content, traps=None):
+        """Sends a request to the validator and parses the response, without
+        converting it to a dict. Returns both the parsed and the serialized
+        response, so the latter can be passed on to clients as is.
+        """
+        response = await self._try_validator_request(request_type, content)
+        return self._parse_response(response_proto, response, traps), response
+
     async def _try_validator_request(self, message_type, content):
         """Serializes and sends a Protobuf message to the validator.
         Handles timeout errors as needed.
@@ -426,24 +536,24 @@ class RouteHandler(object):
         if isinstance(content, BaseMessage):
             content = content.SerializeToString()
 
-        future = self._stream.send(message_type=message_type, content=content)
-
         try:
-            response = await self._loop.run_in_executor(
-                None,
-                future.result,
-                self._timeout)
-        except FutureTimeoutError:
+            response = await self._connection.send(
+                message_type=message_type,
+                content=content,
+                timeout=self._timeout)
+        except (asyncio.TimeoutError, DisconnectError):
             raise errors.ValidatorUnavailable()
 
-        try:
-            return response.content
-        # Caused by resolving a FutureError on validator disconnect
-        except ValidatorConnectionError:
-            raise errors.ValidatorUnavailable()
+        return response.content
 
     @classmethod
     def _try_response_parse(cls, proto, response, traps=None):
+        """Parses the Protobuf response from the validator into a dict.
+        """
+        return cls.message_to_dict(cls._parse_response(proto, response, traps))
+
+    @staticmethod
+    def _parse_response(proto, response, traps=None):
         """Parses the Protobuf response from the validator.
         Uses "error traps" to send back any HTTP error triggered by a Protobuf
         status, both those common to many handlers, and specified individually.
@@ -476,54 +586,105 @@ class RouteHandler(object):
         for trap in traps:
             trap.check(parsed.status)
 
-        return cls.message_to_dict(parsed)
+        return parsed
 
-    @staticmethod
-    def _wrap_response(data=None, metadata=None, status=200):
+    async def _run_sized(self, size, func, *args):
+        """Runs a function over data from a validator response of the given
+        size in bytes. Large responses are handled in the loop's executor.
+        """
+        if size < LARGE_RESPONSE_SIZE:
+            return func(*args)
+        return await self._loop.run_in_executor(None, func, *args)
+
+    async def _wrap_response(self, request, data=None, metadata=None,
+                             status=200, size=0):
         """Creates the JSON response envelope to be sent back to the client.
+        The size of the validator response the data came from, if any,
+        decides whether the envelope is encoded in the loop's executor.
         """
         envelope = metadata or {}
 
         if data is not None:
             envelope['data'] = data
 
+        pretty = request.url.query.get('pretty', 'false').lower() != 'false'
+
         return web.Response(
             status=status,
             content_type='application/json',
-            text=json.dumps(
+            text=await self._run_sized(
+                size, self._encode_json, envelope, pretty))
+
+    @staticmethod
+    def _encode_json(envelope, pretty=False):
+        """Encodes a response envelope as compact JSON, or indented with
+        sorted keys if pretty.
+        """
+        if pretty:
+            return json.dumps(
                 envelope,
                 indent=2,
                 separators=(',', ': '),
-                sort_keys=True))
+                sort_keys=True)
+        return json.dumps(envelope, separators=(',', ':'))
 
-    @classmethod
-    def _wrap_paginated_response(cls, request, response, controls, data):
+    @staticmethod
+    def _accepts_protobuf(request):
+        """Checks whether the client asked for a Protobuf response with an
+        `application/octet-stream` Accept header.
+        """
+        accepted = request.headers.get('Accept', '')
+        return any(a.split(';')[0].strip() == 'application/octet-stream'
+                   for a in accepted.split(','))
+
+    @staticmethod
+    def _wrap_protobuf(content):
+        """Sends a serialized Protobuf response from the validator back to
+        the client as is.
+        """
+        return web.Response(
+            content_type='application/octet-stream',
+            body=content)
+
+    async def _wrap_paginated_response(self, request, response, controls,
+                                       data, by_cursor=False, size=0):
         """Builds the metadata for a pagingated response and wraps everying in
         a JSON encoded web.Response
+
+        If by_cursor is set, the paging urls are always built from the ids
+        sent back by the validator, which may not have counted the resources.
         """
         head = response['head_id']
-        link = cls._build_url(request, head)
+        link = self._build_url(request, head)
 
         paging_response = response['paging']
         total = paging_response['total_resources']
-        paging = {'total_count': total}
+        by_id = by_cursor or 'start_id' in controls or 'end_id' in controls
+        paging = {}
 
         # If there are no resources, there should be nothing else in paging
-        if total == 0:
-            return cls._wrap_response(
+        if total == 0 and not (by_cursor and data):
+            paging['total_count'] = total
+            return await self._wrap_response(
+                request,
                 data=data,
-                metadata={'head': head, 'link': link, 'paging': paging})
+                metadata={'head': head, 'link': link, 'paging': paging},
+                size=size)
 
         count = controls.get('count', len(data))
         start = paging_response['start_index']
-        paging['start_index'] = start
+        if total != 0:
+            paging['total_count'] = total
+            paging['start_index'] = start
+        elif 'start_id' not in controls and 'end_id' not in controls:
+            paging['start_index'] = start
 
         # Builds paging urls specific to this response
         def build_pg_url(min_pos=None, max_pos=None):
-            return cls._build_url(request, head, count, min_pos, max_pos)
+            return self._build_url(request, head, count, min_pos, max_pos)
 
         # Build paging urls based on ids
-        if 'start_id' in controls or 'end_id' in controls:
+        if by_id:
             if paging_response['next_id']:
                 paging['next'] = build_pg_url(paging_response['next_id'])
             if paging_response['previous_id']:
@@ -540,9 +701,20 @@ class RouteHandler(object):
             if start - count >= 0:
                 paging['previous'] = build_pg_url(start - count)
 
-        return cls._wrap_response(
+        return await self._wrap_response(
+            request,
             data=data,
-            metadata={'head': head, 'link': link, 'paging': paging})
+            metadata={'head': head, 'link': link, 'paging': paging},
+            size=size)
+
+    @classmethod
+    def _get_list_fields(cls, response):
+        """Converts the head and paging of a Protobuf list response to a
+        dict, leaving out the listed resources.
+        """
+        return {
+            'head_id': response.head_id,
+            'paging': cls.message_to_dict(response.paging)}
 
     @classmethod
     def _get_metadata(cls, request, response):
@@ -589,40 +761,49 @@ class RouteHandler(object):
         queries = ['{}={}'.format(k, v) for k, v in query.items()]
         return url + '&' + '&'.join(queries) if queries else url
 
+    @staticmethod
+    def _expand_list(expand, resources):
+        """Expands each of a list of blocks, batches, or transactions.
+        """
+        return [expand(r) for r in resources]
+
     @classmethod
     def _expand_block(cls, block):
-        """Deserializes a Block's header, and the header of its Batches.
+        """Converts a Block to a dict, deserializing its header, and the
+        headers of its Batches.
         """
-        cls._parse_header(BlockHeader, block)
-        if 'batches' in block:
-            block['batches'] = [cls._expand_batch(b) for b in block['batches']]
-        return block
+        return {
+            'header': cls._parse_header(BlockHeader, block.header),
+            'header_signature': block.header_signature,
+            'batches': [cls._expand_batch(b) for b in block.batches]}
 
     @classmethod
     def _expand_batch(cls, batch):
-        """Deserializes a Batch's header, and the header of its Transactions.
+        """Converts a Batch to a dict, deserializing its header, and the
+        headers of its Transactions.
         """
-        cls._parse_header(BatchHeader, batch)
-        if 'transactions' in batch:
-            batch['transactions'] = [
-                cls._expand_transaction(t) for t in batch['transactions']]
-        return batch
+        return {
+            'header': cls._parse_header(BatchHeader, batch.header),
+            'header_signature': batch.header_signature,
+            'transactions': [
+                cls._expand_transaction(t) for t in batch.transactions]}
 
     @classmethod
     def _expand_transaction(cls, transaction):
-        """Deserializes a Transaction's header.
+        """Converts a Transaction to a dict, deserializing its header.
         """
-        return cls._parse_header(TransactionHeader, transaction)
+        return {
+            'header': cls._parse_header(TransactionHeader, transaction.header),
+            'header_signature': transaction.header_signature,
+            'payload': base64.b64encode(transaction.payload).decode()}
 
     @classmethod
-    def _parse_header(cls, header_proto, obj):
-        """Deserializes a base64 encoded Protobuf header.
+    def _parse_header(cls, header_proto, header_bytes):
+        """Deserializes a Protobuf header into a dict.
         """
         header = header_proto()
-        header_bytes = base64.b64decode(obj['header'])
         header.ParseFromString(header_bytes)
-        obj['header'] = cls.message_to_dict(header)
-        return obj
+        return cls.message_to_dict(header)
 
     @staticmethod
     def _get_paging_controls(request):
@@ -77,6 +77,7 @@ setup(name='sawtooth-rest-api',
           'aiohttp',
           'cchardet',
           'protobuf',
+          'pyzmq',
           'sawtooth-sdk',
           ],
       entry_points={
@@ -35,8 +35,9 @@ TEST_TIMEOUT = 5
 
 
 class MockStream(object):
-    """Replaces a route handler's stream to allow tests to preset the response
-    to send back as well as run asserts on the protobufs sent to the stream.
+    """Replaces a route handler's connection to allow tests to preset the
+    response to send back as well as run asserts on the protobufs sent to the
+    stream.
 
     Methods can be accessed using `self.stream` within a test case. MockStream
     should not be initialized directly.
@@ -80,8 +81,8 @@ class MockStream(object):
 
         self._reset_sent_request()
 
-    def send(self, message_type, content):
-        """Replaces send method on Stream. Should not be called directly.
+    async def send(self, message_type, content, timeout=None):
+        """Replaces send method on Connection. Should not be called directly.
         """
         request = self._request_proto()
         request.ParseFromString(content)
@@ -95,7 +96,7 @@ class MockStream(object):
             raise AssertionError("Preset a response before sending a request!")
 
         self._reset_response()
-        return self._MockFuture(response_bytes)
+        return self._MockResponse(response_bytes)
 
     def _reset_sent_request(self):
         self._sent_request_type = None
@@ -104,16 +105,9 @@ class MockStream(object):
     def _reset_response(self):
         self._response = None
 
-    class _MockFuture(object):
-        class Response(object):
-            def __init__(self, content):
-                self.content = content
-
-        def __init__(self, response_content):
-            self._response = self.Response(response_content)
-
-        def result(self, timeout):
-            return self._response
+    class _MockResponse(object):
+        def __init__(self, content):
+            self.content = content
 
 
 class BaseApiTest(AioHTTPTestCase):
@@ -149,7 +143,7 @@ class BaseApiTest(AioHTTPTestCase):
 
     @staticmethod
     def build_handlers(loop, stream):
-        """Returns Rest Api route handlers modified with some a mock stream.
+        """Returns Rest Api route handlers connected to a mock stream.
 
         Args:
             stream (object): The MockStream set to `self.stream`
@@ -157,9 +151,7 @@ class BaseApiTest(AioHTTPTestCase):
         Returns:
             RouteHandler: The route handlers to handle test queries
         """
-        handlers = RouteHandler(loop, 'tcp://0.0.0.0:40404', TEST_TIMEOUT)
-        handlers._stream = stream
-        return handlers
+        return RouteHandler(loop, stream, TEST_TIMEOUT)
 
     @staticmethod
     def build_app(loop, endpoint, handler):
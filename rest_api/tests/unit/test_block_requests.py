@@ -13,6 +13,7 @@
 # limitations under the License.
 # ------------------------------------------------------------------------------
 
+import json
 from aiohttp.test_utils import unittest_run_loop
 from tests.unit.components import Mocks, BaseApiTest
 from sawtooth_sdk.protobuf.validator_pb2 import Message
@@ -479,6 +480,131 @@ class BlockListTests(BaseApiTest):
         self.assert_has_valid_data_list(response, 3)
         self.assert_blocks_well_formed(response['data'], 'd', 'c', 'b')
 
+    @unittest_run_loop
+    async def test_block_list_pretty(self):
+        """Verifies GET /blocks sends compact JSON unless asked to be pretty.
+
+        It will receive a Protobuf response with:
+            - a head id of '1'
+            - a paging response with a start of 0, and 2 total resources
+            - two blocks with ids '1' and '0'
+
+        It should send back a JSON response with:
+            - no whitespace by default
+            - keys sorted and indented if the pretty parameter is set
+            - the same data either way
+        """
+        paging = Mocks.make_paging_response(0, 2)
+        blocks = Mocks.make_blocks('1', '0')
+
+        self.stream.preset_response(head_id='1', paging=paging, blocks=blocks)
+        compact = await (await self.client.get('/blocks')).text()
+
+        self.stream.preset_response(head_id='1', paging=paging, blocks=blocks)
+        pretty = await (await self.client.get('/blocks?pretty')).text()
+
+        self.assertNotIn(' ', compact)
+        self.assertNotIn('\n', compact)
+        self.assertEqual(
+            json.dumps(json.loads(pretty), indent=2, sort_keys=True), pretty)
+
+        compact = json.loads(compact)
+        pretty = json.loads(pretty)
+        self.assertEqual(compact['data'], pretty['data'])
+        self.assert_blocks_well_formed(compact['data'], '1', '0')
+
+    @unittest_run_loop
+    async def test_block_list_as_protobuf(self):
+        """Verifies GET /blocks sends the validator's Protobuf response to
+        clients that accept application/octet-stream.
+
+        It will receive a Protobuf response with:
+            - a head id of '1'
+            - a paging response with a start of 0, and 2 total resources
+            - two blocks with ids '1' and '0'
+
+        It should send back a response with:
+            - a status of 200
+            - an application/octet-stream content type
+            - a body that is the validator's serialized response
+        """
+        paging = Mocks.make_paging_response(0, 2)
+        blocks = Mocks.make_blocks('1', '0')
+        self.stream.preset_response(head_id='1', paging=paging, blocks=blocks)
+
+        response = await self.client.get(
+            '/blocks',
+            headers={'Accept': 'application/octet-stream'})
+
+        self.assertEqual(200, response.status)
+        self.assertEqual(
+            'application/octet-stream', response.headers['Content-Type'])
+
+        parsed = client_pb2.ClientBlockListResponse()
+        parsed.ParseFromString(await response.read())
+        self.assertEqual('1', parsed.head_id)
+        self.assertEqual(paging, parsed.paging)
+        self.assertEqual(blocks, list(parsed.blocks))
+
+    @unittest_run_loop
+    async def test_block_list_large(self):
+        """Verifies a GET /blocks with a large response works properly, when
+        the blocks are expanded and encoded outside of the event loop.
+
+        It will receive a Protobuf response with:
+            - a head id of '999'
+            - a paging response with a start of 0, and 1000 total resources
+            - a thousand blocks with ids '999' through '0'
+
+        It should send back a JSON response with:
+            - a status of 200
+            - a data property that is a list of 1000 full blocks
+        """
+        ids = [str(i) for i in reversed(range(1000))]
+        paging = Mocks.make_paging_response(0, 1000)
+        blocks = Mocks.make_blocks(*ids)
+        self.stream.preset_response(
+            head_id='999', paging=paging, blocks=blocks)
+
+        response = await self.get_json_assert_200('/blocks')
+
+        self.assert_has_valid_head(response, '999')
+        self.assert_has_valid_data_list(response, 1000)
+        self.assert_blocks_well_formed(response['data'], *ids)
+
+    @unittest_run_loop
+    async def test_block_list_with_head_cached(self):
+        """Verifies GET /blocks is cached only when pinned to a head.
+
+        It will receive a Protobuf response with:
+            - a head id of '1'
+            - a paging response with a start of 0, and 2 total resources
+            - two blocks with ids '1' and '0'
+
+        It should send a Protobuf request only once for '/blocks?head=1',
+        but for every '/blocks' request, and send back:
+            - an ETag and an immutable Cache-Control header with head=1
+            - neither header without a head
+        """
+        paging = Mocks.make_paging_response(0, 2)
+        blocks = Mocks.make_blocks('1', '0')
+
+        self.stream.preset_response(head_id='1', paging=paging, blocks=blocks)
+        first = await self.get_and_assert_status('/blocks?head=1', 200)
+        second = await self.get_and_assert_status('/blocks?head=1', 200)
+
+        self.assertIn('ETag', first.headers)
+        self.assertIn('immutable', first.headers['Cache-Control'])
+        self.assertEqual(first.headers['ETag'], second.headers['ETag'])
+        self.assertEqual(await first.json(), await second.json())
+
+        self.stream.preset_response(head_id='1', paging=paging, blocks=blocks)
+        unpinned = await self.get_and_assert_status('/blocks', 200)
+        self.stream.assert_valid_request_sent(
+            paging=Mocks.make_paging_controls())
+        self.assertNotIn('ETag', unpinned.headers)
+        self.assertNotIn('Cache-Control', unpinned.headers)
+
 
 class BlockGetTests(BaseApiTest):
 
@@ -542,3 +668,82 @@ class BlockGetTests(BaseApiTest):
         """
         self.stream.preset_response(self.status.NO_RESOURCE)
         await self.assert_404('/blocks/bad')
+
+    @unittest_run_loop
+    async def test_block_get_as_protobuf(self):
+        """Verifies GET /blocks/{block_id} sends the validator's Protobuf
+        response to clients that accept application/octet-stream.
+
+        It will receive a Protobuf response with:
+            - a block with an id of '1'
+
+        It should send back a response with:
+            - a status of 200
+            - an application/octet-stream content type
+            - a body that is the validator's serialized response
+        """
+        block = Mocks.make_blocks('1')[0]
+        self.stream.preset_response(block=block)
+
+        response = await self.client.get(
+            '/blocks/1',
+            headers={'Accept': 'text/html, application/octet-stream;q=0.9'})
+
+        self.assertEqual(200, response.status)
+        self.assertEqual(
+            'application/octet-stream', response.headers['Content-Type'])
+
+        parsed = client_pb2.ClientBlockGetResponse()
+        parsed.ParseFromString(await response.read())
+        self.assertEqual(block, parsed.block)
+
+    @unittest_run_loop
+    async def test_block_get_cached(self):
+        """Verifies GET /blocks/{block_id} is answered from the cache after
+        the first request, and honors If-None-Match.
+
+        It will receive a Protobuf response with:
+            - a block with an id of '1'
+
+        It should send a Protobuf request only for the first query, and send
+        back:
+            - the same block and ETag for the second query
+            - a status of 304 when the ETag is sent back in If-None-Match
+            - a status of 200 when a different ETag is sent
+        """
+        self.stream.preset_response(block=Mocks.make_blocks('1')[0])
+
+        first = await self.get_and_assert_status('/blocks/1', 200)
+        self.stream.assert_valid_request_sent(block_id='1')
+        etag = first.headers['ETag']
+
+        second = await self.get_json_assert_200('/blocks/1')
+        self.assert_blocks_well_formed(second['data'], '1')
+
+        not_modified = await self.client.get(
+            '/blocks/1', headers={'If-None-Match': etag})
+        self.assertEqual(304, not_modified.status)
+        self.assertEqual(etag, not_modified.headers['ETag'])
+
+        modified = await self.client.get(
+            '/blocks/1', headers={'If-None-Match': '"other"'})
+        self.assertEqual(200, modified.status)
+
+    @unittest_run_loop
+    async def test_block_get_error_not_cached(self):
+        """Verifies GET /blocks/{block_id} does not cache errors.
+
+        It will receive a Protobuf response with:
+            - a status of NO_RESOURCE the first time
+            - a block with an id of '1' the second time
+
+        It should send back:
+            - a status of 404 the first time
+            - a status of 200 the second time
+        """
+        self.stream.preset_response(self.status.NO_RESOURCE)
+        await self.assert_404('/blocks/1')
+
+        self.stream.preset_response(block=Mocks.make_blocks('1')[0])
+        response = await self.get_json_assert_200('/blocks/1')
+        self.assert_blocks_well_formed(response['data'], '1')
@@ -0,0 +1,221 @@
+# Copyright 2017 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+
+import asyncio
+import logging
+import os
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from time import time
+
+import zmq
+import zmq.asyncio
+
+from sawtooth_sdk.client.stream import Stream
+from sawtooth_sdk.protobuf.validator_pb2 import Message
+
+from sawtooth_rest_api.messaging import Connection
+from sawtooth_rest_api.messaging import DisconnectError
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+class MockValidator(object):
+    """Answers every message sent to it with a message carrying the same
+    correlation id and content. Messages whose content is b'wait' are
+    answered after wait_delay, others after delay, and messages whose content
+    is b'ignore' are never answered.
+    """
+    def __init__(self, loop, delay=0, wait_delay=0):
+        self._loop = loop
+        self._delay = delay
+        self._wait_delay = wait_delay
+        self._context = zmq.asyncio.Context()
+        self._socket = self._context.socket(zmq.ROUTER)
+        port = self._socket.bind_to_random_port('tcp://127.0.0.1')
+        self.url = 'tcp://127.0.0.1:{}'.format(port)
+        self._task = asyncio.ensure_future(self._answer(), loop=loop)
+
+    async def _answer(self):
+        while True:
+            identity, message_bytes = await self._socket.recv_multipart()
+            message = Message()
+            message.ParseFromString(message_bytes)
+            if message.content == b'ignore':
+                continue
+            self._loop.call_later(
+                self._wait_delay if message.content == b'wait'
+                else self._delay,
+                self._socket.send_multipart,
+                [identity, message_bytes])
+
+    def close(self):
+        self._task.cancel()
+        self._socket.close(linger=0)
+        self._context.term()
+
+
+class ConnectionTestCase(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(None)
+        self.validator = None
+        self.connection = None
+
+    def tearDown(self):
+        if self.connection is not None:
+            self.connection.close()
+        if self.validator is not None:
+            self.validator.close()
+        self.loop.run_until_complete(asyncio.sleep(0, loop=self.loop))
+        self.loop.close()
+
+    def connect(self, delay=0, wait_delay=0):
+        self.validator = MockValidator(self.loop, delay, wait_delay)
+        self.connection = Connection(self.validator.url, loop=self.loop)
+        self.connection.open()
+
+    def send(self, content, timeout=5):
+        return self.loop.run_until_complete(self.connection.send(
+            Message.CLIENT_BLOCK_LIST_REQUEST, content, timeout))
+
+
+class TestConnection(ConnectionTestCase):
+    def test_send_receives_response(self):
+        """Verifies that send resolves to the validator's response to the
+        message that was sent.
+        """
+        self.connect()
+
+        response = self.send(b'content')
+
+        self.assertEqual(b'content', response.content)
+        self.assertEqual(
+            Message.CLIENT_BLOCK_LIST_REQUEST, response.message_type)
+
+    def test_concurrent_sends_are_correlated(self):
+        """Verifies that concurrent requests each resolve to their own
+        response.
+        """
+        self.connect()
+
+        contents = [str(i).encode() for i in range(100)]
+        responses = self.loop.run_until_complete(asyncio.gather(
+            *[self.connection.send(
+                Message.CLIENT_BLOCK_LIST_REQUEST, c, timeout=5)
+              for c in contents],
+            loop=self.loop))
+
+        self.assertEqual(contents, [r.content for r in responses])
+
+    def test_send_times_out(self):
+        """Verifies that send raises a TimeoutError if the validator does not
+        respond in time, and does not leave the request outstanding.
+        """
+        self.connect()
+
+        with self.assertRaises(asyncio.TimeoutError):
+            self.send(b'ignore', timeout=0.1)
+        self.assertEqual({}, self.connection._futures)
+
+    def test_close_fails_outstanding_requests(self):
+        """Verifies that closing the connection fails any requests still
+        waiting for a response, and any that are sent afterwards.
+        """
+        self.connect()
+
+        future = asyncio.ensure_future(
+            self.connection.send(
+                Message.CLIENT_BLOCK_LIST_REQUEST, b'ignore', timeout=5),
+            loop=self.loop)
+        self.loop.run_until_complete(asyncio.sleep(0.1, loop=self.loop))
+        self.connection.close()
+
+        with self.assertRaises(DisconnectError):
+            self.loop.run_until_complete(future)
+        with self.assertRaises(DisconnectError):
+            self.send(b'content')
+
+
+@unittest.skipUnless(
+    os.environ.get('REST_API_LOAD_REQUESTS'),
+    'set REST_API_LOAD_REQUESTS to the number of quick requests to run')
+class TestConnectionLoad(ConnectionTestCase):
+    """Sends a burst of requests which the validator answers quickly,
+    alongside requests which it holds on to for a while, as it does for
+    batch submissions that wait for commit. Reports the time taken and the
+    p99 latency of the quick requests for the asyncio connection, and for the
+    thread per request approach it replaced, where each waiting request
+    holds a thread of the default executor. It only runs when
+    REST_API_LOAD_REQUESTS is set to the size of the burst, e.g. 1000, and
+    the number of waiting requests can be set with REST_API_LOAD_WAITING.
+    The latencies depend on the machine, so they are reported rather than
+    compared.
+    """
+    def setUp(self):
+        super().setUp()
+        self.request_count = int(os.environ['REST_API_LOAD_REQUESTS'])
+        self.waiting_count = int(
+            os.environ.get('REST_API_LOAD_WAITING', '100'))
+        self.delay = 0.01
+        self.wait_delay = 1
+
+    async def _timed(self, request, content):
+        start = time()
+        response = await request(content)
+        self.assertEqual(content, response.content)
+        return time() - start
+
+    def _run_burst(self, request):
+        waiting = [self._timed(request, b'wait')
+                   for _ in range(self.waiting_count)]
+        quick = [self._timed(request, str(i).encode())
+                 for i in range(self.request_count)]
+
+        start = time()
+        latencies = self.loop.run_until_complete(
+            asyncio.gather(*(waiting + quick), loop=self.loop))
+        elapsed = time() - start
+
+        latencies = sorted(latencies[self.waiting_count:])
+        return elapsed, latencies[int(len(latencies) * 0.99) - 1]
+
+    def test_concurrent_request_latency(self):
+        self.connect(delay=self.delay, wait_delay=self.wait_delay)
+
+        async_elapsed, async_p99 = self._run_burst(
+            lambda content: self.connection.send(
+                Message.CLIENT_BLOCK_LIST_REQUEST, content, timeout=60))
+
+        stream = Stream(self.validator.url)
+        executor = ThreadPoolExecutor()
+        try:
+            threaded_elapsed, threaded_p99 = self._run_burst(
+                lambda content: self.loop.run_in_executor(
+                    executor,
+                    stream.send(
+                        Message.CLIENT_BLOCK_LIST_REQUEST, content).result,
+                    60))
+        finally:
+            executor.shutdown()
+
+        LOGGER.warning(
+            '%s requests answered after %.2fs alongside %s answered after '
+            '%.2fs: asyncio connection %.2fs total, p99 %.3fs; thread per '
+            'request %.2fs total, p99 %.3fs',
+            self.request_count, self.delay, self.waiting_count,
+            self.wait_delay, async_elapsed, async_p99, threaded_elapsed,
+            threaded_p99)
@@ -0,0 +1,110 @@
+# Copyright 2017 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+
+from aiohttp import web
+from aiohttp.test_utils import AioHTTPTestCase
+from aiohttp.test_utils import unittest_run_loop
+
+from sawtooth_rest_api.response_cache import ResponseCache
+
+
+class ResponseCacheTests(AioHTTPTestCase):
+    """Tests the ResponseCache with a handler that answers /{name} with a
+    body of the name repeated ten times, and counts how often it is called.
+    """
+    async def get_application(self, loop):
+        self.cache = ResponseCache(max_size=25)
+        self.calls = 0
+
+        async def handler(request):
+            name = request.match_info['name']
+
+            async def handle():
+                self.calls += 1
+                if name == 'missing':
+                    raise web.HTTPNotFound()
+                return web.Response(text=name * 10)
+
+            return await self.cache.respond(request.path, request, handle)
+
+        app = web.Application(loop=loop)
+        app.router.add_get('/{name}', handler)
+        return app
+
+    async def get_text(self, path, status=200, **headers):
+        response = await self.client.get(path, headers=headers)
+        self.assertEqual(status, response.status)
+        return await response.text()
+
+    @unittest_run_loop
+    async def test_hits_and_stats(self):
+        """Verifies that repeated requests are answered from the cache, and
+        that the stats count the hits and misses.
+        """
+        self.assertEqual('a' * 10, await self.get_text('/a'))
+        self.assertEqual('a' * 10, await self.get_text('/a'))
+        self.assertEqual('a' * 10, await self.get_text('/a'))
+        self.assertEqual(1, self.calls)
+
+        stats = self.cache.get_stats()
+        self.assertEqual(2, stats['hits'])
+        self.assertEqual(1, stats['misses'])
+        self.assertAlmostEqual(2 / 3, stats['hit_rate'])
+        self.assertEqual(1, stats['entries'])
+        self.assertEqual(10, stats['size'])
+
+    @unittest_run_loop
+    async def test_least_recently_used_evicted(self):
+        """Verifies that the least recently used response is evicted once
+        the cache is over its size, and that errors are not cached.
+        """
+        await self.get_text('/a')
+        await self.get_text('/b')
+        await self.get_text('/a')
+        await self.get_text('/c')
+        self.assertEqual(3, self.calls)
+
+        await self.get_text('/a')
+        self.assertEqual(3, self.calls)
+        await self.get_text('/b')
+        self.assertEqual(4, self.calls)
+
+        await self.get_text('/missing', status=404)
+        await self.get_text('/missing', status=404)
+        self.assertEqual(6, self.calls)
+        self.assertEqual(2, self.cache.get_stats()['entries'])
+
+    @unittest_run_loop
+    async def test_if_none_match(self):
+        """Verifies that a request whose If-None-Match includes the ETag of
+        the response is answered with a 304, even on a miss.
+        """
+        first = await self.client.get('/a')
+        etag = first.headers['ETag']
+        self.assertTrue(etag.startswith('"'))
+        self.assertEqual('Accept', first.headers['Vary'])
+
+        not_modified = await self.client.get(
+            '/a', headers={'If-None-Match': etag})
+        self.assertEqual(304, not_modified.status)
+        self.assertEqual('Accept', not_modified.headers['Vary'])
+
+        await self.get_text('/a', 304, **{'If-None-Match': etag})
+        await self.get_text(
+            '/a', 304, **{'If-None-Match': '"other", ' + etag})
+        await self.get_text('/b', 304, **{'If-None-Match': '*'})
+        self.assertEqual(
+            'a' * 10, await self.get_text('/a', **{'If-None-Match': '"x"'}))
+        self.assertEqual(4, self.cache.get_stats()['not_modified'])
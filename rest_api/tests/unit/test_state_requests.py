@@ -250,7 +250,8 @@ class StateListTests(BaseApiTest):
 
         It will receive a Protobuf response with:
             - a head id of 'd'
-            - a paging response with a start of 1, and 4 total resources
+            - a paging response with a start of 1, and 4 total resources,
+              a next_id of 'b', and a previous_id of 'd'
             - one leaf of {'c': b'3'}
 
         It should send a Protobuf request with:
@@ -264,7 +265,7 @@ class StateListTests(BaseApiTest):
             - a data property that is a list of 1 dict
             - and that dict is a leaf that matches the one received
         """
-        paging = Mocks.make_paging_response(1, 4)
+        paging = Mocks.make_paging_response(1, 4, next_id='b', previous_id='d')
         leaves = Mocks.make_leaves(c=b'3')
         self.stream.preset_response(head_id='d', paging=paging, leaves=leaves)
 
@@ -275,8 +276,8 @@ class StateListTests(BaseApiTest):
         self.assert_has_valid_head(response, 'd')
         self.assert_has_valid_link(response, '/state?head=d&min=1&count=1')
         self.assert_has_valid_paging(response, paging,
-                                     '/state?head=d&min=2&count=1',
-                                     '/state?head=d&min=0&count=1')
+                                     '/state?head=d&min=b&count=1',
+                                     '/state?head=d&max=d&count=1')
         self.assert_has_valid_data_list(response, 1)
         self.assert_leaves_match(leaves, response['data'])
 
@@ -308,7 +309,8 @@ class StateListTests(BaseApiTest):
 
         It will receive a Protobuf response with:
             - a head id of 'd'
-            - a paging response with a start of 0, and 4 total resources
+            - a paging response with a start of 0, and 4 total resources,
+              and a next_id of 'b'
             - two leaves of {'d': b'4'}, and {'c': b'3'}
 
         It should send a Protobuf request with:
@@ -322,7 +324,7 @@ class StateListTests(BaseApiTest):
             - a data property that is a list of 2 dicts
             - and those dicts are leaves that match those received
         """
-        paging = Mocks.make_paging_response(0, 4)
+        paging = Mocks.make_paging_response(0, 4, next_id='b')
         leaves = Mocks.make_leaves(d=b'4', c=b'3')
         self.stream.preset_response(head_id='d', paging=paging, leaves=leaves)
 
@@ -333,7 +335,7 @@ class StateListTests(BaseApiTest):
         self.assert_has_valid_head(response, 'd')
         self.assert_has_valid_link(response, '/state?head=d&count=2')
         self.assert_has_valid_paging(response, paging,
-                                     '/state?head=d&min=2&count=2')
+                                     '/state?head=d&min=b&count=2')
         self.assert_has_valid_data_list(response, 2)
         self.assert_leaves_match(leaves, response['data'])
 
@@ -343,7 +345,8 @@ class StateListTests(BaseApiTest):
 
         It will receive a Protobuf response with:
             - a head id of 'd'
-            - a paging response with a start of 2, and 4 total resources
+            - a paging response with a start of 2, and 4 total resources,
+              and a previous_id of 'c'
             - two leaves of {'b': b'2'} and {'a': b'1'}
 
         It should send a Protobuf request with:
@@ -357,7 +360,7 @@ class StateListTests(BaseApiTest):
             - a data property that is a list of 2 dicts
             - and those dicts are leaves that match those received
         """
-        paging = Mocks.make_paging_response(2, 4)
+        paging = Mocks.make_paging_response(2, 4, previous_id='c')
         leaves = Mocks.make_leaves(b=b'2', a=b'1')
         self.stream.preset_response(head_id='d', paging=paging, leaves=leaves)
 
@@ -368,7 +371,7 @@ class StateListTests(BaseApiTest):
         self.assert_has_valid_head(response, 'd')
         self.assert_has_valid_link(response, '/state?head=d&min=2')
         self.assert_has_valid_paging(response, paging,
-                                     previous_link='/state?head=d&min=0&count=2')
+                                     previous_link='/state?head=d&max=c&count=2')
         self.assert_has_valid_data_list(response, 2)
         self.assert_leaves_match(leaves, response['data'])
 
@@ -456,7 +459,8 @@ class StateListTests(BaseApiTest):
 
         It will receive a Protobuf response with:
             - a head id of 'd'
-            - a paging response with a start of 0, and 4 total resources
+            - a paging response with a start of 0, and 4 total resources,
+              and a next_id of 'a'
             - three leaves with the ids {'d': b'4'}, {'c': b'3'} and {'b': b'2'}
 
         It should send a Protobuf request with:
@@ -470,7 +474,7 @@ class StateListTests(BaseApiTest):
             - a data property that is a list of 2 dicts
             - and those dicts are leaves that match those received
         """
-        paging = Mocks.make_paging_response(0, 4)
+        paging = Mocks.make_paging_response(0, 4, next_id='a')
         leaves = Mocks.make_leaves(d=b'4', c=b'3', b=b'2')
         self.stream.preset_response(head_id='d', paging=paging, leaves=leaves)
 
@@ -481,10 +485,40 @@ class StateListTests(BaseApiTest):
         self.assert_has_valid_head(response, 'd')
         self.assert_has_valid_link(response, '/state?head=d&max=2&count=7')
         self.assert_has_valid_paging(response, paging,
-                                     '/state?head=d&min=3&count=7')
+                                     '/state?head=d&min=a&count=7')
         self.assert_has_valid_data_list(response, 3)
         self.assert_leaves_match(leaves, response['data'])
 
+    @unittest_run_loop
+    async def test_state_list_paginated_without_total(self):
+        """Verifies GET /state works when the validator does not count leaves.
+
+        It will receive a Protobuf response with:
+            - a head id of 'd'
+            - a paging response with a start of 0, no total resources,
+              and a next_id of 'c'
+            - two leaves of {'a': b'1'}, and {'b': b'2'}
+
+        It should send back a JSON response with:
+            - a response status of 200
+            - paging with a start_index of 0, no total_count, and a next link
+            - a data property that is a list of 2 dicts
+        """
+        paging = Mocks.make_paging_response(0, 0, next_id='c')
+        leaves = Mocks.make_leaves(a=b'1', b=b'2')
+        self.stream.preset_response(head_id='d', paging=paging, leaves=leaves)
+
+        response = await self.get_json_assert_200('/state?count=2')
+
+        self.assert_has_valid_head(response, 'd')
+        self.assertNotIn('total_count', response['paging'])
+        self.assertEqual(0, response['paging']['start_index'])
+        self.assert_valid_url(
+            response['paging']['next'], '/state?head=d&min=c&count=2')
+        self.assertNotIn('previous', response['paging'])
+        self.assert_has_valid_data_list(response, 2)
+        self.assert_leaves_match(leaves, response['data'])
+
 
 class StateGetTests(BaseApiTest):
 
@@ -16,7 +16,9 @@
 # ------------------------------------------------------------------------------
 
 import argparse
+from collections import namedtuple
 import hashlib
+import multiprocessing
 import os
 import logging
 import random
@@ -25,9 +27,12 @@ import time
 import cbor
 import sawtooth_signing as signing
 
+from sawtooth_sdk.client.batch_file import write_batch
 import sawtooth_sdk.protobuf.batch_pb2 as batch_pb2
 import sawtooth_sdk.protobuf.transaction_pb2 as transaction_pb2
 
+from sawtooth_intkey.client_cli.exceptions import IntKeyCliException
+
 
 LOGGER = logging.getLogger(__name__)
 
@@ -60,7 +65,7 @@ class IntKeyPayload(object):
 
 
 def create_intkey_transaction(verb, name, value, deps,
-                              private_key, public_key):
+                              private_key, public_key, nonce=None):
     """Creates a signed intkey transaction.
 
     Args:
@@ -71,9 +76,12 @@ def create_intkey_transaction(verb, name, value, deps,
         deps ([str]): a list of transaction header_signatures which are
             required dependencies which must be processed prior to
             processing this transaction
-        private_key (str): the private key used to sign the transaction
+        private_key (str): the private key used to sign the transaction,
+            serialized or as returned by signing.decode_privkey()
         public_key (str): the public key associated with the private key -
             the public key is included in the transaction as signer_pubkey
+        nonce (str): the nonce of the transaction, which defaults to the
+            current time
 
     Returns:
         transaction (transaction_pb2.Transaction): the signed intkey
@@ -98,7 +106,7 @@ def create_intkey_transaction(verb, name, value, deps,
         payload_encoding="application/cbor",
         payload_sha512=payload.sha512(),
         batcher_pubkey=public_key,
-        nonce=time.time().hex().encode())
+        nonce=time.time().hex().encode() if nonce is None else nonce)
 
     header_bytes = header.SerializeToString()
 
@@ -146,11 +154,11 @@ def generate_word_list(count):
 def do_populate(args, batches, words):
     private_key = signing.generate_privkey()
     public_key = signing.generate_pubkey(private_key)
+    private_key = signing.decode_privkey(private_key)
 
     total_txn_count = 0
     txns = []
-    for i in range(0, len(words)):
-        name = list(words)[i]
+    for name in list(words):
         txn = create_intkey_transaction(
             verb='set',
             name=name,
@@ -172,62 +180,157 @@ def do_populate(args, batches, words):
     batches.append(batch)
 
 
-def do_generate(args, batches, words):
-    private_key = signing.generate_privkey()
-    public_key = signing.generate_pubkey(private_key)
+_GeneratorSettings = namedtuple(
+    '_GeneratorSettings',
+    ['seed', 'words', 'hot_names', 'cold_names', 'conflict_ratio',
+     'batch_max_size', 'private_key', 'public_key'])
 
-    start = time.time()
-    total_txn_count = 0
-    for i in range(0, args.count):
+# The number of batches generated by each task given to the workers.  The
+# batches of each task are generated from their own seed, so the output
+# doesn't depend on the number of workers.
+_TASK_SIZE = 50
+
+# The settings of a worker process, set when the process starts
+_settings = None
+
+
+def _init_generator(settings):
+    # pylint: disable=global-statement
+    global _settings
+    # The decoded key can't be sent to the worker processes, so each worker
+    # decodes it once, rather than for every signature.
+    _settings = settings._replace(
+        private_key=signing.decode_privkey(settings.private_key))
+
+
+def _generate_batches(task):
+    """Generates the batches of a task, using the settings of the worker.
+
+    Args:
+        task (tuple): The index of the first batch, and the number of
+            batches to generate
+
+    Returns:
+        list of tuple: the serialized batches, each with its number of
+            transactions
+    """
+    first_index, count = task
+    rng = random.Random('{}:{}'.format(_settings.seed, first_index))
+
+    batches = []
+    for _ in range(count):
         txns = []
-        for _ in range(0, random.randint(1, args.batch_max_size)):
-            name = random.choice(list(words))
-            txn = create_intkey_transaction(
-                verb=random.choice(['inc', 'dec']),
+        for _ in range(rng.randint(1, _settings.batch_max_size)):
+            if _settings.hot_names and \
+                    rng.random() < _settings.conflict_ratio:
+                name = rng.choice(_settings.hot_names)
+            else:
+                name = rng.choice(_settings.cold_names)
+
+            txns.append(create_intkey_transaction(
+                verb=rng.choice(['inc', 'dec']),
                 name=name,
                 value=1,
-                deps=[words[name]],
-                private_key=private_key,
-                public_key=public_key)
-            total_txn_count += 1
-            txns.append(txn)
+                deps=[_settings.words[name]],
+                private_key=_settings.private_key,
+                public_key=_settings.public_key,
+                nonce='{:032x}'.format(rng.getrandbits(128))))
 
         batch = create_batch(
             transactions=txns,
-            private_key=private_key,
-            public_key=public_key)
-
-        batches.append(batch)
+            private_key=_settings.private_key,
+            public_key=_settings.public_key)
+        batches.append((batch.SerializeToString(), len(txns)))
 
-        if i % 100 == 0 and i != 0:
-            stop = time.time()
+    return batches
 
-            txn_count = 0
-            for batch in batches[-100:]:
-                txn_count += len(batch.transactions)
 
-            fmt = 'batches {}, batch/sec: {:.2f}, txns: {}, txns/sec: {:.2f}'
-            print(fmt.format(
-                str(i),
-                100 / (stop - start),
-                str(total_txn_count),
-                txn_count / (stop - start)))
-            start = stop
+def do_generate(args, words, fd):
+    """Generates args.count batches of inc and dec transactions of the words,
+    spreading the signing over args.workers processes, and writes them to a
+    batch file as they are generated.
+    """
+    names = list(words)
+    hot_names = names[:args.hot_keys]
+    cold_names = names[len(hot_names):] or names
 
+    private_key = signing.generate_privkey()
+    settings = _GeneratorSettings(
+        seed=args.seed,
+        words=words,
+        hot_names=hot_names,
+        cold_names=cold_names,
+        conflict_ratio=args.conflict_ratio,
+        batch_max_size=args.batch_max_size,
+        private_key=private_key,
+        public_key=signing.generate_pubkey(private_key))
+
+    tasks = [
+        (first_index, min(_TASK_SIZE, args.count - first_index))
+        for first_index in range(0, args.count, _TASK_SIZE)
+    ]
+
+    pool = None
+    if args.workers > 1:
+        pool = multiprocessing.Pool(
+            processes=args.workers,
+            initializer=_init_generator,
+            initargs=(settings,))
+        results = pool.imap(_generate_batches, tasks)
+    else:
+        _init_generator(settings)
+        results = map(_generate_batches, tasks)
 
-def write_batch_file(args, batches):
-    batch_list = batch_pb2.BatchList(batches=batches)
-    print("Writing to {}...".format(args.output))
-    with open(args.output, "wb") as fd:
-        fd.write(batch_list.SerializeToString())
+    start = time.time()
+    batch_count = 0
+    total_txn_count = 0
+    txn_count = 0
+    try:
+        for serialized_batches in results:
+            for serialized_batch, batch_txn_count in serialized_batches:
+                write_batch(fd, serialized_batch)
+                txn_count += batch_txn_count
+                batch_count += 1
+
+                if batch_count % 100 == 0:
+                    stop = time.time()
+                    total_txn_count += txn_count
+
+                    fmt = 'batches {}, batch/sec: {:.2f}, txns: {}, ' \
+                        'txns/sec: {:.2f}'
+                    print(fmt.format(
+                        str(batch_count),
+                        100 / (stop - start),
+                        str(total_txn_count),
+                        txn_count / (stop - start)))
+                    start = stop
+                    txn_count = 0
+    finally:
+        if pool is not None:
+            pool.terminate()
 
 
 def do_create_batch(args):
+    if args.seed is None:
+        args.seed = random.SystemRandom().randrange(2 ** 32)
+    print('Seed: {}'.format(args.seed))
+    random.seed(args.seed)
+
+    if not 0 <= args.conflict_ratio <= 1:
+        raise IntKeyCliException('The conflict ratio must be from 0 to 1')
+    if args.conflict_ratio > 0 and args.hot_keys < 1:
+        raise IntKeyCliException(
+            'A conflict ratio needs at least one hot key')
+
     batches = []
     words = generate_word_list(args.pool_size)
     do_populate(args, batches, words)
-    do_generate(args, batches, words)
-    write_batch_file(args, batches)
+
+    print("Writing to {}...".format(args.output))
+    with open(args.output, "wb") as fd:
+        for batch in batches:
+            write_batch(fd, batch.SerializeToString())
+        do_generate(args, words, fd)
 
 
 def add_create_batch_parser(subparsers, parent_parser):
@@ -272,3 +375,31 @@ def add_create_batch_parser(subparsers, parent_parser):
         help='size of the word pool',
         default=100,
         metavar='')
+
+    parser.add_argument(
+        '-w', '--workers',
+        type=int,
+        help='number of processes that sign the transactions',
+        default=multiprocessing.cpu_count(),
+        metavar='')
+
+    parser.add_argument(
+        '--seed',
+        type=int,
+        help='seed for the random choices, so that the same workload is '
+        'generated again',
+        metavar='')
+
+    parser.add_argument(
+        '--hot-keys',
+        type=int,
+        help='number of words in the word pool that are hot keys',
+        default=0,
+        metavar='')
+
+    parser.add_argument(
+        '--conflict-ratio',
+        type=float,
+        help='fraction of the transactions that update a hot key',
+        default=0.0,
+        metavar='')
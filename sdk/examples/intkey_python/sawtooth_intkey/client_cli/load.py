@@ -14,58 +14,234 @@
 # ------------------------------------------------------------------------------
 
 import argparse
+from collections import deque
+from collections import OrderedDict
 import logging
 import time
 
+from sawtooth_sdk.client.batch_file import read_batches
 from sawtooth_sdk.client.exceptions import ValidatorConnectionError
 from sawtooth_sdk.client.stream import Stream
 
 import sawtooth_sdk.protobuf.batch_pb2 as batch_pb2
+from sawtooth_sdk.protobuf.client_pb2 import ClientBatchStatusRequest
+from sawtooth_sdk.protobuf.client_pb2 import ClientBatchStatusResponse
 from sawtooth_sdk.protobuf.validator_pb2 import Message
 
+from sawtooth_intkey.client_cli.exceptions import IntKeyCliException
+
 
 LOGGER = logging.getLogger(__file__)
 
+# The most batch ids whose status is asked for in one request
+_STATUS_REQUEST_SIZE = 500
+
 
-def _split_batch_list(batch_list):
+def _split_batch_list(serialized_batches, batch_size_limit):
     new_list = []
-    for batch in batch_list.batches:
+    for serialized_batch in serialized_batches:
+        batch = batch_pb2.Batch()
+        batch.ParseFromString(serialized_batch)
         new_list.append(batch)
-        if len(new_list) == 100:
+        if len(new_list) == batch_size_limit:
             yield batch_pb2.BatchList(batches=new_list)
             new_list = []
     if len(new_list) > 0:
         yield batch_pb2.BatchList(batches=new_list)
 
 
-def do_load(args):
-    with open(args.filename, mode='rb') as fd:
-        batches = batch_pb2.BatchList()
-        batches.ParseFromString(fd.read())
+def _percentiles(latencies, percents=(50, 95, 99)):
+    """Returns the nearest-rank percentiles of a list of latencies.
+    """
+    ordered = sorted(latencies)
+    return [
+        ordered[min(len(ordered) - 1, len(ordered) * percent // 100)]
+        for percent in percents
+    ]
 
-    stream = Stream(args.url)
-    futures = []
-    start = time.time()
 
-    for batch_list in _split_batch_list(batches):
+def _print_latencies(name, latencies):
+    if latencies:
+        print('{} latency (sec): p50: {:.4f}  p95: {:.4f}  p99: {:.4f}'
+              .format(name, *_percentiles(latencies)))
+
+
+class _BatchLoader(object):
+    """Submits lists of batches, spread round-robin over one or more
+    validators, keeping up to a window of submissions in flight to each.
+    When asked to, it also records the time from the submission of each
+    batch until it is seen to be committed.
+    """
+
+    def __init__(self, urls, window, track_commits):
+        self._targets = [(Stream(url), deque()) for url in urls]
+        self._window = window
+        self._next_target = 0
+        self._track_commits = track_commits
+        self._pending = OrderedDict()
+        self._status_requests = None
+        self.submit_latencies = []
+        self.commit_latencies = []
+        self.statuses = {}
+
+    @property
+    def pending_count(self):
+        return len(self._pending)
+
+    @property
+    def pending_ids(self):
+        return list(self._pending)
+
+    def submit(self, batch_list):
+        stream, in_flight = self._targets[self._next_target]
+        self._next_target = (self._next_target + 1) % len(self._targets)
+
+        # Wait for the oldest submission to this validator once its window
+        # is full
+        while len(in_flight) >= self._window:
+            self._complete(*in_flight.popleft())
+        self._complete_done(in_flight)
+
+        sent = time.time()
+        if self._track_commits:
+            for batch in batch_list.batches:
+                self._pending[batch.header_signature] = (sent, stream)
+
         future = stream.send(
             message_type=Message.CLIENT_BATCH_SUBMIT_REQUEST,
             content=batch_list.SerializeToString())
-        futures.append(future)
+        in_flight.append((future, sent))
+
+        self.check_statuses()
+
+    def finish(self):
+        for _, in_flight in self._targets:
+            while in_flight:
+                self._complete(*in_flight.popleft())
+
+    def check_statuses(self, wait=False):
+        """Asks for the statuses of the batches submitted longest ago,
+        without waiting for the answers unless wait is True.  The status of
+        each batch is asked of the validator it was submitted to, as the
+        others may not have seen it yet.  Batches that are not yet committed
+        are asked for again after the others.
+        """
+        if self._status_requests is None:
+            if not self._pending:
+                return
 
-    for future in futures:
+            ids_by_stream = OrderedDict()
+            batch_count = 0
+            for batch_id, (_, stream) in self._pending.items():
+                ids_by_stream.setdefault(stream, []).append(batch_id)
+                batch_count += 1
+                if batch_count == _STATUS_REQUEST_SIZE:
+                    break
+
+            self._status_requests = [
+                (stream.send(
+                    message_type=Message.CLIENT_BATCH_STATUS_REQUEST,
+                    content=ClientBatchStatusRequest(
+                        batch_ids=batch_ids).SerializeToString()),
+                 batch_ids)
+                for stream, batch_ids in ids_by_stream.items()
+            ]
+
+        if not wait and not all(
+                future.done() for future, _ in self._status_requests):
+            return
+
+        status_requests = self._status_requests
+        self._status_requests = None
+        for future, batch_ids in status_requests:
+            self._record_statuses(future.result(), batch_ids)
+
+    def _record_statuses(self, result, batch_ids):
+        checked = time.time()
+        try:
+            response = ClientBatchStatusResponse()
+            response.ParseFromString(result.content)
+        except ValidatorConnectionError as vce:
+            LOGGER.warning('the status future resolved to %s', vce)
+            return
+
+        for batch_id in batch_ids:
+            status = response.batch_statuses.get(batch_id)
+            if status is not None:
+                self.statuses[batch_id] = \
+                    ClientBatchStatusResponse.BatchStatus.Name(status)
+
+            if status == ClientBatchStatusResponse.COMMITTED:
+                sent, _ = self._pending.pop(batch_id)
+                self.commit_latencies.append(checked - sent)
+            else:
+                self._pending.move_to_end(batch_id)
+
+    def close(self):
+        for stream, _ in self._targets:
+            stream.close()
+
+    def _complete_done(self, in_flight):
+        while in_flight and in_flight[0][0].done():
+            self._complete(*in_flight.popleft())
+
+    def _complete(self, future, sent):
         result = future.result()
+        self.submit_latencies.append(time.time() - sent)
         try:
             assert result.message_type == Message.CLIENT_BATCH_SUBMIT_RESPONSE
         except ValidatorConnectionError as vce:
             LOGGER.warning("the future resolved to %s", vce)
 
-    stop = time.time()
-    print("batches: {} batch/sec: {}".format(
-        str(len(batches.batches)),
-        len(batches.batches) / (stop - start)))
 
-    stream.close()
+def do_load(args):
+    urls = [url.strip() for url in args.url.split(',') if url.strip()]
+    if not urls:
+        raise IntKeyCliException('At least one validator URL is required')
+
+    if args.window < 1:
+        raise IntKeyCliException('The submission window must be at least 1')
+
+    track_commits = args.wait is not None and args.wait > 0
+    loader = _BatchLoader(urls, args.window, track_commits)
+    batch_count = 0
+    start = time.time()
+
+    try:
+        with open(args.filename, mode='rb') as fd:
+            for batch_list in _split_batch_list(read_batches(fd),
+                                                args.batch_size_limit):
+                loader.submit(batch_list)
+                batch_count += len(batch_list.batches)
+        loader.finish()
+
+        stop = time.time()
+        print("batches: {} batch/sec: {}".format(
+            str(batch_count),
+            batch_count / (stop - start)))
+        _print_latencies('submit', loader.submit_latencies)
+
+        if track_commits:
+            while loader.pending_count > 0 and \
+                    time.time() - stop < args.wait:
+                loader.check_statuses(wait=True)
+                if loader.pending_count > 0:
+                    time.sleep(0.2)
+
+            if loader.pending_count > 0:
+                print('Wait timed out! {} batches have not yet been '
+                      'committed...'.format(loader.pending_count))
+                for batch_id in loader.pending_ids:
+                    print('{:128.128}  {:8.8}'.format(
+                        batch_id, loader.statuses.get(batch_id, 'UNKNOWN')))
+            else:
+                print('committed batch/sec: {}'.format(
+                    batch_count / (time.time() - start)))
+                _print_latencies('commit', loader.commit_latencies)
+    except (IOError, ValueError) as e:
+        raise IntKeyCliException(e)
+    finally:
+        loader.close()
 
 
 def add_load_parser(subparsers, parent_parser):
@@ -83,5 +259,24 @@ def add_load_parser(subparsers, parent_parser):
     parser.add_argument(
         '-U', '--url',
         type=str,
-        help='connection URL for validator',
+        help='connection URL for validator, or comma separated URLs to '
+        'spread the batches over several validators',
         default='tcp://localhost:40000')
+
+    parser.add_argument(
+        '--batch-size-limit',
+        type=int,
+        help='batches are split for processing if they exceed this size',
+        default=100)
+
+    parser.add_argument(
+        '--window',
+        type=int,
+        help='the number of submissions in flight to each validator',
+        default=4)
+
+    parser.add_argument(
+        '--wait',
+        type=int,
+        help='wait up to this many seconds for the batches to commit, and '
+        'report the commit rate and latency')
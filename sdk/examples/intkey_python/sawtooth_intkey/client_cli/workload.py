@@ -37,20 +37,17 @@ IntKeyState = namedtuple('IntKeyState', ['name', 'stream', 'value'])
 
 class IntKeyWorkload(Workload):
     """
-    This workload is for the Sawtooth Integer Key transaction family.  In
-    order to guarantee that batches of transactions are submitted at a
-    relatively constant rate, when the transaction callbacks occur the
-    following actions occur:
+    This workload is for the Sawtooth Integer Key transaction family.  The
+    workload generator keeps up to its concurrency of batches pending, and
+    when the transaction callbacks occur the following actions occur:
 
     1.  If there are no pending batches (on_all_batches_committed),
         a new key is created.
     2.  If a batch is committed, the corresponding key is > 1000000
         either an increment is made (if < 10000000) or a new
         key is created (if >= 10000000).
-    3.  If a batch's status has been checked and it has not been
-        committed, create a key (to get a new batch) and let
-        the simulator know that the old transaction should be put back in
-        the queue to be checked again if it is pending.
+    3.  If fewer batches than the concurrency are pending
+        (on_batch_not_yet_committed), a new key is created.
     """
     def __init__(self, delegate, args):
         super(IntKeyWorkload, self).__init__(delegate, args)
@@ -180,8 +177,12 @@ def add_workload_parser(subparsers, parent_parser):
 
     parser.add_argument('--rate',
                         type=int,
-                        help='Batch rate in batches per second. '
-                             'Should be greater then 0.',
+                        help='maximum rate, in batches per second, at which '
+                             'new batches are started; 0 for no limit.',
+                        default=10)
+    parser.add_argument('-c', '--concurrency',
+                        type=int,
+                        help='number of batches to keep pending at once.',
                         default=10)
     parser.add_argument('-d', '--display-frequency',
                         type=int,
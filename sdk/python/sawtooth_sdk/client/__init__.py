@@ -15,6 +15,7 @@
 
 
 __all__ = [
+    'batch_file',
     'future',
     'stream'
 ]
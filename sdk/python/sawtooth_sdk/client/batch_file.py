@@ -0,0 +1,89 @@
+# Copyright 2017 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+
+"""Batch files hold a serialized BatchList.  A BatchList is encoded as a
+sequence of length-delimited batches, so batch files are written and read
+one batch at a time, and a file of several BatchLists written one after
+another is read as a single list of batches.
+
+Batches are written and read in their serialized form, so that callers can
+parse them with whichever generated Batch class they use.
+"""
+
+
+# The key of the batches field of a BatchList, which is field 1 with a
+# length-delimited wire type
+_BATCHES_KEY = b'\x0a'
+
+
+def _encode_varint(value):
+    encoded = bytearray()
+    while value > 0x7f:
+        encoded.append((value & 0x7f) | 0x80)
+        value >>= 7
+    encoded.append(value)
+    return bytes(encoded)
+
+
+def _read_varint(fd):
+    result = 0
+    shift = 0
+    while True:
+        byte = fd.read(1)
+        if not byte:
+            raise ValueError('Invalid batch file: truncated batch length')
+        result |= (byte[0] & 0x7f) << shift
+        if not byte[0] & 0x80:
+            return result
+        shift += 7
+
+
+def write_batch(fd, batch):
+    """Appends a batch to a batch file.
+
+    Args:
+        fd (file): The batch file, opened in binary mode
+        batch (bytes): The serialized batch
+    """
+    fd.write(_BATCHES_KEY + _encode_varint(len(batch)) + batch)
+
+
+def read_batches(fd):
+    """Reads the batches of a batch file one at a time, so that files of any
+    size can be read without holding them in memory.
+
+    Args:
+        fd (file): The batch file, opened in binary mode
+
+    Yields:
+        bytes: the next serialized batch in the file
+
+    Raises:
+        ValueError: if the file is not a valid batch file
+    """
+    while True:
+        key = fd.read(1)
+        if not key:
+            return
+        if key != _BATCHES_KEY:
+            raise ValueError(
+                'Invalid batch file: unexpected field key {}'.format(key))
+
+        length = _read_varint(fd)
+        data = fd.read(length)
+        if len(data) < length:
+            raise ValueError('Invalid batch file: truncated batch')
+
+        yield data
@@ -102,9 +102,9 @@ class Workload(object, metaclass=abc.ABCMeta):
     def on_all_batches_committed(self):
         """
         In the normal course of running the workload generator loop, this is
-        called by the generator to let the workload know that all pending
-        transactions have been completed.  This is a hint to create a new
-        batch.
+        called by the generator to let the workload know that no batches are
+        pending, either because they have all been committed or because they
+        have been dropped.  This is a hint to create a new batch.
 
         Returns:
             Nothing
@@ -131,8 +131,9 @@ class Workload(object, metaclass=abc.ABCMeta):
     def on_batch_not_yet_committed(self):
         """
         In the normal course of running the workload generator, this is called
-        by the generator to let the workload know that a previously-
-        pending batch's status was checked and it is not committed.
+        by the generator to let the workload know that fewer batches than its
+        concurrency are pending, because pending batches have not yet been
+        committed or have been dropped.  This is a hint to create a new batch.
 
 
         Returns:
@@ -12,13 +12,16 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 # ------------------------------------------------------------------------------
+
 import asyncio
 import logging
+import math
 import time
 
 from threading import Lock
 from collections import deque
 from collections import namedtuple
+from collections import OrderedDict
 from concurrent.futures import ThreadPoolExecutor
 
 from sawtooth_sdk.client.future import FutureTimeoutError
@@ -28,36 +31,96 @@ from sawtooth_sdk.protobuf.client_pb2 import ClientBatchStatusRequest
 from sawtooth_sdk.protobuf.client_pb2 import ClientBatchStatusResponse
 from sawtooth_sdk.protobuf.validator_pb2 import Message
 
-PendingBatch = namedtuple('PendingBatch', ['id', 'stream'])
+PendingBatch = namedtuple('PendingBatch', ['id', 'stream', 'submitted'])
 
 LOGGER = logging.getLogger(__name__)
 LOGGER.setLevel(logging.DEBUG)
 
+# The most batch ids whose status is asked for in one request
+STATUS_REQUEST_SIZE = 1000
+
+# How often, in seconds, the statuses of the pending batches are checked
+CHECK_INTERVAL = 0.1
+
+# How long to keep checking on a batch that the validator doesn't know of,
+# as it may not have received the batch yet
+UNKNOWN_BATCH_TIMEOUT = 30
+
+
+class LatencyHistogram(object):
+    """
+    Counts latencies in buckets whose bounds grow by a fixed ratio, so that
+    percentiles are estimated to within that ratio in constant memory.
+    """
+    def __init__(self, minimum=0.001, ratio=1.05):
+        self._minimum = minimum
+        self._log_ratio = math.log(ratio)
+        self._ratio = ratio
+        self._buckets = {}
+        self.count = 0
+
+    def add(self, latency):
+        index = 0
+        if latency > self._minimum:
+            index = int(math.ceil(
+                math.log(latency / self._minimum) / self._log_ratio))
+        self._buckets[index] = self._buckets.get(index, 0) + 1
+        self.count += 1
+
+    def percentile(self, percent):
+        """
+        Returns the upper bound of the bucket holding the latency at the
+        percentile, or None if no latencies have been added.
+        """
+        if self.count == 0:
+            return None
+
+        rank = max(1, int(math.ceil(self.count * percent / 100.0)))
+        seen = 0
+        for index in sorted(self._buckets):
+            seen += self._buckets[index]
+            if seen >= rank:
+                return self._minimum * self._ratio ** index
+
+    def clear(self):
+        self._buckets = {}
+        self.count = 0
+
 
 class WorkloadGenerator(object):
     """
     This is the object that manages the workload sent to the validators and
     keeps track of submitted and committed batches. To run, it must first have
     a Workload set, as this is where the batches are created.
+
+    The generator runs a closed loop: it keeps up to a number of batches
+    outstanding, asking the workload for a new batch whenever fewer are
+    pending, and checks on the pending batches in bulk, with one request per
+    validator.
     """
     def __init__(self, args):
         self._workload = None
         self._lock = Lock()
         # needs to be locked
-        self._pending_batches = deque()
+        self._pending_batches = OrderedDict()
         self._validators = args.urls.split(",")
-        self._number_of_outstanding_requests = 0
         self._submitted_batches_sample = 0
         self._committed_batches_sample = 0
 
         self._time_since_last_check = 0
         self._submitted_batch_samples = deque()
         self._committed_batch_samples = deque()
+        self._sample_latencies = LatencyHistogram()
+        self._latencies = LatencyHistogram()
+
+        self._concurrency = int(args.concurrency)
+        self._rate = int(args.rate)
+        self._start_allowance = 0
+        self._time_since_last_start = 0
 
-        self._rate = 1.0 / int(args.rate)
         self._display_frequency = args.display_frequency
         self.loop = asyncio.get_event_loop()
-        self.thread_pool = ThreadPoolExecutor(10)
+        self.thread_pool = ThreadPoolExecutor(1)
         asyncio.ensure_future(self._simulator_loop(), loop=self.loop)
 
     def set_workload(self, workload):
@@ -69,113 +132,176 @@ class WorkloadGenerator(object):
         if self._workload is None:
             raise WorkloadConfigurationError()
         self._time_since_last_check = time.time()
+        self._time_since_last_start = time.time()
         self.loop.run_forever()
 
     @asyncio.coroutine
     def _simulator_loop(self):
         try:
             while True:
-                yield from asyncio.sleep(self._rate)
-                with self._lock:
-                    now = time.time()
-                    delta = now - self._time_since_last_check
-                    if delta >= self._display_frequency:
-                        sample =  \
-                            (self._submitted_batches_sample / delta)
-                        self._submitted_batch_samples.append(sample)
-                        LOGGER.warning(
-                            'Transaction submission rate for last sample '
-                            'period is %.2f tps',
-                            sample)
-                        sample =  \
-                            (self._committed_batches_sample / delta)
-                        self._committed_batch_samples.append(sample)
-                        LOGGER.warning(
-                            'Transaction commit rate for last sample period is'
-                            ' %.2f tps',
-                            sample)
-
-                        # We are going to only use at most the last 10 samples
-                        # to calculate the moving average
-                        if len(self._submitted_batch_samples) == 11:
-                            self._submitted_batch_samples.popleft()
-                            self._committed_batch_samples.popleft()
-
-                        LOGGER.warning(
-                            'Transaction submission rate for last %d sample(s)'
-                            ' is %.2f tps',
-                            len(self._submitted_batch_samples),
-                            sum(self._submitted_batch_samples) /
-                            len(self._submitted_batch_samples))
-                        LOGGER.warning(
-                            'Transaction commit rate for last %d sample(s)'
-                            ' is %.2f tps',
-                            len(self._committed_batch_samples),
-                            sum(self._committed_batch_samples) /
-                            len(self._committed_batch_samples))
-
-                        self._submitted_batches_sample = 0
-                        self._committed_batches_sample = 0
-                        self._time_since_last_check = now
-
-                    self._number_of_outstanding_requests += 1
-                    # If there are pending batchess, then pull off the first
-                    # one.
-                    batch = \
-                        self._pending_batches.popleft() \
-                        if len(self._pending_batches) > 0 else None
-
-                    self.loop.run_in_executor(
-                        self.thread_pool, self._check_on_batch, batch)
+                yield from asyncio.sleep(CHECK_INTERVAL)
+                self._display_rates()
+
+                # The statuses are checked in a thread, as the requests are
+                # blocking, and the workload's callbacks submit new batches
+                yield from self.loop.run_in_executor(
+                    self.thread_pool, self._check_on_batches)
+                self._start_batches()
 
         except KeyboardInterrupt:
             self._workload.on_will_stop()
             self.loop.stop()
 
-    def _check_on_batch(self, batch):
-        """ If the batch is not None, then we will check its status and
-            perform the appropriate callback into the workload generator.
-            This function is run in a separate thread.
+    def _display_rates(self):
+        with self._lock:
+            now = time.time()
+            delta = now - self._time_since_last_check
+            if delta < self._display_frequency:
+                return
+
+            sample = self._submitted_batches_sample / delta
+            self._submitted_batch_samples.append(sample)
+            LOGGER.warning(
+                'Transaction submission rate for last sample period is '
+                '%.2f tps',
+                sample)
+            sample = self._committed_batches_sample / delta
+            self._committed_batch_samples.append(sample)
+            LOGGER.warning(
+                'Transaction commit rate for last sample period is %.2f tps',
+                sample)
+
+            # We are going to only use at most the last 10 samples to
+            # calculate the moving average
+            if len(self._submitted_batch_samples) == 11:
+                self._submitted_batch_samples.popleft()
+                self._committed_batch_samples.popleft()
+
+            LOGGER.warning(
+                'Transaction submission rate for last %d sample(s) is '
+                '%.2f tps',
+                len(self._submitted_batch_samples),
+                sum(self._submitted_batch_samples) /
+                len(self._submitted_batch_samples))
+            LOGGER.warning(
+                'Transaction commit rate for last %d sample(s) is %.2f tps',
+                len(self._committed_batch_samples),
+                sum(self._committed_batch_samples) /
+                len(self._committed_batch_samples))
+
+            for name, latencies in [
+                    ('last sample period', self._sample_latencies),
+                    ('all samples', self._latencies)]:
+                if latencies.count > 0:
+                    LOGGER.warning(
+                        'Commit latency for %s is p50: %.3f s, p95: %.3f s, '
+                        'p99: %.3f s',
+                        name,
+                        latencies.percentile(50),
+                        latencies.percentile(95),
+                        latencies.percentile(99))
+
+            self._submitted_batches_sample = 0
+            self._committed_batches_sample = 0
+            self._sample_latencies.clear()
+            self._time_since_last_check = now
 
-            Args:
-                batch: PendingBatch named tuple that contains the batch id and
-                       the stream the batch was submitted to.
+    def _start_batches(self):
         """
-        if batch is not None:
-            status = self._get_batch_status(batch.id, batch.stream)
-            if status == "COMMITTED":
-                committed = True
-            else:
-                committed = False
-            if committed:
-                with self._lock:
-                    self._committed_batches_sample += 1
-                self._workload.on_batch_committed(batch.id)
+        Asks the workload for new batches until the concurrency is reached,
+        starting no more than the rate of batches per second.  Batches the
+        workload creates on its own, such as when a batch is committed, count
+        against the rate as well.
+        """
+        with self._lock:
+            now = time.time()
+            wanted = self._concurrency - len(self._pending_batches)
+            if self._rate > 0:
+                self._start_allowance = min(
+                    self._concurrency,
+                    self._start_allowance +
+                    (now - self._time_since_last_start) * self._rate)
+                wanted = min(wanted, int(self._start_allowance))
+            self._time_since_last_start = now
 
+        for _ in range(wanted):
+            with self._lock:
+                outstanding = len(self._pending_batches)
+
+            if outstanding == 0:
+                self._workload.on_all_batches_committed()
             else:
-                if status == "PENDING":
-                    self._workload.on_batch_not_yet_committed()
+                self._workload.on_batch_not_yet_committed()
+
+            with self._lock:
+                if len(self._pending_batches) == outstanding:
+                    # The workload didn't create a batch
+                    break
+
+    def _check_on_batches(self):
+        """ Checks the statuses of the pending batches, with one request to
+            each validator that batches were submitted to, and performs the
+            appropriate callbacks into the workload.  This function is run in
+            a separate thread.
+        """
+        with self._lock:
+            batches_by_stream = OrderedDict()
+            for batch in self._pending_batches.values():
+                batches = batches_by_stream.setdefault(batch.stream, [])
+                if len(batches) < STATUS_REQUEST_SIZE:
+                    batches.append(batch)
+
+        # Send all of the requests before waiting for any of them
+        requests = [
+            (stream, batches, self._send_status_request(stream, batches))
+            for stream, batches in batches_by_stream.items()
+        ]
+
+        for stream, batches, future in requests:
+            statuses = self._get_batch_statuses(stream, future)
+            if statuses is None:
+                continue
+
+            checked = time.time()
+            for batch in batches:
+                status = statuses.get(batch.id, 'UNKNOWN')
+                if status == 'COMMITTED':
+                    latency = checked - batch.submitted
                     with self._lock:
-                        self._pending_batches.appendleft(batch)
-                else:
+                        self._pending_batches.pop(batch.id, None)
+                        self._committed_batches_sample += 1
+                        self._sample_latencies.add(latency)
+                        self._latencies.add(latency)
+                    self._workload.on_batch_committed(batch.id)
+
+                elif status == 'INVALID' or (
+                        status == 'UNKNOWN' and
+                        checked - batch.submitted > UNKNOWN_BATCH_TIMEOUT):
                     LOGGER.debug("Batch's status is %s, "
                                  "dropping batch: %s.",
                                  status, batch.id)
-                    self._workload.on_batch_not_yet_committed()
-        else:
-            self._workload.on_all_batches_committed()
+                    with self._lock:
+                        self._pending_batches.pop(batch.id, None)
 
-        with self._lock:
-            self._number_of_outstanding_requests -= 1
+                else:
+                    # Check on the other batches first next time
+                    with self._lock:
+                        if batch.id in self._pending_batches:
+                            self._pending_batches.move_to_end(batch.id)
 
     def _discover_validators(self):
         for validator in self._validators:
             self._workload.on_validator_discovered(validator)
 
-    def _remove_unresponsive_validator(self, validator):
-        if validator in self._validators:
-            self._validators.remove(validator)
-        self._workload.on_validator_removed(validator)
+    def _remove_unresponsive_validator(self, stream):
+        if stream.url in self._validators:
+            self._validators.remove(stream.url)
+        with self._lock:
+            self._pending_batches = OrderedDict(
+                (batch_id, batch)
+                for batch_id, batch in self._pending_batches.items()
+                if batch.stream is not stream)
+        self._workload.on_validator_removed(stream.url)
 
     def on_new_batch(self, batch_id, stream):
         """
@@ -192,31 +318,44 @@ class WorkloadGenerator(object):
         if batch_id is not None:
             with self._lock:
                 self._submitted_batches_sample += 1
-                self._pending_batches.append(
-                    PendingBatch(id=batch_id, stream=stream))
+                if self._rate > 0:
+                    self._start_allowance -= 1
+                self._pending_batches[batch_id] = \
+                    PendingBatch(
+                        id=batch_id, stream=stream, submitted=time.time())
 
-    def _get_batch_status(self, batch_id, stream):
+    @staticmethod
+    def _send_status_request(stream, batches):
         """
-        Sends a ClientBatchStatusRequest to the stream that the batch was
-        submitted to
+        Sends a ClientBatchStatusRequest for a list of batches to the stream
+        that they were submitted to
         """
-        request = ClientBatchStatusRequest(batch_ids=[batch_id])
-        future = stream.send(
+        request = ClientBatchStatusRequest(
+            batch_ids=[batch.id for batch in batches])
+        return stream.send(
             message_type=Message.CLIENT_BATCH_STATUS_REQUEST,
             content=request.SerializeToString())
+
+    def _get_batch_statuses(self, stream, future):
+        """
+        Returns the statuses from the response to a ClientBatchStatusRequest,
+        by batch id, or None if there is no response
+        """
         try:
-            result = future.result(timeout=0.5)
+            result = future.result(timeout=5)
             response = ClientBatchStatusResponse()
             response.ParseFromString(result.content)
-            return ClientBatchStatusResponse.BatchStatus.Name(
-                response.batch_statuses[batch_id])
+            return {
+                batch_id: ClientBatchStatusResponse.BatchStatus.Name(status)
+                for batch_id, status in response.batch_statuses.items()
+            }
 
         except ValidatorConnectionError:
             LOGGER.warning("The validator at %s is no longer connected. "
                            "Removing Validator.", stream.url)
-            self._remove_unresponsive_validator(stream.url)
-            return "UNKNOWN"
+            self._remove_unresponsive_validator(stream)
+            return None
 
         except FutureTimeoutError:
-            LOGGER.debug("The future timed out for %s.", batch_id)
-            return "UNKNOWN"
+            LOGGER.debug("The status request to %s timed out.", stream.url)
+            return None
@@ -0,0 +1,217 @@
+# Copyright 2017 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+
+import argparse
+import asyncio
+import time
+import unittest
+
+from sawtooth_sdk.protobuf.client_pb2 import ClientBatchStatusResponse
+from sawtooth_sdk.workload import workload_generator
+from sawtooth_sdk.workload.sawtooth_workload import Workload
+from sawtooth_sdk.workload.workload_generator import LatencyHistogram
+from sawtooth_sdk.workload.workload_generator import PendingBatch
+from sawtooth_sdk.workload.workload_generator import WorkloadGenerator
+
+
+class MockWorkload(Workload):
+    """Starts a new batch whenever the workload generator asks for one, and
+    records the batches it is told were committed.
+    """
+
+    def __init__(self, delegate, args):
+        super(MockWorkload, self).__init__(delegate, args)
+        self.stream = MockStream({})
+        self.started = 0
+        self.committed = []
+
+    def on_will_start(self):
+        pass
+
+    def on_will_stop(self):
+        pass
+
+    def on_validator_discovered(self, url):
+        pass
+
+    def on_validator_removed(self, url):
+        pass
+
+    def _start_batch(self):
+        self.started += 1
+        self.delegate.on_new_batch(
+            'batch-{}'.format(self.started), self.stream)
+
+    def on_all_batches_committed(self):
+        self._start_batch()
+
+    def on_batch_committed(self, batch_id):
+        self.committed.append(batch_id)
+
+    def on_batch_not_yet_committed(self):
+        self._start_batch()
+
+
+class MockResult(object):
+    def __init__(self, content):
+        self.content = content
+
+
+class MockFuture(object):
+    def __init__(self, content):
+        self._content = content
+
+    def result(self, timeout=None):
+        return MockResult(self._content)
+
+
+class MockStream(object):
+    """Answers status requests with fixed statuses, leaving out the batches
+    it has no status for, and records the requests.
+    """
+
+    def __init__(self, statuses):
+        self.url = 'tcp://validator:40000'
+        self.statuses = statuses
+        self.requests = []
+
+    def send(self, message_type, content):
+        self.requests.append(content)
+        response = ClientBatchStatusResponse(
+            status=ClientBatchStatusResponse.OK,
+            batch_statuses={
+                batch_id: ClientBatchStatusResponse.BatchStatus.Value(status)
+                for batch_id, status in self.statuses.items()
+            })
+        return MockFuture(response.SerializeToString())
+
+
+class TestLatencyHistogram(unittest.TestCase):
+    def test_percentile(self):
+        """Test that the percentiles are estimated to within the ratio of the
+        buckets, and that nothing is estimated once the histogram is
+        cleared.
+        """
+        histogram = LatencyHistogram(minimum=0.001, ratio=1.05)
+        for i in range(1, 1001):
+            histogram.add(i * 0.001)
+        self.assertEqual(1000, histogram.count)
+
+        for percent, latency in [(50, 0.5), (95, 0.95), (99, 0.99)]:
+            estimate = histogram.percentile(percent)
+            self.assertGreaterEqual(estimate, latency)
+            self.assertLessEqual(estimate, latency * 1.05)
+
+        histogram.clear()
+        self.assertEqual(0, histogram.count)
+        self.assertIsNone(histogram.percentile(50))
+
+    def test_percentile_below_minimum(self):
+        """Test that latencies below the minimum are counted in the first
+        bucket.
+        """
+        histogram = LatencyHistogram(minimum=0.001)
+        histogram.add(0.0001)
+        histogram.add(0)
+        self.assertEqual(0.001, histogram.percentile(99))
+
+
+class TestWorkloadGenerator(unittest.TestCase):
+    def setUp(self):
+        asyncio.set_event_loop(asyncio.new_event_loop())
+
+    def tearDown(self):
+        loop = asyncio.get_event_loop()
+        tasks = asyncio.Task.all_tasks(loop)
+        for task in tasks:
+            task.cancel()
+        loop.run_until_complete(
+            asyncio.gather(*tasks, return_exceptions=True))
+        loop.close()
+
+    def _create_generator(self, concurrency=10, rate=0):
+        generator = WorkloadGenerator(argparse.Namespace(
+            urls='tcp://validator:40000',
+            concurrency=concurrency,
+            rate=rate,
+            display_frequency=30))
+        workload = MockWorkload(generator, None)
+        generator.set_workload(workload)
+        return generator, workload
+
+    def test_concurrency_limit(self):
+        """Test that batches are started until the concurrency is reached,
+        and once more are only started as the pending ones are committed.
+        """
+        generator, workload = self._create_generator(concurrency=5)
+
+        generator._start_batches()
+        self.assertEqual(5, workload.started)
+
+        generator._start_batches()
+        self.assertEqual(5, workload.started)
+
+        workload.stream.statuses = {'batch-1': 'COMMITTED',
+                                    'batch-2': 'COMMITTED'}
+        generator._check_on_batches()
+        self.assertEqual(['batch-1', 'batch-2'], workload.committed)
+
+        generator._start_batches()
+        self.assertEqual(7, workload.started)
+
+    def test_rate_limit(self):
+        """Test that no more than the rate of batches are started per second,
+        however far below the concurrency the pending batches are.
+        """
+        generator, workload = self._create_generator(concurrency=100, rate=10)
+
+        generator._time_since_last_start = time.time() - 0.5
+        generator._start_batches()
+        self.assertEqual(5, workload.started)
+
+        generator._start_batches()
+        self.assertEqual(5, workload.started)
+
+    def test_drop_invalid_and_unknown_batches(self):
+        """Test that invalid batches, and batches the validator still does
+        not know of after the timeout, are dropped, and that pending batches
+        and batches that have only just been submitted are kept.
+        """
+        generator, workload = self._create_generator()
+        stream = workload.stream
+        stream.statuses = {
+            'invalid': 'INVALID',
+            'pending': 'PENDING',
+            'unknown-new': 'UNKNOWN',
+            'unknown-old': 'UNKNOWN',
+        }
+
+        now = time.time()
+        old = now - workload_generator.UNKNOWN_BATCH_TIMEOUT - 1
+        for batch_id, submitted in [('invalid', now),
+                                    ('pending', old),
+                                    ('unknown-new', now),
+                                    ('unknown-old', old),
+                                    ('missing-new', now),
+                                    ('missing-old', old)]:
+            generator._pending_batches[batch_id] = PendingBatch(
+                id=batch_id, stream=stream, submitted=submitted)
+
+        generator._check_on_batches()
+
+        self.assertEqual(1, len(stream.requests))
+        self.assertEqual(['pending', 'unknown-new', 'missing-new'],
+                         list(generator._pending_batches))
+        self.assertEqual([], workload.committed)
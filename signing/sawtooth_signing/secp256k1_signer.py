@@ -79,6 +79,17 @@ def _decode_privkey(encoded_privkey, encoding_format='wif'):
     return secp256k1.PrivateKey(priv, ctx=__CTX__)
 
 
+def decode_privkey(privkey):
+    """ Decode a serialized private key once, for signing many messages
+    Args:
+        privkey: a serialized private key string
+    Returns:
+        A private key object, which can be passed to sign() in place of
+        the serialized private key
+    """
+    return _decode_privkey(privkey)
+
+
 def generate_pubkey(privkey):
     """ Generate the public key based on a given private key
     Args:
@@ -125,12 +136,14 @@ def sign(message, privkey):
     """ Signs a message using the specified private key
     Args:
         message: Message string
-        privkey: A serialized private key string
+        privkey: A serialized private key string, or a private key
+            returned by decode_privkey()
 
     Returns:
         A compact signature (64 byte concatenation of R and S)
     """
-    privkey = _decode_privkey(privkey)
+    if not isinstance(privkey, secp256k1.PrivateKey):
+        privkey = _decode_privkey(privkey)
     if isinstance(message, str):
         message = message.encode('utf-8')
     sig = privkey.ecdsa_sign(message)
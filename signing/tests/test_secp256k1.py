@@ -48,6 +48,16 @@ class TestSecp256kSigner(unittest.TestCase):
         pub2 = signer._encode_pubkey(raw_pub, 'hex')
         self.assertTrue(str(pub) == str(pub2))
 
+    def test_sign_with_decoded_privkey(self):
+        priv = signer.generate_privkey()
+        pub = signer.generate_pubkey(priv)
+        decoded = signer.decode_privkey(priv)
+        for i in range(3):
+            msg = 'message {}'.format(i)
+            self.assertTrue(signer.verify(msg, signer.sign(msg, decoded), pub))
+        self.assertEqual(signer.sign('message', decoded),
+                         signer.sign('message', priv))
+
     def test_invalid_signature(self):
         msg = "This is a message"
         priv = signer.generate_privkey()
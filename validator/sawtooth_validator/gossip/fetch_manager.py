@@ -0,0 +1,231 @@
+# Copyright 2017 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+import logging
+import time
+from threading import Condition
+from threading import Thread
+
+LOGGER = logging.getLogger(__name__)
+
+
+class _Fetch(object):
+    """An outstanding request for a single block, batch or transaction id.
+    """
+    def __init__(self, kind, requested_id, candidates):
+        self.kind = kind
+        self.requested_id = requested_id
+        self.candidates = candidates
+        self.connection_id = None
+        self.sent_at = None
+
+
+class FetchManager(Thread):
+    """Fetches missing blocks and batches by asking one peer at a time
+    instead of broadcasting the request to all peers.
+
+    The peer that announced the dependent item is asked first, followed by
+    the remaining peers in order of their observed response latency. A peer
+    that does not respond within the fetch timeout is skipped and the next
+    peer is asked. Once every peer has been tried, the request falls back to
+    a gossip broadcast.
+    """
+    BLOCK = 'block'
+    BATCH = 'batch'
+    TRANSACTION = 'transaction'
+
+    def __init__(self, gossip, fetch_timeout=2, check_frequency=0.5,
+                 latency_weight=0.2):
+        """Constructor for the FetchManager.
+
+        Args:
+            gossip (gossip.Gossip): Used to list peers and to send requests.
+            fetch_timeout (float): The time in seconds to wait for a peer
+                to respond before asking the next one.
+            check_frequency (float): The time in seconds between checks
+                for timed out fetches.
+            latency_weight (float): The weight given to the latest sample
+                in each peer's exponentially weighted response latency.
+        """
+        super().__init__(name='FetchManager')
+        self.daemon = True
+        self._gossip = gossip
+        self._fetch_timeout = fetch_timeout
+        self._check_frequency = check_frequency
+        self._latency_weight = latency_weight
+        self._condition = Condition()
+        self._stopped = False
+
+        self._fetches = {}
+        self._peer_latencies = {}
+        self._peer_timeouts = {}
+
+    def fetch_block(self, block_id, connection_id=None):
+        """Requests the block with block_id, asking connection_id first.
+
+        Args:
+            block_id (str): The id of the missing block.
+            connection_id (str, optional): The peer that announced a block
+                depending on block_id, which most likely has it.
+        """
+        self._fetch(self.BLOCK, block_id, connection_id)
+
+    def fetch_batch(self, batch_id, connection_id=None):
+        """Requests the batch with batch_id, asking connection_id first.
+        """
+        self._fetch(self.BATCH, batch_id, connection_id)
+
+    def fetch_batches_by_transaction_ids(self, transaction_ids,
+                                         connection_id=None):
+        """Requests the batches containing transaction_ids, asking
+        connection_id first.
+        """
+        for transaction_id in transaction_ids:
+            self._fetch(self.TRANSACTION, transaction_id, connection_id)
+
+    def fetched(self, requested_id, connection_id=None):
+        """Marks the fetch for requested_id as complete. If the item was
+        received from the peer it was requested from, the peer's response
+        latency is updated.
+
+        Args:
+            requested_id (str): The id of the received block or batch, or of
+                a transaction in the received batch.
+            connection_id (str, optional): The peer the item came from.
+        """
+        with self._condition:
+            fetch = self._fetches.pop(requested_id, None)
+            if fetch is None or fetch.connection_id is None or \
+                    fetch.connection_id != connection_id:
+                return
+
+            latency = time.time() - fetch.sent_at
+            previous = self._peer_latencies.get(connection_id)
+            if previous is None:
+                self._peer_latencies[connection_id] = latency
+            else:
+                self._peer_latencies[connection_id] = \
+                    (1 - self._latency_weight) * previous + \
+                    self._latency_weight * latency
+            self._peer_timeouts[connection_id] = 0
+
+    def get_peer_latencies(self):
+        """Returns a copy of the exponentially weighted response latency,
+        in seconds, of each peer that has answered a fetch.
+        """
+        with self._condition:
+            return dict(self._peer_latencies)
+
+    def get_peer_timeouts(self):
+        """Returns a copy of the number of consecutive fetches each peer has
+        failed to answer in time.
+        """
+        with self._condition:
+            return dict(self._peer_timeouts)
+
+    def pending_count(self):
+        with self._condition:
+            return len(self._fetches)
+
+    def _fetch(self, kind, requested_id, connection_id):
+        with self._condition:
+            if requested_id in self._fetches:
+                return
+
+            fetch = _Fetch(kind, requested_id,
+                           self._rank_peers(preferred=connection_id))
+            self._fetches[requested_id] = fetch
+            self._send_next(fetch)
+
+    def _rank_peers(self, preferred=None):
+        """Returns the peers ordered by how likely they are to answer
+        quickly. Peers that have not answered a fetch yet are ranked as if
+        they were the fastest, so that they get tried.
+        """
+        peers = sorted(
+            self._gossip.get_peers(),
+            key=lambda peer: (self._peer_timeouts.get(peer, 0),
+                              self._peer_latencies.get(peer, 0)))
+        if preferred is not None and preferred in peers:
+            peers.remove(preferred)
+            peers.insert(0, preferred)
+        return peers
+
+    def _send_next(self, fetch):
+        while fetch.candidates:
+            connection_id = fetch.candidates.pop(0)
+            try:
+                self._send_request(fetch, connection_id)
+            except ValueError:
+                LOGGER.debug("Connection %s is no longer valid, can't "
+                             "fetch %s from it",
+                             connection_id, fetch.requested_id)
+                continue
+            fetch.connection_id = connection_id
+            fetch.sent_at = time.time()
+            return
+
+        # Every peer has been asked without success, fall back to a
+        # broadcast which will be forwarded by peers
+        LOGGER.debug("No peer answered the request for %s %s, "
+                     "broadcasting the request",
+                     fetch.kind, fetch.requested_id)
+        del self._fetches[fetch.requested_id]
+        if fetch.kind == self.BLOCK:
+            self._gossip.broadcast_block_request(fetch.requested_id)
+        elif fetch.kind == self.BATCH:
+            self._gossip.broadcast_batch_by_batch_id_request(
+                fetch.requested_id)
+        else:
+            self._gossip.broadcast_batch_by_transaction_id_request(
+                [fetch.requested_id])
+
+    def _send_request(self, fetch, connection_id):
+        # A targeted request is not forwarded by the peer; if the peer
+        # doesn't have the item, the next peer is asked on timeout.
+        if fetch.kind == self.BLOCK:
+            self._gossip.send_block_request(
+                fetch.requested_id, connection_id, time_to_live=0)
+        elif fetch.kind == self.BATCH:
+            self._gossip.send_batch_by_batch_id_request(
+                fetch.requested_id, connection_id, time_to_live=0)
+        else:
+            self._gossip.send_batch_by_transaction_id_request(
+                [fetch.requested_id], connection_id, time_to_live=0)
+
+    def check_timeouts(self):
+        """Asks the next peer for every fetch whose current peer did not
+        respond within the fetch timeout.
+        """
+        with self._condition:
+            horizon = time.time() - self._fetch_timeout
+            timed_out = [fetch for fetch in self._fetches.values()
+                         if fetch.sent_at is not None and
+                         fetch.sent_at < horizon]
+            for fetch in timed_out:
+                LOGGER.debug("Peer %s did not answer the request for %s %s "
+                             "in time",
+                             fetch.connection_id, fetch.kind,
+                             fetch.requested_id)
+                self._peer_timeouts[fetch.connection_id] = \
+                    self._peer_timeouts.get(fetch.connection_id, 0) + 1
+                self._send_next(fetch)
+
+    def run(self):
+        while not self._stopped:
+            self.check_timeouts()
+            time.sleep(self._check_frequency)
+
+    def stop(self):
+        self._stopped = True
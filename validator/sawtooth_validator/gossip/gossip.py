@@ -16,15 +16,21 @@ import logging
 import copy
 import time
 import random
+import os
+import binascii
 from threading import Thread
 from threading import Condition
 from functools import partial
 
+from sawtooth_validator.journal.timed_cache import TimedCache
+
+from sawtooth_validator.protobuf.block_pb2 import Block
 from sawtooth_validator.protobuf.network_pb2 import GossipMessage
 from sawtooth_validator.protobuf.network_pb2 import GossipBatchByBatchIdRequest
 from sawtooth_validator.protobuf.network_pb2 import \
     GossipBatchByTransactionIdRequest
 from sawtooth_validator.protobuf.network_pb2 import GossipBlockRequest
+from sawtooth_validator.protobuf.network_pb2 import GossipBlockRangeRequest
 from sawtooth_validator.protobuf import validator_pb2
 from sawtooth_validator.protobuf.network_pb2 import PeerRegisterRequest
 from sawtooth_validator.protobuf.network_pb2 import GetPeersRequest
@@ -35,6 +41,10 @@ from sawtooth_validator.exceptions import PeeringException
 LOGGER = logging.getLogger(__name__)
 
 
+def _generate_nonce():
+    return binascii.b2a_hex(os.urandom(16)).decode()
+
+
 class Gossip(object):
     def __init__(self, network,
                  public_uri=None,
@@ -43,7 +53,11 @@ class Gossip(object):
                  initial_peer_endpoints=None,
                  minimum_peer_connectivity=3,
                  maximum_peer_connectivity=10,
-                 topology_check_frequency=1):
+                 topology_check_frequency=1,
+                 request_time_to_live=3,
+                 seen_cache_keep_time=300,
+                 seen_cache_purge_frequency=30,
+                 compact_block_relay=False):
         """Constructor for the Gossip object. Gossip defines the
         overlay network above the lower level networking classes.
 
@@ -78,6 +92,19 @@ class Gossip(object):
                 reaches this threshold.
             topology_check_frequency (int): The time in seconds between
                 topology update checks.
+            request_time_to_live (int): The number of hops a block or
+                batch request may be forwarded by peers which cannot
+                answer it before it is dropped.
+            seen_cache_keep_time (int): The time in seconds to remember
+                the ids of blocks and batches that have been gossiped, so
+                that duplicates arriving from other peers are neither
+                processed nor forwarded again.
+            seen_cache_purge_frequency (int): The time in seconds between
+                purges of expired entries from the seen cache.
+            compact_block_relay (bool): If True, blocks are broadcast with
+                only their header and header signature. Peers rebuild the
+                block from the batches they have already received by gossip
+                and request only the batches they are missing.
         """
         self._peering_mode = peering_mode
         self._condition = Condition()
@@ -90,6 +117,13 @@ class Gossip(object):
         self._minimum_peer_connectivity = minimum_peer_connectivity
         self._maximum_peer_connectivity = maximum_peer_connectivity
         self._topology_check_frequency = topology_check_frequency
+        self._request_time_to_live = request_time_to_live
+        self._compact_block_relay = compact_block_relay
+
+        self._seen_cache = TimedCache(seen_cache_keep_time)
+        self._seen_cache_purge_frequency = seen_cache_purge_frequency
+        self._seen_cache_purge_time = \
+            time.time() + seen_cache_purge_frequency
 
         self._topology = None
         self._peers = {}
@@ -172,7 +206,35 @@ class Gossip(object):
                 LOGGER.debug("Attempt to unregister connection_id %s failed: "
                              "connection_id was not registered")
 
+    def mark_seen(self, content_id):
+        """Records that the block or batch identified by content_id, or the
+        request identified by its nonce, has been gossiped.
+
+        Args:
+            content_id (str): The header signature of the block or batch,
+                or the nonce of a request.
+
+        Returns:
+            bool: True if content_id had already been seen, False otherwise.
+        """
+        with self._condition:
+            if self._seen_cache_purge_time < time.time():
+                self._seen_cache.purge_expired()
+                self._seen_cache_purge_time = \
+                    time.time() + self._seen_cache_purge_frequency
+
+            if content_id in self._seen_cache:
+                return True
+            self._seen_cache[content_id] = True
+            return False
+
     def broadcast_block(self, block, exclude=None):
+        self.mark_seen(block.header_signature)
+        if self._compact_block_relay:
+            # The batch ids are in the header, which is all a peer needs to
+            # rebuild the block from its batch cache.
+            block = Block(header=block.header,
+                          header_signature=block.header_signature)
         gossip_message = GossipMessage(
             content_type="BLOCK",
             content=block.SerializeToString())
@@ -182,17 +244,50 @@ class Gossip(object):
 
     def broadcast_block_request(self, block_id):
         # Need to define node identity to be able to route directly back
-        block_request = GossipBlockRequest(block_id=block_id)
+        block_request = GossipBlockRequest(
+            block_id=block_id,
+            nonce=_generate_nonce(),
+            time_to_live=self._request_time_to_live)
+        self.mark_seen(block_request.nonce)
         self.broadcast(block_request,
                        validator_pb2.Message.GOSSIP_BLOCK_REQUEST)
 
-    def send_block_request(self, block_id, connection_id):
-        block_request = GossipBlockRequest(block_id=block_id)
+    def send_block_request(self, block_id, connection_id,
+                           time_to_live=None):
+        if time_to_live is None:
+            time_to_live = self._request_time_to_live
+        block_request = GossipBlockRequest(
+            block_id=block_id,
+            nonce=_generate_nonce(),
+            time_to_live=time_to_live)
+        self.mark_seen(block_request.nonce)
         self.send(validator_pb2.Message.GOSSIP_BLOCK_REQUEST,
                   block_request.SerializeToString(),
                   connection_id)
 
+    def send_block_range_request(self, block_id, stop_block_num,
+                                 connection_id, max_blocks=500):
+        """Requests the blocks after the block numbered stop_block_num, up
+        to and including block_id, from a single peer.
+
+        Args:
+            block_id (str): The id of the block being caught up to.
+            stop_block_num (int): The number of the newest block that is
+                already known.
+            connection_id (str): The peer to request the blocks from.
+            max_blocks (int): The maximum number of blocks to request.
+        """
+        range_request = GossipBlockRangeRequest(
+            block_id=block_id,
+            stop_block_num=stop_block_num,
+            max_blocks=max_blocks,
+            nonce=_generate_nonce())
+        self.send(validator_pb2.Message.GOSSIP_BLOCK_RANGE_REQUEST,
+                  range_request.SerializeToString(),
+                  connection_id)
+
     def broadcast_batch(self, batch, exclude=None):
+        self.mark_seen(batch.header_signature)
         gossip_message = GossipMessage(
             content_type="BATCH",
             content=batch.SerializeToString())
@@ -203,17 +298,52 @@ class Gossip(object):
     def broadcast_batch_by_transaction_id_request(self, transaction_ids):
         # Need to define node identity to be able to route directly back
         batch_request = GossipBatchByTransactionIdRequest(
-            ids=transaction_ids
+            ids=transaction_ids,
+            nonce=_generate_nonce(),
+            time_to_live=self._request_time_to_live
         )
+        self.mark_seen(batch_request.nonce)
         self.broadcast(
             batch_request,
             validator_pb2.Message.GOSSIP_BATCH_BY_TRANSACTION_ID_REQUEST)
 
+    def send_batch_by_transaction_id_request(self, transaction_ids,
+                                             connection_id,
+                                             time_to_live=None):
+        if time_to_live is None:
+            time_to_live = self._request_time_to_live
+        batch_request = GossipBatchByTransactionIdRequest(
+            ids=transaction_ids,
+            nonce=_generate_nonce(),
+            time_to_live=time_to_live
+        )
+        self.mark_seen(batch_request.nonce)
+        self.send(validator_pb2.Message.GOSSIP_BATCH_BY_TRANSACTION_ID_REQUEST,
+                  batch_request.SerializeToString(),
+                  connection_id)
+
+    def send_batch_by_batch_id_request(self, batch_id, connection_id,
+                                       time_to_live=None):
+        if time_to_live is None:
+            time_to_live = self._request_time_to_live
+        batch_request = GossipBatchByBatchIdRequest(
+            id=batch_id,
+            nonce=_generate_nonce(),
+            time_to_live=time_to_live
+        )
+        self.mark_seen(batch_request.nonce)
+        self.send(validator_pb2.Message.GOSSIP_BATCH_BY_BATCH_ID_REQUEST,
+                  batch_request.SerializeToString(),
+                  connection_id)
+
     def broadcast_batch_by_batch_id_request(self, batch_id):
         # Need to define node identity to be able to route directly back
         batch_request = GossipBatchByBatchIdRequest(
-            id=batch_id
+            id=batch_id,
+            nonce=_generate_nonce(),
+            time_to_live=self._request_time_to_live
         )
+        self.mark_seen(batch_request.nonce)
         self.broadcast(
             batch_request,
             validator_pb2.Message.GOSSIP_BATCH_BY_BATCH_ID_REQUEST)
@@ -22,6 +22,7 @@ from sawtooth_validator.protobuf.batch_pb2 import Batch
 from sawtooth_validator.protobuf.block_pb2 import Block
 from sawtooth_validator.protobuf.network_pb2 import GossipMessage
 from sawtooth_validator.protobuf.network_pb2 import GossipBlockResponse
+from sawtooth_validator.protobuf.network_pb2 import GossipBlockRangeResponse
 from sawtooth_validator.protobuf.network_pb2 import GossipBatchResponse
 from sawtooth_validator.protobuf.network_pb2 import GetPeersRequest
 from sawtooth_validator.protobuf.network_pb2 import GetPeersResponse
@@ -146,6 +147,19 @@ class GossipBlockResponseHandler(Handler):
             message_type=validator_pb2.Message.NETWORK_ACK)
 
 
+class GossipBlockRangeResponseHandler(Handler):
+    def handle(self, connection_id, message_content):
+        ack = NetworkAcknowledgement()
+        ack.status = ack.OK
+        block_range_response_message = GossipBlockRangeResponse()
+        block_range_response_message.ParseFromString(message_content)
+
+        return HandlerResult(
+            HandlerStatus.RETURN_AND_PASS,
+            message_out=ack,
+            message_type=validator_pb2.Message.NETWORK_ACK)
+
+
 class GossipBatchResponseHandler(Handler):
     def handle(self, connection_id, message_content):
         ack = NetworkAcknowledgement()
@@ -172,12 +186,22 @@ class GossipBroadcastHandler(Handler):
         if gossip_message.content_type == "BATCH":
             batch = Batch()
             batch.ParseFromString(gossip_message.content)
+            # If this batch was already gossiped to us, it has been passed to
+            # the completer and forwarded, so drop the duplicate
+            if self._gossip.mark_seen(batch.header_signature):
+                LOGGER.debug("Drop duplicate gossiped batch %s from %s",
+                             batch.header_signature, connection_id)
+                return HandlerResult(status=HandlerStatus.DROP)
             # If we already have this batch, don't forward it
             if not self._completer.get_batch(batch.header_signature):
                 self._gossip.broadcast_batch(batch, exclude)
         elif gossip_message.content_type == "BLOCK":
             block = Block()
             block.ParseFromString(gossip_message.content)
+            if self._gossip.mark_seen(block.header_signature):
+                LOGGER.debug("Drop duplicate gossiped block %s from %s",
+                             block.header_signature, connection_id)
+                return HandlerResult(status=HandlerStatus.DROP)
             # If we already have this block, don't forward it
             if not self._completer.get_block(block.header_signature):
                 self._gossip.broadcast_block(block, exclude)
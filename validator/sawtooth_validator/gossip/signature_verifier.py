@@ -28,6 +28,7 @@ from sawtooth_validator.protobuf.block_pb2 import BlockHeader
 from sawtooth_validator.protobuf.block_pb2 import Block
 from sawtooth_validator.protobuf.network_pb2 import GossipMessage
 from sawtooth_validator.protobuf.network_pb2 import GossipBlockResponse
+from sawtooth_validator.protobuf.network_pb2 import GossipBlockRangeResponse
 from sawtooth_validator.protobuf.network_pb2 import GossipBatchResponse
 from sawtooth_validator.networking.dispatch import HandlerResult
 from sawtooth_validator.networking.dispatch import HandlerStatus
@@ -161,6 +162,24 @@ class GossipBlockResponseSignatureVerifier(Handler):
             return HandlerResult(status=HandlerStatus.DROP)
 
 
+class GossipBlockRangeResponseSignatureVerifier(Handler):
+    def handle(self, connection_id, message_content):
+        block_range_response_message = GossipBlockRangeResponse()
+        block_range_response_message.ParseFromString(message_content)
+
+        for content in block_range_response_message.blocks:
+            block = Block()
+            block.ParseFromString(content)
+            if not validate_block(block):
+                LOGGER.debug("requested block's signature is invalid: %s",
+                             block.header_signature)
+                return HandlerResult(status=HandlerStatus.DROP)
+
+        LOGGER.debug("requested block range passes signature verification "
+                     "%s", block_range_response_message.block_id)
+        return HandlerResult(status=HandlerStatus.PASS)
+
+
 class GossipBatchResponseSignatureVerifier(Handler):
     def handle(self, connection_id, message_content):
         batch_response_message = GossipBatchResponse()
@@ -0,0 +1,205 @@
+# Copyright 2017 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+
+from collections import OrderedDict
+import logging
+from threading import RLock
+
+from sawtooth_validator.journal.block_wrapper import NULL_BLOCK_IDENTIFIER
+
+LOGGER = logging.getLogger(__name__)
+
+
+def _invert_lowest_one(number):
+    return number & (number - 1)
+
+
+def _skip_block_num(block_num):
+    """Returns the block number of the ancestor that a block's skip pointer
+    refers to.  The numbers are chosen so that any ancestor can be reached
+    in a logarithmic number of steps along skip and previous pointers.
+    """
+    if block_num < 2:
+        return 0
+
+    if block_num & 1:
+        return _invert_lowest_one(_invert_lowest_one(block_num - 1)) + 1
+
+    return _invert_lowest_one(block_num)
+
+
+class AncestorIndex(object):
+    """Finds the ancestors of blocks, and the common ancestor of two blocks,
+    without walking back through the chain one block at a time.
+
+    The ancestors of blocks on the current chain are found through the block
+    store's block number index.  Every other
+    block is indexed the first time it is looked up, recording its block
+    number, its previous block and a skip pointer to an earlier ancestor.
+    """
+
+    def __init__(self, block_cache, maximum_entries=10000):
+        """Initialize the AncestorIndex
+        Args:
+             block_cache: The cache of all recent blocks, which is also used
+             to find the block store.
+             maximum_entries: The maximum number of blocks outside of the
+             block store to keep in the index.
+        """
+        self._block_cache = block_cache
+        self._block_store = block_cache.block_store
+        self._maximum_entries = maximum_entries
+
+        # block id -> (block number, previous block id, skip block id)
+        self._entries = OrderedDict()
+        self._lock = RLock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def get_block_num(self, block_id):
+        """Returns the block number of a block.
+
+        Raises:
+            KeyError: The block is not in the block cache
+        """
+        with self._lock:
+            entry = self._entries.get(block_id)
+            if entry is not None:
+                return entry[0]
+        return self._block_cache[block_id].block_num
+
+    def get_ancestor_id(self, block_id, block_num):
+        """Returns the id of the ancestor of a block with a block number,
+        which is the block itself if they have the same number.
+
+        Raises:
+            KeyError: The block, or one of its ancestors, is not in the block
+            cache
+            ValueError: The block number is above that of the block
+        """
+        with self._lock:
+            if not 0 <= block_num <= self.get_block_num(block_id):
+                raise ValueError(
+                    'No ancestor of {} with block number {}'.format(
+                        block_id[:8], block_num))
+
+            walk_id = block_id
+            walk_num = self.get_block_num(block_id)
+            while walk_num != block_num:
+                ancestor_id = \
+                    self._get_chain_ancestor_id(walk_id, walk_num, block_num)
+                if ancestor_id is not None:
+                    return ancestor_id
+
+                _, previous_id, skip_id = self._get_entry(walk_id)
+
+                # Follow the skip pointer unless it passes the target, or
+                # the previous block's skip pointer gets closer to it
+                skip_num = _skip_block_num(walk_num)
+                previous_skip_num = _skip_block_num(walk_num - 1)
+                if skip_num == block_num or \
+                        (skip_num > block_num and
+                         not (previous_skip_num < skip_num - 2 and
+                              previous_skip_num >= block_num)):
+                    walk_id, walk_num = skip_id, skip_num
+                else:
+                    walk_id, walk_num = previous_id, walk_num - 1
+
+            return walk_id
+
+    def find_common_ancestor_id(self, block_id, other_block_id):
+        """Returns the id of the most recent block that is an ancestor of
+        both blocks, or None if the blocks descend from different genesis
+        blocks.
+
+        Raises:
+            KeyError: One of the blocks, or one of their ancestors, is not in
+            the block cache
+        """
+        with self._lock:
+            block_num = min(
+                self.get_block_num(block_id),
+                self.get_block_num(other_block_id))
+
+            if self.get_ancestor_id(block_id, block_num) == \
+                    self.get_ancestor_id(other_block_id, block_num):
+                return self.get_ancestor_id(block_id, block_num)
+
+            # Once two chains diverge they never meet again, so search for
+            # the highest block number at which the ancestors are the same
+            lowest, highest = -1, block_num
+            while highest - lowest > 1:
+                middle = (lowest + highest) // 2
+                if self.get_ancestor_id(block_id, middle) == \
+                        self.get_ancestor_id(other_block_id, middle):
+                    lowest = middle
+                else:
+                    highest = middle
+
+            if lowest < 0:
+                return None
+
+            return self.get_ancestor_id(block_id, lowest)
+
+    def _get_chain_ancestor_id(self, block_id, block_num, ancestor_num):
+        """Returns the id of the ancestor of a block through the block
+        store's block number index, or None if the block is not indexed as
+        part of the current chain.
+        """
+        try:
+            if self._block_store.get_block_id_by_number(block_num) == \
+                    block_id:
+                return self._block_store.get_block_id_by_number(ancestor_num)
+        except KeyError:
+            pass
+        return None
+
+    def _get_entry(self, block_id):
+        entry = self._entries.get(block_id)
+        if entry is not None:
+            self._entries.move_to_end(block_id)
+            return entry
+
+        # Index the block along with any of its predecessors that are not
+        # yet indexed or on the current chain, oldest first, so that each
+        # skip pointer is found through blocks that are already indexed
+        blkw = self._block_cache[block_id]
+        unindexed = [blkw]
+        while blkw.previous_block_id != NULL_BLOCK_IDENTIFIER and \
+                blkw.previous_block_id not in self._entries and \
+                self._get_chain_ancestor_id(
+                    blkw.previous_block_id,
+                    blkw.block_num - 1,
+                    blkw.block_num - 1) is None:
+            blkw = self._block_cache[blkw.previous_block_id]
+            unindexed.append(blkw)
+
+        for blkw in reversed(unindexed):
+            if blkw.previous_block_id == NULL_BLOCK_IDENTIFIER:
+                skip_id = None
+            else:
+                skip_id = \
+                    self.get_ancestor_id(
+                        blkw.previous_block_id,
+                        _skip_block_num(blkw.block_num))
+            entry = (blkw.block_num, blkw.previous_block_id, skip_id)
+            self._entries[blkw.identifier] = entry
+
+        while len(self._entries) > self._maximum_entries:
+            self._entries.popitem(last=False)
+
+        return entry
@@ -13,28 +13,174 @@
 # limitations under the License.
 # ------------------------------------------------------------------------------
 
+from collections import deque
+
 from sawtooth_validator.journal.timed_cache import TimedCache
 
 
+def _block_size(value):
+    block = getattr(value, 'block', None)
+    if block is None:
+        return 0
+    return block.ByteSize()
+
+
 class BlockCache(TimedCache):
     """
     A dict like interface to access blocks. Stores BlockState objects.
+
+    If max_bytes is given, the least recently used blocks are evicted to
+    keep the serialized size of the cached blocks within it. The most recent
+    pinned_window blocks of the current chain, and any blocks pinned while
+    they are being validated, are never evicted or expired.
     """
-    def __init__(self, block_store=None, keep_time=10):
+    def __init__(self, block_store=None, keep_time=10, max_bytes=None,
+                 pinned_window=0):
         super(BlockCache, self).__init__(keep_time)
         self._block_store = block_store if block_store is not None else {}
+        self._max_bytes = max_bytes
+        self._pinned_window = pinned_window
+
+        self._sizes = {}
+        self._total_bytes = 0
+
+        # The ids of the most recent blocks of the current chain, oldest
+        # first, and the number of times each other block has been pinned.
+        self._chain_window = deque()
+        self._chain_window_ids = set()
+        self._pinned = {}
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
 
     def __getitem__(self, key):
         with self._lock:
             try:
-                return super(BlockCache, self).__getitem__(key)
+                value = super(BlockCache, self).__getitem__(key)
+                self._hits += 1
+                return value
             except KeyError:
+                self._misses += 1
                 if key in self._block_store:
                     value = self._block_store[key]
-                    super(BlockCache, self).__setitem__(key, value)
+                    self[key] = value
                     return value
                 raise
 
+    def __setitem__(self, key, value):
+        with self._lock:
+            self._total_bytes -= self._sizes.pop(key, 0)
+            size = _block_size(value)
+            self._sizes[key] = size
+            self._total_bytes += size
+            super(BlockCache, self).__setitem__(key, value)
+            self._evict_to_budget()
+
+    def _remove(self, key):
+        super(BlockCache, self)._remove(key)
+        self._total_bytes -= self._sizes.pop(key, 0)
+
+    def _is_pinned(self, key):
+        return key in self._chain_window_ids or key in self._pinned
+
+    def _expire(self, time_horizon):
+        while self._cache:
+            key, entry = next(iter(self._cache.items()))
+            if entry.timestamp > time_horizon:
+                break
+            if self._is_pinned(key):
+                # Keep pinned blocks by treating them as just accessed
+                entry.touch()
+                self._cache.move_to_end(key)
+            else:
+                self._remove(key)
+
+    def _evict_to_budget(self):
+        if self._max_bytes is None:
+            return
+        excess = self._total_bytes - self._max_bytes
+        victims = []
+        # Oldest first; pinned blocks are skipped
+        for key in self._cache:
+            if excess <= 0:
+                break
+            if self._is_pinned(key):
+                continue
+            victims.append(key)
+            excess -= self._sizes.get(key, 0)
+        for key in victims:
+            self._remove(key)
+            self._evictions += 1
+
+    def pin(self, block_id):
+        """Keeps the block with block_id in the cache until it is unpinned,
+        such as while it is being validated. A block pinned more than once
+        must be unpinned as many times.
+        """
+        with self._lock:
+            self._pinned[block_id] = self._pinned.get(block_id, 0) + 1
+
+    def unpin(self, block_id):
+        with self._lock:
+            count = self._pinned.get(block_id, 0)
+            if count > 1:
+                self._pinned[block_id] = count - 1
+            elif count == 1:
+                del self._pinned[block_id]
+                self._evict_to_budget()
+
+    def update_chain_head(self, chain_head):
+        """Pins the most recent pinned_window blocks of the chain ending at
+        chain_head, unpinning the blocks of the previous chain head's window
+        that are no longer in it.
+        """
+        if self._pinned_window <= 0 or chain_head is None:
+            return
+        with self._lock:
+            if self._chain_window and \
+                    chain_head.previous_block_id == self._chain_window[-1]:
+                # The chain was extended, so only the window's ends move
+                self._chain_window.append(chain_head.identifier)
+                self._chain_window_ids.add(chain_head.identifier)
+                while len(self._chain_window) > self._pinned_window:
+                    self._chain_window_ids.discard(
+                        self._chain_window.popleft())
+            else:
+                window = deque()
+                block = chain_head
+                while block is not None and \
+                        len(window) < self._pinned_window:
+                    window.appendleft(block.identifier)
+                    try:
+                        block = self[block.previous_block_id]
+                    except KeyError:
+                        block = None
+                self._chain_window = window
+                self._chain_window_ids = set(window)
+            self._evict_to_budget()
+
+    def get_stats(self):
+        """Returns the number of cached blocks and their total serialized
+        size in bytes, the number of pinned blocks, and the hits, misses,
+        evictions and hit rate of the cache.
+
+        Returns:
+            dict: The block cache statistics.
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'blocks': len(self._cache),
+                'bytes': self._total_bytes,
+                'max_bytes': self._max_bytes,
+                'pinned': len(self._chain_window_ids | set(self._pinned)),
+                'hits': self._hits,
+                'misses': self._misses,
+                'evictions': self._evictions,
+                'hit_rate': self._hits / lookups if lookups else 0.0
+            }
+
     @property
     def block_store(self):
         """
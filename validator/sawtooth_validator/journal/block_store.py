@@ -13,8 +13,13 @@
 # limitations under the License.
 # ------------------------------------------------------------------------------
 
+from collections import deque
+import heapq
+import logging
 from time import time
 from threading import Condition
+from threading import Event
+from threading import Thread
 # pylint: disable=no-name-in-module
 from collections.abc import MutableMapping
 from sawtooth_validator.journal.block_wrapper import BlockStatus
@@ -22,6 +27,175 @@ from sawtooth_validator.journal.block_wrapper import BlockWrapper
 from sawtooth_validator.protobuf.batch_pb2 import BatchHeader
 from sawtooth_validator.protobuf.block_pb2 import Block
 
+LOGGER = logging.getLogger(__name__)
+
+# Keys of the block number and resource count indexes, which share the
+# block store database with the blocks and the batch and transaction ids.
+_BLOCK_NUM_KEY = 'block_num:{}'
+_COUNTS_KEY = 'counts:{}'
+
+
+class _CommitSubscription(object):
+    """A callback waiting for a set of batches to be committed."""
+    def __init__(self, batch_ids, callback, deadline):
+        self.remaining = set(batch_ids)
+        self.callback = callback
+        self.deadline = deadline
+        self.done = False
+
+
+class _CommitNotifierThread(Thread):
+    """Calls the callbacks of completed and timed out commit subscriptions,
+    so that the thread committing blocks does not wait on them.
+    """
+    def __init__(self, registry):
+        super().__init__(name='BatchCommitNotifier')
+        self.daemon = True
+        self._registry = registry
+
+    def run(self):
+        self._registry.run_notifier()
+
+    def stop(self):
+        self._registry.stop()
+
+
+class _BatchCommitRegistry(object):
+    """Subscriptions to batch commits, keyed by batch id, so that a commit
+    only wakes the subscriptions waiting on the batches it commits. Callbacks
+    are called, and timed out subscriptions expired, by a single notifier
+    thread, rather than by the committing thread or a thread per waiter.
+    """
+    def __init__(self):
+        self._condition = Condition()
+        self._by_batch_id = {}
+        # Subscriptions waiting on the next commit of any batch
+        self._any_commit = []
+        # A heap of (deadline, sequence number, subscription)
+        self._deadlines = []
+        self._sequence = 0
+        # (subscription, committed) pairs waiting on the notifier thread
+        self._ready = deque()
+        self._notifier_thread = None
+        self._stopped = False
+
+    @property
+    def lock(self):
+        return self._condition
+
+    def subscribe(self, batch_ids, callback, timeout, has_batch):
+        """Calls callback(True) once all of batch_ids are committed, or
+        callback(False) if that hasn't happened within timeout seconds. If
+        batch_ids is empty, callback(True) is called on the next commit.
+        """
+        committed = None
+        with self._condition:
+            subscription = _CommitSubscription(
+                [batch_id for batch_id in batch_ids
+                 if not has_batch(batch_id)],
+                callback,
+                time() + timeout)
+            if batch_ids and not subscription.remaining:
+                committed = True
+            elif self._stopped:
+                committed = False
+            elif not batch_ids:
+                self._any_commit.append(subscription)
+            else:
+                for batch_id in subscription.remaining:
+                    self._by_batch_id.setdefault(
+                        batch_id, []).append(subscription)
+
+            if committed is None:
+                self._sequence += 1
+                heapq.heappush(
+                    self._deadlines,
+                    (subscription.deadline, self._sequence, subscription))
+                self._ensure_notifier_thread()
+                self._condition.notify_all()
+
+        if committed is not None:
+            callback(committed)
+
+    def notify_committed(self, batch_ids):
+        """Completes the subscriptions that were waiting only on batch_ids
+        and those waiting on the next commit. Their callbacks are called on
+        the notifier thread.
+        """
+        with self._condition:
+            completed = self._any_commit
+            self._any_commit = []
+            for batch_id in batch_ids:
+                for subscription in self._by_batch_id.pop(batch_id, []):
+                    subscription.remaining.discard(batch_id)
+                    if not subscription.remaining:
+                        completed.append(subscription)
+            if completed:
+                for subscription in completed:
+                    subscription.done = True
+                    self._ready.append((subscription, True))
+                self._condition.notify_all()
+
+    def stop(self):
+        """Stops the notifier thread. Subscriptions that are still waiting
+        are called back as timed out.
+        """
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+
+    def _ensure_notifier_thread(self):
+        if self._notifier_thread is None:
+            self._notifier_thread = _CommitNotifierThread(self)
+            self._notifier_thread.start()
+
+    def run_notifier(self):
+        while True:
+            with self._condition:
+                while self._deadlines and \
+                        (self._deadlines[0][2].done or
+                         self._deadlines[0][0] <= time() or
+                         self._stopped):
+                    _, _, subscription = heapq.heappop(self._deadlines)
+                    if subscription.done:
+                        continue
+                    subscription.done = True
+                    self._unsubscribe(subscription)
+                    self._ready.append((subscription, False))
+
+                if not self._ready:
+                    if self._stopped:
+                        return
+                    if self._deadlines:
+                        self._condition.wait(self._deadlines[0][0] - time())
+                    else:
+                        self._condition.wait()
+                    continue
+
+                ready = list(self._ready)
+                self._ready.clear()
+
+            for subscription, committed in ready:
+                self._call(subscription, committed)
+
+    def _unsubscribe(self, subscription):
+        if subscription in self._any_commit:
+            self._any_commit.remove(subscription)
+        for batch_id in subscription.remaining:
+            subscriptions = self._by_batch_id.get(batch_id, [])
+            if subscription in subscriptions:
+                subscriptions.remove(subscription)
+            if not subscriptions:
+                self._by_batch_id.pop(batch_id, None)
+
+    @staticmethod
+    def _call(subscription, committed):
+        try:
+            subscription.callback(committed)
+        # pylint: disable=broad-except
+        except Exception as exc:
+            LOGGER.exception(exc)
+
 
 class BlockStore(MutableMapping):
     """
@@ -31,14 +205,17 @@ class BlockStore(MutableMapping):
     """
     def __init__(self, block_db):
         self._block_store = block_db
-        self._commit_condition = Condition()
+        self._commit_registry = _BatchCommitRegistry()
 
     def __setitem__(self, key, value):
         if key != value.identifier:
             raise KeyError("Invalid key to store block under: {} expected {}".
                            format(key, value.identifier))
         add_ops = self._build_add_block_ops(value)
-        self._block_store.set_batch(add_ops)
+        with self._commit_registry.lock:
+            self._block_store.set_batch(add_ops)
+        self._commit_registry.notify_committed(
+            [batch.header_signature for batch in value.batches])
 
     def __getitem__(self, key):
         stored_block = self._block_store[key]
@@ -95,9 +272,18 @@ class BlockStore(MutableMapping):
         if old_chain is not None:
             for blkw in old_chain:
                 del_keys = del_keys + self._build_remove_block_ops(blkw)
+                del_keys = del_keys + self._build_remove_index_ops(blkw)
+        add_pairs = add_pairs + self._build_add_index_ops(new_chain)
         add_pairs.append(("chain_head_id", new_chain[0].identifier))
 
-        self._block_store.set_batch(add_pairs, del_keys)
+        # Hold the registry's lock, so that a subscription can't check for
+        # its batches between the write and the notification.
+        with self._commit_registry.lock:
+            self._block_store.set_batch(add_pairs, del_keys)
+        self._commit_registry.notify_committed(
+            [batch.header_signature
+             for blkw in new_chain
+             for batch in blkw.batches])
 
     @property
     def chain_head(self):
@@ -117,22 +303,33 @@ class BlockStore(MutableMapping):
         """
         return self._block_store
 
+    def subscribe_to_batch_commits(self, callback, batch_ids=None,
+                                   timeout=None):
+        """Calls callback(True) once a set of batch ids have been committed
+        to the block chain, or callback(False) if timeout is exceeded first.
+        If no batch_ids are passed in, callback(True) is called on the next
+        commit. The callback is called on the block store's notifier thread,
+        or on the calling thread if the batches are already committed, so it
+        should not block.
+        """
+        self._commit_registry.subscribe(
+            batch_ids or [], callback, timeout or 300, self.has_batch)
+
     def wait_for_batch_commits(self, batch_ids=None, timeout=None):
         """Waits for a set of batch ids to be committed to the block chain,
         and returns True when they have. If timeout is exceeded, returns False.
         If no batch_ids are passed in, it will return True on the next commit.
         """
-        batch_ids = batch_ids or []
-        timeout = timeout or 300
-        start_time = time()
+        done = Event()
+        result = []
+
+        def on_done(committed):
+            result.append(committed)
+            done.set()
 
-        with self._commit_condition:
-            while True:
-                if all(self.has_batch(b) for b in batch_ids):
-                    return True
-                if time() - start_time > timeout:
-                    return False
-                self._commit_condition.wait(timeout - (time() - start_time))
+        self.subscribe_to_batch_commits(on_done, batch_ids, timeout)
+        done.wait()
+        return result[0]
 
     def _build_add_block_ops(self, blkw):
         """Build the batch operations to add a block to the BlockStore.
@@ -143,15 +340,56 @@ class BlockStore(MutableMapping):
         """
         out = []
         blk_id = blkw.identifier
-        with self._commit_condition:
-            out.append((blk_id, blkw.block.SerializeToString()))
-            for batch in blkw.batches:
-                out.append((batch.header_signature, blk_id))
-                for txn in batch.transactions:
-                    out.append((txn.header_signature, blk_id))
-            self._commit_condition.notify_all()
+        out.append((blk_id, blkw.block.SerializeToString()))
+        for batch in blkw.batches:
+            out.append((batch.header_signature, blk_id))
+            for txn in batch.transactions:
+                out.append((txn.header_signature, blk_id))
         return out
 
+    def _build_add_index_ops(self, new_chain):
+        """Build the batch operations to index the blocks of a new chain by
+        block number, and to record the number of batches and transactions
+        in the chain up to and including each block. A block is only
+        counted if its predecessor was, so that counts are always complete.
+
+        :param new_chain (list of BlockWrapper): The new blocks, newest first
+        :return:
+        list of key value tuples to add to the BlockStore
+        """
+        out = []
+        counts = {}
+        for blkw in reversed(new_chain):
+            if blkw.block_num == 0:
+                previous = (0, 0)
+            elif blkw.previous_block_id in counts:
+                previous = counts[blkw.previous_block_id]
+            else:
+                try:
+                    previous = self.get_chain_counts(blkw.previous_block_id)
+                except KeyError:
+                    continue
+
+            counts[blkw.identifier] = (
+                previous[0] + len(blkw.batches),
+                previous[1] + sum(len(b.transactions) for b in blkw.batches))
+            out.append((_BLOCK_NUM_KEY.format(blkw.block_num),
+                        blkw.identifier))
+            out.append((_COUNTS_KEY.format(blkw.identifier),
+                        list(counts[blkw.identifier])))
+        return out
+
+    def _build_remove_index_ops(self, blkw):
+        """Build the batch operations to remove a block from the indexes.
+
+        :param blkw (BlockWrapper): Block to remove.
+        :return:
+        list of values to remove from the BlockStore
+        """
+        return [key for key in (_BLOCK_NUM_KEY.format(blkw.block_num),
+                                _COUNTS_KEY.format(blkw.identifier))
+                if key in self._block_store]
+
     @staticmethod
     def _build_remove_block_ops(blkw):
         """Build the batch operations to remove a block from the BlockStore.
@@ -169,6 +407,43 @@ class BlockStore(MutableMapping):
                 out.append(txn.header_signature)
         return out
 
+    def get_block_id_by_number(self, block_num):
+        """Returns the id of the block in the current chain with a block
+        number, without reading the block itself.
+
+        Raises:
+            KeyError: No block with that number has been indexed
+        """
+        block_id = self._block_store.get(_BLOCK_NUM_KEY.format(block_num))
+        if block_id is None:
+            raise KeyError('No block number {} in BlockStore'.format(
+                block_num))
+        return block_id
+
+    def get_block_by_number(self, block_num):
+        """Returns the block in the current chain with a block number.
+
+        Raises:
+            KeyError: No block with that number has been indexed
+        """
+        return self.__getitem__(self.get_block_id_by_number(block_num))
+
+    def get_chain_counts(self, block_id):
+        """Returns the number of batches and of transactions in the chain
+        from genesis up to and including a block.
+
+        Returns:
+            tuple: The batch count and the transaction count
+
+        Raises:
+            KeyError: The block's counts have not been indexed
+        """
+        counts = self._block_store.get(_COUNTS_KEY.format(block_id))
+        if counts is None:
+            raise KeyError('No counts for block {} in BlockStore'.format(
+                block_id))
+        return tuple(counts)
+
     def get_block_by_transaction_id(self, txn_id):
         try:
             return self.__getitem__(self._block_store[txn_id])
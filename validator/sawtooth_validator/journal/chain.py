@@ -12,16 +12,23 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 # ------------------------------------------------------------------------------
+from contextlib import contextmanager
+import heapq
+import itertools
 import logging
+from threading import Lock
 from threading import RLock
 
 import sawtooth_signing as signing
 
+from sawtooth_validator.journal.ancestor_index import AncestorIndex
 from sawtooth_validator.journal.block_wrapper import BlockStatus
 from sawtooth_validator.journal.block_wrapper import BlockWrapper
 from sawtooth_validator.journal.block_wrapper import NULL_BLOCK_IDENTIFIER
 from sawtooth_validator.journal.consensus.consensus_factory import \
     ConsensusFactory
+from sawtooth_validator.journal.consensus.consensus_factory import \
+    ConsensusInstanceCache
 from sawtooth_validator.journal.transaction_cache import TransactionCache
 
 from sawtooth_validator.protobuf.transaction_pb2 import TransactionHeader
@@ -40,6 +47,34 @@ class BlockValidationAborted(Exception):
     pass
 
 
+class BlockValidationLocks(object):
+    """Hands out a lock per block, so that when several forks sharing a block
+    are validated at the same time, the block is validated by one of them
+    while the others wait for its result.
+    """
+    def __init__(self):
+        self._lock = Lock()
+        self._locks = {}
+
+    @contextmanager
+    def hold(self, block_id):
+        with self._lock:
+            entry = self._locks.get(block_id)
+            if entry is None:
+                entry = [Lock(), 0]
+                self._locks[block_id] = entry
+            entry[1] += 1
+
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._locks[block_id]
+
+
 class BlockValidator(object):
     """
     Responsible for validating a block, handles both chain extensions and fork
@@ -57,7 +92,10 @@ class BlockValidator(object):
                  executor,
                  squash_handler,
                  identity_signing_key,
-                 data_dir):
+                 data_dir,
+                 consensus_instances=None,
+                 validation_locks=None,
+                 ancestor_index=None):
         """Initialize the BlockValidator
         Args:
              consensus_module: The consensus module that contains
@@ -75,6 +113,12 @@ class BlockValidator(object):
              identity_signing_key: Private key for signing blocks.
              data_dir: Path to location where persistent data for the
              consensus module can be stored.
+             consensus_instances: The ConsensusInstanceCache providing
+             consensus objects, if they are shared with other validations.
+             validation_locks: The BlockValidationLocks shared with other
+             validations that may run at the same time.
+             ancestor_index: The AncestorIndex used to find the root of
+             the fork, if it is shared with other validations.
         Returns:
             None
         """
@@ -90,6 +134,20 @@ class BlockValidator(object):
         self._identity_public_key = \
             signing.generate_pubkey(self._identity_signing_key)
         self._data_dir = data_dir
+        if consensus_instances is None:
+            consensus_instances = \
+                ConsensusInstanceCache(
+                    block_cache=block_cache,
+                    state_view_factory=state_view_factory,
+                    data_dir=data_dir,
+                    validator_id=self._identity_public_key)
+        self._consensus_instances = consensus_instances
+        self._validation_locks = \
+            validation_locks if validation_locks is not None \
+            else BlockValidationLocks()
+        self._ancestor_index = \
+            ancestor_index if ancestor_index is not None \
+            else AncestorIndex(block_cache)
         self._result = {
             'new_block': new_block,
             'chain_head': chain_head,
@@ -207,19 +265,28 @@ class BlockValidator(object):
         return True
 
     def validate_block(self, blkw, committed_txn):
+        # Another validation may be working on the same block, as when forks
+        # sharing new blocks are validated at the same time, in which case
+        # its result is used
+        with self._validation_locks.hold(blkw.identifier):
+            return self._validate_block(blkw, committed_txn)
+
+    def _validate_block(self, blkw, committed_txn):
         try:
             if blkw.status == BlockStatus.Valid:
+                # The transactions of blocks validated earlier must still be
+                # recorded for the dependency checks of the blocks after them
+                for batch in blkw.batches:
+                    committed_txn.add_batch(batch)
                 return True
             elif blkw.status == BlockStatus.Invalid:
                 return False
             else:
                 valid = True
 
-                consensus = self._consensus_module.\
-                    BlockVerifier(block_cache=self._block_cache,
-                                  state_view_factory=self._state_view_factory,
-                                  data_dir=self._data_dir,
-                                  validator_id=self._identity_public_key)
+                consensus = \
+                    self._consensus_instances.get_block_verifier(
+                        self._consensus_module)
 
                 if valid:
                     valid = self._is_block_complete(blkw)
@@ -243,50 +310,52 @@ class BlockValidator(object):
 
     def _find_common_height(self, new_chain, cur_chain):
         """
-        Walk back on the longest chain until we find a predecessor that is the
-        same height as the other chain.
+        Find the root of the fork through the ancestor index, then walk
+        back on both chains to the blocks at the height of the root.
         The blocks are recorded in the corresponding lists
         and the blocks at the same height are returned
         """
         new_blkw = self._new_block
         cur_blkw = self._chain_head
-        # 1) find the common ancestor of this block in the current chain
-        # Walk back until we have both chains at the same length
-
-        # Walk back the new chain to find the block that is the
-        # same height as the current head.
-        if new_blkw.block_num > cur_blkw.block_num:
-            # new chain is longer
-            # walk the current chain back until we find the block that is the
-            # same height as the current chain.
-            while new_blkw.block_num > cur_blkw.block_num and \
-                    new_blkw.previous_block_id != NULL_BLOCK_IDENTIFIER:
-                new_chain.append(new_blkw)
-                try:
-                    new_blkw = \
-                        self._block_cache[
-                            new_blkw.previous_block_id]
-                except KeyError:
-                    LOGGER.debug("Block rejected due missing" +
-                                 " predecessor: %s", new_blkw)
-                    for b in new_chain:
-                        b.status = BlockStatus.Invalid
-                    self._done_cb(False, self._result)
-                    raise BlockValidationAborted()
-        elif new_blkw.block_num < cur_blkw.block_num:
-            # current chain is longer
-            # walk the current chain back until we find the block that is the
-            # same height as the new chain.
-            while cur_blkw.block_num > \
-                    new_blkw.block_num \
-                    and new_blkw.previous_block_id != \
-                    NULL_BLOCK_IDENTIFIER:
-                cur_chain.append(cur_blkw)
-                cur_blkw = self._block_cache[cur_blkw.previous_block_id]
+
+        # 1) find the common ancestor of this block in the current chain,
+        # rejecting blocks that don't share a genesis block with it or that
+        # are missing a predecessor before any blocks are loaded
+        try:
+            common_id = self._ancestor_index.find_common_ancestor_id(
+                new_blkw.identifier, cur_blkw.identifier)
+        except KeyError:
+            LOGGER.debug("Block rejected due missing" +
+                         " predecessor: %s", new_blkw)
+            new_blkw.status = BlockStatus.Invalid
+            self._done_cb(False, self._result)
+            raise BlockValidationAborted()
+
+        if common_id is None:
+            LOGGER.info("Block rejected due to wrong genesis: %s %s",
+                        cur_blkw, new_blkw)
+            new_blkw.status = BlockStatus.Invalid
+            self._done_cb(False, self._result)
+            raise BlockValidationAborted()
+
+        common_height = self._ancestor_index.get_block_num(common_id)
+
+        # 2) Walk back both chains to the height of the common ancestor,
+        # collecting the blocks that are needed to switch between them.
+        while new_blkw.block_num > common_height:
+            new_chain.append(new_blkw)
+            new_blkw = self._block_cache[new_blkw.previous_block_id]
+
+        while cur_blkw.block_num > common_height:
+            cur_chain.append(cur_blkw)
+            cur_blkw = self._block_cache[cur_blkw.previous_block_id]
+
         return (new_blkw, cur_blkw)
 
     def _find_common_ancestor(self, new_blkw, cur_blkw, new_chain, cur_chain):
-        """ Finds a common ancestor of the two chains.
+        """ Finds a common ancestor of the two chains.  The blocks at the
+        height of the ancestor found through the index are normally the same,
+        unless the current chain changed while the index was being searched.
         """
         while cur_blkw.identifier != \
                 new_blkw.identifier:
@@ -314,11 +383,9 @@ class BlockValidator(object):
     def _test_commit_new_chain(self):
         """ Compare the two chains and determine which should be the head.
         """
-        fork_resolver = self._consensus_module.\
-            ForkResolver(block_cache=self._block_cache,
-                         state_view_factory=self._state_view_factory,
-                         data_dir=self._data_dir,
-                         validator_id=self._identity_public_key)
+        fork_resolver = \
+            self._consensus_instances.get_fork_resolver(
+                self._consensus_module)
 
         return fork_resolver.compare_forks(self._chain_head, self._new_block)
 
@@ -460,6 +527,22 @@ class ChainController(object):
         self._identity_public_key = \
             signing.generate_pubkey(self._identity_signing_key)
         self._data_dir = data_dir
+        self._consensus_instances = \
+            ConsensusInstanceCache(
+                block_cache=block_cache,
+                state_view_factory=state_view_factory,
+                data_dir=data_dir,
+                validator_id=self._identity_public_key)
+        self._validation_locks = BlockValidationLocks()
+        self._ancestor_index = AncestorIndex(block_cache)
+
+        # Validations waiting for a thread of the executor, ordered so that
+        # the longest fork is validated first.  Each entry is run by the
+        # next task the executor starts, so the executor's threads work on
+        # independent forks at the same time.
+        self._validation_queue = []
+        self._validation_queue_lock = Lock()
+        self._validation_counter = itertools.count()
 
         self._blocks_processing = {}  # a set of blocks that are
         # currently being processed.
@@ -472,6 +555,7 @@ class ChainController(object):
             self._chain_head = self._block_store.chain_head
             LOGGER.info("Chain controller initialized with chain head: %s",
                         self._chain_head)
+            self._block_cache.update_chain_head(self._chain_head)
         except Exception as exc:
             LOGGER.error("Invalid block store. Head of the block chain cannot "
                          "be determined")
@@ -504,9 +588,26 @@ class ChainController(object):
                 executor=self._transaction_executor,
                 squash_handler=self._squash_handler,
                 identity_signing_key=self._identity_signing_key,
-                data_dir=self._data_dir)
+                data_dir=self._data_dir,
+                consensus_instances=self._consensus_instances,
+                validation_locks=self._validation_locks,
+                ancestor_index=self._ancestor_index)
             self._blocks_processing[blkw.block.header_signature] = validator
-            self._executor.submit(validator.run)
+            # Keep the block cached while it is being validated
+            self._block_cache.pin(blkw.identifier)
+            self._queue_validation(blkw, validator)
+
+    def _queue_validation(self, blkw, validator):
+        with self._validation_queue_lock:
+            heapq.heappush(
+                self._validation_queue,
+                (-blkw.block_num, next(self._validation_counter), validator))
+        self._executor.submit(self._run_next_validation)
+
+    def _run_next_validation(self):
+        with self._validation_queue_lock:
+            _, _, validator = heapq.heappop(self._validation_queue)
+        validator.run()
 
     def on_block_validated(self, commit_new_block, result):
         """Message back from the block validator, that the validation is
@@ -525,6 +626,7 @@ class ChainController(object):
 
                 # remove from the processing list
                 del self._blocks_processing[new_block.identifier]
+                self._block_cache.unpin(new_block.identifier)
 
                 # Remove this block from the pending queue, obtaining any
                 # immediate descendants of this block in the process.
@@ -560,6 +662,7 @@ class ChainController(object):
                 # If the head is to be updated to the new block.
                 elif commit_new_block:
                     self._chain_head = new_block
+                    self._block_cache.update_chain_head(self._chain_head)
 
                     # update the the block store to have the new chain
                     self._block_store.update_chain(result["new_chain"],
@@ -685,12 +788,15 @@ class ChainController(object):
                 executor=self._transaction_executor,
                 squash_handler=self._squash_handler,
                 identity_signing_key=self._identity_signing_key,
-                data_dir=self._data_dir)
+                data_dir=self._data_dir,
+                consensus_instances=self._consensus_instances,
+                validation_locks=self._validation_locks)
 
             valid = validator.validate_block(block, committed_txn)
             if valid:
                 self._block_store.update_chain([block])
                 self._chain_head = block
+                self._block_cache.update_chain_head(self._chain_head)
                 self._notify_on_chain_updated(self._chain_head)
             else:
                 LOGGER.warning("The genesis block is not valid. Cannot "
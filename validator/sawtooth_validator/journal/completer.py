@@ -14,8 +14,10 @@
 # ------------------------------------------------------------------------------
 
 import logging
+import queue
 import time
 from threading import RLock
+from threading import Thread
 from collections import deque
 
 from sawtooth_validator.journal.block_cache import BlockCache
@@ -44,14 +46,33 @@ class Completer(object):
     is sent sent out over the gossip network. It also checks that all batches
     have their dependencies satisifed, otherwise it will request the batch that
     has the missing transaction.
+
+    Blocks and batches received from the network are queued and completed on
+    a dedicated ingestion thread, so that network handler threads do not wait
+    on each other. The caches each have their own lock, so lookups do not
+    wait on ingestion, and the on_block_received and on_batch_received
+    callbacks are called, in completion order, without holding the
+    completer's lock.
     """
-    def __init__(self, block_store, gossip, cache_purge_frequency=30):
+    def __init__(self, block_store, gossip, cache_purge_frequency=30,
+                 request_timeout=10, fetch_manager=None, sync_threshold=10):
         """
         :param block_store (dictionary) The block store shared with the journal
         :param gossip (gossip.Gossip) Broadcasts block and batch request to
                 peers
         :param cache_purge_frequency (int) The time between purging the
                 TimedCaches.
+        :param request_timeout (int) The time in seconds to wait on an
+                outstanding request before the same block, batch or
+                transaction is requested again.
+        :param fetch_manager (fetch_manager.FetchManager) If given, missing
+                blocks and batches are fetched from one peer at a time,
+                starting with the peer that sent the dependent item, instead
+                of being requested from all peers.
+        :param sync_threshold (int) When a block received from a peer is
+                more than this many blocks ahead of the chain head, its
+                missing predecessors are requested from that peer as block
+                ranges, oldest first, instead of one block at a time.
         """
         self.gossip = gossip
         self.batch_cache = TimedCache(cache_purge_frequency)
@@ -62,13 +83,48 @@ class Completer(object):
         self._seen_txns = TimedCache(cache_purge_frequency)
         self._incomplete_batches = TimedCache(cache_purge_frequency)
         self._incomplete_blocks = TimedCache(cache_purge_frequency)
+        # ids of the blocks held in _incomplete_blocks
+        self._incomplete_block_ids = TimedCache(cache_purge_frequency)
+        self._requested = TimedCache(cache_purge_frequency)
+        self._request_timeout = request_timeout
+        self._fetch_manager = fetch_manager
+        self._sync_threshold = sync_threshold
+        # The far-ahead block being caught up to, the peer it was received
+        # from, the number of the newest block received in a block range,
+        # and the stop block number and time of the outstanding range
+        # request. The block is held here rather than in the incomplete
+        # block cache, which could expire it before the ranges arrive.
+        self._sync_block = None
+        self._sync_connection_id = None
+        self._sync_block_num = None
+        self._sync_requested_from = None
+        self._sync_requested_at = None
         self._on_block_received = None
         self._on_batch_received = None
+        # Guards the completion state; only held while completing a block or
+        # batch, never while calling back into the journal.
         self.lock = RLock()
+
+        # Completed blocks and batches waiting to be passed to the journal.
+        # Appended to under self.lock, so they are delivered in completion
+        # order by whichever thread holds the delivery lock.
+        self._deliveries = deque()
+        self._delivery_lock = RLock()
+
+        self._ingestion_queue = queue.Queue()
+        self._ingestion_thread = None
+
+        # The time each incomplete block or batch was first received, used
+        # to measure how long completion takes.
+        self._received_times = TimedCache(cache_purge_frequency)
+        self._metrics_lock = RLock()
+        self._completed = {'block': 0, 'batch': 0}
+        self._total_latency = {'block': 0.0, 'batch': 0.0}
+        self._max_latency = {'block': 0.0, 'batch': 0.0}
         self._cache_purge_frequency = cache_purge_frequency
         self._purge_time = time.time() + self._cache_purge_frequency
 
-    def _complete_block(self, block):
+    def _complete_block(self, block, connection_id=None):
         """ Check the block to see if it is complete and if it can be passed to
             the journal. If the block's predecessor is not in the block_cache
             the predecessor is requested and the current block is added to the
@@ -94,14 +150,17 @@ class Completer(object):
             return None
 
         if block.previous_block_id not in self.block_cache:
+            if self._is_far_ahead(block, connection_id):
+                self._sync_to(block, connection_id)
+                return None
+
             LOGGER.debug("Request missing predecessor: %s",
                          block.previous_block_id)
-            if block.previous_block_id not in self._incomplete_blocks:
-                self._incomplete_blocks[block.previous_block_id] = [block]
-            elif block not in self._incomplete_blocks[block.previous_block_id]:
-                self._incomplete_blocks[block.previous_block_id] += [block]
+            self._add_incomplete_block(block.previous_block_id, block)
 
-            self.gossip.broadcast_block_request(block.previous_block_id)
+            # The predecessor may itself be waiting on its own predecessor
+            if block.previous_block_id not in self._incomplete_block_ids:
+                self._request_block(block.previous_block_id, connection_id)
             return None
 
         # Check for same number of batch_ids and batches
@@ -123,11 +182,8 @@ class Completer(object):
                 if batch_id not in self.batch_cache and \
                         batch_id not in temp_batches:
                     # Request all missing batches
-                    self.gossip.broadcast_batch_by_batch_id_request(batch_id)
-                    if batch_id not in self._incomplete_blocks:
-                        self._incomplete_blocks[batch_id] = [block]
-                    elif block not in self._incomplete_blocks[batch_id]:
-                        self._incomplete_blocks[batch_id] += [block]
+                    self._request_batch(batch_id, connection_id)
+                    self._add_incomplete_block(batch_id, block)
                     building = False
 
             if not building:
@@ -163,6 +219,13 @@ class Completer(object):
                              "batches in block.batches Dropping %s", block)
                 return None
 
+    def _add_incomplete_block(self, key, block):
+        if key not in self._incomplete_blocks:
+            self._incomplete_blocks[key] = [block]
+        elif block not in self._incomplete_blocks[key]:
+            self._incomplete_blocks[key] += [block]
+        self._incomplete_block_ids[block.header_signature] = None
+
     def _finalize_batch_list(self, block, temp_batches):
         batches = []
         for batch_id in block.header.batch_ids:
@@ -175,7 +238,7 @@ class Completer(object):
 
         return batches
 
-    def _complete_batch(self, batch):
+    def _complete_batch(self, batch, connection_id=None):
         valid = True
         dependencies = []
         for txn in batch.transactions:
@@ -200,11 +263,141 @@ class Completer(object):
                         self._incomplete_batches[dependency] += [batch]
                     valid = False
         if not valid:
-            self.gossip.broadcast_batch_by_transaction_id_request(
-                dependencies)
+            self._request_batches_by_transaction_ids(dependencies,
+                                                     connection_id)
 
         return valid
 
+    def _request_block(self, block_id, connection_id=None):
+        if not self._should_request(block_id):
+            return
+        if self._fetch_manager is not None:
+            self._fetch_manager.fetch_block(block_id, connection_id)
+        else:
+            self.gossip.broadcast_block_request(block_id)
+
+    def _is_far_ahead(self, block, connection_id):
+        """Returns whether the missing predecessors of a block received from
+        a peer should be requested as block ranges: it is far ahead of the
+        chain head, or ahead of the blocks received by the block range sync
+        in progress.
+        """
+        if connection_id is None:
+            return False
+        if self._sync_block is not None:
+            return block.block_num > self._sync_block_num + 1
+        chain_head = self._block_store.chain_head
+        return chain_head is not None and \
+            block.block_num - chain_head.block_num > self._sync_threshold
+
+    def _sync_to(self, block, connection_id):
+        """Catches up to a far-ahead block by requesting the blocks before
+        it from the peer that sent it, one block range at a time.
+        """
+        if self._sync_block is None:
+            self._sync_block_num = self._block_store.chain_head.block_num
+        if self._sync_block is None or \
+                block.block_num > self._sync_block.block_num:
+            self._sync_block = block
+            self._sync_connection_id = connection_id
+
+        if self._sync_requested_at is None or \
+                time.time() - self._sync_requested_at >= \
+                self._request_timeout:
+            self._request_block_range()
+
+    def _request_block_range(self):
+        LOGGER.debug("Request blocks %s to %s from %s",
+                     self._sync_block_num + 1, self._sync_block.block_num - 1,
+                     self._sync_connection_id)
+        self._sync_requested_from = self._sync_block_num
+        self._sync_requested_at = time.time()
+        try:
+            self.gossip.send_block_range_request(
+                self._sync_block.previous_block_id,
+                self._sync_block_num,
+                self._sync_connection_id)
+        except ValueError:
+            LOGGER.debug("Connection %s is no longer valid",
+                         self._sync_connection_id)
+            self._end_sync()
+
+    def _block_range_received(self):
+        """Called once the last chunk of a block range has been completed.
+        Requests the next block range, or completes the block being caught
+        up to once its predecessor has been received.
+        """
+        if self._sync_block is None:
+            return
+        if self._sync_block.previous_block_id in self.block_cache:
+            block = self._sync_block
+            connection_id = self._sync_connection_id
+            self._clear_sync()
+            self._add_block(block, connection_id)
+        elif self._sync_block_num > self._sync_requested_from:
+            self._request_block_range()
+        else:
+            LOGGER.debug("Peer %s has no blocks after %s",
+                         self._sync_connection_id, self._sync_block_num)
+            self._end_sync()
+
+    def _end_sync(self):
+        """Gives up on block ranges, and requests the predecessor of the
+        block being caught up to from all peers instead.
+        """
+        block = self._sync_block
+        self._clear_sync()
+        self._add_incomplete_block(block.previous_block_id, block)
+        self._request_block(block.previous_block_id)
+
+    def _clear_sync(self):
+        self._sync_block = None
+        self._sync_connection_id = None
+        self._sync_block_num = None
+        self._sync_requested_from = None
+        self._sync_requested_at = None
+
+    def _request_batch(self, batch_id, connection_id=None):
+        if not self._should_request(batch_id):
+            return
+        if self._fetch_manager is not None:
+            self._fetch_manager.fetch_batch(batch_id, connection_id)
+        else:
+            self.gossip.broadcast_batch_by_batch_id_request(batch_id)
+
+    def _request_batches_by_transaction_ids(self, transaction_ids,
+                                            connection_id=None):
+        transaction_ids = [transaction_id
+                           for transaction_id in transaction_ids
+                           if self._should_request(transaction_id)]
+        if not transaction_ids:
+            return
+        if self._fetch_manager is not None:
+            self._fetch_manager.fetch_batches_by_transaction_ids(
+                transaction_ids, connection_id)
+        else:
+            self.gossip.broadcast_batch_by_transaction_id_request(
+                transaction_ids)
+
+    def _should_request(self, requested_id):
+        """Returns whether requested_id should be requested from the
+        network, which is the case unless a request for it is already
+        outstanding. Records the request if it should be made.
+        """
+        now = time.time()
+        requested_at = self._requested.get(requested_id)
+        if requested_at is not None and \
+                now - requested_at < self._request_timeout:
+            return False
+        self._requested[requested_id] = now
+        return True
+
+    def _clear_requested(self, requested_id, connection_id=None):
+        if requested_id in self._requested:
+            del self._requested[requested_id]
+        if self._fetch_manager is not None:
+            self._fetch_manager.fetched(requested_id, connection_id)
+
     def _add_seen_txns(self, batch):
         for txn in batch.transactions:
             if txn.header_signature in self._seen_txns and \
@@ -218,7 +411,7 @@ class Completer(object):
         if key in self._incomplete_batches:
             batches = self._incomplete_batches[key]
             for batch in batches:
-                self.add_batch(batch)
+                self._add_batch(batch)
             del self._incomplete_batches[key]
 
     def _process_incomplete_blocks(self, key):
@@ -235,16 +428,63 @@ class Completer(object):
                         if self._complete_block(inc_block):
                             self.block_cache[inc_block.header_signature] = \
                                 inc_block
-                            self._on_block_received(inc_block)
+                            self._remove_incomplete_block_id(
+                                inc_block.header_signature)
+                            self._clear_requested(inc_block.header_signature)
+                            self._queue_delivery('block', inc_block)
                             to_complete.append(inc_block.header_signature)
                     del self._incomplete_blocks[my_key]
 
+    def _remove_incomplete_block_id(self, block_id):
+        if block_id in self._incomplete_block_ids:
+            del self._incomplete_block_ids[block_id]
+
+    def _queue_delivery(self, kind, item):
+        received_at = self._received_times.get(item.header_signature)
+        if received_at is not None:
+            del self._received_times[item.header_signature]
+            latency = time.time() - received_at
+        else:
+            latency = 0.0
+        with self._metrics_lock:
+            self._completed[kind] += 1
+            self._total_latency[kind] += latency
+            self._max_latency[kind] = max(self._max_latency[kind], latency)
+        self._deliveries.append((kind, item))
+
+    def _deliver(self):
+        """Passes completed blocks and batches to the journal, in the order
+        they were completed. Must not be called while holding self.lock.
+        """
+        while self._deliveries:
+            # If another thread is delivering, it will also deliver what
+            # this thread completed, so don't wait for it.
+            if not self._delivery_lock.acquire(blocking=False):
+                return
+            try:
+                while self._deliveries:
+                    kind, item = self._deliveries.popleft()
+                    if kind == 'block':
+                        self._on_block_received(item)
+                    else:
+                        self._on_batch_received(item)
+            finally:
+                self._delivery_lock.release()
+
+    def _mark_received(self, item_id):
+        if item_id not in self._received_times:
+            self._received_times[item_id] = time.time()
+
     def _purge_caches(self):
         if self._purge_time < time.time():
             LOGGER.debug("Purges caches of expired entries.")
+            LOGGER.debug("Completer metrics: %s", self.get_metrics())
             self._seen_txns.purge_expired()
             self._incomplete_batches.purge_expired()
             self._incomplete_blocks.purge_expired()
+            self._incomplete_block_ids.purge_expired()
+            self._requested.purge_expired()
+            self._received_times.purge_expired()
             self.batch_cache.purge_expired()
             self.block_cache.purge_expired()
             self._purge_time = time.time() + self._cache_purge_frequency
@@ -255,30 +495,167 @@ class Completer(object):
     def set_on_batch_received(self, on_batch_received_func):
         self._on_batch_received = on_batch_received_func
 
-    def add_block(self, block):
+    def add_block(self, block, connection_id=None):
+        """
+        :param block (Block) The block to complete
+        :param connection_id (str) The peer the block was received from, if
+                any. Missing predecessors and batches are requested from
+                this peer first.
+        """
         with self.lock:
-            blkw = BlockWrapper(block)
-            block = self._complete_block(blkw)
-            if block is not None:
-                self.block_cache[block.header_signature] = blkw
-                self._on_block_received(blkw)
-                self._process_incomplete_blocks(block.header_signature)
-                self._purge_caches()
-
-    def add_batch(self, batch):
+            self._add_block(BlockWrapper(block), connection_id)
+        self._deliver()
+
+    def _add_block(self, blkw, connection_id=None):
+        self._mark_received(blkw.header_signature)
+        block = self._complete_block(blkw, connection_id)
+        if block is not None:
+            self.block_cache[block.header_signature] = blkw
+            self._remove_incomplete_block_id(block.header_signature)
+            self._clear_requested(block.header_signature, connection_id)
+            self._queue_delivery('block', blkw)
+            self._process_incomplete_blocks(block.header_signature)
+            self._purge_caches()
+
+    def add_block_range(self, blocks, last, connection_id=None):
+        """
+        :param blocks (list of Block) One chunk of a block range, oldest
+                first
+        :param last (bool) Whether this is the last chunk of the range
+        :param connection_id (str) The peer the blocks were received from
+        """
         with self.lock:
-            if batch.header_signature in self.batch_cache:
+            for block in blocks:
+                blkw = BlockWrapper(block)
+                self._add_block(blkw, connection_id)
+                if self._sync_block is not None and \
+                        blkw.header_signature in self.block_cache and \
+                        blkw.block_num > self._sync_block_num:
+                    self._sync_block_num = blkw.block_num
+            if last:
+                self._block_range_received()
+        self._deliver()
+
+    def add_batch(self, batch, connection_id=None):
+        """
+        :param batch (Batch) The batch to complete
+        :param connection_id (str) The peer the batch was received from, if
+                any. Missing dependencies are requested from this peer first.
+        """
+        with self.lock:
+            self._add_batch(batch, connection_id)
+        self._deliver()
+
+    def _add_batch(self, batch, connection_id=None):
+        if batch.header_signature in self.batch_cache:
+            return
+        self._mark_received(batch.header_signature)
+        if self._complete_batch(batch, connection_id):
+            self.batch_cache[batch.header_signature] = batch
+            self._clear_requested(batch.header_signature, connection_id)
+            self._add_seen_txns(batch)
+            self._queue_delivery('batch', batch)
+            self._process_incomplete_blocks(batch.header_signature)
+            # If there was a batch waiting on this transaction, process
+            # that batch
+            for txn in batch.transactions:
+                self._clear_requested(txn.header_signature, connection_id)
+                if txn.header_signature in self._incomplete_batches:
+                    self._process_incomplete_batches(txn.header_signature)
+
+    def queue_block(self, block, connection_id=None):
+        """Queues the block to be completed on the ingestion thread, or
+        completes it immediately if the ingestion thread is not running.
+
+        :param block (Block) The block to complete
+        :param connection_id (str) The peer the block was received from
+        """
+        if self._ingestion_thread is None:
+            self.add_block(block, connection_id)
+        else:
+            self._ingestion_queue.put(('block', block, connection_id))
+
+    def queue_batch(self, batch, connection_id=None):
+        """Queues the batch to be completed on the ingestion thread, or
+        completes it immediately if the ingestion thread is not running.
+
+        :param batch (Batch) The batch to complete
+        :param connection_id (str) The peer the batch was received from
+        """
+        if self._ingestion_thread is None:
+            self.add_batch(batch, connection_id)
+        else:
+            self._ingestion_queue.put(('batch', batch, connection_id))
+
+    def queue_block_range(self, blocks, last, connection_id=None):
+        """Queues a chunk of a block range to be completed on the ingestion
+        thread, or completes it immediately if the ingestion thread is not
+        running.
+
+        :param blocks (list of Block) The blocks to complete, oldest first
+        :param last (bool) Whether this is the last chunk of the range
+        :param connection_id (str) The peer the blocks were received from
+        """
+        if self._ingestion_thread is None:
+            self.add_block_range(blocks, last, connection_id)
+        else:
+            self._ingestion_queue.put(
+                ('block_range', (blocks, last), connection_id))
+
+    def start(self):
+        """Starts the ingestion thread, which completes queued blocks and
+        batches.
+        """
+        self._ingestion_thread = Thread(target=self._ingest,
+                                        name='CompleterIngestion')
+        self._ingestion_thread.daemon = True
+        self._ingestion_thread.start()
+
+    def stop(self):
+        """Stops the ingestion thread once the blocks and batches already
+        queued have been completed.
+        """
+        ingestion_thread = self._ingestion_thread
+        if ingestion_thread is not None:
+            self._ingestion_thread = None
+            self._ingestion_queue.put(None)
+            ingestion_thread.join()
+
+    def _ingest(self):
+        while True:
+            item = self._ingestion_queue.get()
+            if item is None:
                 return
-            if self._complete_batch(batch):
-                self.batch_cache[batch.header_signature] = batch
-                self._add_seen_txns(batch)
-                self._on_batch_received(batch)
-                self._process_incomplete_blocks(batch.header_signature)
-                # If there was a batch waiting on this transaction, process
-                # that batch
-                for txn in batch.transactions:
-                    if txn.header_signature in self._incomplete_batches:
-                        self._process_incomplete_batches(txn.header_signature)
+            kind, content, connection_id = item
+            try:
+                if kind == 'block':
+                    self.add_block(content, connection_id)
+                elif kind == 'block_range':
+                    self.add_block_range(*content, connection_id)
+                else:
+                    self.add_batch(content, connection_id)
+            # pylint: disable=broad-except
+            except Exception as exc:
+                LOGGER.exception(exc)
+
+    def get_metrics(self):
+        """Returns the number of blocks and batches waiting to be
+        completed and, for each of blocks and batches, the number completed
+        and the average and maximum time in seconds between first receiving
+        one and passing it to the journal.
+
+        Returns:
+            dict: The completer metrics.
+        """
+        with self._metrics_lock:
+            metrics = {'queue_depth': self._ingestion_queue.qsize()}
+            for kind, plural in (('block', 'blocks'), ('batch', 'batches')):
+                completed = self._completed[kind]
+                metrics[plural + '_completed'] = completed
+                metrics[kind + '_average_latency'] = \
+                    self._total_latency[kind] / completed if completed else 0.0
+                metrics[kind + '_max_latency'] = self._max_latency[kind]
+            return metrics
 
     def get_chain_head(self):
         """Returns the block which is the current head of the chain.
@@ -286,39 +663,44 @@ class Completer(object):
         Returns:
             BlockWrapper: The head of the chain.
         """
-        with self.lock:
-            return self._block_store.chain_head
+        return self._block_store.chain_head
 
     def get_block(self, block_id):
-        with self.lock:
-            if block_id in self.block_cache:
-                return self.block_cache[block_id]
+        # The caches are synchronized, so lookups don't wait on ingestion
+        try:
+            return self.block_cache[block_id]
+        except KeyError:
             return None
 
-    def get_batch(self, batch_id):
-        with self.lock:
-            if batch_id in self.batch_cache:
-                return self.batch_cache[batch_id]
+    def get_block_by_number(self, block_num):
+        """Returns the block in the current chain with a block number, or
+        None if there is no such block.
+        """
+        try:
+            return self._block_store.get_block_by_number(block_num)
+        except KeyError:
+            return None
 
-            else:
-                block_store = self.block_cache.block_store
-                try:
-                    return block_store.get_batch(batch_id)
-                except ValueError:
-                    return None
+    def get_batch(self, batch_id):
+        try:
+            return self.batch_cache[batch_id]
+        except KeyError:
+            block_store = self.block_cache.block_store
+            try:
+                return block_store.get_batch(batch_id)
+            except ValueError:
+                return None
 
     def get_batch_by_transaction(self, transaction_id):
-        with self.lock:
-            if transaction_id in self._seen_txns:
-                batch_id = self._seen_txns[transaction_id]
-                return self.get_batch(batch_id)
-
-            else:
-                block_store = self.block_cache.block_store
-                try:
-                    return block_store.get_batch_by_transaction(transaction_id)
-                except ValueError:
-                    return None
+        try:
+            batch_id = self._seen_txns[transaction_id]
+        except KeyError:
+            block_store = self.block_cache.block_store
+            try:
+                return block_store.get_batch_by_transaction(transaction_id)
+            except ValueError:
+                return None
+        return self.get_batch(batch_id)
 
 
 class CompleterBatchListBroadcastHandler(Handler):
@@ -347,11 +729,11 @@ class CompleterGossipHandler(Handler):
         if gossip_message.content_type == "BLOCK":
             block = Block()
             block.ParseFromString(gossip_message.content)
-            self._completer.add_block(block)
+            self._completer.queue_block(block, connection_id)
         elif gossip_message.content_type == "BATCH":
             batch = Batch()
             batch.ParseFromString(gossip_message.content)
-            self._completer.add_batch(batch)
+            self._completer.queue_batch(batch, connection_id)
         return HandlerResult(
             status=HandlerStatus.PASS)
 
@@ -366,7 +748,7 @@ class CompleterGossipBlockResponseHandler(Handler):
 
         block = Block()
         block.ParseFromString(block_response_message.content)
-        self._completer.add_block(block)
+        self._completer.queue_block(block, connection_id)
 
         return HandlerResult(status=HandlerStatus.PASS)
 
@@ -381,6 +763,27 @@ class CompleterGossipBatchResponseHandler(Handler):
 
         batch = Batch()
         batch.ParseFromString(batch_response_message.content)
-        self._completer.add_batch(batch)
+        self._completer.queue_batch(batch, connection_id)
+
+        return HandlerResult(status=HandlerStatus.PASS)
+
+
+class CompleterGossipBlockRangeResponseHandler(Handler):
+    def __init__(self, completer):
+        self._completer = completer
+
+    def handle(self, connection_id, message_content):
+        range_response_message = network_pb2.GossipBlockRangeResponse()
+        range_response_message.ParseFromString(message_content)
+
+        # The blocks are sent oldest first, so each block's predecessor
+        # has been added before the block itself.
+        blocks = []
+        for content in range_response_message.blocks:
+            block = Block()
+            block.ParseFromString(content)
+            blocks.append(block)
+        self._completer.queue_block_range(
+            blocks, range_response_message.last, connection_id)
 
         return HandlerResult(status=HandlerStatus.PASS)
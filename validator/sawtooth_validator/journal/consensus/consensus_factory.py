@@ -13,6 +13,7 @@
 # limitations under the License.
 # ------------------------------------------------------------------------------
 import importlib
+import threading
 
 from sawtooth_validator.exceptions import UnknownConsensusModuleError
 from sawtooth_validator.journal.block_wrapper import NULL_BLOCK_IDENTIFIER
@@ -23,6 +24,10 @@ class ConsensusFactory(object):
     """ConsensusFactory returns consensus modules by short name.
     """
 
+    # Importing a module that has already been imported still takes the
+    # import lock, which is a noticeable part of the per-block cost
+    _modules = {}
+
     @staticmethod
     def get_consensus_module(module_name):
         """Returns a consensus module by name.
@@ -37,6 +42,10 @@ class ConsensusFactory(object):
             UnknownConsensusModuleError: Raised if the given module_name does
                 not correspond to a consensus implementation.
         """
+        module = ConsensusFactory._modules.get(module_name)
+        if module is not None:
+            return module
+
         module_package = module_name
         if module_name == 'genesis':
             module_package = \
@@ -50,11 +59,14 @@ class ConsensusFactory(object):
             module_package = 'sawtooth_poet.poet_consensus'
 
         try:
-            return importlib.import_module(module_package)
+            module = importlib.import_module(module_package)
         except ImportError:
             raise UnknownConsensusModuleError(
                 'Consensus module "{}" does not exist.'.format(module_name))
 
+        ConsensusFactory._modules[module_name] = module
+        return module
+
     @staticmethod
     def get_configured_consensus_module(block_id, state_view):
         """Returns the consensus_module based on the consensus module set by the
@@ -76,3 +88,93 @@ class ConsensusFactory(object):
             'sawtooth.consensus.algorithm', default_value=default_consensus)
         return ConsensusFactory.get_consensus_module(
             consensus_module_name)
+
+
+class ConsensusInstanceCache(object):
+    """Creates the consensus BlockPublisher, BlockVerifier and ForkResolver
+    objects for consensus modules, keeping them so that they are only
+    created again when the consensus module changes, i.e., when the
+    sawtooth.consensus.algorithm setting changes.  Consensus objects must
+    therefore not keep anything specific to a block between calls, other
+    than a BlockPublisher between initialize_block and finalize_block, and a
+    BlockVerifier and ForkResolver may be called from several threads.
+
+    Args:
+        block_cache (BlockCache): The cache of blocks passed to the consensus
+            objects
+        state_view_factory (StateViewFactory): The factory passed to the
+            consensus objects
+        data_dir (str): The path to where consensus objects may store
+            persistent data
+        validator_id (str): A unique ID for this validator
+        batch_publisher (BatchPublisher, optional): The batch publisher
+            passed to BlockPublisher objects
+    """
+
+    def __init__(self,
+                 block_cache,
+                 state_view_factory,
+                 data_dir,
+                 validator_id,
+                 batch_publisher=None):
+        self._block_cache = block_cache
+        self._state_view_factory = state_view_factory
+        self._data_dir = data_dir
+        self._validator_id = validator_id
+        self._batch_publisher = batch_publisher
+
+        self._lock = threading.Lock()
+        self._instances = {}
+
+    def get_block_publisher(self, consensus_module):
+        """Returns the BlockPublisher for the consensus module.
+        """
+        return self._get_instance(
+            consensus_module,
+            'BlockPublisher',
+            lambda: consensus_module.BlockPublisher(
+                block_cache=self._block_cache,
+                state_view_factory=self._state_view_factory,
+                batch_publisher=self._batch_publisher,
+                data_dir=self._data_dir,
+                validator_id=self._validator_id))
+
+    def get_block_verifier(self, consensus_module):
+        """Returns the BlockVerifier for the consensus module.
+        """
+        return self._get_instance(
+            consensus_module,
+            'BlockVerifier',
+            lambda: consensus_module.BlockVerifier(
+                block_cache=self._block_cache,
+                state_view_factory=self._state_view_factory,
+                data_dir=self._data_dir,
+                validator_id=self._validator_id))
+
+    def get_fork_resolver(self, consensus_module):
+        """Returns the ForkResolver for the consensus module.
+        """
+        return self._get_instance(
+            consensus_module,
+            'ForkResolver',
+            lambda: consensus_module.ForkResolver(
+                block_cache=self._block_cache,
+                state_view_factory=self._state_view_factory,
+                data_dir=self._data_dir,
+                validator_id=self._validator_id))
+
+    def _get_instance(self, consensus_module, kind, create):
+        key = (consensus_module.__name__, kind)
+        with self._lock:
+            instance = self._instances.get(key)
+            if instance is None:
+                # Only the objects of the configured module are kept, the
+                # others are dropped when the configuration changes
+                for other in list(self._instances):
+                    if other[1] == kind:
+                        del self._instances[other]
+
+                instance = create()
+                self._instances[key] = instance
+
+            return instance
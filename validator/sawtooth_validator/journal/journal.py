@@ -60,6 +60,8 @@ class Journal(object):
 
                     if block_cache_purge_time < time.time():
                         self._block_cache.purge_expired()
+                        LOGGER.debug("Block cache statistics: %s",
+                                     self._block_cache.get_stats())
                         block_cache_purge_time = time.time() + \
                             self._block_cache_purge_frequency
 
@@ -125,7 +127,10 @@ class Journal(object):
                  check_publish_block_frequency=0.1,
                  block_cache_purge_frequency=30,
                  block_cache_keep_time=300,
-                 block_cache=None):
+                 block_cache_max_bytes=256 * 1024 * 1024,
+                 block_cache_pinned_window=100,
+                 block_cache=None,
+                 block_validation_threads=3):
         """
         Creates a Journal instance.
 
@@ -149,14 +154,25 @@ class Journal(object):
             purges of the BlockCache.
             block_cache_keep_time (float): time in seconds to hold unaccess
             blocks in the BlockCache.
+            block_cache_max_bytes (int): the total serialized size of the
+            blocks held in the BlockCache, beyond which the least recently
+            used blocks are evicted. None for no limit.
+            block_cache_pinned_window (int): the number of most recent
+            blocks of the current chain which are never evicted from the
+            BlockCache.
             block_cache (:obj:`BlockCache`, optional): A BlockCache to use in
                 place of an internally created instance. Defaults to None.
+            block_validation_threads (int): the number of forks which may be
+            validated at the same time.
         """
         self._block_store = block_store
         self._block_cache = block_cache
         if self._block_cache is None:
             self._block_cache = BlockCache(
-                self._block_store, keep_time=block_cache_keep_time)
+                self._block_store,
+                keep_time=block_cache_keep_time,
+                max_bytes=block_cache_max_bytes,
+                pinned_window=block_cache_pinned_window)
         self._block_cache_purge_frequency = block_cache_purge_frequency
         self._state_view_factory = state_view_factory
 
@@ -176,6 +192,8 @@ class Journal(object):
         self._chain_thread = None
         self._chain_id_manager = chain_id_manager
         self._data_dir = data_dir
+        self._block_validation_threads = block_validation_threads
+        self._block_validation_executor = None
 
     def _init_subprocesses(self):
         self._block_publisher = BlockPublisher(
@@ -194,11 +212,13 @@ class Journal(object):
             batch_queue=self._batch_queue,
             check_publish_block_frequency=self._check_publish_block_frequency
         )
+        self._block_validation_executor = ThreadPoolExecutor(
+            self._block_validation_threads)
         self._chain_controller = ChainController(
             block_sender=self._block_sender,
             block_cache=self._block_cache,
             state_view_factory=self._state_view_factory,
-            executor=ThreadPoolExecutor(1),
+            executor=self._block_validation_executor,
             transaction_executor=self._transaction_executor,
             on_chain_updated=self._block_publisher.on_chain_updated,
             squash_handler=self._squash_handler,
@@ -238,6 +258,10 @@ class Journal(object):
             self._chain_thread.stop()
             self._chain_thread = None
 
+        if self._block_validation_executor is not None:
+            self._block_validation_executor.shutdown(wait=False)
+            self._block_validation_executor = None
+
     def on_block_received(self, block):
         """
         New block has been received, queue it with the chain controller
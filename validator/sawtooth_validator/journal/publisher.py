@@ -25,6 +25,8 @@ from sawtooth_validator.journal.consensus.batch_publisher import \
     BatchPublisher
 from sawtooth_validator.journal.consensus.consensus_factory import \
     ConsensusFactory
+from sawtooth_validator.journal.consensus.consensus_factory import \
+    ConsensusInstanceCache
 
 from sawtooth_validator.journal.transaction_cache import TransactionCache
 
@@ -94,6 +96,13 @@ class BlockPublisher(object):
         self._identity_public_key = \
             signing.generate_pubkey(self._identity_signing_key)
         self._data_dir = data_dir
+        self._consensus_instances = \
+            ConsensusInstanceCache(
+                block_cache=block_cache,
+                state_view_factory=state_view_factory,
+                data_dir=data_dir,
+                validator_id=self._identity_public_key,
+                batch_publisher=self._batch_publisher)
 
     def _build_block(self, chain_head):
         """ Build a candidate block and construct the consensus object to
@@ -109,12 +118,8 @@ class BlockPublisher(object):
             chain_head.header_signature,
             state_view)
 
-        self._consensus = consensus_module.\
-            BlockPublisher(block_cache=self._block_cache,
-                           state_view_factory=self._state_view_factory,
-                           batch_publisher=self._batch_publisher,
-                           data_dir=self._data_dir,
-                           validator_id=self._identity_public_key)
+        self._consensus = \
+            self._consensus_instances.get_block_publisher(consensus_module)
 
         block_header = BlockHeader(
             block_num=chain_head.block_num + 1,
@@ -14,19 +14,50 @@
 # ------------------------------------------------------------------------------
 
 import logging
+import time
+from threading import RLock
 
+from sawtooth_validator.journal.timed_cache import TimedCache
 from sawtooth_validator.networking.dispatch import Handler
 from sawtooth_validator.networking.dispatch import HandlerResult
 from sawtooth_validator.networking.dispatch import HandlerStatus
 from sawtooth_validator.protobuf import network_pb2
+from sawtooth_validator.protobuf.batch_pb2 import Batch
+from sawtooth_validator.protobuf.block_pb2 import Block
 from sawtooth_validator.protobuf import validator_pb2
 
 LOGGER = logging.getLogger(__name__)
 
 
 class Responder(object):
-    def __init__(self, completer):
+    """
+    The Responder answers block and batch requests from peers. Requests it
+    cannot answer are forwarded to the other peers at most once per
+    request_timeout; any further requests for the same id are recorded as
+    pending and answered when the response to the forwarded request arrives.
+    """
+    def __init__(self, completer, cache_keep_time=300,
+                 cache_purge_frequency=30, request_timeout=10,
+                 max_block_range=1000):
+        """
+        :param completer (completer.Completer) Source of blocks and batches
+        :param cache_keep_time (int) The time in seconds to keep pending
+                requests.
+        :param cache_purge_frequency (int) The time between purging the
+                TimedCaches.
+        :param request_timeout (int) The time in seconds after which a
+                forwarded request that has not been answered may be
+                forwarded again.
+        :param max_block_range (int) The maximum number of blocks returned
+                for a single block range request.
+        """
         self.completer = completer
+        self.pending_requests = TimedCache(cache_keep_time)
+        self._request_timeout = request_timeout
+        self._max_block_range = max_block_range
+        self._cache_purge_frequency = cache_purge_frequency
+        self._purge_time = time.time() + self._cache_purge_frequency
+        self._lock = RLock()
 
     def check_for_block(self, block_id):
         # Ask Completer
@@ -36,6 +67,43 @@ class Responder(object):
             block = self.completer.get_block(block_id)
         return block
 
+    def check_for_block_range(self, block_id, stop_block_num, max_blocks):
+        """Returns the blocks of the chain ending at block_id after the block
+        numbered stop_block_num, oldest first. At most max_blocks blocks,
+        capped by max_block_range, are returned, and none if block_id or any
+        block of its fork is unknown.
+
+        The blocks shared with the current chain are read forward by block
+        number, and only the blocks of a fork that block_id is on are found
+        by walking back from it.
+        """
+        block = self.completer.get_block(block_id)
+        fork = []
+        while block is not None and block.block_num > stop_block_num and \
+                not self._is_on_current_chain(block):
+            fork.append(block)
+            block = self.completer.get_block(block.previous_block_id)
+        if block is None:
+            return []
+        fork.reverse()
+
+        max_blocks = min(max_blocks, self._max_block_range)
+        last_block_num = min(block.block_num, stop_block_num + max_blocks)
+        blocks = []
+        for block_num in range(stop_block_num + 1, last_block_num + 1):
+            block = self.completer.get_block_by_number(block_num)
+            if block is None:
+                # The fork no longer follows on from the blocks returned
+                return blocks
+            blocks.append(block)
+        blocks.extend(fork[:max_blocks - len(blocks)])
+        return blocks
+
+    def _is_on_current_chain(self, block):
+        current = self.completer.get_block_by_number(block.block_num)
+        return current is not None and \
+            current.header_signature == block.header_signature
+
     def check_for_batch(self, batch_id):
         batch = self.completer.get_batch(batch_id)
         return batch
@@ -44,6 +112,52 @@ class Responder(object):
         batch = self.completer.get_batch_by_transaction(transaction_id)
         return batch
 
+    def already_requested(self, requested_id):
+        """Returns whether a request for requested_id has been forwarded to
+        peers within the request timeout and is still waiting on a response.
+        """
+        with self._lock:
+            if requested_id not in self.pending_requests:
+                return False
+            requested_at, _ = self.pending_requests[requested_id]
+            return time.time() - requested_at < self._request_timeout
+
+    def add_request(self, requested_id, connection_id):
+        """Records that connection_id is waiting on requested_id. If the
+        request is not already outstanding, the forwarding time is reset.
+        """
+        with self._lock:
+            self._purge_caches()
+            if requested_id in self.pending_requests:
+                requested_at, connection_ids = \
+                    self.pending_requests[requested_id]
+                if not self.already_requested(requested_id):
+                    requested_at = time.time()
+                if connection_id not in connection_ids:
+                    connection_ids = connection_ids + [connection_id]
+            else:
+                requested_at = time.time()
+                connection_ids = [connection_id]
+            self.pending_requests[requested_id] = \
+                (requested_at, connection_ids)
+
+    def get_request(self, requested_id):
+        """Returns the connection ids waiting on requested_id, or None."""
+        with self._lock:
+            if requested_id in self.pending_requests:
+                return self.pending_requests[requested_id][1]
+            return None
+
+    def remove_request(self, requested_id):
+        with self._lock:
+            if requested_id in self.pending_requests:
+                del self.pending_requests[requested_id]
+
+    def _purge_caches(self):
+        if self._purge_time < time.time():
+            self.pending_requests.purge_expired()
+            self._purge_time = time.time() + self._cache_purge_frequency
+
 
 class BlockResponderHandler(Handler):
     def __init__(self, responder, gossip):
@@ -53,13 +167,31 @@ class BlockResponderHandler(Handler):
     def handle(self, connection_id, message_content):
         block_request_message = network_pb2.GossipBlockRequest()
         block_request_message.ParseFromString(message_content)
+        if block_request_message.nonce and \
+                self._gossip.mark_seen(block_request_message.nonce):
+            LOGGER.debug("Drop repeated block request %s from %s",
+                         block_request_message.nonce, connection_id)
+            return HandlerResult(status=HandlerStatus.DROP)
+
         block_id = block_request_message.block_id
         node_id = block_request_message.node_id
         block = self._responder.check_for_block(block_id)
         if block is None:
-            # No block found, broadcast orignal message to other peers
-            self._gossip.broadcast(block_request_message,
-                                   validator_pb2.Message.GOSSIP_BLOCK_REQUEST)
+            if block_id == "HEAD":
+                LOGGER.debug("No chain head available. Cannot respond to "
+                             "block requests.")
+            elif self._responder.already_requested(block_id):
+                LOGGER.debug("Block %s has already been requested",
+                             block_id)
+                self._responder.add_request(block_id, connection_id)
+            elif block_request_message.time_to_live > 0:
+                # No block found, forward the request to the other peers
+                block_request_message.time_to_live -= 1
+                self._responder.add_request(block_id, connection_id)
+                self._gossip.broadcast(
+                    block_request_message,
+                    validator_pb2.Message.GOSSIP_BLOCK_REQUEST,
+                    exclude=[connection_id])
         else:
             LOGGER.debug("Responding to block requests: %s",
                          block.get_block().header_signature)
@@ -75,6 +207,89 @@ class BlockResponderHandler(Handler):
         return HandlerResult(status=HandlerStatus.PASS)
 
 
+class ResponderBlockResponseHandler(Handler):
+    """Sends a block response to every peer whose request for the block was
+    coalesced into a forwarded request.
+    """
+    def __init__(self, responder, gossip):
+        self._responder = responder
+        self._gossip = gossip
+
+    def handle(self, connection_id, message_content):
+        block_response = network_pb2.GossipBlockResponse()
+        block_response.ParseFromString(message_content)
+        block = Block()
+        block.ParseFromString(block_response.content)
+
+        open_request = self._responder.get_request(block.header_signature)
+        if open_request is not None:
+            for connection in open_request:
+                LOGGER.debug("Responding to pending block request: send %s "
+                             "to %s", block.header_signature, connection)
+                try:
+                    self._gossip.send(
+                        validator_pb2.Message.GOSSIP_BLOCK_RESPONSE,
+                        message_content,
+                        connection)
+                except ValueError:
+                    LOGGER.debug("Can't send block response %s to closed "
+                                 "connection %s",
+                                 block.header_signature,
+                                 connection)
+            self._responder.remove_request(block.header_signature)
+
+        return HandlerResult(status=HandlerStatus.PASS)
+
+
+class BlockRangeResponderHandler(Handler):
+    """Answers a block range request with the requested blocks, oldest
+    first, split into chunks so that the requester can start completing the
+    oldest blocks while the rest are still being sent.
+    """
+    def __init__(self, responder, gossip, chunk_size=50):
+        self._responder = responder
+        self._gossip = gossip
+        self._chunk_size = chunk_size
+
+    def handle(self, connection_id, message_content):
+        range_request_message = network_pb2.GossipBlockRangeRequest()
+        range_request_message.ParseFromString(message_content)
+        block_id = range_request_message.block_id
+        blocks = self._responder.check_for_block_range(
+            block_id,
+            range_request_message.stop_block_num,
+            range_request_message.max_blocks)
+
+        LOGGER.debug("Responding to block range request %s with %s blocks",
+                     block_id, len(blocks))
+
+        # Always send at least one chunk, so that the requester learns that
+        # the block was not found.
+        start = 0
+        while True:
+            chunk = blocks[start:start + self._chunk_size]
+            start += self._chunk_size
+            range_response = network_pb2.GossipBlockRangeResponse(
+                block_id=block_id,
+                blocks=[block.get_block().SerializeToString()
+                        for block in chunk],
+                nonce=range_request_message.nonce,
+                last=start >= len(blocks))
+            try:
+                self._gossip.send(
+                    validator_pb2.Message.GOSSIP_BLOCK_RANGE_RESPONSE,
+                    range_response.SerializeToString(),
+                    connection_id)
+            except ValueError:
+                LOGGER.debug("Can't send block range %s to closed "
+                             "connection %s", block_id, connection_id)
+                break
+            if range_response.last:
+                break
+
+        return HandlerResult(status=HandlerStatus.PASS)
+
+
 class BatchByBatchIdResponderHandler(Handler):
     def __init__(self, responder, gossip):
         self._responder = responder
@@ -83,14 +298,29 @@ class BatchByBatchIdResponderHandler(Handler):
     def handle(self, connection_id, message_content):
         batch_request_message = network_pb2.GossipBatchByBatchIdRequest()
         batch_request_message.ParseFromString(message_content)
+        if batch_request_message.nonce and \
+                self._gossip.mark_seen(batch_request_message.nonce):
+            LOGGER.debug("Drop repeated batch request %s from %s",
+                         batch_request_message.nonce, connection_id)
+            return HandlerResult(status=HandlerStatus.DROP)
+
         batch = None
         batch = self._responder.check_for_batch(batch_request_message.id)
         node_id = batch_request_message.node_id
 
         if batch is None:
-            self._gossip.broadcast(
-                batch_request_message,
-                validator_pb2.Message.GOSSIP_BATCH_BY_BATCH_ID_REQUEST)
+            batch_id = batch_request_message.id
+            if self._responder.already_requested(batch_id):
+                LOGGER.debug("Batch %s has already been requested",
+                             batch_id)
+                self._responder.add_request(batch_id, connection_id)
+            elif batch_request_message.time_to_live > 0:
+                batch_request_message.time_to_live -= 1
+                self._responder.add_request(batch_id, connection_id)
+                self._gossip.broadcast(
+                    batch_request_message,
+                    validator_pb2.Message.GOSSIP_BATCH_BY_BATCH_ID_REQUEST,
+                    exclude=[connection_id])
         else:
             LOGGER.debug("Responding to batch requests %s",
                          batch.header_signature)
@@ -114,6 +344,12 @@ class BatchByTransactionIdResponderHandler(Handler):
     def handle(self, connection_id, message_content):
         batch_request_message = network_pb2.GossipBatchByTransactionIdRequest()
         batch_request_message.ParseFromString(message_content)
+        if batch_request_message.nonce and \
+                self._gossip.mark_seen(batch_request_message.nonce):
+            LOGGER.debug("Drop repeated batch request %s from %s",
+                         batch_request_message.nonce, connection_id)
+            return HandlerResult(status=HandlerStatus.DROP)
+
         node_id = batch_request_message.node_id
         batch = None
         batches = []
@@ -132,20 +368,29 @@ class BatchByTransactionIdResponderHandler(Handler):
 
             batch = None
 
-        if batches == []:
-            self._gossip.broadcast(
-                batch_request_message,
-                validator_pb2.Message.
-                GOSSIP_BATCH_BY_TRANSACTION_ID_REQUEST)
-
-        elif unfound_txn_ids != []:
+        # Only forward the transaction ids that are not already the subject
+        # of an outstanding request
+        forward_txn_ids = []
+        for txn_id in unfound_txn_ids:
+            if self._responder.already_requested(txn_id):
+                LOGGER.debug("Transaction %s has already been requested",
+                             txn_id)
+                self._responder.add_request(txn_id, connection_id)
+            elif batch_request_message.time_to_live > 0:
+                forward_txn_ids.append(txn_id)
+                self._responder.add_request(txn_id, connection_id)
+
+        if forward_txn_ids:
             new_request = network_pb2.GossipBatchByTransactionIdRequest()
-            new_request.ids.extend(unfound_txn_ids)
+            new_request.ids.extend(forward_txn_ids)
             new_request.node_id = batch_request_message.node_id
+            new_request.nonce = batch_request_message.nonce
+            new_request.time_to_live = batch_request_message.time_to_live - 1
             self._gossip.broadcast(
                 new_request,
                 validator_pb2.Message.
-                GOSSIP_BATCH_BY_TRANSACTION_ID_REQUEST)
+                GOSSIP_BATCH_BY_TRANSACTION_ID_REQUEST,
+                exclude=[connection_id])
 
         if batches != []:
             for batch in batches:
@@ -161,3 +406,45 @@ class BatchByTransactionIdResponderHandler(Handler):
                                   connection_id)
 
         return HandlerResult(status=HandlerStatus.PASS)
+
+
+class ResponderBatchResponseHandler(Handler):
+    """Sends a batch response to every peer whose request for the batch, or
+    for one of its transactions, was coalesced into a forwarded request.
+    """
+    def __init__(self, responder, gossip):
+        self._responder = responder
+        self._gossip = gossip
+
+    def handle(self, connection_id, message_content):
+        batch_response = network_pb2.GossipBatchResponse()
+        batch_response.ParseFromString(message_content)
+        batch = Batch()
+        batch.ParseFromString(batch_response.content)
+
+        requested_ids = [batch.header_signature] + \
+            [txn.header_signature for txn in batch.transactions]
+        connections = []
+        for requested_id in requested_ids:
+            open_request = self._responder.get_request(requested_id)
+            if open_request is None:
+                continue
+            for connection in open_request:
+                if connection not in connections:
+                    connections.append(connection)
+            self._responder.remove_request(requested_id)
+
+        for connection in connections:
+            LOGGER.debug("Responding to pending batch request: send %s "
+                         "to %s", batch.header_signature, connection)
+            try:
+                self._gossip.send(validator_pb2.Message.GOSSIP_BATCH_RESPONSE,
+                                  message_content,
+                                  connection)
+            except ValueError:
+                LOGGER.debug("Can't send batch response %s to closed "
+                             "connection %s",
+                             batch.header_signature,
+                             connection)
+
+        return HandlerResult(status=HandlerStatus.PASS)
@@ -13,6 +13,7 @@
 # limitations under the License.
 # ------------------------------------------------------------------------------
 # pylint: disable=no-name-in-module
+from collections import OrderedDict
 from collections.abc import MutableMapping
 from threading import RLock
 import time
@@ -22,44 +23,66 @@ class TimedCache(MutableMapping):
     """
     A dict like interface to access blocks. Stores BlockState objects.
 
+    Entries are kept in the order they were last set or accessed, so the
+    expired entries are always at the front. Expiring them costs time in
+    proportion to the number of expired entries, not the size of the cache,
+    and is done incrementally as entries are set. If max_size is given, the
+    least recently used entries are evicted to keep the cache within it.
+
     Accesses are Thread safe.
     """
     class CachedValue(object):
-        def __init__(self, value):
+        __slots__ = ['value', 'timestamp']
+
+        def __init__(self, value, timestamp=None):
             self.value = value
-            self.timestamp = time.time()  # the time this State was created,
-            # used for house keeping, ie when to flush this from the cache.
+            # the time this State was created, used for house keeping, ie
+            # when to flush this from the cache.
+            self.timestamp = time.time() if timestamp is None else timestamp
 
-        def touch(self):
+        def touch(self, timestamp=None):
             """
             Mark this entry as accessed.
             """
-            self.timestamp = time.time()
+            self.timestamp = time.time() if timestamp is None else timestamp
 
-    def __init__(self, keep_time=10):
+    def __init__(self, keep_time=10, max_size=None):
         super(TimedCache, self).__init__()
         self._lock = RLock()
-        self._cache = {}
+        self._cache = OrderedDict()
         self._keep_time = keep_time  # time in seconds before purging blocks
         # from cache.
+        self._max_size = max_size
 
     def __setitem__(self, key, value):
         with self._lock:
-            self._cache[key] = self.CachedValue(value)
+            now = time.time()
+            entry = self._cache.get(key)
+            if entry is None:
+                self._cache[key] = self.CachedValue(value, now)
+            else:
+                entry.value = value
+                entry.touch(now)
+                self._cache.move_to_end(key)
+            self._expire(now - self._keep_time)
+            if self._max_size is not None:
+                while len(self._cache) > self._max_size:
+                    self._remove(next(iter(self._cache)))
 
     def __getitem__(self, key):
         with self._lock:
             value = self._cache[key]
             value.touch()
+            self._cache.move_to_end(key)
             return value.value
 
     def __delitem__(self, key):
         with self._lock:
-            del self._cache[key]
+            self._remove(key)
 
     def __iter__(self):
         with self._lock:
-            return iter(self._cache)
+            return iter(list(self._cache))
 
     def __len__(self):
         with self._lock:
@@ -80,14 +103,28 @@ class TimedCache(MutableMapping):
     def keep_time(self):
         return self._keep_time
 
+    @property
+    def max_size(self):
+        return self._max_size
+
+    def _remove(self, key):
+        """Removes key from the cache. Every removal, whether deleted,
+        expired or evicted, goes through this method.
+        """
+        del self._cache[key]
+
+    def _expire(self, time_horizon):
+        # The entries are ordered by timestamp, so stop at the first one
+        # that has not expired.
+        while self._cache:
+            key, entry = next(iter(self._cache.items()))
+            if entry.timestamp > time_horizon:
+                break
+            self._remove(key)
+
     def purge_expired(self):
         """
         Remove all expired entries from the cache.
         """
         with self._lock:
-            time_horizon = time.time() - self._keep_time
-            new_cache = {}
-            for (k, v) in self._cache.items():
-                if v.timestamp > time_horizon:
-                    new_cache[k] = v
-            self._cache = new_cache
+            self._expire(time.time() - self._keep_time)
@@ -13,6 +13,7 @@
 # limitations under the License.
 # ------------------------------------------------------------------------------
 import abc
+from concurrent.futures import Future
 import enum
 from functools import partial
 import logging
@@ -110,35 +111,54 @@ class Dispatcher(Thread):
         try:
             handler_manager = next(collection)
             future = handler_manager.execute(connection_id, message.content)
-            future.add_done_callback(partial(self._determine_next, message_id))
+            future.add_done_callback(
+                partial(self._determine_next, message_id,
+                        handler_manager.handler))
         except IndexError:
             # IndexError is raised if done with handlers
             with self._condition:
                 del self._message_information[message_id]
 
-    def _determine_next(self, message_id, future):
-        if future.result().status == HandlerStatus.DROP:
+    def _determine_next(self, message_id, handler, future):
+        try:
+            result = future.result()
+        # pylint: disable=broad-except
+        except Exception as exc:
+            LOGGER.exception("Unhandled exception while handling message: "
+                             "%s", exc)
+            result = handler.internal_error_result()
+            if result is None:
+                result = HandlerResult(status=HandlerStatus.DROP)
+
+        if isinstance(result, Future):
+            # The handler will complete asynchronously, without holding an
+            # executor thread while it waits.
+            result.add_done_callback(
+                partial(self._determine_next, message_id, handler))
+            return
+
+        if result.status == HandlerStatus.DROP:
             with self._condition:
                 del self._message_information[message_id]
 
-        elif future.result().status == HandlerStatus.PASS:
+        elif result.status == HandlerStatus.PASS:
             self._process(message_id)
 
-        elif future.result().status == HandlerStatus.RETURN_AND_PASS:
+        elif result.status == HandlerStatus.RETURN_AND_PASS:
             with self._condition:
                 connection, connection_id, \
                     original_message, _ = self._message_information[message_id]
 
             message = validator_pb2.Message(
-                content=future.result().message_out.SerializeToString(),
+                content=result.message_out.SerializeToString(),
                 correlation_id=original_message.correlation_id,
-                message_type=future.result().message_type)
+                message_type=result.message_type)
 
             self._send_message[connection](msg=message,
                                            connection_id=connection_id)
             self._process(message_id)
 
-        elif future.result().status == HandlerStatus.RETURN:
+        elif result.status == HandlerStatus.RETURN:
             with self._condition:
                 connection, connection_id,  \
                     original_message, _ = self._message_information[message_id]
@@ -146,9 +166,9 @@ class Dispatcher(Thread):
                 del self._message_information[message_id]
 
             message = validator_pb2.Message(
-                content=future.result().message_out.SerializeToString(),
+                content=result.message_out.SerializeToString(),
                 correlation_id=original_message.correlation_id,
-                message_type=future.result().message_type)
+                message_type=result.message_type)
             self._send_message[connection](msg=message,
                                            connection_id=connection_id)
         with self._condition:
@@ -183,6 +203,10 @@ class _HandlerManager(object):
         self._executor = executor
         self._handler = handler
 
+    @property
+    def handler(self):
+        return self._handler
+
     def execute(self, connection_id, message):
         return self._executor.submit(
             self._handler.handle, connection_id, message)
@@ -233,6 +257,17 @@ class Handler(object, metaclass=abc.ABCMeta):
                                 into a protobuf python class
         :return HandlerResult: The status of the handling
                                 and optionally the message
-                                and message_type to send out
+                                and message_type to send out,
+                                or a concurrent.futures.Future
+                                that will be resolved with one
         """
         raise NotImplementedError()
+
+    def internal_error_result(self):
+        """
+
+        :return HandlerResult: The result to send back if handling a
+                                message raises an exception, or None
+                                to drop the message
+        """
+        return None
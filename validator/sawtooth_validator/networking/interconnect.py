@@ -16,10 +16,12 @@
 import asyncio
 from functools import partial
 import hashlib
+import heapq
 import logging
 import queue
 import sys
 from threading import Condition
+from threading import RLock
 from threading import Thread
 import time
 import uuid
@@ -51,6 +53,78 @@ ConnectionInfo = namedtuple('ConnectionInfo',
                             ['connection_type', 'connection', 'uri'])
 
 
+class _ConnectionTable(object):
+    """A map of connection ids to ConnectionInfo, shared by the
+    send/receive threads that add and remove connections and the handler
+    threads that look connections up. All access is synchronized, and the
+    number of connections of each ConnectionType is kept up to date so that
+    limits can be checked without scanning the table.
+    """
+    def __init__(self):
+        self._lock = RLock()
+        self._connections = {}
+        self._counts = {connection_type: 0
+                        for connection_type in ConnectionType}
+
+    def __contains__(self, connection_id):
+        with self._lock:
+            return connection_id in self._connections
+
+    def __getitem__(self, connection_id):
+        with self._lock:
+            return self._connections[connection_id]
+
+    def __setitem__(self, connection_id, connection_info):
+        with self._lock:
+            previous = self._connections.get(connection_id)
+            if previous is not None:
+                self._counts[previous.connection_type] -= 1
+            self._connections[connection_id] = connection_info
+            self._counts[connection_info.connection_type] += 1
+
+    def __delitem__(self, connection_id):
+        with self._lock:
+            connection_info = self._connections.pop(connection_id)
+            self._counts[connection_info.connection_type] -= 1
+
+    def __len__(self):
+        with self._lock:
+            return len(self._connections)
+
+    def __iter__(self):
+        # Iterate over a copy, so that connections may be added or removed
+        # by other threads while iterating.
+        with self._lock:
+            return iter(list(self._connections))
+
+    def get(self, connection_id, default=None):
+        with self._lock:
+            return self._connections.get(connection_id, default)
+
+    def add_if_absent(self, connection_id, connection_info):
+        """Adds the connection unless a connection with the same id is
+        already in the table.
+
+        Returns:
+            bool: True if the connection was added.
+        """
+        with self._lock:
+            if connection_id in self._connections:
+                return False
+            self[connection_id] = connection_info
+            return True
+
+    def discard(self, connection_id):
+        with self._lock:
+            if connection_id in self._connections:
+                del self[connection_id]
+
+    def count(self, connection_type):
+        """Returns the number of connections of connection_type."""
+        with self._lock:
+            return self._counts[connection_type]
+
+
 def _generate_id():
     return uuid.uuid4().hex.encode()
 
@@ -77,8 +151,8 @@ class _SendReceive(object):
                 in the dispatcher for transmitting responses.
             futures (future.FutureCollection): A Map of correlation ids to
                 futures
-            connections (dict): A dictionary that uses a sha512 hash as
-                the keys and either an OutboundConnection or string
+            connections (_ConnectionTable): A table that uses a sha512 hash
+                as the keys and either an OutboundConnection or string
                 identity as values.
             zmq_identity (bytes): Used to identify the dealer socket
             address (str): The endpoint to bind or connect to.
@@ -124,6 +198,16 @@ class _SendReceive(object):
         # for inbound connections to our zmq.ROUTER socket.
         self._last_message_times = {}
 
+        # A heap of (check time, zmq identity), ordered by the time at
+        # which each inbound connection is next due to be checked for
+        # inactivity. Only the identities that are due are visited on
+        # each heartbeat, instead of every connected identity.
+        self._heartbeat_schedule = []
+        # The check time currently scheduled for each zmq identity. Heap
+        # entries with any other check time are stale, as when an identity
+        # has been removed and has reconnected, and are skipped.
+        self._heartbeat_deadlines = {}
+
         self._connections = connections
         self._identities_to_connection_ids = {}
 
@@ -131,8 +215,10 @@ class _SendReceive(object):
     def connection(self):
         return self._connection
 
-    def _is_connection_lost(self, last_timestamp):
-        return (time.time() - last_timestamp >
+    def _is_connection_lost(self, last_timestamp, now=None):
+        if now is None:
+            now = time.time()
+        return (now - last_timestamp >
                 self._connection_timeout)
 
     def _identity_to_connection_id(self, zmq_identity):
@@ -151,27 +237,16 @@ class _SendReceive(object):
 
         while True:
             if self._socket.getsockopt(zmq.TYPE) == zmq.ROUTER:
-                expired = [ident for ident in self._last_message_times
-                           if time.time() - self._last_message_times[ident] >
-                           self._heartbeat_interval]
-                for zmq_identity in expired:
-                    if self._is_connection_lost(
-                            self._last_message_times[zmq_identity]):
-                        LOGGER.debug("No response from %s in %s seconds"
-                                     " - removing connection.",
-                                     zmq_identity,
-                                     self._connection_timeout)
-                        self._remove_connected_identity(zmq_identity)
-                    else:
-                        message = validator_pb2.Message(
-                            correlation_id=_generate_id(),
-                            content=ping.SerializeToString(),
-                            message_type=validator_pb2.Message.NETWORK_PING)
-                        fut = future.Future(message.correlation_id,
-                                            message.content,
-                                            has_callback=False)
-                        self._futures.put(fut)
-                        yield from self._send_message(zmq_identity, message)
+                for zmq_identity in self._check_inbound_heartbeats():
+                    message = validator_pb2.Message(
+                        correlation_id=_generate_id(),
+                        content=ping.SerializeToString(),
+                        message_type=validator_pb2.Message.NETWORK_PING)
+                    fut = future.Future(message.correlation_id,
+                                        message.content,
+                                        has_callback=False)
+                    self._futures.put(fut)
+                    yield from self._send_message(zmq_identity, message)
             elif self._socket.getsockopt(zmq.TYPE) == zmq.DEALER:
                 if self._last_message_time:
                     if self._is_connection_lost(self._last_message_time):
@@ -182,23 +257,69 @@ class _SendReceive(object):
                         yield from self._stop()
             yield from asyncio.sleep(self._heartbeat_interval)
 
+    def _check_inbound_heartbeats(self, now=None):
+        """Removes the inbound connections that have timed out and returns
+        the zmq identities of the connections that have been quiet for
+        longer than the heartbeat interval, which should be pinged.
+        """
+        if now is None:
+            now = time.time()
+        to_ping = []
+        while self._heartbeat_schedule and \
+                self._heartbeat_schedule[0][0] <= now:
+            deadline, zmq_identity = heapq.heappop(self._heartbeat_schedule)
+            if self._heartbeat_deadlines.get(zmq_identity) != deadline:
+                continue
+            del self._heartbeat_deadlines[zmq_identity]
+            last_message_time = self._last_message_times.get(zmq_identity)
+            if last_message_time is None:
+                # The connection has already been removed
+                continue
+
+            if now - last_message_time <= self._heartbeat_interval:
+                # A message was received since this check was scheduled
+                self._schedule_heartbeat(
+                    zmq_identity,
+                    last_message_time + self._heartbeat_interval)
+            elif self._is_connection_lost(last_message_time, now):
+                LOGGER.debug("No response from %s in %s seconds"
+                             " - removing connection.",
+                             zmq_identity,
+                             self._connection_timeout)
+                self._remove_connected_identity(zmq_identity)
+            else:
+                to_ping.append(zmq_identity)
+                self._schedule_heartbeat(
+                    zmq_identity, now + self._heartbeat_interval)
+        return to_ping
+
+    def _schedule_heartbeat(self, zmq_identity, deadline):
+        self._heartbeat_deadlines[zmq_identity] = deadline
+        heapq.heappush(self._heartbeat_schedule, (deadline, zmq_identity))
+
     def _remove_connected_identity(self, zmq_identity):
+        connection_id = self._identity_to_connection_id(zmq_identity)
         if zmq_identity in self._last_message_times:
             del self._last_message_times[zmq_identity]
         if zmq_identity in self._identities_to_connection_ids:
             del self._identities_to_connection_ids[zmq_identity]
+        if zmq_identity in self._heartbeat_deadlines:
+            del self._heartbeat_deadlines[zmq_identity]
+        self._connections.discard(connection_id)
+
+    def _received_from_identity(self, zmq_identity, now=None):
+        if now is None:
+            now = time.time()
+        if zmq_identity not in self._heartbeat_deadlines:
+            self._schedule_heartbeat(zmq_identity,
+                                     now + self._heartbeat_interval)
+        self._last_message_times[zmq_identity] = now
         connection_id = self._identity_to_connection_id(zmq_identity)
-        if connection_id in self._connections:
-            del self._connections[connection_id]
-
-    def _received_from_identity(self, zmq_identity):
-        self._last_message_times[zmq_identity] = time.time()
-        connection_id = self._identity_to_connection_id(zmq_identity)
-        if connection_id not in self._connections:
-            self._connections[connection_id] = \
-                ConnectionInfo(ConnectionType.ZMQ_IDENTITY,
-                               zmq_identity,
-                               None)
+        self._connections.add_if_absent(
+            connection_id,
+            ConnectionInfo(ConnectionType.ZMQ_IDENTITY,
+                           zmq_identity,
+                           None))
 
     @asyncio.coroutine
     def _receive_message(self):
@@ -270,8 +391,8 @@ class _SendReceive(object):
         """
         zmq_identity = None
         if connection_id is not None and self._connections is not None:
-            if connection_id in self._connections:
-                connection_info = self._connections.get(connection_id)
+            connection_info = self._connections.get(connection_id)
+            if connection_info is not None:
                 if connection_info.connection_type == \
                         ConnectionType.ZMQ_IDENTITY:
                     zmq_identity = connection_info.connection
@@ -420,7 +541,8 @@ class Interconnect(object):
                  heartbeat=False,
                  public_uri=None,
                  connection_timeout=60,
-                 max_incoming_connections=100):
+                 max_incoming_connections=100,
+                 heartbeat_interval=10):
         """
         Constructor for Interconnect.
 
@@ -434,6 +556,13 @@ class Interconnect(object):
                 server_public_key used by the server socket to sign
                 messages are part of the zmq auth handshake.
             heartbeat (bool): Whether or not to send ping messages.
+            connection_timeout (int): Number of seconds after which a
+                connection is considered timed out.
+            max_incoming_connections (int): The maximum number of inbound
+                connections to accept. Outbound connections are not counted
+                against this limit.
+            heartbeat_interval (int): Number of seconds between ping
+                messages on an otherwise quiet connection.
         """
         self._endpoint = endpoint
         self._public_uri = public_uri
@@ -445,7 +574,7 @@ class Interconnect(object):
         self._server_private_key = server_private_key
         self._heartbeat = heartbeat
         self._connection_timeout = connection_timeout
-        self._connections = {}
+        self._connections = _ConnectionTable()
         self.outbound_connections = {}
         self._max_incoming_connections = max_incoming_connections
 
@@ -459,6 +588,7 @@ class Interconnect(object):
             server_public_key=server_public_key,
             server_private_key=server_private_key,
             heartbeat=heartbeat,
+            heartbeat_interval=heartbeat_interval,
             connection_timeout=connection_timeout)
 
         self._thread = None
@@ -470,15 +600,30 @@ class Interconnect(object):
         Returns:
             bool
         """
+        # The connection being considered is already in the table
+        inbound_connections = \
+            self._connections.count(ConnectionType.ZMQ_IDENTITY)
         LOGGER.debug("Determining whether inbound connection should "
-                     "be allowed. num connections: %s max %s",
-                     len(self._connections),
+                     "be allowed. num inbound connections: %s max %s",
+                     inbound_connections,
                      self._max_incoming_connections)
-        if len(self._connections) > self._max_incoming_connections:
+        if inbound_connections > self._max_incoming_connections:
             return False
         else:
             return True
 
+    def connection_count(self, connection_type=None):
+        """Returns the number of connections of connection_type, or of
+        all connections if connection_type is None.
+
+        Args:
+            connection_type (ConnectionType): The type of connection to
+                count.
+        """
+        if connection_type is None:
+            return len(self._connections)
+        return self._connections.count(connection_type)
+
     def add_outbound_connection(self, uri,
                                 success_callback=None,
                                 failure_callback=None):
@@ -547,10 +692,10 @@ class Interconnect(object):
         :param data: bytes serialized protobuf
         :return: future.Future
         """
-        if connection_id not in self._connections:
+        connection_info = self._connections.get(connection_id)
+        if connection_info is None:
             raise ValueError("Unknown connection id: %s",
                              connection_id)
-        connection_info = self._connections.get(connection_id)
         if connection_info.connection_type == \
                 ConnectionType.ZMQ_IDENTITY:
             message = validator_pb2.Message(
@@ -607,8 +752,9 @@ class Interconnect(object):
                 reachable endpoint.
         """
         for connection_id in self._connections:
-            connection_info = self._connections[connection_id]
-            if connection_info.uri == endpoint:
+            connection_info = self._connections.get(connection_id)
+            if connection_info is not None and \
+                    connection_info.uri == endpoint:
                 return connection_id
         raise KeyError()
 
@@ -623,8 +769,8 @@ class Interconnect(object):
             endpoint (str): A zmq-style uri which identifies a publically
                 reachable endpoint.
         """
-        if connection_id in self._connections:
-            connection_info = self._connections[connection_id]
+        connection_info = self._connections.get(connection_id)
+        if connection_info is not None:
             self._connections[connection_id] = \
                 ConnectionInfo(connection_info.connection_type,
                                connection_info.connection,
@@ -637,17 +783,14 @@ class Interconnect(object):
                          connection_id)
 
     def _add_connection(self, connection, uri=None):
-        connection_id = connection.connection_id
-        if connection_id not in self._connections:
-            self._connections[connection_id] = \
-                ConnectionInfo(ConnectionType.OUTBOUND_CONNECTION,
-                               connection,
-                               uri)
+        self._connections.add_if_absent(
+            connection.connection_id,
+            ConnectionInfo(ConnectionType.OUTBOUND_CONNECTION,
+                           connection,
+                           uri))
 
     def _remove_connection(self, connection):
-        connection_id = connection.connection_id
-        if connection_id in self._connections:
-            del self._connections[connection_id]
+        self._connections.discard(connection.connection_id)
 
 
 class OutboundConnection(object):
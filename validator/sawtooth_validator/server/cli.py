@@ -83,6 +83,14 @@ def parse_args(args):
                              'parameters',
                         action='append',
                         type=str)
+    parser.add_argument('--compact-block-relay',
+                        help='Broadcast new blocks with only their headers, '
+                             'leaving peers to rebuild them from batches '
+                             'they have already received. Batches are only '
+                             'kept for a short time, so this is best suited '
+                             'to networks where blocks are published soon '
+                             'after their batches are broadcast',
+                        action='store_true')
     parser.add_argument('-v', '--verbose',
                         action='count',
                         default=0,
@@ -207,7 +215,8 @@ def main(args=sys.argv[1:]):
                           opts.join,
                           opts.peers,
                           path_config.data_dir,
-                          identity_signing_key)
+                          identity_signing_key,
+                          compact_block_relay=opts.compact_block_relay)
 
     # pylint: disable=broad-except
     try:
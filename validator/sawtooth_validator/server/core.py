@@ -34,6 +34,8 @@ from sawtooth_validator.journal.block_store import BlockStore
 from sawtooth_validator.journal.completer import CompleterGossipHandler
 from sawtooth_validator.journal.completer import \
     CompleterGossipBlockResponseHandler
+from sawtooth_validator.journal.completer import \
+    CompleterGossipBlockRangeResponseHandler
 from sawtooth_validator.journal.completer import \
     CompleterGossipBatchResponseHandler
 from sawtooth_validator.journal.completer import \
@@ -41,9 +43,14 @@ from sawtooth_validator.journal.completer import \
 from sawtooth_validator.journal.completer import Completer
 from sawtooth_validator.journal.responder import Responder
 from sawtooth_validator.journal.responder import BlockResponderHandler
+from sawtooth_validator.journal.responder import BlockRangeResponderHandler
 from sawtooth_validator.journal.responder import BatchByBatchIdResponderHandler
 from sawtooth_validator.journal.responder import \
     BatchByTransactionIdResponderHandler
+from sawtooth_validator.journal.responder import \
+    ResponderBlockResponseHandler
+from sawtooth_validator.journal.responder import \
+    ResponderBatchResponseHandler
 from sawtooth_validator.networking.dispatch import Dispatcher
 from sawtooth_validator.journal.chain_id_manager import ChainIdManager
 from sawtooth_validator.execution.executor import TransactionExecutor
@@ -54,10 +61,13 @@ from sawtooth_validator.state.state_view import StateViewFactory
 from sawtooth_validator.gossip import signature_verifier
 from sawtooth_validator.networking.interconnect import Interconnect
 from sawtooth_validator.gossip.gossip import Gossip
+from sawtooth_validator.gossip.fetch_manager import FetchManager
 from sawtooth_validator.gossip.gossip_handlers import GossipBroadcastHandler
 from sawtooth_validator.gossip.gossip_handlers import GossipMessageHandler
 from sawtooth_validator.gossip.gossip_handlers import \
     GossipBlockResponseHandler
+from sawtooth_validator.gossip.gossip_handlers import \
+    GossipBlockRangeResponseHandler
 from sawtooth_validator.gossip.gossip_handlers import \
     GossipBatchResponseHandler
 from sawtooth_validator.gossip.gossip_handlers import PeerRegisterHandler
@@ -75,7 +85,7 @@ LOGGER = logging.getLogger(__name__)
 class Validator(object):
     def __init__(self, network_endpoint, component_endpoint, public_uri,
                  peering, join_list, peer_list, data_dir,
-                 identity_signing_key):
+                 identity_signing_key, compact_block_relay=False):
         """Constructs a validator instance.
 
         Args:
@@ -98,6 +108,8 @@ class Validator(object):
             peer_list (list of str): a list of peer addresses
             data_dir (str): path to the data directory
             key_dir (str): path to the key directory
+            compact_block_relay (bool): If True, new blocks are broadcast
+                with only their headers instead of their batches.
         """
         db_filename = os.path.join(data_dir,
                                    'merkle-{}.lmdb'.format(
@@ -136,7 +148,7 @@ class Validator(object):
         executor = TransactionExecutor(service=self._service,
                                        context_manager=context_manager,
                                        config_view_factory=ConfigViewFactory(
-                                           StateViewFactory(merkle_db)))
+                                           state_view_factory))
         self._executor = executor
 
         zmq_identity = hashlib.sha512(
@@ -174,9 +186,14 @@ class Validator(object):
                               initial_peer_endpoints=peer_list,
                               minimum_peer_connectivity=3,
                               maximum_peer_connectivity=10,
-                              topology_check_frequency=1)
+                              topology_check_frequency=1,
+                              compact_block_relay=compact_block_relay)
 
-        completer = Completer(block_store, self._gossip)
+        self._fetch_manager = FetchManager(self._gossip)
+
+        completer = Completer(block_store, self._gossip,
+                              fetch_manager=self._fetch_manager)
+        self._completer = completer
 
         block_sender = BroadcastBlockSender(completer, self._gossip)
         batch_sender = BroadcastBatchSender(completer, self._gossip)
@@ -184,7 +201,7 @@ class Validator(object):
         # Create and configure journal
         self._journal = Journal(
             block_store=block_store,
-            state_view_factory=StateViewFactory(merkle_db),
+            state_view_factory=state_view_factory,
             block_sender=block_sender,
             batch_sender=batch_sender,
             transaction_executor=executor,
@@ -288,7 +305,8 @@ class Validator(object):
         # to the sending of the message to the completer, as this step
         # relies on whether the  gossip message has previously been
         # seen by the validator to determine whether or not forwarding
-        # should occur
+        # should occur. Messages that have already been seen are dropped
+        # here.
         self._network_dispatcher.add_handler(
             validator_pb2.Message.GOSSIP_MESSAGE,
             GossipBroadcastHandler(
@@ -320,13 +338,44 @@ class Validator(object):
             signature_verifier.GossipBlockResponseSignatureVerifier(),
             process_pool)
 
-        # GOSSIP_BLOCK_RESPONSE 3) Send message to completer
+        # GOSSIP_BLOCK_RESPONSE 3) Answers any pending requests for the
+        # block that were coalesced into a forwarded request
+        self._network_dispatcher.add_handler(
+            validator_pb2.Message.GOSSIP_BLOCK_RESPONSE,
+            ResponderBlockResponseHandler(responder, self._gossip),
+            network_thread_pool)
+
+        # GOSSIP_BLOCK_RESPONSE 4) Send message to completer
         self._network_dispatcher.add_handler(
             validator_pb2.Message.GOSSIP_BLOCK_RESPONSE,
             CompleterGossipBlockResponseHandler(
                 completer),
             network_thread_pool)
 
+        self._network_dispatcher.add_handler(
+            validator_pb2.Message.GOSSIP_BLOCK_RANGE_REQUEST,
+            BlockRangeResponderHandler(responder, self._gossip),
+            network_thread_pool)
+
+        # GOSSIP_BLOCK_RANGE_RESPONSE 1) Sends ack to the sender
+        self._network_dispatcher.add_handler(
+            validator_pb2.Message.GOSSIP_BLOCK_RANGE_RESPONSE,
+            GossipBlockRangeResponseHandler(),
+            network_thread_pool)
+
+        # GOSSIP_BLOCK_RANGE_RESPONSE 2) Verifies signatures
+        self._network_dispatcher.add_handler(
+            validator_pb2.Message.GOSSIP_BLOCK_RANGE_RESPONSE,
+            signature_verifier.GossipBlockRangeResponseSignatureVerifier(),
+            process_pool)
+
+        # GOSSIP_BLOCK_RANGE_RESPONSE 3) Send blocks to completer
+        self._network_dispatcher.add_handler(
+            validator_pb2.Message.GOSSIP_BLOCK_RANGE_RESPONSE,
+            CompleterGossipBlockRangeResponseHandler(
+                completer),
+            network_thread_pool)
+
         self._network_dispatcher.add_handler(
             validator_pb2.Message.GOSSIP_BATCH_BY_BATCH_ID_REQUEST,
             BatchByBatchIdResponderHandler(responder, self._gossip),
@@ -349,7 +398,14 @@ class Validator(object):
             signature_verifier.GossipBatchResponseSignatureVerifier(),
             process_pool)
 
-        # GOSSIP_BATCH_RESPONSE 3) Send message to completer
+        # GOSSIP_BATCH_RESPONSE 3) Answers any pending requests for the
+        # batch that were coalesced into a forwarded request
+        self._network_dispatcher.add_handler(
+            validator_pb2.Message.GOSSIP_BATCH_RESPONSE,
+            ResponderBatchResponseHandler(responder, self._gossip),
+            network_thread_pool)
+
+        # GOSSIP_BATCH_RESPONSE 4) Send message to completer
         self._network_dispatcher.add_handler(
             validator_pb2.Message.GOSSIP_BATCH_RESPONSE,
             CompleterGossipBatchResponseHandler(
@@ -384,14 +440,14 @@ class Validator(object):
         self._dispatcher.add_handler(
             validator_pb2.Message.CLIENT_STATE_LIST_REQUEST,
             client_handlers.StateListRequest(
-                merkle_db,
+                state_view_factory,
                 self._journal.get_block_store()),
             thread_pool)
 
         self._dispatcher.add_handler(
             validator_pb2.Message.CLIENT_STATE_GET_REQUEST,
             client_handlers.StateGetRequest(
-                merkle_db,
+                state_view_factory,
                 self._journal.get_block_store()),
             thread_pool)
 
@@ -445,6 +501,8 @@ class Validator(object):
         self._network.start()
 
         self._gossip.start()
+        self._fetch_manager.start()
+        self._completer.start()
         self._journal.start()
 
         signal_event = threading.Event()
@@ -458,6 +516,8 @@ class Validator(object):
 
     def stop(self):
         self._gossip.stop()
+        self._fetch_manager.stop()
+        self._completer.stop()
         self._network.stop()
 
         self._service.stop()
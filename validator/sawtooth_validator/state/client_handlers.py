@@ -14,12 +14,13 @@
 # ------------------------------------------------------------------------------
 
 import abc
+from concurrent.futures import Future
+from itertools import islice
 import logging
 # pylint: disable=import-error,no-name-in-module
 # needed for google.protobuf import
 from google.protobuf.message import DecodeError
 
-from sawtooth_validator.state.merkle import MerkleDatabase
 from sawtooth_validator.networking.dispatch import Handler
 from sawtooth_validator.networking.dispatch import HandlerResult
 from sawtooth_validator.networking.dispatch import HandlerStatus
@@ -60,7 +61,8 @@ class _ClientRequestHandler(Handler, metaclass=abc.ABCMeta):
         request_proto (class): Protobuf class of the request to be handled
         response_proto (class): Protobuf class of the response to be sent
         response_type (enum): Message status of the response
-        tree (MerkleDatabase, optional): State tree to be queried
+        state_view_factory (StateViewFactory, optional): Creates views of
+            the state tree to be queried
         block_store (BlockStoreAdapter, optional): Block chain to be queried
         batch_cache (TimedCache, optional): A cache of Batches being processed
 
@@ -69,13 +71,13 @@ class _ClientRequestHandler(Handler, metaclass=abc.ABCMeta):
     """
 
     def __init__(self, request_proto, response_proto, response_type,
-                 tree=None, block_store=None, batch_cache=None):
+                 state_view_factory=None, block_store=None, batch_cache=None):
         self._request_proto = request_proto
         self._response_proto = response_proto
         self._response_type = response_type
         self._status = response_proto
 
-        self._tree = tree
+        self._state_view_factory = state_view_factory
         self._block_store = block_store
         self._batch_cache = batch_cache
 
@@ -101,8 +103,16 @@ class _ClientRequestHandler(Handler, metaclass=abc.ABCMeta):
         except _ResponseFailed as e:
             response = e.status
 
+        if isinstance(response, Future):
+            return self._wrap_deferred_result(response)
         return self._wrap_result(response)
 
+    def internal_error_result(self):
+        """Wraps an INTERNAL_ERROR response, sent back to the client if
+        handling its request raises an exception.
+        """
+        return self._wrap_result(self._status.INTERNAL_ERROR)
+
     @abc.abstractmethod
     def _respond(self, request):
         """This method must be implemented by each child to build its response.
@@ -112,7 +122,8 @@ class _ClientRequestHandler(Handler, metaclass=abc.ABCMeta):
 
         Returns:
             enum: An enum status, or...
-            dict: A dict of attributes for the response protobuf
+            dict: A dict of attributes for the response protobuf, or...
+            Future: A Future which will be resolved with either of the above
         """
         raise NotImplementedError('Client Handler must have _respond method')
 
@@ -131,6 +142,64 @@ class _ClientRequestHandler(Handler, metaclass=abc.ABCMeta):
             message_out=self._response_proto(**response),
             message_type=self._response_type)
 
+    def _wrap_deferred_result(self, deferred_response):
+        """Wraps a response that will be completed later in a Future, which
+        the dispatcher will wait on without holding a thread.
+
+        Args:
+            deferred_response (Future): Will be resolved with either an
+                integer status enum, or a dict of response attributes.
+
+        Returns:
+            Future: Resolved with the HandlerResult to be sent to the client
+        """
+        deferred_result = Future()
+
+        def wrap(future):
+            try:
+                deferred_result.set_result(self._wrap_result(future.result()))
+            # pylint: disable=broad-except
+            except Exception as exc:
+                LOGGER.exception(exc)
+                deferred_result.set_result(
+                    self._wrap_result(self._status.INTERNAL_ERROR))
+
+        deferred_response.add_done_callback(wrap)
+        return deferred_result
+
+    def _wait_for_commits(self, batch_ids, timeout, respond):
+        """Defers a response until a set of batches have been committed, or
+        the timeout has passed, without blocking the calling thread.
+
+        Note:
+            This method will fail without a `_block_store`
+
+        Args:
+            batch_ids (list of str): The ids of the batches to wait for
+            timeout (int): The maximum time to wait in seconds
+            respond (function): Called to build the response once done
+
+        Returns:
+            Future: Resolved with the result of respond
+        """
+        deferred_response = Future()
+
+        def on_done(_):
+            try:
+                deferred_response.set_result(respond())
+            except _ResponseFailed as e:
+                deferred_response.set_result(e.status)
+            # pylint: disable=broad-except
+            except Exception as exc:
+                deferred_response.set_exception(exc)
+
+        if not batch_ids:
+            on_done(True)
+        else:
+            self._block_store.subscribe_to_batch_commits(
+                on_done, batch_ids=batch_ids, timeout=timeout)
+        return deferred_response
+
     def _wrap_response(self, status=None, **kwargs):
         """Convenience method to wrap a status with any key word args.
 
@@ -172,21 +241,24 @@ class _ClientRequestHandler(Handler, metaclass=abc.ABCMeta):
             LOGGER.debug('Unable to get chain head from block store')
             raise _ResponseFailed(self._status.NOT_READY)
 
-    def _set_root(self, request):
-        """Sets the root of the merkle tree, returning any head id used.
+    def _get_state_view(self, request):
+        """Creates a view of the state tree at the requested root. Each
+        request gets its own view, so concurrent requests at different roots
+        don't interfere with each other.
 
         Note:
-            This method will fail if `_tree` has not been set
+            This method will fail if `_state_view_factory` has not been set
 
         Args:
             request (object): The parsed protobuf request object
 
         Returns:
+            StateView: a view of the state tree at the requested root
             None: if a merkle_root is specified directly, no id is returned
             str: the id of the head block used to specify the root
 
         Raises:
-            ResponseFailed: Failed to set the root if the merkle tree
+            ResponseFailed: Failed to find the root in the merkle tree
         """
         if request.merkle_root:
             root = request.merkle_root
@@ -199,12 +271,12 @@ class _ClientRequestHandler(Handler, metaclass=abc.ABCMeta):
             head_id = head.header_signature
 
         try:
-            self._tree.set_merkle_root(root)
+            state_view = self._state_view_factory.create_view(root)
         except KeyError as e:
             LOGGER.debug('Unable to find root "%s" in database', e)
             raise _ResponseFailed(self._status.NO_ROOT)
 
-        return head_id
+        return state_view, head_id
 
     def _list_store_resources(self, request, head_id, filter_ids,
                               resource_fetcher, block_xform):
@@ -268,6 +340,58 @@ class _ClientRequestHandler(Handler, metaclass=abc.ABCMeta):
 
         return resources
 
+    def _paginate_store_resources(self, request, head, filter_ids,
+                                  resource_fetcher, block_xform,
+                                  chain_count, locate):
+        """Lists and paginates blocks or resources derived from blocks. When
+        the block store has indexed the head block, only the blocks needed
+        for the requested page are read, otherwise the whole chain is walked
+        using `_list_store_resources`.
+
+        Note:
+            This method will fail if `_block_store` has not been set
+
+        Args:
+            request (object): The parsed protobuf request object
+            head (Block): Either the request's head block, or the chain head
+            filter_ids (list of str): the resource ids (if any) to filter by
+            resource_fetcher (function): Fetches a resource by its id
+            block_xform (function): Transforms a block into a list of resources
+            chain_count (function): Returns the number of resources in the
+                chain up to and including a block, given its id and number
+            locate (function): Returns the BlockWrapper containing a resource,
+                raising a KeyError or ValueError if there is none
+
+        Returns:
+            list: The paginated list of resources
+            object: The PagingResponse to be sent back to the client
+        """
+        try:
+            chain = _ChainResources(
+                self._block_store, head, chain_count, block_xform, locate)
+        except KeyError:
+            chain = None
+
+        if chain is None or (filter_ids and not request.head_id):
+            resources = self._list_store_resources(
+                request,
+                head.header_signature,
+                filter_ids,
+                resource_fetcher,
+                block_xform)
+
+        elif filter_ids:
+            resources = [resource_fetcher(i) for i in filter_ids
+                         if chain.contains(i)]
+
+        else:
+            return chain.paginate(request.paging, self._status.INVALID_PAGING)
+
+        return _Pager.paginate_resources(
+            request,
+            resources,
+            self._status.INVALID_PAGING)
+
     def _get_statuses(self, batch_ids):
         """Fetches the committed statuses for a set of batch ids.
 
@@ -382,6 +506,152 @@ class _Pager(object):
             return resources[index].address
 
 
+class _ChainResources(object):
+    """Reads the blocks, or the batches or transactions in blocks, of the
+    chain ending at a head block, ordered from newest to oldest like
+    `_list_store_resources`. Uses the block store's block number index and
+    chain counts to find and read only the blocks a page needs, rather than
+    walking the chain from the head.
+
+    Args:
+        block_store (BlockStore): The block store to read blocks from
+        head (Block): The block at the head of the chain
+        chain_count (function): Returns the number of resources in the chain
+            up to and including a block, given its id and number
+        block_xform (function): Transforms a block into a list of resources
+        locate (function): Returns the BlockWrapper containing a resource,
+            raising a KeyError or ValueError if there is none
+
+    Raises:
+        KeyError: The head block has not been indexed by the block store
+    """
+    def __init__(self, block_store, head, chain_count, block_xform, locate):
+        header = BlockHeader()
+        header.ParseFromString(head.header)
+
+        self._block_store = block_store
+        self._head_num = header.block_num
+        self._chain_count = chain_count
+        self._block_xform = block_xform
+        self._locate = locate
+
+        head_id = block_store.get_block_id_by_number(self._head_num)
+        if head_id != head.header_signature:
+            raise KeyError('Block {} is not indexed'.format(head_id))
+        self.total = chain_count(head_id, self._head_num)
+
+    def paginate(self, paging, on_fail_status):
+        """Reads a page of resources based on PagingControls, in the same
+        manner as `_Pager.paginate_resources`.
+
+        Args:
+            paging (PagingControls): The paging controls from the request
+            on_fail_status (enum): The status to fail with if the paging
+                controls do not specify a valid page
+
+        Returns:
+            list: The paginated list of resources
+            object: The PagingResponse to be sent back to the client
+        """
+        if self.total == 0:
+            return [], client_pb2.PagingResponse(total_resources=0)
+
+        count = min(paging.count, MAX_PAGE_SIZE) or MAX_PAGE_SIZE
+
+        try:
+            if paging.start_id:
+                start_index = self.index_by_id(paging.start_id)
+            elif paging.end_id:
+                start_index = self.index_by_id(paging.end_id) + 1 - count
+            else:
+                start_index = paging.start_index
+
+            if start_index < 0 or start_index >= self.total:
+                raise AssertionError
+        except (AssertionError, KeyError, ValueError):
+            raise _ResponseFailed(on_fail_status)
+
+        # Read one more resource on either side for the previous and next ids
+        first_index = max(start_index - 1, 0)
+        resources = self.get_range(first_index, start_index + count + 1)
+        previous_id = ''
+        if first_index < start_index:
+            previous_id = resources.pop(0).header_signature
+        next_id = ''
+        if len(resources) > count:
+            next_id = resources.pop().header_signature
+
+        paging_response = client_pb2.PagingResponse(
+            next_id=next_id,
+            previous_id=previous_id,
+            start_index=start_index,
+            total_resources=self.total)
+
+        return resources, paging_response
+
+    def contains(self, resource_id):
+        try:
+            self.index_by_id(resource_id)
+        except (KeyError, ValueError):
+            return False
+        return True
+
+    def index_by_id(self, resource_id):
+        """Returns the index of a resource, counting from the head.
+
+        Raises:
+            KeyError, ValueError: The resource is not in this chain
+        """
+        block = self._locate(resource_id)
+        block_num = block.block_num
+        if block_num > self._head_num or \
+                self._block_store.get_block_id_by_number(block_num) != \
+                block.identifier:
+            raise KeyError('{} is not in the chain'.format(resource_id))
+
+        ids = [r.header_signature for r in self._block_xform(block.block)]
+        return self._first_index(block_num) + ids.index(resource_id)
+
+    def get_range(self, start, stop):
+        """Returns the resources with indexes from start up to stop.
+        """
+        stop = min(stop, self.total)
+        if start >= stop:
+            return []
+
+        block_num = self._find_block_num(start)
+        skip = start - self._first_index(block_num)
+        resources = []
+        while len(resources) < stop - start and block_num >= 0:
+            block = self._block_store.get_block_by_number(block_num).block
+            resources.extend(self._block_xform(block)[skip:])
+            skip = 0
+            block_num -= 1
+
+        return resources[:stop - start]
+
+    def _first_index(self, block_num):
+        """Returns the index of the first resource in a block, or where it
+        would be if the block has no resources.
+        """
+        if block_num < 0:
+            return self.total
+        block_id = self._block_store.get_block_id_by_number(block_num)
+        return self.total - self._chain_count(block_id, block_num)
+
+    def _find_block_num(self, index):
+        """Binary searches for the number of the block containing a resource.
+        """
+        low, high = 0, self._head_num
+        while low < high:
+            middle = (low + high) // 2
+            if self._first_index(middle) <= index:
+                high = middle
+            else:
+                low = middle + 1
+        return low
+
+
 class BatchSubmitFinisher(_ClientRequestHandler):
     def __init__(self, block_store, batch_cache):
         super().__init__(
@@ -397,12 +667,11 @@ class BatchSubmitFinisher(_ClientRequestHandler):
 
         batch_ids = [b.header_signature for b in request.batches]
 
-        self._block_store.wait_for_batch_commits(
-            batch_ids=batch_ids,
-            timeout=request.timeout or DEFAULT_TIMEOUT)
-
-        statuses = self._get_statuses(batch_ids)
-        return self._wrap_response(batch_statuses=statuses)
+        return self._wait_for_commits(
+            batch_ids,
+            request.timeout or DEFAULT_TIMEOUT,
+            lambda: self._wrap_response(
+                batch_statuses=self._get_statuses(batch_ids)))
 
 
 class BatchStatusRequest(_ClientRequestHandler):
@@ -416,10 +685,14 @@ class BatchStatusRequest(_ClientRequestHandler):
 
     def _respond(self, request):
         if request.wait_for_commit:
-            self._block_store.wait_for_batch_commits(
-                batch_ids=request.batch_ids,
-                timeout=request.timeout or DEFAULT_TIMEOUT)
+            return self._wait_for_commits(
+                list(request.batch_ids),
+                request.timeout or DEFAULT_TIMEOUT,
+                lambda: self._respond_with_statuses(request))
 
+        return self._respond_with_statuses(request)
+
+    def _respond_with_statuses(self, request):
         statuses = self._get_statuses(request.batch_ids)
         if not statuses:
             return self._status.NO_RESOURCE
@@ -440,29 +713,19 @@ class StateCurrentRequest(_ClientRequestHandler):
 
 
 class StateListRequest(_ClientRequestHandler):
-    def __init__(self, database, block_store):
+    def __init__(self, state_view_factory, block_store):
         super().__init__(
             client_pb2.ClientStateListRequest,
             client_pb2.ClientStateListResponse,
             validator_pb2.Message.CLIENT_STATE_LIST_RESPONSE,
-            tree=MerkleDatabase(database),
+            state_view_factory=state_view_factory,
             block_store=block_store)
 
     def _respond(self, request):
-        head_id = self._set_root(request)
-
-        # Fetch leaves and encode as protobuf
-        leaves = [
-            client_pb2.Leaf(address=a, data=v) for a, v in
-            self._tree.leaves(request.address or '').items()]
+        state_view, head_id = self._get_state_view(request)
 
-        # Order leaves, remove if tree.leaves refactored to be ordered
-        leaves.sort(key=lambda l: l.address)
-
-        leaves, paging = _Pager.paginate_resources(
-            request,
-            leaves,
-            self._status.INVALID_PAGING)
+        leaves, paging = self._paginate_leaves(
+            state_view, request.address or '', request.paging)
 
         if not leaves:
             return self._wrap_response(
@@ -475,22 +738,93 @@ class StateListRequest(_ClientRequestHandler):
             paging=paging,
             leaves=leaves)
 
+    def _paginate_leaves(self, state_view, prefix, paging):
+        """Pages through the leaves under a prefix without reading the rest
+        of the tree. Since the leaves are never counted, the PagingResponse
+        will not have a total_resources, and will only have a start_index
+        when paged by index.
+
+        Args:
+            state_view (StateView): The view of the state tree to list
+            prefix (str): The address prefix of the leaves to list
+            paging (PagingControls): The paging controls from the request
+
+        Returns:
+            list of Leaf: The leaves in this page, in address order
+            PagingResponse: The ids of the leaves around this page
+        """
+        if next(state_view.iter_leaves(prefix), None) is None:
+            return [], client_pb2.PagingResponse()
+
+        count = min(paging.count, MAX_PAGE_SIZE) or MAX_PAGE_SIZE
+        start_index = 0
+
+        if paging.end_id:
+            leaves = list(islice(
+                state_view.iter_leaves(prefix, paging.end_id, reverse=True),
+                count + 1))
+            self._check_cursor(leaves, paging.end_id)
+            previous_id = leaves[count][0] if len(leaves) > count else ''
+            next_id = self._adjacent_address(
+                state_view, prefix, paging.end_id)
+            leaves = leaves[count - 1::-1]
+
+        elif paging.start_id:
+            leaves = list(islice(
+                state_view.iter_leaves(prefix, paging.start_id),
+                count + 1))
+            self._check_cursor(leaves, paging.start_id)
+            previous_id = self._adjacent_address(
+                state_view, prefix, paging.start_id, reverse=True)
+            next_id = leaves[count][0] if len(leaves) > count else ''
+            leaves = leaves[:count]
+
+        else:
+            start_index = paging.start_index
+            if start_index < 0:
+                raise _ResponseFailed(self._status.INVALID_PAGING)
+            leaf_iter = state_view.iter_leaves(prefix)
+            previous = list(islice(leaf_iter, start_index))
+            leaves = list(islice(leaf_iter, count + 1))
+            if not leaves:
+                raise _ResponseFailed(self._status.INVALID_PAGING)
+            previous_id = previous[-1][0] if previous else ''
+            next_id = leaves[count][0] if len(leaves) > count else ''
+            leaves = leaves[:count]
+
+        return (
+            [client_pb2.Leaf(address=a, data=v) for a, v in leaves],
+            client_pb2.PagingResponse(
+                next_id=next_id,
+                previous_id=previous_id,
+                start_index=start_index))
+
+    def _check_cursor(self, leaves, address):
+        if not leaves or leaves[0][0] != address:
+            raise _ResponseFailed(self._status.INVALID_PAGING)
+
+    @staticmethod
+    def _adjacent_address(state_view, prefix, address, reverse=False):
+        adjacent = list(islice(
+            state_view.iter_leaves(prefix, address, reverse), 2))
+        return adjacent[1][0] if len(adjacent) > 1 else ''
+
 
 class StateGetRequest(_ClientRequestHandler):
-    def __init__(self, database, block_store):
+    def __init__(self, state_view_factory, block_store):
         super().__init__(
             client_pb2.ClientStateGetRequest,
             client_pb2.ClientStateGetResponse,
             validator_pb2.Message.CLIENT_STATE_GET_RESPONSE,
-            tree=MerkleDatabase(database),
+            state_view_factory=state_view_factory,
             block_store=block_store)
 
     def _respond(self, request):
-        head_id = self._set_root(request)
+        state_view, head_id = self._get_state_view(request)
 
         # Fetch leaf value
         try:
-            value = self._tree.get(request.address)
+            value = state_view.get(request.address)
         except KeyError:
             LOGGER.debug('Unable to find entry at address %s', request.address)
             return self._status.NO_RESOURCE
@@ -510,18 +844,16 @@ class BlockListRequest(_ClientRequestHandler):
             block_store=block_store)
 
     def _respond(self, request):
-        head_id = self._get_head_block(request).header_signature
-        blocks = self._list_store_resources(
+        head = self._get_head_block(request)
+        head_id = head.header_signature
+        blocks, paging = self._paginate_store_resources(
             request,
-            head_id,
+            head,
             request.block_ids,
             lambda filter_id: self._block_store[filter_id].block,
-            lambda block: [block])
-
-        blocks, paging = _Pager.paginate_resources(
-            request,
-            blocks,
-            self._status.INVALID_PAGING)
+            lambda block: [block],
+            lambda block_id, block_num: block_num + 1,
+            lambda block_id: self._block_store[block_id])
 
         if not blocks:
             return self._wrap_response(
@@ -561,18 +893,17 @@ class BatchListRequest(_ClientRequestHandler):
             block_store=block_store)
 
     def _respond(self, request):
-        head_id = self._get_head_block(request).header_signature
-        batches = self._list_store_resources(
+        head = self._get_head_block(request)
+        head_id = head.header_signature
+        batches, paging = self._paginate_store_resources(
             request,
-            head_id,
+            head,
             request.batch_ids,
             self._block_store.get_batch,
-            lambda block: [a for a in block.batches])
-
-        batches, paging = _Pager.paginate_resources(
-            request,
-            batches,
-            self._status.INVALID_PAGING)
+            lambda block: [a for a in block.batches],
+            lambda block_id, _: self._block_store.get_chain_counts(
+                block_id)[0],
+            self._block_store.get_block_by_batch_id)
 
         if not batches:
             return self._wrap_response(
@@ -612,18 +943,17 @@ class TransactionListRequest(_ClientRequestHandler):
             block_store=block_store)
 
     def _respond(self, request):
-        head_id = self._get_head_block(request).header_signature
-        transactions = self._list_store_resources(
+        head = self._get_head_block(request)
+        head_id = head.header_signature
+        transactions, paging = self._paginate_store_resources(
             request,
-            head_id,
+            head,
             request.transaction_ids,
             self._block_store.get_transaction,
-            lambda block: [t for a in block.batches for t in a.transactions])
-
-        transactions, paging = _Pager.paginate_resources(
-            request,
-            transactions,
-            self._status.INVALID_PAGING)
+            lambda block: [t for a in block.batches for t in a.transactions],
+            lambda block_id, _: self._block_store.get_chain_counts(
+                block_id)[1],
+            self._block_store.get_block_by_transaction_id)
 
         if not transactions:
             return self._wrap_response(
@@ -13,9 +13,11 @@
 # limitations under the License.
 # ------------------------------------------------------------------------------
 
+from collections import OrderedDict
 import copy
 import logging
 import hashlib
+from threading import Lock
 import cbor
 
 LOGGER = logging.getLogger(__name__)
@@ -30,9 +32,48 @@ NODE_PROTO = {"v": None,
 TOKEN_SIZE = 2
 
 
+class NodeCache(object):
+    """A thread-safe, least recently used cache of decoded trie nodes,
+    keyed by their hashes. Since a node's hash is derived from its contents,
+    a cached node never goes stale, and the cache can be shared by any
+    number of trees over the same database, at any roots.
+
+    Cached nodes are shared between trees, so they must not be modified.
+    """
+    def __init__(self, max_nodes=100000):
+        self._max_nodes = max_nodes
+        self._nodes = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key_hash):
+        with self._lock:
+            node = self._nodes.get(key_hash)
+            if node is not None:
+                self._nodes.move_to_end(key_hash)
+            return node
+
+    def __setitem__(self, key_hash, node):
+        with self._lock:
+            self._nodes[key_hash] = node
+            while len(self._nodes) > self._max_nodes:
+                self._nodes.popitem(last=False)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._nodes)
+
+
 class MerkleDatabase(object):
-    def __init__(self, database, merkle_root=INIT_ROOT_KEY):
+    def __init__(self, database, merkle_root=INIT_ROOT_KEY, node_cache=None):
+        """
+        Args:
+            database (Database): The database containing the trie's nodes
+            merkle_root (str): The root of the trie
+            node_cache (NodeCache, optional): A cache of decoded nodes,
+                which may be shared with other trees over the same database
+        """
         self._database = database
+        self._node_cache = node_cache
         self.set_merkle_root(merkle_root)
 
     def __iter__(self):
@@ -71,11 +112,20 @@ class MerkleDatabase(object):
         return hashlib.sha512(stuff).hexdigest()[:64]
 
     def _get_by_hash(self, key_hash):
-        if key_hash in self._database:
-            return self._decode(self._database.get(key_hash))
-        else:
+        if self._node_cache is not None:
+            node = self._node_cache.get(key_hash)
+            if node is not None:
+                return node
+
+        packed = self._database.get(key_hash)
+        if packed is None:
             raise KeyError("hash {} not found in database".format(key_hash))
 
+        node = self._decode(packed)
+        if self._node_cache is not None:
+            self._node_cache[key_hash] = node
+        return node
+
     def __getitem__(self, address):
         return self.get(address)
 
@@ -85,6 +135,31 @@ class MerkleDatabase(object):
     def get_node(self, address):
         return self._get_by_addr(address)
 
+    def get_node_hash(self, address):
+        """Returns the hash of the node at an address, which identifies the
+        contents of the whole subtree under it.  As such, it only changes
+        when a leaf whose address starts with the address changes.
+
+        Args:
+            address (str): The address, or address prefix, of the node
+
+        Returns:
+            str: The hash of the node
+
+        Raises:
+            KeyError: If there is no node at the address
+        """
+        tokens = self._tokenize_address(address)
+        if not tokens:
+            return self._root_hash
+
+        parent = self._get_by_addr(''.join(tokens[:-1]))
+        try:
+            return parent['c'][tokens[-1]]
+        except KeyError:
+            raise KeyError("invalid address {} "
+                           "from root {}".format(address, self._root_hash))
+
     def __setitem__(self, address, value):
         return self.set(address, value)
 
@@ -122,6 +197,9 @@ class MerkleDatabase(object):
             if token in node['c'] and not new_branch:
                 path = path + token
                 node = self._get_by_hash(node['c'][token])
+                if self._node_cache is not None:
+                    # Cached nodes are shared, so copy them to modify them
+                    node = copy.deepcopy(node)
                 nodes[path] = node
             else:
                 if return_empty:
@@ -261,5 +339,69 @@ class MerkleDatabase(object):
             leaves[address] = value
         return leaves
 
+    def iter_leaves(self, prefix='', start_address=None, reverse=False):
+        """Lazily yields the leaves under a prefix in address order, reading
+        only the nodes needed to produce each leaf.
+
+        Args:
+            prefix (str): Only leaves whose addresses begin with this prefix
+                are yielded
+            start_address (str, optional): Resumes iteration at the first
+                address at or after this one (at or before, if reversed)
+            reverse (bool): Yields leaves in descending address order
+
+        Yields:
+            tuple: The address and the decoded value of each leaf
+        """
+        try:
+            node = self._get_by_addr(prefix)
+        except KeyError:
+            return
+
+        bound = start_address
+        if bound is not None and not bound.startswith(prefix):
+            # A bound outside the prefix either includes or excludes all of
+            # its leaves
+            if (bound < prefix) != reverse:
+                bound = None
+            else:
+                return
+
+        yield from self._iter_ordered(prefix, node, bound, reverse)
+
+    def _iter_ordered(self, path, node, bound, reverse):
+        if bound is not None and len(path) >= len(bound):
+            # path is the bound itself, so it and everything after it in
+            # iteration order is included
+            if reverse:
+                if node['v'] is not None:
+                    yield (path, self._decode(node['v']))
+                return
+            bound = None
+
+        # A node sorts before its descendants, so it is yielded first
+        # unless it is a proper prefix of the bound
+        if not reverse and bound is None and node['v'] is not None:
+            yield (path, self._decode(node['v']))
+
+        bound_token = None
+        if bound is not None:
+            bound_token = bound[len(path):len(path) + TOKEN_SIZE]
+
+        for token in sorted(node['c'], reverse=reverse):
+            child_bound = None
+            if bound_token is not None:
+                if token == bound_token:
+                    child_bound = bound
+                elif (token < bound_token) != reverse:
+                    continue
+
+            child = self._get_by_hash(node['c'][token])
+            yield from self._iter_ordered(
+                path + token, child, child_bound, reverse)
+
+        if reverse and node['v'] is not None:
+            yield (path, self._decode(node['v']))
+
     def close(self):
         self._database.close()
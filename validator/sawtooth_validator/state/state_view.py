@@ -13,24 +13,31 @@
 # limitations under the License.
 # ------------------------------------------------------------------------------
 
+from sawtooth_validator.state.merkle import INIT_ROOT_KEY
 from sawtooth_validator.state.merkle import MerkleDatabase
+from sawtooth_validator.state.merkle import NodeCache
 
 
 class StateViewFactory(object):
     """The StateViewFactory produces StateViews for a particular merkle root.
 
     This factory produces read-only views of a merkle tree. For a given
-    database, these views are considered immutable.
+    database, these views are considered immutable, so each view may be
+    used from a different thread. The views share a cache of decoded tree
+    nodes.
     """
 
-    def __init__(self, database):
+    def __init__(self, database, node_cache_size=100000):
         """Initializes the factory with a given database.
 
         Args:
             database (:obj:`Database`): the database containing the merkle
                 tree.
+            node_cache_size (int): the number of decoded tree nodes to cache
+                for the views.
         """
         self._database = database
+        self._node_cache = NodeCache(node_cache_size)
 
     def create_view(self, state_root_hash=None):
         """Creates a StateView for the given state root hash.
@@ -41,11 +48,14 @@ class StateViewFactory(object):
         Returns:
             StateView: state view locked to the given root hash.
         """
-        # Create a default Merkle database and if we have a state root hash,
-        # update the Merkle database's root to that
-        merkle_db = MerkleDatabase(self._database)
-        if state_root_hash is not None:
-            merkle_db.set_merkle_root(state_root_hash)
+        # Create a default Merkle database unless we have a state root hash
+        if state_root_hash is None:
+            state_root_hash = INIT_ROOT_KEY
+
+        merkle_db = MerkleDatabase(
+            self._database,
+            state_root_hash,
+            node_cache=self._node_cache)
 
         return StateView(merkle_db)
 
@@ -74,6 +84,20 @@ class StateView(object):
         """
         return self._tree.get(address)
 
+    def get_node_hash(self, address):
+        """
+        Args:
+            address (str): an address, or address prefix
+
+        Returns:
+            str: the hash of the merkle node at the address, which changes
+                only when the state under the address changes
+
+        Raises:
+            KeyError: if there is no state under the address
+        """
+        return self._tree.get_node_hash(address)
+
     def addresses(self):
         """
         Returns:
@@ -90,3 +114,16 @@ class StateView(object):
             dict of str,bytes: the state entries at the leaves
         """
         return self._tree.leaves(prefix)
+
+    def iter_leaves(self, prefix='', start_address=None, reverse=False):
+        """
+        Args:
+            prefix (str): an address prefix under which to look for leaves
+            start_address (str, optional): the address at which to start
+            reverse (bool): whether to iterate in descending address order
+
+        Returns:
+            iterator of (str, bytes): the state entries at the leaves, in
+                address order
+        """
+        return self._tree.iter_leaves(prefix, start_address, reverse)
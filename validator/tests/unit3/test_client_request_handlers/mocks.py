@@ -67,7 +67,9 @@ class MockBlockStore(BlockStore):
     With defaults, creates three blocks with ids ranging from 'B-0' to 'B-2',
     and a single batch, and single transaction in each, with ids prefixed by
     'b-' or 't-'. Using the optional root parameter for add_block, it is
-    possible to save meaningful state_root_hashes to a block.
+    possible to save meaningful state_root_hashes to a block, and using the
+    optional batch_count parameter, to add extra batches to a block, with
+    ids suffixed by '.1', '.2', etc.
     """
     def __init__(self, size=3, start='0'):
         super().__init__(DictDatabase())
@@ -75,7 +77,7 @@ class MockBlockStore(BlockStore):
         for i in range(size):
             self.add_block(_increment_key(start, i))
 
-    def add_block(self, base_id, root='merkle_root'):
+    def add_block(self, base_id, root='merkle_root', batch_count=1):
         block_id = 'B-' + base_id
         head = self.chain_head
         if head:
@@ -93,10 +95,14 @@ class MockBlockStore(BlockStore):
             consensus=b'consensus',
             state_root_hash=root)
 
+        batches = [make_mock_batch(base_id)] + [
+            make_mock_batch('{}.{}'.format(base_id, i))
+            for i in range(1, batch_count)]
+
         block = Block(
             header=header.SerializeToString(),
             header_signature=block_id,
-            batches=[make_mock_batch(base_id)])
+            batches=batches[:batch_count])
 
         self.update_chain([BlockWrapper(block)], [])
 
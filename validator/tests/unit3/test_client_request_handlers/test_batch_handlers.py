@@ -394,6 +394,48 @@ class TestBatchListRequests(ClientHandlerTestCase):
         self.assert_all_instances(response.batches, Batch)
         self.assertEqual('b-0', response.batches[0].header_signature)
 
+    def test_batch_list_paginated_across_blocks(self):
+        """Verifies batch list pages are read correctly from blocks with
+        different numbers of batches, using the block store's indexes.
+
+        Queries a mock block store with five blocks, with batch ids:
+            'B-4': ['b-4']
+            'B-3': ['b-3', 'b-3.1']
+            'B-2': ['b-2', 'b-2.1', 'b-2.2']
+            'B-1': []
+            'B-0': ['b-0']
+
+        Expects to find, for every start index and a count of 2:
+            - a status of OK
+            - the two batches at that index, listed newest to oldest
+            - a paging response with the ids on either side of the page,
+                and a total resource count of 7
+        """
+        store = MockBlockStore(size=0)
+        for base_id, batch_count in zip('01234', (1, 0, 3, 2, 1)):
+            store.add_block(base_id, batch_count=batch_count)
+        self._handler = handlers.BatchListRequest(store)
+
+        expected = ['b-4', 'b-3', 'b-3.1', 'b-2', 'b-2.1', 'b-2.2', 'b-0']
+        for start in range(len(expected)):
+            response = self.make_paged_request(count=2, start_index=start)
+
+            self.assertEqual(self.status.OK, response.status)
+            self.assertEqual(
+                expected[start:start + 2],
+                [b.header_signature for b in response.batches])
+            self.assert_valid_paging(
+                response,
+                next_id=''.join(expected[start + 2:start + 3]),
+                previous_id=expected[start - 1] if start else '',
+                start_index=start,
+                total=7)
+
+        response = self.make_paged_request(count=2, end_id='b-2.1')
+        self.assertEqual(
+            ['b-2', 'b-2.1'], [b.header_signature for b in response.batches])
+        self.assert_valid_paging(response, 'b-2.2', 'b-3.1', 3, 7)
+
 
 class TestBatchGetRequests(ClientHandlerTestCase):
     def setUp(self):
@@ -0,0 +1,86 @@
+# Copyright 2017 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+
+import logging
+import os
+from time import time
+import unittest
+
+import sawtooth_validator.state.client_handlers as handlers
+from sawtooth_validator.protobuf import client_pb2
+from test_client_request_handlers.base_case import ClientHandlerTestCase
+from test_client_request_handlers.mocks import MockBlockStore
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+@unittest.skipUnless(
+    os.environ.get('CLIENT_LIST_BENCHMARK_BLOCKS'),
+    'set CLIENT_LIST_BENCHMARK_BLOCKS to the length of the chain to run')
+class TestListRequestLatency(ClientHandlerTestCase):
+    """Builds a long chain and reports the latency of listing a page of
+    blocks, batches, and transactions at either end of it. It only runs when
+    CLIENT_LIST_BENCHMARK_BLOCKS is set to the length of the chain, e.g.
+    10000, so that unit test runs stay fast.
+    """
+    def setUp(self):
+        self.block_count = int(os.environ['CLIENT_LIST_BENCHMARK_BLOCKS'])
+        self._store = MockBlockStore(size=self.block_count)
+
+    def _time_request(self, handler, request_proto, response_proto,
+                      **paging):
+        self.initialize(handler, request_proto, response_proto,
+                        store=self._store)
+        start = time()
+        response = self.make_paged_request(**paging)
+        return time() - start, response
+
+    def _report(self, name, handler, request_proto, response_proto,
+                resources):
+        latencies = []
+        for paging in ({'count': 100},
+                       {'count': 100, 'start_index': self.block_count - 100},
+                       {'count': 100, 'start_id': resources.format(0)}):
+            latency, response = self._time_request(
+                handler, request_proto, response_proto, **paging)
+            self.assertEqual(self.status.OK, response.status)
+            self.assertEqual(
+                self.block_count, response.paging.total_resources)
+            latencies.append(latency)
+
+        LOGGER.warning(
+            '%s list of 100 over %s blocks: head %.4fs, tail %.4fs, '
+            'by id %.4fs', name, self.block_count, *latencies)
+
+    def test_list_latency(self):
+        self._report(
+            'Block',
+            handlers.BlockListRequest(self._store),
+            client_pb2.ClientBlockListRequest,
+            client_pb2.ClientBlockListResponse,
+            'B-{}')
+        self._report(
+            'Batch',
+            handlers.BatchListRequest(self._store),
+            client_pb2.ClientBatchListRequest,
+            client_pb2.ClientBatchListResponse,
+            'b-{}')
+        self._report(
+            'Transaction',
+            handlers.TransactionListRequest(self._store),
+            client_pb2.ClientTransactionListRequest,
+            client_pb2.ClientTransactionListResponse,
+            't-{}')
@@ -13,8 +13,11 @@
 # limitations under the License.
 # ------------------------------------------------------------------------------
 
+from concurrent.futures import ThreadPoolExecutor
+
 import sawtooth_validator.state.client_handlers as handlers
 from sawtooth_validator.protobuf import client_pb2
+from sawtooth_validator.state.state_view import StateViewFactory
 from test_client_request_handlers.base_case import ClientHandlerTestCase
 from test_client_request_handlers.mocks import make_db_and_store
 
@@ -46,10 +49,18 @@ class TestStateListRequests(ClientHandlerTestCase):
         """
         return [l for l in leaves if l.address == address][0].data
 
+    def assert_valid_paging(self, response, next_id='', previous_id='',
+                            start_index=0, total=0):
+        """Leaves are paged without being counted, so state list responses
+        never have a total resource count.
+        """
+        super().assert_valid_paging(
+            response, next_id, previous_id, start_index, total)
+
     def setUp(self):
         db, store, roots = make_db_and_store()
         self.initialize(
-            handlers.StateListRequest(db, store),
+            handlers.StateListRequest(StateViewFactory(db), store),
             client_pb2.ClientStateListRequest,
             client_pb2.ClientStateListResponse,
             store=store,
@@ -64,7 +75,7 @@ class TestStateListRequests(ClientHandlerTestCase):
         the tests expect to find:
             - a status of OK
             - a head_id of 'B-2' (the latest)
-            - the default paging response, showing all 3 resources returned
+            - the default paging response, with all resources returned
             - a list of leaves with 3 items
             - that the list contains instances of Leaf
             - that there is a leaf with an address of 'a' and data of b'3'
@@ -117,7 +128,7 @@ class TestStateListRequests(ClientHandlerTestCase):
         Expects to find:
             - a status of OK
             - that head_id is missing (queried by root)
-            - a paging response showing all 1 resources returned
+            - the default paging response, with all resources returned
             - a list of leaves with 1 item
             - that the list contains instances of Leaf
             - that Leaf has an address of 'a' and data of b'1'
@@ -126,7 +137,7 @@ class TestStateListRequests(ClientHandlerTestCase):
 
         self.assertEqual(self.status.OK, response.status)
         self.assertFalse(response.head_id)
-        self.assert_valid_paging(response, total=1)
+        self.assert_valid_paging(response)
         self.assertEqual(1, len(response.leaves))
 
         self.assert_all_instances(response.leaves, client_pb2.Leaf)
@@ -156,7 +167,7 @@ class TestStateListRequests(ClientHandlerTestCase):
         Expects to find:
             - a status of OK
             - a head_id of 'B-1'
-            - a paging response showing all 2 resources returned
+            - the default paging response, with all resources returned
             - a list of leaves with 2 items
             - that the list contains instances of Leaf
             - that there is a leaf with an address of 'a' and data of b'1'
@@ -165,7 +176,7 @@ class TestStateListRequests(ClientHandlerTestCase):
 
         self.assertEqual(self.status.OK, response.status)
         self.assertEqual('B-1', response.head_id)
-        self.assert_valid_paging(response, total=2)
+        self.assert_valid_paging(response)
         self.assertEqual(2, len(response.leaves))
 
         self.assert_all_instances(response.leaves, client_pb2.Leaf)
@@ -194,7 +205,7 @@ class TestStateListRequests(ClientHandlerTestCase):
         Expects to find:
             - a status of OK
             - a head_id of 'B-2' (the latest)
-            - a paging response showing all 1 resources returned
+            - the default paging response, with all resources returned
             - a list of leaves with 1 item
             - that the list contains instances of Leaf
             - that Leaf matches the address of 'c' and has data of b'7'
@@ -203,7 +214,7 @@ class TestStateListRequests(ClientHandlerTestCase):
 
         self.assertEqual(self.status.OK, response.status)
         self.assertEqual('B-2', response.head_id)
-        self.assert_valid_paging(response, total=1)
+        self.assert_valid_paging(response)
         self.assertEqual(1, len(response.leaves))
 
         self.assert_all_instances(response.leaves, client_pb2.Leaf)
@@ -234,7 +245,7 @@ class TestStateListRequests(ClientHandlerTestCase):
         Expects to find:
             - a status of OK
             - a head_id of 'B-1'
-            - a paging response showing all 1 resources returned
+            - the default paging response, with all resources returned
             - a list of leaves with 1 item
             - that the list contains instances of Leaf
             - that Leaf matches the address of 'b', and has data of b'4'
@@ -243,7 +254,7 @@ class TestStateListRequests(ClientHandlerTestCase):
 
         self.assertEqual(self.status.OK, response.status)
         self.assertEqual('B-1', response.head_id)
-        self.assert_valid_paging(response, total=1)
+        self.assert_valid_paging(response)
         self.assertEqual(1, len(response.leaves))
 
         self.assert_all_instances(response.leaves, client_pb2.Leaf)
@@ -301,8 +312,7 @@ class TestStateListRequests(ClientHandlerTestCase):
             - a paging response with:
                 * a next_id of 'c'
                 * a previous_id of 'a'
-                * a start_index of 1
-                * the default total resource count of 3
+                * no start_index, as the leaves before 'b' aren't counted
             - a list of leaves with 1 item
             - that item is an instance of Leaf
             - that Leaf has an address of 'b' and data of b'5'
@@ -311,7 +321,7 @@ class TestStateListRequests(ClientHandlerTestCase):
 
         self.assertEqual(self.status.OK, response.status)
         self.assertEqual('B-2', response.head_id)
-        self.assert_valid_paging(response, 'c', 'a', 1)
+        self.assert_valid_paging(response, 'c', 'a')
         self.assertEqual(1, len(response.leaves))
         self.assert_all_instances(response.leaves, client_pb2.Leaf)
         self.assertEqual('b', response.leaves[0].address)
@@ -329,8 +339,7 @@ class TestStateListRequests(ClientHandlerTestCase):
             - a paging response with:
                 * the default empty next_id
                 * a previous_id of 'a'
-                * a start_index of 1
-                * the default total resource count of 3
+                * no start_index, as the leaves before 'b' aren't counted
             - a list of leaves with 2 items
             - those items are instances of Leaf
             - the last leaf has an address of 'c' and data of b'7'
@@ -339,7 +348,7 @@ class TestStateListRequests(ClientHandlerTestCase):
 
         self.assertEqual(self.status.OK, response.status)
         self.assertEqual('B-2', response.head_id)
-        self.assert_valid_paging(response, previous_id='a', start_index=1)
+        self.assert_valid_paging(response, previous_id='a')
         self.assertEqual(2, len(response.leaves))
         self.assert_all_instances(response.leaves, client_pb2.Leaf)
         self.assertEqual('c', response.leaves[1].address)
@@ -399,7 +408,6 @@ class TestStateListRequests(ClientHandlerTestCase):
                 * an empty next_id
                 * a previous_id of 'a'
                 * a start_index of 1
-                * a total resource count of 2
             - a list of leaves with 1 item
             - that item is an instance of Leaf
             - that has a header_signature of 'b-0'
@@ -408,7 +416,7 @@ class TestStateListRequests(ClientHandlerTestCase):
 
         self.assertEqual(self.status.OK, response.status)
         self.assertEqual('B-1', response.head_id)
-        self.assert_valid_paging(response, '', 'a', 1, 2)
+        self.assert_valid_paging(response, '', 'a', 1)
         self.assertEqual(1, len(response.leaves))
         self.assert_all_instances(response.leaves, client_pb2.Leaf)
         self.assertEqual('b', response.leaves[0].address)
@@ -423,7 +431,7 @@ class TestStateListRequests(ClientHandlerTestCase):
         Expects to find:
             - a status of OK
             - a head_id of 'B-2', the latest
-            - a paging response with a total resource count of 1
+            - the default paging response, with all resources returned
             - a list of leaves with 1 item
             - that item is an instance of Leaf
             - that has a header_signature of 'b-0'
@@ -432,7 +440,7 @@ class TestStateListRequests(ClientHandlerTestCase):
 
         self.assertEqual(self.status.OK, response.status)
         self.assertEqual('B-2', response.head_id)
-        self.assert_valid_paging(response, total=1)
+        self.assert_valid_paging(response)
         self.assertEqual(1, len(response.leaves))
         self.assert_all_instances(response.leaves, client_pb2.Leaf)
         self.assertEqual('b', response.leaves[0].address)
@@ -443,7 +451,7 @@ class TestStateGetRequests(ClientHandlerTestCase):
     def setUp(self):
         db, store, roots = make_db_and_store()
         self.initialize(
-            handlers.StateGetRequest(db, store),
+            handlers.StateGetRequest(StateViewFactory(db), store),
             client_pb2.ClientStateGetRequest,
             client_pb2.ClientStateGetResponse,
             store=store,
@@ -581,3 +589,64 @@ class TestStateGetRequests(ClientHandlerTestCase):
         self.assertEqual(self.status.NO_RESOURCE, response.status)
         self.assertFalse(response.head_id)
         self.assertFalse(response.value)
+
+
+class TestConcurrentStateRequests(ClientHandlerTestCase):
+    """Sends many state requests at different heads from a pool of threads,
+    as the dispatcher does, and checks each gets the state at its own head.
+    """
+    def setUp(self):
+        self.db, self._store, self.roots = make_db_and_store(size=20)
+        self.state_view_factory = StateViewFactory(self.db)
+
+    def _expected(self, handler, request_proto, response_proto, **kwargs):
+        self.initialize(handler, request_proto, response_proto,
+                        store=self._store)
+        return self.make_request(**kwargs).SerializeToString()
+
+    def test_state_requests_under_concurrency(self):
+        """Verifies concurrent state list and get requests at different
+        heads return the same responses as when made one at a time.
+
+        Queries a mock db with twenty heads, whose state each has one more
+        leaf than the last, from ten threads.
+
+        Expects to find:
+            - every response matches the response to the same request
+                made serially
+        """
+        list_handler = handlers.StateListRequest(
+            self.state_view_factory, self._store)
+        get_handler = handlers.StateGetRequest(
+            self.state_view_factory, self._store)
+
+        requests = []
+        for i in range(20):
+            head_id = 'B-{}'.format(i)
+            list_request = client_pb2.ClientStateListRequest(head_id=head_id)
+            requests.append((list_handler, list_request, self._expected(
+                list_handler,
+                client_pb2.ClientStateListRequest,
+                client_pb2.ClientStateListResponse,
+                head_id=head_id)))
+
+            get_request = client_pb2.ClientStateGetRequest(
+                head_id=head_id, address='a')
+            requests.append((get_handler, get_request, self._expected(
+                get_handler,
+                client_pb2.ClientStateGetRequest,
+                client_pb2.ClientStateGetResponse,
+                head_id=head_id,
+                address='a')))
+
+        def handle(request):
+            handler, message, _ = request
+            return handler.handle(
+                self._identity,
+                message.SerializeToString()).message_out.SerializeToString()
+
+        with ThreadPoolExecutor(max_workers=10) as executor:
+            responses = list(executor.map(handle, requests * 50))
+
+        for (_, _, expected), response in zip(requests * 50, responses):
+            self.assertEqual(expected, response)
@@ -13,6 +13,7 @@
 # limitations under the License.
 # ------------------------------------------------------------------------------
 
+from concurrent.futures import Future
 from threading import Thread
 from time import time, sleep
 
@@ -232,3 +233,29 @@ class TestBatchStatusRequests(ClientHandlerTestCase):
         self.assertGreater(8, time() - start_time)
         self.assertEqual(self.status.OK, response.status)
         self.assertEqual(response.batch_statuses['b-new'], self.status.COMMITTED)
+
+    def test_batch_status_with_wait_is_deferred(self):
+        """Verifies requests that wait for commit don't block the handler.
+
+        Queries the default mock block store which will have no block with
+        the id 'deferred', with a timeout of one second.
+
+        Expects to find:
+            - the handler to return an unresolved Future immediately
+            - a response status of OK once the Future resolves
+            - a status of UNKNOWN at key 'b-deferred' in batch_statuses
+        """
+        request = self._request_proto(
+            batch_ids=['b-deferred'],
+            wait_for_commit=True,
+            timeout=1).SerializeToString()
+
+        result = self._handler.handle(self._identity, request)
+
+        self.assertIsInstance(result, Future)
+        self.assertFalse(result.done())
+
+        response = result.result(timeout=5).message_out
+        self.assertEqual(self.status.OK, response.status)
+        self.assertEqual(
+            response.batch_statuses['b-deferred'], self.status.UNKNOWN)
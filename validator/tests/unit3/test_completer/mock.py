@@ -17,10 +17,16 @@ class MockGossip():
         self.requested_blocks = []
         self.requested_batches = []
         self.requested_batches_by_transactin_id = []
+        self.requested_block_ranges = []
 
     def broadcast_block_request(self, block_id):
         self.requested_blocks.append(block_id)
 
+    def send_block_range_request(self, block_id, stop_block_num,
+                                 connection_id, max_blocks=500):
+        self.requested_block_ranges.append(
+            (block_id, stop_block_num, connection_id))
+
     def broadcast_batch_by_batch_id_request(self, batch_id):
         self.requested_batches.append(batch_id)
 
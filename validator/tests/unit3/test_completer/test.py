@@ -12,15 +12,22 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 # ------------------------------------------------------------------------------
+import threading
+import time
 import unittest
 import random
 import hashlib
 import cbor
 
 import sawtooth_signing as signing
+from sawtooth_validator.database.dict_database import DictDatabase
 from sawtooth_validator.journal.completer import Completer
+from sawtooth_validator.journal.completer import \
+    CompleterGossipBlockRangeResponseHandler
 from sawtooth_validator.journal.block_store import BlockStore
+from sawtooth_validator.journal.block_wrapper import BlockWrapper
 from sawtooth_validator.journal.block_wrapper import NULL_BLOCK_IDENTIFIER
+from sawtooth_validator.protobuf.network_pb2 import GossipBlockRangeResponse
 from sawtooth_validator.protobuf.transaction_pb2 import TransactionHeader, \
     Transaction
 from sawtooth_validator.protobuf.batch_pb2 import BatchHeader, Batch
@@ -30,7 +37,7 @@ from test_completer.mock import MockGossip
 
 class TestCompleter(unittest.TestCase):
     def setUp(self):
-        self.block_store = BlockStore({})
+        self.block_store = BlockStore(DictDatabase())
         self.gossip = MockGossip()
         self.completer = Completer(self.block_store, self.gossip)
         self.completer._on_block_received = self._on_block_received
@@ -297,3 +304,139 @@ class TestCompleter(unittest.TestCase):
         self.assertIn(batch.header_signature, self.batches)
         self.assertEquals(missing_batch,
                           self.completer.get_batch_by_transaction("Missing"))
+
+    def test_outstanding_request_not_repeated(self):
+        """
+        Add two blocks that are missing the same predecessor. The predecessor
+        should only be requested once while that request is outstanding.
+        """
+        blocks = self._create_blocks(2, 1, missing_predecessor=True)
+        for block in blocks:
+            self.completer.add_block(block)
+        self.assertEqual(self.gossip.requested_blocks, ["Missing"])
+
+    def test_block_range_sync(self):
+        """
+        Add a block far ahead of the chain head. The missing blocks should be
+        requested from the sending peer one block range at a time, starting
+        after the chain head, and each block of the range responses should
+        be completed in order without requesting its predecessor. The
+        far-ahead block should not be held in the incomplete block cache.
+        """
+        blocks = self._create_blocks(30, 1)
+        self.block_store.update_chain([BlockWrapper(blocks[0])])
+        self.completer.add_block(blocks[-1], "peer")
+        self.assertEqual(self.gossip.requested_block_ranges,
+                         [(blocks[-2].header_signature, 0, "peer")])
+        self.assertEqual(self.gossip.requested_blocks, [])
+        self.assertEqual(len(self.completer._incomplete_blocks), 0)
+
+        handler = CompleterGossipBlockRangeResponseHandler(self.completer)
+        for start in range(1, 29, 10):
+            response = GossipBlockRangeResponse(
+                block_id=blocks[-2].header_signature,
+                blocks=[block.SerializeToString()
+                        for block in blocks[start:start + 10]],
+                last=True)
+            handler.handle("peer", response.SerializeToString())
+
+        self.assertEqual(self.blocks,
+                         [block.header_signature for block in blocks[1:]])
+        self.assertEqual(self.gossip.requested_blocks, [])
+        self.assertEqual(self.gossip.requested_block_ranges,
+                         [(blocks[-2].header_signature, 0, "peer"),
+                          (blocks[-2].header_signature, 10, "peer"),
+                          (blocks[-2].header_signature, 20, "peer")])
+
+    def test_block_range_not_found(self):
+        """
+        If the peer asked for a block range has no blocks to send, the
+        predecessor of the far-ahead block should be requested from all
+        peers instead.
+        """
+        blocks = self._create_blocks(30, 1)
+        self.block_store.update_chain([BlockWrapper(blocks[0])])
+        self.completer.add_block(blocks[-1], "peer")
+
+        handler = CompleterGossipBlockRangeResponseHandler(self.completer)
+        response = GossipBlockRangeResponse(
+            block_id=blocks[-2].header_signature, last=True)
+        handler.handle("peer", response.SerializeToString())
+        self.assertEqual(self.gossip.requested_blocks,
+                         [blocks[-2].header_signature])
+
+    def test_compact_block(self):
+        """
+        Add a block that was announced with only its header. The block should
+        be rebuilt from the batch cache, requesting only the batch that has
+        not been received yet.
+        """
+        block = self._create_blocks(1, 3)[0]
+        batches = list(block.batches)
+        self.completer.add_batch(batches[0])
+        self.completer.add_batch(batches[1])
+
+        compact_block = Block(header=block.header,
+                              header_signature=block.header_signature)
+        self.completer.add_block(compact_block)
+        self.assertEqual(self.gossip.requested_batches,
+                         [batches[2].header_signature])
+        self.assertEqual(len(self.blocks), 0)
+
+        self.completer.add_batch(batches[2])
+        self.assertIn(block.header_signature, self.blocks)
+        self.assertEqual(
+            block,
+            self.completer.get_block(block.header_signature).get_block())
+
+    def test_queued_blocks_and_batches(self):
+        """
+        Queue a batch and a block on the running ingestion thread. Both should
+        be completed and passed on, and the metrics should count them.
+        """
+        block = self._create_blocks(1, 2, missing_batch=True,
+                                    find_batch=False)[0]
+        missing_batch = self._create_batches(1, 1)[0]
+        header = BlockHeader()
+        header.ParseFromString(block.header)
+        missing_batch.header_signature = header.batch_ids[-1]
+
+        self.completer.start()
+        try:
+            self.completer.queue_block(block)
+            self.completer.queue_batch(missing_batch)
+            deadline = time.time() + 5
+            while block.header_signature not in self.blocks and \
+                    time.time() < deadline:
+                time.sleep(0.01)
+        finally:
+            self.completer.stop()
+
+        self.assertIn(block.header_signature, self.blocks)
+        self.assertIn(missing_batch.header_signature, self.batches)
+        metrics = self.completer.get_metrics()
+        self.assertEqual(metrics['blocks_completed'], 1)
+        self.assertEqual(metrics['batches_completed'], 1)
+        self.assertEqual(metrics['queue_depth'], 0)
+        self.assertGreater(metrics['block_max_latency'], 0)
+
+    def test_callbacks_outside_lock(self):
+        """
+        The journal callbacks should be called without holding the
+        completer's lock, so other threads can add batches meanwhile.
+        """
+        batches = self._create_batches(2, 1)
+        added = []
+
+        def on_batch_received(batch):
+            if batch.header_signature != batches[0].header_signature:
+                return
+            thread = threading.Thread(
+                target=self.completer.add_batch, args=(batches[1],))
+            thread.start()
+            thread.join(2)
+            added.append(not thread.is_alive())
+
+        self.completer.set_on_batch_received(on_batch_received)
+        self.completer.add_batch(batches[0])
+        self.assertEqual(added, [True])
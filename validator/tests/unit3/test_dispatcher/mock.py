@@ -13,6 +13,7 @@
 # limitations under the License.
 # ------------------------------------------------------------------------------
 
+from concurrent.futures import Future
 from threading import RLock
 import time
 
@@ -46,6 +47,23 @@ class MockHandler2(dispatch.Handler):
             message_type=validator_pb2.Message.DEFAULT)
 
 
+class MockFailingHandler(dispatch.Handler):
+    """Returns a Future that fails, as a handler completing asynchronously
+    might.
+    """
+
+    def handle(self, connection_id, message_content):
+        result = Future()
+        result.set_exception(RuntimeError('handler failed'))
+        return result
+
+    def internal_error_result(self):
+        return dispatch.HandlerResult(
+            dispatch.HandlerStatus.RETURN,
+            message_out=validator_pb2.Message(correlation_id='error'),
+            message_type=validator_pb2.Message.DEFAULT)
+
+
 class MockSendMessage(object):
 
     def __init__(self, connections):
@@ -22,6 +22,7 @@ from sawtooth_validator.protobuf import validator_pb2
 from test_dispatcher.mock import MockSendMessage
 from test_dispatcher.mock import MockHandler1
 from test_dispatcher.mock import MockHandler2
+from test_dispatcher.mock import MockFailingHandler
 
 
 class TestDispatcherIdentityMessageMatch(unittest.TestCase):
@@ -72,3 +73,35 @@ class TestDispatcherIdentityMessageMatch(unittest.TestCase):
 
     def tearDown(self):
         self._dispatcher.stop()
+
+
+class TestDispatcherHandlerFailure(unittest.TestCase):
+    def setUp(self):
+        self._connection = "TestConnection"
+        self._dispatcher = dispatch.Dispatcher()
+        self._dispatcher.add_handler(
+            validator_pb2.Message.DEFAULT,
+            MockFailingHandler(),
+            ThreadPoolExecutor())
+        self.mock_send_message = MockSendMessage({'A': '0'})
+        self._dispatcher.add_send_message(self._connection,
+                                          self.mock_send_message.send_message)
+
+    def test_internal_error_sent(self):
+        """Tests that when the Future returned by a handler fails, the
+        handler's internal error result is sent back instead of the message
+        being left unanswered.
+        """
+        self._dispatcher.start()
+        self._dispatcher.dispatch(
+            self._connection,
+            validator_pb2.Message(
+                correlation_id='request',
+                message_type=validator_pb2.Message.DEFAULT),
+            'A')
+        self._dispatcher.block_until_complete()
+        self.assertEqual(self.mock_send_message.message_ids, ['error'])
+        self.assertEqual(self.mock_send_message.identities, ['0'])
+
+    def tearDown(self):
+        self._dispatcher.stop()
@@ -0,0 +1,47 @@
+# Copyright 2017 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+
+
+class MockGossip():
+    def __init__(self, peers):
+        self.peers = peers
+        self.sent_requests = []
+        self.broadcast_requests = []
+
+    def get_peers(self):
+        return {peer: peer for peer in self.peers}
+
+    def send_block_request(self, block_id, connection_id, time_to_live=None):
+        self.sent_requests.append((block_id, connection_id, time_to_live))
+
+    def send_batch_by_batch_id_request(self, batch_id, connection_id,
+                                       time_to_live=None):
+        self.sent_requests.append((batch_id, connection_id, time_to_live))
+
+    def send_batch_by_transaction_id_request(self, transaction_ids,
+                                             connection_id,
+                                             time_to_live=None):
+        for transaction_id in transaction_ids:
+            self.sent_requests.append(
+                (transaction_id, connection_id, time_to_live))
+
+    def broadcast_block_request(self, block_id):
+        self.broadcast_requests.append(block_id)
+
+    def broadcast_batch_by_batch_id_request(self, batch_id):
+        self.broadcast_requests.append(batch_id)
+
+    def broadcast_batch_by_transaction_id_request(self, transaction_ids):
+        self.broadcast_requests.extend(transaction_ids)
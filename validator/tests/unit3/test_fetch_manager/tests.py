@@ -0,0 +1,76 @@
+# Copyright 2017 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+import unittest
+
+from sawtooth_validator.gossip.fetch_manager import FetchManager
+from test_fetch_manager.mock import MockGossip
+
+
+class TestFetchManager(unittest.TestCase):
+    def setUp(self):
+        self.gossip = MockGossip(["peer_1", "peer_2", "peer_3"])
+        # A negative timeout makes every outstanding fetch time out on the
+        # next check
+        self.fetch_manager = FetchManager(self.gossip, fetch_timeout=-1)
+
+    def test_fetch_from_preferred_peer(self):
+        """
+        Test that a fetch asks only the preferred peer, without forwarding,
+        and that a duplicate fetch is not sent.
+        """
+        self.fetch_manager.fetch_block("block", "peer_2")
+        self.fetch_manager.fetch_block("block", "peer_3")
+        self.assertEqual(self.gossip.sent_requests,
+                         [("block", "peer_2", 0)])
+        self.assertEqual(self.gossip.broadcast_requests, [])
+
+    def test_failover_to_next_peer(self):
+        """
+        Test that each peer is asked in turn as fetches time out, and that the
+        request is broadcast once every peer has been asked.
+        """
+        self.fetch_manager.fetch_batch("batch", "peer_3")
+        for _ in range(3):
+            self.fetch_manager.check_timeouts()
+
+        self.assertEqual(
+            [peer for _, peer, _ in self.gossip.sent_requests],
+            ["peer_3", "peer_1", "peer_2"])
+        self.assertEqual(self.gossip.broadcast_requests, ["batch"])
+        self.assertEqual(self.fetch_manager.pending_count(), 0)
+        self.assertEqual(self.fetch_manager.get_peer_timeouts(),
+                         {"peer_1": 1, "peer_2": 1, "peer_3": 1})
+
+    def test_latency_tracking(self):
+        """
+        Test that a response from the asked peer completes the fetch and
+        records the peer's latency, and that peers that timed out are ranked
+        last while peers with no latency yet are tried first.
+        """
+        self.fetch_manager.fetch_batches_by_transaction_ids(["txn"], "peer_1")
+        self.fetch_manager.check_timeouts()
+        self.fetch_manager.fetched("txn", "peer_2")
+
+        self.assertEqual(self.fetch_manager.pending_count(), 0)
+        self.assertIn("peer_2", self.fetch_manager.get_peer_latencies())
+        self.assertNotIn("peer_1", self.fetch_manager.get_peer_latencies())
+
+        self.gossip.sent_requests = []
+        self.fetch_manager.fetch_block("block")
+        for _ in range(2):
+            self.fetch_manager.check_timeouts()
+        self.assertEqual(
+            [peer for _, peer, _ in self.gossip.sent_requests],
+            ["peer_3", "peer_2", "peer_1"])
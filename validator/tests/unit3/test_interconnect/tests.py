@@ -0,0 +1,187 @@
+# Copyright 2017 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+
+import asyncio
+import logging
+import os
+import resource
+import socket
+import time
+import unittest
+
+import zmq
+
+from sawtooth_validator.networking import future
+from sawtooth_validator.networking.dispatch import Dispatcher
+from sawtooth_validator.networking.interconnect import ConnectionType
+from sawtooth_validator.networking.interconnect import Interconnect
+from sawtooth_validator.networking.interconnect import _ConnectionTable
+from sawtooth_validator.networking.interconnect import _SendReceive
+from sawtooth_validator.protobuf import validator_pb2
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+class TestHeartbeat(unittest.TestCase):
+    def setUp(self):
+        self.connections = _ConnectionTable()
+        self.send_receive = _SendReceive(
+            "TestConnection",
+            "tcp://127.0.0.1:0",
+            futures=future.FutureCollection(),
+            connections=self.connections,
+            heartbeat=True,
+            heartbeat_interval=10,
+            connection_timeout=60)
+
+    def test_quiet_connections_pinged(self):
+        """
+        Test that only the connections that have been quiet for longer than
+        the heartbeat interval are pinged, and that connections that stay
+        quiet past the connection timeout are removed.
+        """
+        self.send_receive._received_from_identity(b'quiet', now=0)
+        self.send_receive._received_from_identity(b'busy', now=0)
+        self.assertEqual(
+            self.connections.count(ConnectionType.ZMQ_IDENTITY), 2)
+
+        self.assertEqual(self.send_receive._check_inbound_heartbeats(5), [])
+
+        self.send_receive._received_from_identity(b'busy', now=8)
+        self.assertEqual(self.send_receive._check_inbound_heartbeats(11),
+                         [b'quiet'])
+        self.assertEqual(self.send_receive._check_inbound_heartbeats(19),
+                         [b'busy'])
+
+        self.send_receive._received_from_identity(b'busy', now=50)
+        self.send_receive._check_inbound_heartbeats(61)
+        self.assertEqual(
+            self.connections.count(ConnectionType.ZMQ_IDENTITY), 1)
+        self.assertIsNone(self.connections.get(
+            self.send_receive._identity_to_connection_id(b'quiet')))
+
+    def test_reconnected_identity_scheduled_once(self):
+        """
+        Test that an identity which is removed and reconnects before its
+        scheduled check is only checked, and pinged, once per interval.
+        """
+        self.send_receive._received_from_identity(b'peer', now=0)
+        self.send_receive._remove_connected_identity(b'peer')
+        self.send_receive._received_from_identity(b'peer', now=1)
+
+        self.assertEqual(self.send_receive._check_inbound_heartbeats(12),
+                         [b'peer'])
+        self.assertEqual(len(self.send_receive._heartbeat_schedule), 1)
+        self.assertEqual(self.send_receive._check_inbound_heartbeats(21),
+                         [])
+
+
+def _unused_port():
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+@unittest.skipUnless(
+    os.environ.get('INTERCONNECT_LOAD_CLIENTS'),
+    'set INTERCONNECT_LOAD_CLIENTS to the number of clients to connect')
+class TestInterconnectLoad(unittest.TestCase):
+    """Connects many DEALER clients to a single Interconnect and reports the
+    time taken by each heartbeat check. It only runs when
+    INTERCONNECT_LOAD_CLIENTS is set to the number of clients, e.g. 2000, so
+    that unit test runs stay fast.
+    """
+    def setUp(self):
+        self.client_count = int(os.environ['INTERCONNECT_LOAD_CLIENTS'])
+
+        # Each client uses a file descriptor on both ends of its connection
+        required_files = 2 * self.client_count + 256
+        self.file_limits = resource.getrlimit(resource.RLIMIT_NOFILE)
+        soft_limit, hard_limit = self.file_limits
+        if soft_limit != resource.RLIM_INFINITY and \
+                soft_limit < required_files:
+            if hard_limit != resource.RLIM_INFINITY and \
+                    hard_limit < required_files:
+                self.skipTest('{} open files are needed for {} clients'
+                              .format(required_files, self.client_count))
+            resource.setrlimit(resource.RLIMIT_NOFILE,
+                               (required_files, hard_limit))
+            self.addCleanup(
+                resource.setrlimit, resource.RLIMIT_NOFILE, self.file_limits)
+
+        self.endpoint = 'tcp://127.0.0.1:{}'.format(_unused_port())
+        self.dispatcher = Dispatcher()
+        self.interconnect = Interconnect(
+            self.endpoint,
+            self.dispatcher,
+            heartbeat=True,
+            max_incoming_connections=self.client_count)
+        self.interconnect.start()
+        self.context = zmq.Context()
+        self.context.set(zmq.MAX_SOCKETS, self.client_count + 16)
+        self.clients = []
+
+    def tearDown(self):
+        for client in self.clients:
+            client.close(linger=0)
+        self.context.term()
+        self.interconnect.stop()
+
+    def test_heartbeat_overhead(self):
+        message = validator_pb2.Message(
+            correlation_id='load',
+            message_type=validator_pb2.Message.DEFAULT)
+        for _ in range(self.client_count):
+            client = self.context.socket(zmq.DEALER)
+            client.connect(self.endpoint)
+            client.send(message.SerializeToString())
+            self.clients.append(client)
+
+        deadline = time.time() + 30
+        while self.interconnect.connection_count(
+                ConnectionType.ZMQ_IDENTITY) < self.client_count and \
+                time.time() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(
+            self.interconnect.connection_count(ConnectionType.ZMQ_IDENTITY),
+            self.client_count)
+        self.assertTrue(self.interconnect.allow_inbound_connection())
+
+        # Check every connection as if all were due for a ping, then check
+        # again when none are due. The checks run on the interconnect's
+        # event loop, which owns the heartbeat schedule.
+        send_receive = self.interconnect._send_receive_thread
+
+        @asyncio.coroutine
+        def time_checks():
+            start = time.time()
+            due = send_receive._check_inbound_heartbeats(time.time() + 11)
+            all_due_time = time.time() - start
+            start = time.time()
+            send_receive._check_inbound_heartbeats()
+            none_due_time = time.time() - start
+            return due, all_due_time, none_due_time
+
+        due, all_due_time, none_due_time = asyncio.run_coroutine_threadsafe(
+            time_checks(), send_receive._event_loop).result(timeout=60)
+
+        self.assertEqual(len(due), self.client_count)
+        LOGGER.warning(
+            'Heartbeat check for %s connections: %.6fs with all due, '
+            '%.6fs with none due',
+            self.client_count, all_due_time, none_due_time)
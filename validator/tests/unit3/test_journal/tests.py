@@ -13,22 +13,36 @@
 # limitations under the License.
 # ------------------------------------------------------------------------------
 
+from concurrent.futures import ThreadPoolExecutor
 import logging
+import threading
+import time
 import unittest
+from unittest import mock
 
 from sawtooth_validator.database.dict_database import DictDatabase
 
+from sawtooth_validator.journal.ancestor_index import AncestorIndex
 from sawtooth_validator.journal.block_cache import BlockCache
+from sawtooth_validator.journal.block_store import BlockStore
 from sawtooth_validator.journal.block_wrapper import BlockStatus
 from sawtooth_validator.journal.block_wrapper import BlockWrapper
+from sawtooth_validator.journal.block_wrapper import NULL_BLOCK_IDENTIFIER
 
 from sawtooth_validator.journal.chain import BlockValidator
 from sawtooth_validator.journal.chain import ChainController
+from sawtooth_validator.journal.consensus.consensus_factory import \
+    ConsensusInstanceCache
+from sawtooth_validator.journal.consensus.dev_mode import \
+    dev_mode_consensus
 from sawtooth_validator.journal.journal import Journal
 from sawtooth_validator.journal.publisher import BlockPublisher
 from sawtooth_validator.journal.timed_cache import TimedCache
 
 from sawtooth_validator.protobuf.batch_pb2 import Batch
+from sawtooth_validator.protobuf.block_pb2 import Block
+from sawtooth_validator.protobuf.block_pb2 import BlockHeader
+from sawtooth_validator.protobuf.transaction_pb2 import Transaction
 
 from sawtooth_validator.state.state_view import StateViewFactory
 
@@ -62,6 +76,250 @@ class TestBlockCache(unittest.TestCase):
         with self.assertRaises(KeyError):
             bc["test-missing"]
 
+    def test_byte_budget(self):
+        """ Test that the least recently used blocks are evicted to keep the
+        cache within its byte budget, except pinned blocks.
+        """
+        blocks = [BlockWrapper(Block(header_signature=str(i) * 10,
+                                     header=b'x' * 100))
+                  for i in range(4)]
+        size = blocks[0].block.ByteSize()
+        bc = BlockCache({}, keep_time=10, max_bytes=size * 2)
+
+        bc.pin(blocks[0].identifier)
+        for block in blocks[:3]:
+            bc[block.identifier] = block
+        self.assertTrue(blocks[0].identifier in bc)
+        self.assertFalse(blocks[1].identifier in bc)
+        self.assertTrue(blocks[2].identifier in bc)
+
+        bc.unpin(blocks[0].identifier)
+        bc[blocks[3].identifier] = blocks[3]
+        self.assertFalse(blocks[0].identifier in bc)
+
+        stats = bc.get_stats()
+        self.assertEqual(stats['blocks'], 2)
+        self.assertEqual(stats['bytes'], size * 2)
+        self.assertEqual(stats['evictions'], 2)
+
+    def test_pinned_chain_window(self):
+        """ Test that the most recent blocks of the chain are pinned, and
+        that the window moves as the chain is extended.
+        """
+        bc = BlockCache({}, keep_time=10, max_bytes=0, pinned_window=2)
+        previous_block_id = NULL_BLOCK_IDENTIFIER
+        blocks = []
+        for i in range(4):
+            header = BlockHeader(block_num=i,
+                                 previous_block_id=previous_block_id)
+            block = BlockWrapper(Block(
+                header_signature=str(i) * 10,
+                header=header.SerializeToString()))
+            blocks.append(block)
+            previous_block_id = block.identifier
+
+        bc.update_chain_head(blocks[1])
+        bc[blocks[1].identifier] = blocks[1]
+        self.assertTrue(blocks[1].identifier in bc)
+
+        for block in blocks[2:]:
+            bc.update_chain_head(block)
+            bc[block.identifier] = block
+        self.assertFalse(blocks[1].identifier in bc)
+        self.assertTrue(blocks[2].identifier in bc)
+        self.assertTrue(blocks[3].identifier in bc)
+        self.assertEqual(bc.get_stats()['pinned'], 2)
+
+
+class TestBlockStore(unittest.TestCase):
+    def _make_block(self, block_id, previous, batch_count):
+        if previous is None:
+            block_num, previous_block_id = 0, NULL_BLOCK_IDENTIFIER
+        else:
+            block_num = previous.block_num + 1
+            previous_block_id = previous.identifier
+
+        batches = [
+            Batch(header_signature='{}-b{}'.format(block_id, i),
+                  transactions=[
+                      Transaction(header_signature='{}-b{}-t{}'.format(
+                          block_id, i, j))
+                      for j in range(i + 1)])
+            for i in range(batch_count)]
+        header = BlockHeader(block_num=block_num,
+                             previous_block_id=previous_block_id)
+        return BlockWrapper(Block(header_signature=block_id,
+                                  header=header.SerializeToString(),
+                                  batches=batches))
+
+    def test_chain_indexes(self):
+        """ Test that blocks are indexed by number, with the number of
+        batches and transactions in the chain, and that the indexes follow
+        the chain when it switches to a fork.
+        """
+        store = BlockStore(DictDatabase())
+        chain = [self._make_block('genesis', None, 0)]
+        for i, batch_count in enumerate([1, 2, 3]):
+            chain.append(self._make_block(
+                'main-{}'.format(i), chain[-1], batch_count))
+        for block in chain:
+            store.update_chain([block])
+
+        self.assertEqual(store.get_block_id_by_number(2), 'main-1')
+        self.assertEqual(store.get_block_by_number(3).identifier, 'main-2')
+        self.assertEqual(store.get_chain_counts('genesis'), (0, 0))
+        self.assertEqual(store.get_chain_counts('main-1'), (3, 4))
+        self.assertEqual(store.get_chain_counts('main-2'), (6, 10))
+
+        fork = [self._make_block('fork-0', chain[1], 1)]
+        fork.insert(0, self._make_block('fork-1', fork[0], 1))
+        store.update_chain(fork, [chain[3], chain[2]])
+
+        self.assertEqual(store.get_block_id_by_number(2), 'fork-0')
+        self.assertEqual(store.get_block_id_by_number(3), 'fork-1')
+        self.assertEqual(store.get_chain_counts('fork-1'), (3, 3))
+        with self.assertRaises(KeyError):
+            store.get_chain_counts('main-2')
+
+        # A block whose predecessor isn't counted is left out of the indexes
+        orphan = self._make_block(
+            'orphan', self._make_block('missing', fork[0], 1), 1)
+        store.update_chain([orphan])
+        with self.assertRaises(KeyError):
+            store.get_chain_counts('orphan')
+        with self.assertRaises(KeyError):
+            store.get_block_id_by_number(orphan.block_num)
+
+    def test_commit_callbacks_off_committing_thread(self):
+        """ Test that batch commit callbacks are called on the notifier
+        thread, so a slow callback doesn't hold up the thread committing
+        blocks, and that stopping the notifier times out any remaining
+        subscriptions.
+        """
+        store = BlockStore(DictDatabase())
+        genesis = self._make_block('genesis', None, 0)
+        store.update_chain([genesis])
+        block = self._make_block('block', genesis, 1)
+
+        release = threading.Event()
+        called = threading.Event()
+        results = []
+
+        def on_commit(committed):
+            release.wait()
+            results.append((committed, threading.current_thread()))
+            called.set()
+
+        store.subscribe_to_batch_commits(on_commit, ['block-b0'], timeout=10)
+        store.subscribe_to_batch_commits(
+            lambda committed: results.append((committed, None)),
+            ['missing'], timeout=10)
+        store.update_chain([block])
+        self.assertEqual(results, [])
+
+        release.set()
+        self.assertTrue(called.wait(5))
+        self.assertTrue(results[0][0])
+        self.assertIsNot(results[0][1], threading.current_thread())
+
+        notifier = results[0][1]
+        notifier.stop()
+        notifier.join(5)
+        self.assertFalse(notifier.is_alive())
+        self.assertEqual(results[1], (False, None))
+
+
+class TestAncestorIndex(unittest.TestCase):
+    def setUp(self):
+        self.block_store = BlockStore(DictDatabase())
+        self.block_cache = BlockCache(self.block_store)
+        self.index = AncestorIndex(self.block_cache)
+
+    def _make_chain(self, prefix, previous, length):
+        """Adds a chain of blocks to the block cache, and returns them,
+        oldest first.
+        """
+        chain = []
+        for i in range(length):
+            if previous is None:
+                block_num, previous_block_id = 0, NULL_BLOCK_IDENTIFIER
+            else:
+                block_num = previous.block_num + 1
+                previous_block_id = previous.identifier
+            header = BlockHeader(block_num=block_num,
+                                 previous_block_id=previous_block_id)
+            previous = BlockWrapper(Block(
+                header_signature='{}-{}'.format(prefix, i),
+                header=header.SerializeToString()))
+            self.block_cache[previous.identifier] = previous
+            chain.append(previous)
+        return chain
+
+    def test_ancestors(self):
+        """ Test that the ancestors of blocks on the current chain and on a
+        fork are found, indexing only the blocks of the fork, in a
+        logarithmic number of steps.
+        """
+        main = self._make_chain('main', None, 100)
+        for block in main:
+            self.block_store.update_chain([block])
+        fork = self._make_chain('fork', main[19], 300)
+
+        self.assertEqual(
+            self.index.get_ancestor_id(main[-1].identifier, 42),
+            main[42].identifier)
+
+        chain = main[:20] + fork
+        for block_num in range(len(chain)):
+            self.assertEqual(
+                self.index.get_ancestor_id(fork[-1].identifier, block_num),
+                chain[block_num].identifier)
+        self.assertEqual(len(self.index), len(fork))
+
+        with mock.patch.object(self.index, '_get_entry',
+                               wraps=self.index._get_entry) as get_entry:
+            self.index.get_ancestor_id(fork[-1].identifier, 21)
+            self.assertLess(get_entry.call_count, 30)
+
+        with self.assertRaises(ValueError):
+            self.index.get_ancestor_id(main[5].identifier, 6)
+
+    def test_common_ancestor(self):
+        """ Test that the common ancestor of blocks on forks is found, that
+        blocks from different genesis blocks have none, and that a missing
+        predecessor is reported.
+        """
+        main = self._make_chain('main', None, 50)
+        for block in main:
+            self.block_store.update_chain([block])
+        fork = self._make_chain('fork', main[30], 10)
+        other = self._make_chain('other', fork[3], 40)
+
+        self.assertEqual(
+            self.index.find_common_ancestor_id(
+                main[-1].identifier, other[-1].identifier),
+            main[30].identifier)
+        self.assertEqual(
+            self.index.find_common_ancestor_id(
+                fork[-1].identifier, other[-1].identifier),
+            fork[3].identifier)
+        self.assertEqual(
+            self.index.find_common_ancestor_id(
+                other[-1].identifier, main[12].identifier),
+            main[12].identifier)
+
+        alternate = self._make_chain('alternate', None, 20)
+        self.assertIsNone(
+            self.index.find_common_ancestor_id(
+                alternate[-1].identifier, main[-1].identifier))
+
+        missing = self._make_chain('missing', fork[-1], 1)
+        orphan = self._make_chain('orphan', missing[0], 5)
+        del self.block_cache[missing[0].identifier]
+        with self.assertRaises(KeyError):
+            self.index.find_common_ancestor_id(
+                orphan[-1].identifier, main[-1].identifier)
+
 
 class TestBlockPublisher(unittest.TestCase):
     '''
@@ -845,6 +1103,68 @@ class TestChainController(unittest.TestCase):
         self.receive_and_process_blocks(wow)
         self.assert_is_chain_head(wow)
 
+    def test_longest_fork_validated_first(self):
+        '''Tests that of several competing forks waiting to be validated,
+        the longest is validated first
+        '''
+        _, head_2 = self.generate_chain(self.init_head, 2)
+        _, head_7 = self.generate_chain(self.init_head, 7)
+        _, head_5 = self.generate_chain(self.init_head, 5)
+
+        for block in (head_2, head_7, head_5):
+            self.chain_ctrl.on_block_received(block)
+
+        self.executor.process_next()
+        self.assert_is_chain_head(head_7)
+
+        self.executor.process_all()
+        self.assert_is_chain_head(head_7)
+
+    def test_parallel_forks_share_blocks(self):
+        '''Tests that forks validated at the same time, which share blocks
+        that have not been validated, validate those blocks only once
+        '''
+        executor = ThreadPoolExecutor(3)
+        self.addCleanup(executor.shutdown)
+        chain_ctrl = ChainController(
+            block_cache=self.block_tree_manager.block_cache,
+            state_view_factory=MockStateViewFactory(
+                self.block_tree_manager.state_db),
+            block_sender=self.block_sender,
+            executor=executor,
+            transaction_executor=MockTransactionExecutor(),
+            on_chain_updated=lambda *args, **kwargs: None,
+            squash_handler=None,
+            chain_id_manager=None,
+            identity_signing_key=self.block_tree_manager.identity_signing_key,
+            data_dir=None)
+
+        shared_chain, shared_head = self.generate_chain(self.init_head, 3)
+        _, head_a = self.generate_chain(shared_head, 2)
+        _, head_b = self.generate_chain(shared_head, 4)
+        _, head_c = self.generate_chain(shared_head, 1)
+
+        verified = []
+        verify_block = mock_consensus.BlockVerifier.verify_block
+
+        def slow_verify_block(verifier, block_wrapper):
+            verified.append(block_wrapper.identifier)
+            time.sleep(0.01)
+            return verify_block(verifier, block_wrapper)
+
+        with mock.patch.object(mock_consensus.BlockVerifier, 'verify_block',
+                               slow_verify_block):
+            for block in (head_a, head_b, head_c):
+                chain_ctrl.on_block_received(block)
+            wait_until(
+                lambda: not chain_ctrl._blocks_processing, time_out=10)
+
+        for block in shared_chain:
+            self.assertEqual(1, verified.count(block.identifier))
+        self.assertEqual(
+            head_b.header_signature,
+            chain_ctrl.chain_head.header_signature)
+
 
     # next multi threaded
     # next add block publisher
@@ -886,6 +1206,59 @@ class TestChainController(unittest.TestCase):
         self.executor.process_all()
 
 
+class TestConsensusInstanceCache(unittest.TestCase):
+    def setUp(self):
+        self.block_tree_manager = BlockTreeManager()
+        self.consensus_instances = ConsensusInstanceCache(
+            block_cache=self.block_tree_manager.block_cache,
+            state_view_factory=MockStateViewFactory(
+                self.block_tree_manager.state_db),
+            data_dir=None,
+            validator_id='validator',
+            batch_publisher=MockBatchSender())
+
+    def test_instances_reused(self):
+        """Verify that the consensus objects for a consensus module are
+        created once and then reused.
+        """
+        for get in [self.consensus_instances.get_block_publisher,
+                    self.consensus_instances.get_block_verifier,
+                    self.consensus_instances.get_fork_resolver]:
+            instance = get(mock_consensus)
+            self.assertIs(instance, get(mock_consensus))
+
+        self.assertIsInstance(
+            self.consensus_instances.get_block_verifier(mock_consensus),
+            mock_consensus.BlockVerifier)
+
+    def test_instances_replaced_on_module_change(self):
+        """Verify that the consensus objects are created again when the
+        consensus module changes, and that objects for the previous module
+        are not kept.
+        """
+        verifier = \
+            self.consensus_instances.get_block_verifier(mock_consensus)
+        resolver = \
+            self.consensus_instances.get_fork_resolver(mock_consensus)
+
+        dev_mode_verifier = \
+            self.consensus_instances.get_block_verifier(dev_mode_consensus)
+        self.assertIsInstance(
+            dev_mode_verifier, dev_mode_consensus.BlockVerifier)
+        self.assertIs(
+            dev_mode_verifier,
+            self.consensus_instances.get_block_verifier(dev_mode_consensus))
+
+        # Other kinds of consensus objects are unaffected
+        self.assertIs(
+            resolver,
+            self.consensus_instances.get_fork_resolver(mock_consensus))
+
+        self.assertIsNot(
+            verifier,
+            self.consensus_instances.get_block_verifier(mock_consensus))
+
+
 class TestJournal(unittest.TestCase):
     def setUp(self):
         self.gossip = MockNetwork()
@@ -941,6 +1314,45 @@ class TestJournal(unittest.TestCase):
             if journal is not None:
                 journal.stop()
 
+    def test_stop(self):
+        """
+        Test that once the Journal has validated a block, stopping it ends
+        all of its threads, including those of the block validation pool.
+        """
+        threads_before = set(threading.enumerate())
+
+        btm = BlockTreeManager()
+        journal = Journal(
+            block_store=btm.block_store,
+            block_cache=btm.block_cache,
+            state_view_factory=StateViewFactory(DictDatabase()),
+            block_sender=self.block_sender,
+            batch_sender=self.batch_sender,
+            transaction_executor=self.txn_executor,
+            squash_handler=None,
+            identity_signing_key=btm.identity_signing_key,
+            chain_id_manager=None,
+            data_dir=None,
+            block_cache_purge_frequency=0.1
+        )
+        journal.start()
+
+        journal.on_batch_received(Batch())
+        wait_until(lambda: self.block_sender.new_block is not None, 2)
+        block = BlockWrapper(self.block_sender.new_block)
+        journal.on_block_received(block)
+        wait_until(lambda: btm.chain_head.identifier == block.identifier, 2)
+        self.assertEqual(block.identifier, btm.chain_head.identifier)
+
+        journal.stop()
+
+        def journal_threads():
+            return [t for t in threading.enumerate()
+                    if t not in threads_before and t.is_alive()]
+
+        wait_until(lambda: not journal_threads(), 5)
+        self.assertEqual([], journal_threads())
+
 
 class TestTimedCache(unittest.TestCase):
     def test_cache(self):
@@ -992,3 +1404,31 @@ class TestTimedCache(unittest.TestCase):
         self.assertEqual(len(bc), 2)
         self.assertTrue("test" in bc)
         self.assertTrue("test2" in bc)
+
+    def test_expire_on_set(self):
+        """ Test that expired values are evicted as new values are set,
+        without purging the cache.
+        """
+        bc = TimedCache(keep_time=1)
+
+        bc["test"] = "value"
+        bc.cache["test"].timestamp = bc.cache["test"].timestamp - 2
+        bc["test2"] = "value2"
+        self.assertEqual(len(bc), 1)
+        self.assertFalse("test" in bc)
+        self.assertTrue("test2" in bc)
+
+    def test_max_size(self):
+        """ Test that the least recently used values are evicted to keep
+        the cache within max_size.
+        """
+        bc = TimedCache(keep_time=10, max_size=2)
+
+        bc["test"] = "value"
+        bc["test2"] = "value2"
+        bc["test"]  # access so that test2 is the least recently used
+        bc["test3"] = "value3"
+        self.assertEqual(len(bc), 2)
+        self.assertTrue("test" in bc)
+        self.assertFalse("test2" in bc)
+        self.assertTrue("test3" in bc)
@@ -119,6 +119,78 @@ class TestSawtoothMerkleTrie(unittest.TestCase):
             self.assert_value_at_address(
                 address, value, ishash=True)
 
+    def test_merkle_trie_iter_leaves(self):
+        """Tests that leaves are iterated in address order, and that
+        iteration can be resumed at any address, in either direction.
+        """
+        prefixes = ['aa', 'ab', 'bb']
+        set_items = {
+            prefix + _hash(key)[:8]: {key: 1} for prefix in prefixes
+            for key in (_random_string(10) for _ in range(20))
+        }
+        self.set_merkle_root(self.update(set_items, virtual=False))
+
+        addresses = sorted(set_items)
+        self.assertEqual(
+            addresses,
+            [address for address, _ in self.trie.iter_leaves()])
+        self.assertEqual(
+            addresses[::-1],
+            [address for address, _ in self.trie.iter_leaves(reverse=True)])
+
+        prefixed = [a for a in addresses if a.startswith('ab')]
+        self.assertEqual(
+            prefixed,
+            [address for address, _ in self.trie.iter_leaves('ab')])
+
+        for index in (0, 5, len(prefixed) - 1):
+            start = prefixed[index]
+            self.assertEqual(
+                prefixed[index:],
+                [address for address, _ in self.trie.iter_leaves('ab', start)])
+            self.assertEqual(
+                prefixed[index::-1],
+                [address for address, _ in
+                 self.trie.iter_leaves('ab', start, reverse=True)])
+
+        # A start address outside of the prefix includes or excludes all
+        self.assertEqual(
+            prefixed,
+            [address for address, _ in self.trie.iter_leaves('ab', 'aa')])
+        self.assertEqual(
+            [], list(self.trie.iter_leaves('ab', 'bb')))
+        self.assertEqual([], list(self.trie.iter_leaves('cc')))
+
+        for address, value in self.trie.iter_leaves('bb'):
+            self.assertEqual(set_items[address], value)
+
+    def test_merkle_trie_node_hash(self):
+        """Tests that the hash of the node at an address prefix changes only
+        when state under the prefix changes.
+        """
+        set_items = {
+            prefix + _hash(key)[:8]: {key: 1} for prefix in ['aabb', 'ccdd']
+            for key in (_random_string(10) for _ in range(5))
+        }
+        self.set_merkle_root(self.update(set_items, virtual=False))
+        root = self.get_merkle_root()
+        self.assertEqual(root, self.trie.get_node_hash(''))
+
+        aabb_hash = self.trie.get_node_hash('aabb')
+        ccdd_hash = self.trie.get_node_hash('ccdd')
+        self.assertEqual(
+            MerkleDatabase.hash(self.lmdb.get(aabb_hash)), aabb_hash)
+
+        # Changing state under one prefix leaves the other's hash alone
+        self.set_merkle_root(self.update(
+            {'ccdd' + _hash('new')[:8]: {'new': 1}}, virtual=False))
+        self.assert_not_root(root)
+        self.assertEqual(aabb_hash, self.trie.get_node_hash('aabb'))
+        self.assertNotEqual(ccdd_hash, self.trie.get_node_hash('ccdd'))
+
+        with self.assertRaises(KeyError):
+            self.trie.get_node_hash('eeff')
+
     # assertions
 
     def assert_value_at_address(self, address, value, ishash=False):
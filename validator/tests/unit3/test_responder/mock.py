@@ -0,0 +1,74 @@
+# Copyright 2017 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+
+
+class MockGossip():
+    def __init__(self):
+        self.broadcasted = {}
+        self.sent = {}
+        self._seen = set()
+
+    def mark_seen(self, content_id):
+        if content_id in self._seen:
+            return True
+        self._seen.add(content_id)
+        return False
+
+    def send(self, message_type, message, connection_id):
+        if connection_id not in self.sent:
+            self.sent[connection_id] = []
+        self.sent[connection_id].append((message_type, message))
+
+    def broadcast(self, gossip_message, message_type, exclude=None):
+        if message_type not in self.broadcasted:
+            self.broadcasted[message_type] = []
+        self.broadcasted[message_type].append(gossip_message)
+
+    def clear(self):
+        self.broadcasted = {}
+        self.sent = {}
+
+
+class MockCompleter():
+    def __init__(self):
+        self.blocks = {}
+        self.blocks_by_num = {}
+        self.batches = {}
+        self.batches_by_txn = {}
+
+    def add_block(self, block, on_chain=True):
+        self.blocks[block.header_signature] = block
+        if on_chain:
+            self.blocks_by_num[block.block_num] = block
+
+    def add_batch(self, batch):
+        self.batches[batch.header_signature] = batch
+        for txn in batch.transactions:
+            self.batches_by_txn[txn.header_signature] = batch
+
+    def get_chain_head(self):
+        return None
+
+    def get_block(self, block_id):
+        return self.blocks.get(block_id)
+
+    def get_block_by_number(self, block_num):
+        return self.blocks_by_num.get(block_num)
+
+    def get_batch(self, batch_id):
+        return self.batches.get(batch_id)
+
+    def get_batch_by_transaction(self, transaction_id):
+        return self.batches_by_txn.get(transaction_id)
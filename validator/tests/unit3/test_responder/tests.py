@@ -0,0 +1,273 @@
+# Copyright 2017 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+import unittest
+
+from sawtooth_validator.journal.block_wrapper import BlockWrapper
+from sawtooth_validator.journal.responder import Responder
+from sawtooth_validator.journal.responder import BlockResponderHandler
+from sawtooth_validator.journal.responder import BlockRangeResponderHandler
+from sawtooth_validator.journal.responder import \
+    ResponderBlockResponseHandler
+from sawtooth_validator.journal.responder import \
+    BatchByBatchIdResponderHandler
+from sawtooth_validator.journal.responder import \
+    BatchByTransactionIdResponderHandler
+from sawtooth_validator.journal.responder import \
+    ResponderBatchResponseHandler
+from sawtooth_validator.networking.dispatch import HandlerStatus
+from sawtooth_validator.protobuf import network_pb2
+from sawtooth_validator.protobuf import validator_pb2
+from sawtooth_validator.protobuf.batch_pb2 import Batch
+from sawtooth_validator.protobuf.block_pb2 import Block
+from sawtooth_validator.protobuf.block_pb2 import BlockHeader
+from sawtooth_validator.protobuf.transaction_pb2 import Transaction
+from test_responder.mock import MockGossip
+from test_responder.mock import MockCompleter
+
+
+class TestResponder(unittest.TestCase):
+    def setUp(self):
+        self.gossip = MockGossip()
+        self.completer = MockCompleter()
+        self.responder = Responder(self.completer)
+        self.block_request_handler = \
+            BlockResponderHandler(self.responder, self.gossip)
+        self.block_response_handler = \
+            ResponderBlockResponseHandler(self.responder, self.gossip)
+        self.batch_request_handler = \
+            BatchByBatchIdResponderHandler(self.responder, self.gossip)
+        self.batch_by_txn_request_handler = \
+            BatchByTransactionIdResponderHandler(self.responder, self.gossip)
+        self.batch_response_handler = \
+            ResponderBatchResponseHandler(self.responder, self.gossip)
+
+    def _block_request(self, block_id, nonce, time_to_live=3):
+        return network_pb2.GossipBlockRequest(
+            block_id=block_id,
+            nonce=nonce,
+            time_to_live=time_to_live).SerializeToString()
+
+    def _batch_request(self, batch_id, nonce, time_to_live=3):
+        return network_pb2.GossipBatchByBatchIdRequest(
+            id=batch_id,
+            nonce=nonce,
+            time_to_live=time_to_live).SerializeToString()
+
+    def test_block_responder_handler(self):
+        """
+        Test that the BlockResponderHandler answers a request for a block it
+        has and forwards a request for a block it does not have.
+        """
+        self.block_request_handler.handle(
+            "Connection_1", self._block_request("ABC", "1"))
+        self.assertEqual(
+            len(self.gossip.broadcasted[
+                validator_pb2.Message.GOSSIP_BLOCK_REQUEST]),
+            1)
+        forwarded = self.gossip.broadcasted[
+            validator_pb2.Message.GOSSIP_BLOCK_REQUEST][0]
+        self.assertEqual(forwarded.time_to_live, 2)
+        self.assertEqual(self.responder.get_request("ABC"), ["Connection_1"])
+
+        self.completer.add_block(
+            BlockWrapper(Block(header_signature="DEF")))
+        self.block_request_handler.handle(
+            "Connection_1", self._block_request("DEF", "2"))
+        self.assertEqual(
+            self.gossip.sent["Connection_1"][0][0],
+            validator_pb2.Message.GOSSIP_BLOCK_RESPONSE)
+
+    def test_block_request_coalesced(self):
+        """
+        Test that requests for the same block from several peers are only
+        forwarded once, and that all of them are answered when the block
+        response arrives.
+        """
+        self.block_request_handler.handle(
+            "Connection_1", self._block_request("ABC", "1"))
+        self.block_request_handler.handle(
+            "Connection_2", self._block_request("ABC", "2"))
+        self.assertEqual(
+            len(self.gossip.broadcasted[
+                validator_pb2.Message.GOSSIP_BLOCK_REQUEST]),
+            1)
+        self.assertEqual(self.responder.get_request("ABC"),
+                         ["Connection_1", "Connection_2"])
+
+        response = network_pb2.GossipBlockResponse(
+            content=Block(header_signature="ABC").SerializeToString())
+        self.block_response_handler.handle(
+            "Connection_3", response.SerializeToString())
+        self.assertIn("Connection_1", self.gossip.sent)
+        self.assertIn("Connection_2", self.gossip.sent)
+        self.assertIsNone(self.responder.get_request("ABC"))
+
+    def test_repeated_request_dropped(self):
+        """
+        Test that a request which loops back with a nonce that has already
+        been seen is dropped, and a request with no hops left is not
+        forwarded.
+        """
+        self.block_request_handler.handle(
+            "Connection_1", self._block_request("ABC", "1"))
+        result = self.block_request_handler.handle(
+            "Connection_2", self._block_request("ABC", "1"))
+        self.assertEqual(result.status, HandlerStatus.DROP)
+
+        self.gossip.clear()
+        self.batch_request_handler.handle(
+            "Connection_1", self._batch_request("XYZ", "2", time_to_live=0))
+        self.assertEqual(self.gossip.broadcasted, {})
+        self.assertIsNone(self.responder.get_request("XYZ"))
+
+        self.batch_by_txn_request_handler.handle(
+            "Connection_1",
+            network_pb2.GossipBatchByTransactionIdRequest(
+                ids=["123"],
+                nonce="3",
+                time_to_live=0).SerializeToString())
+        self.assertEqual(self.gossip.broadcasted, {})
+        self.assertIsNone(self.responder.get_request("123"))
+
+    def test_batch_request_coalesced(self):
+        """
+        Test that requests for a batch by batch id and by transaction id are
+        coalesced and answered by a single batch response.
+        """
+        self.batch_request_handler.handle(
+            "Connection_1", self._batch_request("ABC", "1"))
+        self.batch_request_handler.handle(
+            "Connection_2", self._batch_request("ABC", "2"))
+        self.batch_by_txn_request_handler.handle(
+            "Connection_3",
+            network_pb2.GossipBatchByTransactionIdRequest(
+                ids=["123"],
+                nonce="3",
+                time_to_live=3).SerializeToString())
+        self.assertEqual(
+            len(self.gossip.broadcasted[
+                validator_pb2.Message.GOSSIP_BATCH_BY_BATCH_ID_REQUEST]),
+            1)
+
+        batch = Batch(
+            header_signature="ABC",
+            transactions=[Transaction(header_signature="123")])
+        response = network_pb2.GossipBatchResponse(
+            content=batch.SerializeToString())
+        self.batch_response_handler.handle(
+            "Connection_4", response.SerializeToString())
+        for connection_id in ["Connection_1", "Connection_2", "Connection_3"]:
+            self.assertEqual(len(self.gossip.sent[connection_id]), 1)
+        self.assertIsNone(self.responder.get_request("ABC"))
+        self.assertIsNone(self.responder.get_request("123"))
+
+    def test_block_range_responder_handler(self):
+        """
+        Test that the BlockRangeResponderHandler answers a block range
+        request with the blocks after stop_block_num, read forward by block
+        number, oldest first and split into chunks, and with a single empty
+        last chunk for a block it does not have.
+        """
+        previous_block_id = "0"
+        for block_num in range(1, 11):
+            header = BlockHeader(block_num=block_num,
+                                 previous_block_id=previous_block_id)
+            self.completer.add_block(BlockWrapper(Block(
+                header=header.SerializeToString(),
+                header_signature=str(block_num))))
+            previous_block_id = str(block_num)
+
+        handler = BlockRangeResponderHandler(
+            self.responder, self.gossip, chunk_size=3)
+        handler.handle(
+            "Connection_1",
+            network_pb2.GossipBlockRangeRequest(
+                block_id="10",
+                stop_block_num=3,
+                max_blocks=100,
+                nonce="1").SerializeToString())
+
+        chunks = []
+        for message_type, message in self.gossip.sent["Connection_1"]:
+            self.assertEqual(
+                message_type,
+                validator_pb2.Message.GOSSIP_BLOCK_RANGE_RESPONSE)
+            chunk = network_pb2.GossipBlockRangeResponse()
+            chunk.ParseFromString(message)
+            chunks.append(chunk)
+        self.assertEqual([chunk.last for chunk in chunks],
+                         [False, False, True])
+        block_ids = []
+        for chunk in chunks:
+            for content in chunk.blocks:
+                block = Block()
+                block.ParseFromString(content)
+                block_ids.append(block.header_signature)
+        self.assertEqual(block_ids, [str(i) for i in range(4, 11)])
+
+        self.gossip.clear()
+        handler.handle(
+            "Connection_1",
+            network_pb2.GossipBlockRangeRequest(
+                block_id="ABC",
+                stop_block_num=3,
+                max_blocks=100,
+                nonce="2").SerializeToString())
+        chunk = network_pb2.GossipBlockRangeResponse()
+        chunk.ParseFromString(self.gossip.sent["Connection_1"][0][1])
+        self.assertTrue(chunk.last)
+        self.assertEqual(len(chunk.blocks), 0)
+
+    def test_block_range_on_fork(self):
+        """
+        Test that a block range request for a block on a fork is answered
+        with the blocks of the current chain up to where the fork branches
+        off, followed by the blocks of the fork, and that the range is capped
+        by max_blocks.
+        """
+        previous_block_id = "0"
+        for block_num in range(1, 11):
+            header = BlockHeader(block_num=block_num,
+                                 previous_block_id=previous_block_id)
+            self.completer.add_block(BlockWrapper(Block(
+                header=header.SerializeToString(),
+                header_signature=str(block_num))))
+            previous_block_id = str(block_num)
+
+        previous_block_id = "5"
+        for block_num in range(6, 9):
+            header = BlockHeader(block_num=block_num,
+                                 previous_block_id=previous_block_id)
+            self.completer.add_block(BlockWrapper(Block(
+                header=header.SerializeToString(),
+                header_signature="fork-{}".format(block_num))),
+                on_chain=False)
+            previous_block_id = "fork-{}".format(block_num)
+
+        self.assertEqual(
+            [block.header_signature
+             for block in self.responder.check_for_block_range(
+                 "fork-8", 3, 100)],
+            ["4", "5", "fork-6", "fork-7", "fork-8"])
+        self.assertEqual(
+            [block.header_signature
+             for block in self.responder.check_for_block_range(
+                 "fork-8", 3, 3)],
+            ["4", "5", "fork-6"])
+        self.assertEqual(
+            [block.header_signature
+             for block in self.responder.check_for_block_range(
+                 "fork-8", 6, 100)],
+            ["fork-7", "fork-8"])